@@ -0,0 +1,125 @@
+"""Mesin agregasi satu-lintasan untuk dashboard.
+
+Semua angka agregat yang dibutuhkan `index()` (total, filter bulan, tren,
+saldo per rekening) dibangun dari SATU kali iterasi atas daftar transaksi.
+Tanggal tiap baris hanya di-parse sekali. Ini implementasi
+backend_agregasi.BackendPython; backend lain membaca angka yang sama dari
+database. Status anggaran selalu dibaca dari view v_status_anggaran
+(pelacak_anggaran.PelacakAnggaran.status).
+"""
+from datetime import datetime
+
+
+def bulan_tahun(tanggal):
+    """Ambil (tahun, bulan) dari string tanggal ISO tanpa membuat objek datetime."""
+    # Format dari PostgREST selalu 'YYYY-MM-DD...' sehingga cukup di-slice.
+    if len(tanggal) >= 7 and tanggal[4] == '-':
+        return int(tanggal[0:4]), int(tanggal[5:7])
+    dt = datetime.fromisoformat(tanggal)
+    return dt.year, dt.month
+
+
+def periode_tren(today, jumlah_bulan=6):
+    """Daftar (tahun, bulan) untuk grafik tren, dari yang terlama ke terbaru.
+
+    Mundur per bulan kalender, bukan kelipatan 30 hari (cara lama bisa
+    melewatkan atau mengulang satu bulan, mis. jika hari ini tanggal 31).
+    """
+    indeks_bulan = today.year * 12 + today.month - 1
+    return [(i // 12, i % 12 + 1) for i in range(indeks_bulan - jumlah_bulan + 1, indeks_bulan + 1)]
+
+
+def agregasi_transaksi(all_transaksi, bulan, tahun):
+    """Hitung semua agregat dashboard dalam satu lintasan.
+
+    Mengembalikan dict berisi:
+      - total_pemasukan / total_pengeluaran: seluruh transaksi
+      - per_bulan: {(tahun, bulan): {'pemasukan': x, 'pengeluaran': y}}
+      - transaksi_bulan_ini: baris pada bulan/tahun filter (urutan asli)
+      - pemasukan_bulan_ini / pengeluaran_bulan_ini: tanpa kategori Transfer
+      - pengeluaran_kategori: {kategori: total} pengeluaran bulan filter
+      - per_rekening: {rekening_id: {'pemasukan': x, 'pengeluaran': y}}
+    """
+    total_pemasukan = 0.0
+    total_pengeluaran = 0.0
+    per_bulan = {}
+    per_rekening = {}
+    transaksi_bulan_ini = []
+    pemasukan_bulan_ini = 0.0
+    pengeluaran_bulan_ini = 0.0
+    pengeluaran_kategori = {}
+    periode_filter = (tahun, bulan)
+
+    for t in all_transaksi:
+        tipe = t.get('tipe')
+        jumlah = float(t.get('jumlah', 0))
+        if tipe == 'pemasukan':
+            total_pemasukan += jumlah
+        elif tipe == 'pengeluaran':
+            total_pengeluaran += jumlah
+
+        rekening_id = t.get('rekening_id')
+        if rekening_id is not None and tipe in ('pemasukan', 'pengeluaran'):
+            rek = per_rekening.get(rekening_id)
+            if rek is None:
+                rek = per_rekening[rekening_id] = {'pemasukan': 0.0, 'pengeluaran': 0.0}
+            rek[tipe] += jumlah
+
+        tanggal = t.get('tanggal')
+        if not tanggal:
+            continue
+        periode = bulan_tahun(tanggal)
+        if tipe in ('pemasukan', 'pengeluaran'):
+            ember = per_bulan.get(periode)
+            if ember is None:
+                ember = per_bulan[periode] = {'pemasukan': 0.0, 'pengeluaran': 0.0}
+            ember[tipe] += jumlah
+
+        if periode == periode_filter:
+            transaksi_bulan_ini.append(t)
+            kategori = t.get('kategori')
+            if tipe == 'pemasukan':
+                if kategori != 'Transfer':
+                    pemasukan_bulan_ini += jumlah
+            elif tipe == 'pengeluaran':
+                if kategori != 'Transfer':
+                    pengeluaran_bulan_ini += jumlah
+                pengeluaran_kategori[kategori] = pengeluaran_kategori.get(kategori, 0.0) + jumlah
+
+    return {
+        'total_pemasukan': total_pemasukan,
+        'total_pengeluaran': total_pengeluaran,
+        'per_bulan': per_bulan,
+        'per_rekening': per_rekening,
+        'transaksi_bulan_ini': transaksi_bulan_ini,
+        'pemasukan_bulan_ini': pemasukan_bulan_ini,
+        'pengeluaran_bulan_ini': pengeluaran_bulan_ini,
+        'pengeluaran_kategori': pengeluaran_kategori,
+    }
+
+
+def data_tren(hasil, periode):
+    """Bangun dict tren untuk Chart.js dari bucket per bulan."""
+    tren_data = {'labels': [], 'pemasukan': [], 'pengeluaran': []}
+    for tahun_tren, bulan_tren in periode:
+        ember = hasil['per_bulan'].get((tahun_tren, bulan_tren), {})
+        tren_data['labels'].append(f"{bulan_tren}/{tahun_tren}")
+        tren_data['pemasukan'].append(ember.get('pemasukan', 0.0))
+        tren_data['pengeluaran'].append(ember.get('pengeluaran', 0.0))
+    return tren_data
+
+
+def saldo_rekening(rekening_list, hasil, saldo_tercatat=None):
+    """Tambahkan 'saldo_sekarang' ke setiap rekening (mengubah dict aslinya).
+
+    Jika `saldo_tercatat` ({rekening_id: saldo} dari buku saldo) diberikan,
+    nilainya dipakai langsung; rekening yang belum tercatat dihitung dari agregat.
+    """
+    saldo_tercatat = saldo_tercatat or {}
+    for rek in rekening_list:
+        if rek['id'] in saldo_tercatat:
+            rek['saldo_sekarang'] = saldo_tercatat[rek['id']]
+            continue
+        mutasi = hasil['per_rekening'].get(rek['id'], {})
+        rek['saldo_sekarang'] = float(rek.get('saldo_awal', 0)) + mutasi.get('pemasukan', 0.0) - mutasi.get('pengeluaran', 0.0)
+    return rekening_list
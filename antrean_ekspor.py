@@ -0,0 +1,206 @@
+"""Antrean pekerjaan ekspor yang dijalankan di latar belakang.
+
+Rute hanya mendaftarkan pekerjaan dan langsung mengembalikan id-nya; file
+Excel/CSV/PDF dibuat di process pool sehingga kerja CPU openpyxl/fpdf tidak
+memegang GIL worker web. Hasilnya disimpan sebagai artefak di direktori
+lokal bersama file status JSON per pekerjaan. Karena status disimpan di disk
+(bukan di memori proses), endpoint status/unduh bisa dilayani worker mana pun.
+
+Id pekerjaan adalah hash dari (format, filter, opsi, versi ledger). Ekspor
+yang sama persis memakai ulang artefak yang sudah ada (atau pekerjaan yang
+sedang berjalan) sampai ada transaksi baru yang menaikkan versi ledger.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from ekspor import iter_transaksi, tulis_csv, tulis_excel, tulis_pdf_transaksi
+
+EKSTENSI = {'excel': 'xlsx', 'csv': 'csv', 'pdf': 'pdf'}
+MIMETYPE = {
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'pdf': 'application/pdf',
+}
+NAMA_UNDUHAN = {'excel': 'laporan_keuangan.xlsx', 'csv': 'laporan_transaksi.csv', 'pdf': 'laporan_keuangan.pdf'}
+
+STATUS_AKTIF = ('antre', 'berjalan')
+
+
+def kunci_ekspor(format_, filter_, opsi, versi):
+    """Id deterministik untuk satu permintaan ekspor pada versi ledger tertentu."""
+    mentah = json.dumps({'format': format_, 'filter': filter_, 'opsi': opsi, 'versi': versi}, sort_keys=True, default=str)
+    return hashlib.sha1(mentah.encode('utf-8')).hexdigest()[:24]
+
+
+def _tulis_json(path, data):
+    # Tulis ke file sementara lalu rename agar pembaca tidak melihat JSON setengah jadi
+    sementara = f'{path}.{os.getpid()}.tmp'
+    with open(sementara, 'w') as f:
+        json.dump(data, f)
+    os.replace(sementara, path)
+
+
+def _baca_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def kerjakan_ekspor(pembuat_klien, format_, filter_, opsi, path_artefak, path_status):
+    """Dijalankan di proses pool: buat satu artefak dan perbarui file statusnya."""
+    status = _baca_json(path_status) or {}
+    status.update(status='berjalan', mulai=time.time())
+    _tulis_json(path_status, status)
+    sementara = f'{path_artefak}.{os.getpid()}.tmp'
+    try:
+        client = pembuat_klien()
+        with open(sementara, 'wb') as output:
+            if format_ == 'excel':
+                tulis_excel(iter_transaksi(client, filter_), output)
+            elif format_ == 'csv':
+                tulis_csv(iter_transaksi(client, filter_), output)
+            else:
+                tulis_pdf_transaksi(client, filter_, output, per_bulan=opsi.get('per_bulan', False), maks_baris=opsi.get('maks_baris'))
+        os.replace(sementara, path_artefak)
+        status.update(status='selesai', selesai=time.time(), ukuran=os.path.getsize(path_artefak))
+    except Exception as e:
+        if os.path.exists(sementara):
+            os.remove(sementara)
+        status.update(status='gagal', selesai=time.time(), pesan=str(e))
+    _tulis_json(path_status, status)
+    return status['status']
+
+
+class AntreanEkspor:
+    def __init__(self, direktori, pembuat_klien, maks_worker=2, maks_ukuran=500 * 1024 * 1024,
+                 maks_umur=24 * 3600, batas_waktu=15 * 60, pool=None):
+        """
+        `pembuat_klien`: callable tanpa argumen yang bisa di-pickle (mis.
+        functools.partial(create_client, url, key)); dipanggil di proses pool.
+        `maks_ukuran` / `maks_umur`: batas total byte dan umur (detik) artefak.
+        `batas_waktu`: pekerjaan aktif yang lebih tua dari ini dianggap macet
+        (mis. worker yang mendaftarkannya mati) dan boleh didaftarkan ulang.
+        """
+        self.direktori = direktori
+        self.pembuat_klien = pembuat_klien
+        self.maks_worker = maks_worker
+        self.maks_ukuran = maks_ukuran
+        self.maks_umur = maks_umur
+        self.batas_waktu = batas_waktu
+        self._pool = pool
+        os.makedirs(direktori, exist_ok=True)
+
+    @property
+    def pool(self):
+        # Dibuat saat pekerjaan pertama agar impor app tidak langsung membuat proses.
+        # 'spawn', bukan fork: worker web punya thread (pool kueri, pool HTTP)
+        # dan socket terbuka yang tidak aman diwarisi proses anak.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.maks_worker, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _path_status(self, id_):
+        return os.path.join(self.direktori, f'{id_}.json')
+
+    def path_artefak(self, status):
+        return os.path.join(self.direktori, f"{status['id']}.{EKSTENSI[status['format']]}")
+
+    def status(self, id_):
+        """Dict status pekerjaan, atau None jika id tidak dikenal/sudah dibersihkan."""
+        if not id_.isalnum():
+            return None
+        return _baca_json(self._path_status(id_))
+
+    def _masih_berlaku(self, status):
+        if status is None:
+            return False
+        if status['status'] == 'selesai':
+            return os.path.exists(self.path_artefak(status))
+        if status['status'] in STATUS_AKTIF:
+            return time.time() - status['dibuat'] < self.batas_waktu
+        return False
+
+    def kirim(self, format_, filter_=None, opsi=None, versi=None):
+        """Daftarkan ekspor dan kembalikan dict statusnya.
+
+        Jika `versi` ledger diketahui, permintaan yang identik memakai ulang
+        artefak/pekerjaan yang sama. Tanpa versi, setiap permintaan dibuat baru.
+        """
+        if format_ not in EKSTENSI:
+            raise ValueError(f'Format ekspor tidak dikenal: {format_}')
+        filter_, opsi = filter_ or {}, opsi or {}
+        id_ = kunci_ekspor(format_, filter_, opsi, versi) if versi is not None else uuid.uuid4().hex[:24]
+        status = self.status(id_)
+        if self._masih_berlaku(status):
+            if status['status'] == 'selesai':
+                # Tandai baru dipakai supaya tidak tergusur lebih dulu (LRU berdasarkan mtime)
+                os.utime(self.path_artefak(status))
+            return status
+
+        self.bersihkan()
+        status = {'id': id_, 'format': format_, 'status': 'antre', 'dibuat': time.time(), 'versi': versi}
+        path_status = self._path_status(id_)
+        _tulis_json(path_status, status)
+        future = self.pool.submit(kerjakan_ekspor, self.pembuat_klien, format_, filter_, opsi, self.path_artefak(status), path_status)
+        future.add_done_callback(lambda f: self._tangani_gagal_pool(f, path_status))
+        return status
+
+    def _tangani_gagal_pool(self, future, path_status):
+        # Kesalahan di dalam kerjakan_ekspor sudah dicatat oleh proses anak;
+        # di sini hanya kegagalan pool (proses mati, argumen tidak bisa di-pickle).
+        error = future.exception()
+        if error is None:
+            return
+        status = _baca_json(path_status) or {}
+        status.update(status='gagal', selesai=time.time(), pesan=str(error) or type(error).__name__)
+        _tulis_json(path_status, status)
+
+    def bersihkan(self):
+        """Hapus artefak yang kedaluwarsa, lalu yang paling lama tidak dipakai
+        sampai total ukurannya di bawah `maks_ukuran`. Mengembalikan jumlah
+        pekerjaan yang dihapus."""
+        sekarang = time.time()
+        artefak, dihapus = [], 0
+        for nama in os.listdir(self.direktori):
+            if not nama.endswith('.json'):
+                continue
+            status = _baca_json(os.path.join(self.direktori, nama))
+            if status is None or status.get('status') in STATUS_AKTIF and self._masih_berlaku(status):
+                continue
+            path = self.path_artefak(status) if status.get('format') in EKSTENSI else None
+            if status.get('status') == 'selesai' and path and os.path.exists(path):
+                mtime = os.path.getmtime(path)
+                if sekarang - mtime <= self.maks_umur:
+                    artefak.append((mtime, os.path.getsize(path), status))
+                    continue
+            elif sekarang - status.get('dibuat', 0) <= self.maks_umur:
+                # Pekerjaan gagal/macet disimpan sebentar supaya statusnya masih bisa dibaca
+                continue
+            self._hapus(status)
+            dihapus += 1
+
+        total = sum(ukuran for _, ukuran, _ in artefak)
+        for _, ukuran, status in sorted(artefak, key=lambda a: a[0]):
+            if total <= self.maks_ukuran:
+                break
+            self._hapus(status)
+            total -= ukuran
+            dihapus += 1
+        return dihapus
+
+    def _hapus(self, status):
+        paths = [self._path_status(status['id'])]
+        if status.get('format') in EKSTENSI:
+            paths.append(self.path_artefak(status))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
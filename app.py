@@ -1,13 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, get_flashed_messages, send_file, Response, jsonify
-from supabase import create_client, Client
-from datetime import datetime, date, timedelta
-import pandas as pd
-from io import BytesIO
+from flask import Flask, render_template, request, redirect, url_for, flash, get_flashed_messages, send_file, Response, jsonify, stream_with_context, has_request_context, abort
+from datetime import datetime
 import json
+import csv
+import functools
+import hashlib
+import hmac
+import importlib
+import itertools
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
-from fpdf import FPDF
+from werkzeug.http import is_resource_modified
+from markupsafe import Markup
 import locale
+from agregasi import data_tren, periode_tren, saldo_rekening
+from backend_agregasi import buat_backend, ringkasan_kosong
+from cache import CacheFragmen, CacheTTL
+from kueri_paralel import HasilKueri, PelaksanaKueri
+from buku_saldo import BukuSaldo
+from rekap_bulanan import RekapBulanan
+from pelacak_anggaran import AMBANG_BAWAAN, PelacakAnggaran, pesan_peringatan
+from dana_darurat import DANA_AMAN_TARGET, NAMA as NAMA_DANA_DARURAT, DanaDarurat, waterfall
+from paginasi import ambil_halaman, filter_dari_args, hitung_total
+from pencarian import MODE as MODE_PENCARIAN, IndeksPencarian
+from penulisan import PenulisSupabase
+from ekspor import iter_transaksi, iter_csv, tulis_excel, tulis_pdf_transaksi
+from versi import VersiData
+from klien import KlienMalas, KonfigurasiPool, buat_klien_supabase, statistik_pool
+from instrumentasi import KlienTerinstrumentasi, fase, metrik_bawaan, pasang_flask
+from antrean_ekspor import AntreanEkspor, MIMETYPE, NAMA_UNDUHAN
+from impor import (KATEGORI_PELUNASAN, KATEGORI_UTANG_BARU, KOLOM_OPSIONAL, KOLOM_WAJIB, UKURAN_BATCH, baca_berkas,
+                   impor_transaksi as jalankan_impor, periksa_header)
+import click
 
 # 1. Inisialisasi Aplikasi Flask
 app = Flask(__name__)
@@ -22,10 +47,76 @@ supabase_key = os.getenv("SUPABASE_KEY")
 if not supabase_url or not supabase_key:
     raise ValueError("SUPABASE_URL dan SUPABASE_KEY harus didefinisikan di file .env")
 
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    raise ValueError(f"Gagal menginisialisasi klien Supabase: {str(e)}")
+# Metrik performa: latensi kueri Supabase per tabel/operasi, durasi request dan
+# fase rute (rute /metrics dan header Server-Timing, lihat instrumentasi.py).
+# Rute /metrics, /statistik_cache dan /statistik_pool hanya aktif jika
+# TOKEN_METRIK diatur (lihat hanya_internal).
+# PROFIL_RASIO > 0 menjalankan profiler sampling untuk sebagian request.
+metrik = metrik_bawaan()
+pasang_flask(
+    app, metrik,
+    rasio_profil=float(os.getenv("PROFIL_RASIO", "0")),
+    interval_profil=float(os.getenv("PROFIL_INTERVAL_MS", "5")) / 1000,
+    direktori_profil=os.getenv("DIREKTORI_PROFIL", os.path.join(tempfile.gettempdir(), "nadifah-profil")),
+)
+
+# Klien dibuat (dan paket supabase diimpor) saat kueri pertama, lihat klien.py.
+# Kueri PostgREST memakai pool koneksi terbatas dengan keep-alive, timeout dan
+# retry untuk baca (SUPABASE_POOL_MAKS, SUPABASE_TIMEOUT_BACA, ..., lihat KonfigurasiPool).
+konfigurasi_pool = KonfigurasiPool.dari_env()
+klien_supabase = KlienMalas(functools.partial(buat_klien_supabase, supabase_url, supabase_key, konfigurasi_pool))
+supabase = KlienTerinstrumentasi(klien_supabase, metrik)
+
+# Thread pool untuk kueri baca yang independen (1 = jalankan berurutan)
+pelaksana_kueri = PelaksanaKueri(maks_worker=int(os.getenv("KUERI_PARALEL_WORKER", "8")))
+
+# Sumber agregat dashboard: 'rekap' (tabel rekap_bulanan), 'supabase' (view di database,
+# lihat folder sql/) atau 'python'.
+# Sub-kuerinya memakai pool sendiri karena backend ini dipanggil dari dalam pelaksana_kueri.
+backend_agregasi = buat_backend(os.getenv("AGREGASI_BACKEND", "rekap"), supabase,
+                                pelaksana=PelaksanaKueri(maks_worker=3 if pelaksana_kueri.maks_worker > 1 else 1))
+
+# Cache untuk tabel referensi (pengaturan, rekening, anggaran, tabungan) dan jumlah total transaksi
+cache_referensi = CacheTTL(ttl=float(os.getenv("CACHE_TTL", "30")), maks_entri=128)
+
+# Saldo berjalan per rekening (tabel saldo_rekening, lihat sql/002_saldo_rekening.sql)
+buku_saldo = BukuSaldo(supabase)
+
+# Total per bulan/tipe/kategori/rekening (tabel rekap_bulanan, lihat sql/005_rekap_bulanan.sql)
+rekap_bulanan = RekapBulanan(supabase)
+
+# Pemakaian anggaran per bulan/kategori dan peringatan saat ambang dilewati
+# (sql/008_anggaran_terpakai.sql). AMBANG_ANGGARAN: rasio dipisah koma, mis. "0.5,0.8,1".
+pelacak_anggaran = PelacakAnggaran(supabase, ambang=[float(a) for a in os.getenv("AMBANG_ANGGARAN", "").split(',') if a.strip()] or AMBANG_BAWAAN)
+
+# Indeks pencarian teks transaksi dan utang/piutang (sql/009_pencarian.sql)
+indeks_pencarian = IndeksPencarian(supabase)
+
+# Batas jumlah transaksi yang dirender ke tabel PDF; di atas ini hanya ringkasan
+MAKS_BARIS_PDF = int(os.getenv("MAKS_BARIS_PDF", "20000"))
+
+# Batas panjang grafik tren di dashboard (?tren=N bulan)
+MAKS_BULAN_TREN = 36
+
+# Baris Dana Darurat di tabel tabungan (lihat dana_darurat.py, sql/007_dana_darurat.sql)
+dana_darurat = DanaDarurat(supabase)
+
+# Versi data per tabel (tabel versi_data, lihat sql/004_versi_data.sql)
+versi_data = VersiData(supabase)
+
+# Rute tambah/hapus transaksi dan utang/piutang, serta impor per batch: satu RPC per operasi yang
+# menulis semua langkahnya dalam satu transaksi database (sql/010_penulisan_atomik.sql)
+penulis = PenulisSupabase(supabase, ambang=pelacak_anggaran.ambang)
+
+# Ekspor di latar belakang: artefak disimpan di direktori lokal dan dipakai
+# ulang selama versi ledger belum berubah
+antrean_ekspor = AntreanEkspor(
+    os.getenv("DIREKTORI_EKSPOR", os.path.join(tempfile.gettempdir(), "nadifah-ekspor")),
+    functools.partial(buat_klien_supabase, supabase_url, supabase_key, konfigurasi_pool),
+    maks_worker=int(os.getenv("EKSPOR_WORKER", "2")),
+    maks_ukuran=int(os.getenv("EKSPOR_MAKS_MB", "500")) * 1024 * 1024,
+    maks_umur=int(os.getenv("EKSPOR_MAKS_UMUR_JAM", "24")) * 3600,
+)
 
 # Mengatur bahasa ke Bahasa Indonesia untuk format tanggal dan waktu
 try:
@@ -60,125 +151,210 @@ def format_datetime(value, format='%Y-%m-%d'):
 
 app.jinja_env.filters['datetimeformat'] = format_datetime
 
+# --- Helper baca tabel referensi lewat cache ---
+# segar=True membaca langsung dari database (dan memperbarui cache); dipakai
+# saat hasilnya disimpan dengan kunci versi, karena cache proses ini bisa
+# belum melihat penulisan worker lain.
+def ambil_gaji(segar=False):
+    """Nilai mentah pengaturan 'gaji' (string), atau None jika belum diatur."""
+    def muat():
+        response = supabase.table('pengaturan').select('nilai').eq('kunci', 'gaji').execute()
+        return response.data[0]['nilai'] if response.data else None
+    return cache_referensi.ambil('pengaturan', 'kunci=gaji', muat, segar=segar)
+
+def ambil_rekening(segar=False):
+    return cache_referensi.ambil('rekening', 'semua', lambda: supabase.table('rekening').select('*').order('id').execute().data or [], segar=segar)
+
+def ambil_status_anggaran(bulan, tahun, segar=False):
+    # Ikut diinvalidasi saat transaksi berubah (lihat setelah_penulisan)
+    return cache_referensi.ambil('anggaran', f'status bulan={bulan}&tahun={tahun}', lambda: pelacak_anggaran.status(bulan, tahun), segar=segar)
+
+def ambil_tabungan(segar=False):
+    return cache_referensi.ambil('tabungan', 'semua', lambda: supabase.table('tabungan').select('*').order('id').execute().data or [], segar=segar)
+
+# --- Helper setelah transaksi ditulis ---
+def setelah_penulisan(hasil):
+    """Setelah RPC penulis: data turunan dan Dana Darurat sudah diperbarui di database, tinggal cache proses ini."""
+    cache_referensi.invalidasi('transaksi', 'anggaran')
+    if hasil.get('dana_darurat_berubah'):
+        cache_referensi.invalidasi('tabungan')
+    umumkan_peringatan(hasil.get('peringatan') or [])
+
+def umumkan_peringatan(peringatan):
+    for p in peringatan:
+        print(f"Peringatan anggaran: {pesan_peringatan(p)}")
+        if p['arah'] == 'naik' and has_request_context():
+            flash(pesan_peringatan(p), 'warning')
+
+def sinkronkan_dana_darurat():
+    """Samakan target/alokasi Dana Darurat dengan gaji dan total saldo terbaru.
+
+    Dipanggil setelah gaji berubah; penulisan transaksi menyinkronkan Dana
+    Darurat di dalam RPC atomiknya sendiri. Penulisannya idempoten, jadi aman
+    diulang (mis. lewat `flask sinkronkan-dana-darurat`).
+    Mengembalikan True jika baris Dana Darurat ditulis.
+    """
+    try:
+        nilai_gaji = ambil_gaji()
+        gaji = float(nilai_gaji) if nilai_gaji is not None else 0.0
+        berubah = dana_darurat.sinkronkan(gaji, backend_agregasi.total_saldo())
+    except Exception as e:
+        print(f"Error syncing dana darurat: {e}")
+        return False
+    if berubah:
+        tandai_berubah('tabungan')
+    return berubah
+
+def naikkan_versi(*tabel):
+    """Tandai tabel sudah berubah; kegagalan hanya membuat cache berbasis versi dimuat ulang lebih lambat."""
+    try:
+        versi_data.naikkan(*tabel)
+    except Exception as e:
+        print(f"Error updating versi_data: {e}")
+
+def tandai_berubah(*tabel):
+    """Setelah tabel referensi ditulis: buang cache proses ini dan naikkan versinya untuk semua worker."""
+    cache_referensi.invalidasi(*tabel)
+    naikkan_versi(*tabel)
+
+def versi_ledger():
+    """Versi tabel transaksi saat ini, atau None jika tidak bisa dibaca."""
+    try:
+        return versi_data.ambil('transaksi')
+    except Exception as e:
+        print(f"Error reading versi_data: {e}")
+        return None
+
 # 4. Rute Utama (Dashboard) - VERSI BARU
-@app.route('/')
-def index():
-    # --- Bagian 1: Pengambilan Data Awal ---
+def parameter_dashboard(args):
+    """(bulan, tahun, jumlah_bulan_tren, today) dari query string dashboard."""
     today = datetime.now()
-    bulan_filter = request.args.get('bulan', default=today.month, type=int)
-    tahun_filter = request.args.get('tahun', default=today.year, type=int)
+    bulan_filter = args.get('bulan', default=today.month, type=int)
+    tahun_filter = args.get('tahun', default=today.year, type=int)
+    # Panjang grafik tren (?tren=12, 24, ...); biayanya sebanding jumlah bulan
+    jumlah_bulan_tren = min(max(args.get('tren', default=6, type=int), 1), MAKS_BULAN_TREN)
+    return bulan_filter, tahun_filter, jumlah_bulan_tren, today
+
+def hitung_dashboard(bulan_filter, tahun_filter, jumlah_bulan_tren, today, lewati=(), tambahan=None, susulan=None, segar=False):
+    """Semua angka dashboard untuk index() dan /api/dashboard.
+
+    Mengembalikan dict nilai Python (belum di-JSON-kan) plus 'galat': daftar
+    pesan error yang ditampilkan index() lewat flash, dan 'kueri_gagal': nama
+    kueri yang error.
+
+    Untuk cache panel index(): kueri di `lewati` tidak dijalankan dan nilainya
+    kosong; `tambahan` ({nama: fungsi}) ikut dijalankan bersamaan dan hasilnya
+    dikembalikan di 'tambahan'. `susulan(hasil_kueri)` dipanggil sesudahnya
+    dan mengembalikan (nama kueri, nilai); nilai dikembalikan di 'susulan' dan
+    nama kueri adalah yang perlu dijalankan (lagi) sebagai putaran kedua: kueri dari `lewati` yang ternyata tetap perlu, dan kueri tabel
+    referensi yang harus dibaca segar karena panelnya akan disimpan dengan
+    kunci versi. Putaran kedua selalu melewati cache_referensi; dengan
+    `segar=True` putaran pertama juga (untuk hasil yang disimpan di
+    cache_dashboard).
+    """
+    # --- Bagian 1: Pengambilan Data Awal ---
+    galat = []
+    periode = periode_tren(today, jumlah_bulan_tren)
+
+    # Semua kueri baca di bawah tidak saling bergantung, jadi dijalankan bersamaan.
+    # Error tiap kueri tetap ditangani di blok try/except masing-masing.
+    def daftar_kueri(segar):
+        return {
+            'gaji': lambda: ambil_gaji(segar),
+            # Agregat dihitung oleh backend (default: view di database), bukan dari select('*')
+            'agregat': lambda: backend_agregasi.ringkasan(bulan_filter, tahun_filter, periode),
+            'anggaran': lambda: ambil_status_anggaran(bulan_filter, tahun_filter, segar),
+            'tabungan': lambda: ambil_tabungan(segar),
+            'rekening': lambda: ambil_rekening(segar),
+            'saldo_rekening': buku_saldo.semua,
+            'utang_piutang': lambda: supabase.table('utang_piutang').select('*').eq('lunas', False).execute().data or [],
+        }
 
-    all_transaksi, gaji = [], 0.0
+    with fase('kueri', metrik):
+        kueri = daftar_kueri(segar)
+        tambahan = tambahan or {}
+        hasil_kueri = pelaksana_kueri.jalankan({nama: fungsi for nama, fungsi in dict(kueri, **tambahan).items() if nama not in lewati})
+        perlu, nilai_susulan = susulan(hasil_kueri) if susulan is not None else ((), None)
+        perlu = set(perlu) & set(kueri)
+        if perlu:
+            kueri_segar = daftar_kueri(True)
+            hasil_kueri.update(pelaksana_kueri.jalankan({nama: kueri_segar[nama] for nama in perlu}))
+    hasil_kueri.update({nama: HasilKueri({} if nama == 'saldo_rekening' else [], None) for nama in set(lewati) - perlu})
+
+    gaji = 0.0
+    try:
+        nilai_gaji = hasil_kueri['gaji'].nilai()
+        gaji = float(nilai_gaji) if nilai_gaji is not None else 0.0
+    except Exception as e:
+        print(f"Error fetching initial data: {e}")
+        galat.append(f"Gagal mengambil data awal: {e}")
+
+    hasil_agregasi = ringkasan_kosong()
     try:
-        gaji_response = supabase.table('pengaturan').select('nilai').eq('kunci', 'gaji').execute()
-        gaji = float(gaji_response.data[0]['nilai']) if gaji_response.data else 0.0
-        transaksi_response = supabase.table('transaksi').select('*').order('tanggal', desc=True).execute()
-        all_transaksi = transaksi_response.data or []
+        hasil_agregasi = hasil_kueri['agregat'].nilai()
     except Exception as e:
         print(f"Error fetching initial data: {e}")
-        flash(f"Gagal mengambil data awal: {e}", "error")
+        galat.append(f"Gagal mengambil data awal: {e}")
 
-    # --- Bagian 2: Perhitungan Umum & Filter ---
-    total_pemasukan_all = sum(float(t.get('jumlah', 0)) for t in all_transaksi if t.get('tipe') == 'pemasukan')
-    total_pengeluaran_all = sum(float(t.get('jumlah', 0)) for t in all_transaksi if t.get('tipe') == 'pengeluaran')
+    # --- Bagian 2: Perhitungan Umum & Filter (lihat agregasi.py & backend_agregasi.py) ---
+    total_pemasukan_all = hasil_agregasi['total_pemasukan']
+    total_pengeluaran_all = hasil_agregasi['total_pengeluaran']
     total_saldo = total_pemasukan_all - total_pengeluaran_all
     
-    transaksi_bulan_ini = [
-        t for t in all_transaksi 
-        if t.get('tanggal') and 
-           datetime.fromisoformat(t['tanggal']).month == bulan_filter and 
-           datetime.fromisoformat(t['tanggal']).year == tahun_filter
-    ]
-    pemasukan_bulan_ini = sum(float(t.get('jumlah', 0)) for t in transaksi_bulan_ini if t.get('tipe') == 'pemasukan' and t.get('kategori') != 'Transfer')
-    pengeluaran_bulan_ini = sum(float(t.get('jumlah', 0)) for t in transaksi_bulan_ini if t.get('tipe') == 'pengeluaran' and t.get('kategori') != 'Transfer')
+    transaksi_bulan_ini = hasil_agregasi['transaksi_bulan_ini']
+    pemasukan_bulan_ini = hasil_agregasi['pemasukan_bulan_ini']
+    pengeluaran_bulan_ini = hasil_agregasi['pengeluaran_bulan_ini']
     
     # ... Logika Chart dan Tren ...
-    pengeluaran_kategori = {k: 0.0 for k in KATEGORI_PENGELUARAN}
-    for t in transaksi_bulan_ini:
-        if t.get('tipe') == 'pengeluaran' and t.get('kategori') in pengeluaran_kategori:
-            pengeluaran_kategori[t['kategori']] += float(t.get('jumlah', 0))
+    pengeluaran_kategori = {k: hasil_agregasi['pengeluaran_kategori'].get(k, 0.0) for k in KATEGORI_PENGELUARAN}
     chart_data = {'labels': list(pengeluaran_kategori.keys()), 'data': list(pengeluaran_kategori.values())}
-    tren_data = {'labels': [], 'pemasukan': [], 'pengeluaran': []}
-    for i in range(5, -1, -1):
-        target_date = today - timedelta(days=i*30)
-        bulan_tren, tahun_tren = target_date.month, target_date.year
-        transaksi_per_bulan = [t for t in all_transaksi if t.get('tanggal') and datetime.fromisoformat(t['tanggal']).month == bulan_tren and datetime.fromisoformat(t['tanggal']).year == tahun_tren]
-        tren_pemasukan = sum(float(t.get('jumlah', 0)) for t in transaksi_per_bulan if t.get('tipe') == 'pemasukan')
-        tren_pengeluaran = sum(float(t.get('jumlah', 0)) for t in transaksi_per_bulan if t.get('tipe') == 'pengeluaran')
-        tren_data['labels'].append(f"{bulan_tren}/{tahun_tren}")
-        tren_data['pemasukan'].append(tren_pemasukan)
-        tren_data['pengeluaran'].append(tren_pengeluaran)
+    tren_data = data_tren(hasil_agregasi, periode)
     total_tren_pemasukan = sum(tren_data['pemasukan'])
     total_tren_pengeluaran = sum(tren_data['pengeluaran'])
     arus_kas_bersih_tren = total_tren_pemasukan - total_tren_pengeluaran
 
     # --- Bagian 3: Logika Anggaran ---
+    # Pemakaian sudah dihitung inkremental oleh pelacak_anggaran, jadi cukup satu baris per anggaran
     anggaran_status = []
     try:
-        anggaran = supabase.table('anggaran').select('*').eq('bulan', bulan_filter).eq('tahun', tahun_filter).execute().data or []
-        for a in anggaran:
-            terpakai = sum(float(t.get('jumlah', 0)) for t in transaksi_bulan_ini if t.get('kategori') == a.get('kategori') and t.get('tipe') == 'pengeluaran')
-            anggaran_status.append({'kategori': a.get('kategori'), 'batas': float(a.get('batas', 0)), 'terpakai': terpakai, 'sisa': float(a.get('batas', 0)) - terpakai, 'melebihi': terpakai > float(a.get('batas', 0))})
+        anggaran_status = hasil_kueri['anggaran'].nilai()
     except Exception as e:
         print(f"Error fetching anggaran: {e}")
 
     # --- Bagian 4: Logika Dana Darurat & Tabungan ---
+    # Dashboard hanya membaca; baris Dana Darurat dibuat/diperbarui oleh
+    # sinkronkan_dana_darurat() saat gaji berubah dan oleh RPC penulisan
+    # atomik saat transaksi berubah.
     dana_darurat_obj, tabungan_lain = None, []
     try:
-        dd_response = supabase.table('tabungan').select('id, target, terkumpul').eq('nama', 'Dana Darurat').maybe_single().execute()
-        if not dd_response.data:
-            target_awal = gaji * 3 if gaji > 0 else 0
-            supabase.table('tabungan').insert({'nama': 'Dana Darurat', 'target': target_awal, 'terkumpul': 0.0, 'tenggat': (date.today() + timedelta(days=365*10)).isoformat()}).execute()
-        else:
-            new_target = gaji * 3
-            if float(dd_response.data.get('target', 0)) != new_target and gaji > 0:
-                supabase.table('tabungan').update({'target': new_target}).eq('nama', 'Dana Darurat').execute()
-        semua_tabungan = supabase.table('tabungan').select('*').order('id').execute().data or []
-        dana_darurat_obj = next((t for t in semua_tabungan if t.get('nama') == 'Dana Darurat'), None)
-        tabungan_lain = [t for t in semua_tabungan if t.get('nama') != 'Dana Darurat']
+        semua_tabungan = hasil_kueri['tabungan'].nilai()
+        dana_darurat_obj = next((t for t in semua_tabungan if t.get('nama') == NAMA_DANA_DARURAT), None)
+        tabungan_lain = [t for t in semua_tabungan if t.get('nama') != NAMA_DANA_DARURAT]
     except Exception as e:
         print(f"!!! TERJADI ERROR PADA BLOK TABUNGAN: {e} !!!")
-        
+
     # --- Bagian 5: LOGIKA WATERFALL ---
-    DANA_AMAN_TARGET = 10000000.0
-    sisa_uang = total_saldo
-    dana_aman_terpenuhi = min(sisa_uang, DANA_AMAN_TARGET)
-    sisa_uang_setelah_aman = sisa_uang - dana_aman_terpenuhi
-    saldo_produktif = sisa_uang_setelah_aman
-    if dana_darurat_obj:
-        dana_darurat_terkumpul_saat_ini = float(dana_darurat_obj.get('terkumpul', 0))
-        dana_darurat_target = float(dana_darurat_obj.get('target', 0))
-        if dana_darurat_terkumpul_saat_ini < dana_darurat_target:
-            kebutuhan_dana_darurat = dana_darurat_target - dana_darurat_terkumpul_saat_ini
-            alokasi_ke_dana_darurat = min(sisa_uang_setelah_aman, kebutuhan_dana_darurat)
-            if alokasi_ke_dana_darurat > 0:
-                terkumpul_baru = dana_darurat_terkumpul_saat_ini + alokasi_ke_dana_darurat
-                try:
-                    supabase.table('tabungan').update({'terkumpul': terkumpul_baru}).eq('id', dana_darurat_obj['id']).execute()
-                    dana_darurat_obj['terkumpul'] = terkumpul_baru
-                except Exception as e:
-                    print(f"ERROR: Gagal menyimpan alokasi dana darurat: {e}")
-            sisa_uang_setelah_darurat = sisa_uang_setelah_aman - alokasi_ke_dana_darurat
-            saldo_produktif = sisa_uang_setelah_darurat
+    pembagian = waterfall(total_saldo, dana_darurat_obj, gaji)
+    dana_aman_terpenuhi, saldo_produktif = pembagian['dana_aman_terpenuhi'], pembagian['saldo_produktif']
+    dana_darurat_obj = pembagian['dana_darurat']
 
     # --- Bagian 6: Logika Saldo Rekening ---
     rekening_dengan_saldo = []
     try:
-        rekening_list = supabase.table('rekening').select('*').order('id').execute().data or []
-        for rek in rekening_list:
-            tx_for_rek = [t for t in all_transaksi if t.get('rekening_id') == rek['id']]
-            pemasukan_rek = sum(float(t['jumlah']) for t in tx_for_rek if t['tipe'] == 'pemasukan')
-            pengeluaran_rek = sum(float(t['jumlah']) for t in tx_for_rek if t['tipe'] == 'pengeluaran')
-            saldo_sekarang = float(rek.get('saldo_awal', 0)) + pemasukan_rek - pengeluaran_rek
-            rek['saldo_sekarang'] = saldo_sekarang
-            rekening_dengan_saldo.append(rek)
+        rekening_list = hasil_kueri['rekening'].nilai()
+        saldo_tercatat = {}
+        try:
+            saldo_tercatat = hasil_kueri['saldo_rekening'].nilai()
+        except Exception as e:
+            print(f"Error fetching saldo_rekening: {e}")
+        rekening_dengan_saldo = saldo_rekening(rekening_list, hasil_agregasi, saldo_tercatat)
     except Exception as e:
         print(f"Error calculating rekening balances: {e}")
 
     # --- Bagian 7: Logika Utang Piutang (DIKEMBALIKAN KE VERSI LENGKAP) ---
     utang_piutang_summary = {'total_utang': 0.0, 'total_piutang': 0.0}
     try:
-        semua_utang_piutang = supabase.table('utang_piutang').select('*').eq('lunas', False).execute().data or []
+        semua_utang_piutang = hasil_kueri['utang_piutang'].nilai()
         for item in semua_utang_piutang:
             sisa = float(item.get('jumlah_total', 0)) - float(item.get('jumlah_terbayar', 0))
             if item.get('tipe') == 'Utang':
@@ -188,21 +364,244 @@ def index():
     except Exception as e:
         print(f"Error fetching utang_piutang data: {e}")
 
+    return {
+        'transaksi': transaksi_bulan_ini[:5],
+        'dana_aman_terpenuhi': dana_aman_terpenuhi, 'DANA_AMAN_TARGET': DANA_AMAN_TARGET,
+        'total_saldo': total_saldo, 'saldo_produktif': saldo_produktif,
+        'pemasukan_bulan_ini': pemasukan_bulan_ini, 'pengeluaran_bulan_ini': pengeluaran_bulan_ini,
+        'dana_darurat': dana_darurat_obj, 'tabungan': tabungan_lain, 'gaji': gaji,
+        'chart_data': chart_data, 'tren_data': tren_data,
+        'anggaran_status': anggaran_status, 'total_tren_pemasukan': total_tren_pemasukan,
+        'total_tren_pengeluaran': total_tren_pengeluaran, 'arus_kas_bersih_tren': arus_kas_bersih_tren,
+        'rekening_data': rekening_dengan_saldo,
+        'utang_piutang_data': utang_piutang_summary,
+        'bulan': bulan_filter,
+        'tahun': tahun_filter,
+        'jumlah_bulan_tren': jumlah_bulan_tren,
+        'galat': galat,
+        'kueri_gagal': {nama for nama, h in hasil_kueri.items() if h.error is not None and nama not in tambahan},
+        'tambahan': {nama: hasil_kueri[nama] for nama in tambahan},
+        'susulan': nilai_susulan,
+    }
+
+# Panel sisi kanan index.html (templates/panel/<nama>.html) -> (tabel sumber,
+# kueri hitung_dashboard yang hanya dipakai panel itu, bergantung bulan/tahun?,
+# kueri tabel referensi yang dibaca panel itu).
+# HTML panel disimpan di cache_fragmen dengan kunci versi tabel sumbernya, jadi
+# panel yang tabelnya tidak ditulis sejak render terakhir tidak dikueri maupun
+# dirender ulang. Panel tabungan tetap butuh kueri tabungan untuk kartu Dana Aman.
+PANEL_DASHBOARD = {
+    'rekening': (('rekening', 'transaksi'), ('rekening', 'saldo_rekening'), False, ('rekening',)),
+    'anggaran': (('anggaran', 'transaksi'), ('anggaran',), True, ('anggaran',)),
+    'utang_piutang': (('utang_piutang',), ('utang_piutang',), False, ()),
+    'tabungan': (('tabungan', 'pengaturan', 'transaksi'), (), False, ('tabungan', 'gaji')),
+}
+
+# Kueri hitung_dashboard yang dibaca lewat cache_referensi -> tabel yang
+# mengubah hasilnya. Sebelum panel disimpan, kueri ini dibaca ulang tanpa
+# cache jika salah satu tabelnya berubah sejak panel itu terakhir disimpan:
+# cache_referensi per proses bisa belum melihat penulisan worker lain, dan
+# data lama itu akan terkunci di bawah kunci versi yang baru.
+KUERI_REFERENSI = {
+    'gaji': ('pengaturan',),
+    'rekening': ('rekening',),
+    'anggaran': ('anggaran', 'transaksi'),
+    'tabungan': ('tabungan',),
+}
+
+# HTML panel dashboard per (panel, bulan/tahun, versi tabel), LRU dengan batas memori
+cache_fragmen = CacheFragmen(maks_byte=int(float(os.getenv("CACHE_FRAGMEN_MB", "8")) * 1024 * 1024))
+
+def cari_panel(parameter_panel, tersimpan, lewati, hasil_kueri):
+    """`susulan` hitung_dashboard untuk index(): HTML panel tersimpan untuk versi tabel saat ini.
+
+    Mengembalikan (kueri yang perlu dijalankan susulan, (panel, kunci)):
+    panel berisi HTML yang masih cocok, kunci berisi kunci versi setiap panel
+    (kosong jika versi_data gagal dibaca, sehingga tidak ada yang disimpan).
+    """
+    try:
+        versi = hasil_kueri['versi'].nilai()
+    except Exception as e:
+        print(f"Error reading versi_data: {e}")
+        versi = None
+    panel, kunci, perlu = {}, {}, set()
+    for nama, (tabel, kueri, _, referensi) in PANEL_DASHBOARD.items():
+        if versi is not None:
+            kunci[nama] = tuple(versi.get(t, 0) for t in tabel)
+            html = cache_fragmen.ambil(nama, parameter_panel[nama], kunci[nama])
+            if html is not None:
+                panel[nama] = Markup(html)
+                continue
+            lama = tersimpan[nama]
+            berubah = {t for i, t in enumerate(tabel) if lama is None or lama[i] != kunci[nama][i]}
+            perlu.update(k for k in referensi if berubah & set(KUERI_REFERENSI[k]))
+        perlu.update(k for k in kueri if k in lewati)
+    return perlu, (panel, kunci)
+
+def panel_dashboard(bulan_filter, tahun_filter, jumlah_bulan_tren, today):
+    """Data dashboard dan HTML panel untuk index(): (data, panel).
+
+    Panel dari cache_fragmen dipakai apa adanya; sisanya dirender dari data
+    lalu disimpan, kecuali panel yang kuerinya gagal. Pesan galat sudah
+    di-flash.
+    """
+    parameter_panel = {nama: (bulan_filter, tahun_filter) if per_periode else () for nama, (_, _, per_periode, _) in PANEL_DASHBOARD.items()}
+
+    # versi_data dibaca bersamaan dengan kueri dashboard, bukan sebelumnya. Kueri
+    # panel yang punya HTML tersimpan dilewati dengan tebakan bahwa versinya belum
+    # berubah; jika ternyata berubah, kueri panel itu dijalankan susulan.
+    tersimpan = {nama: cache_fragmen.versi_tersimpan(nama, parameter_panel[nama]) for nama in PANEL_DASHBOARD}
+    lewati = {k for nama, (_, kueri, _, _) in PANEL_DASHBOARD.items() if tersimpan[nama] is not None for k in kueri}
+    with fase('dashboard', metrik):
+        data = hitung_dashboard(bulan_filter, tahun_filter, jumlah_bulan_tren, today, lewati=lewati, tambahan={'versi': versi_data.semua},
+                                susulan=functools.partial(cari_panel, parameter_panel, tersimpan, lewati))
+    panel, kunci = data.pop('susulan')
+    for pesan in data.pop('galat'):
+        flash(pesan, "error")
+    data.pop('total_saldo')
+    data.pop('tambahan')
+    kueri_gagal = data.pop('kueri_gagal')
+
     # --- Bagian 8: Final Render ---
-    return render_template('index.html',
-        transaksi=transaksi_bulan_ini[:5],
-        dana_aman_terpenuhi=dana_aman_terpenuhi, DANA_AMAN_TARGET=DANA_AMAN_TARGET,
-        saldo_produktif=saldo_produktif, pemasukan_bulan_ini=pemasukan_bulan_ini,
-        pengeluaran_bulan_ini=pengeluaran_bulan_ini,
-        dana_darurat=dana_darurat_obj, tabungan=tabungan_lain, gaji=gaji,
-        chart_data=json.dumps(chart_data), tren_data=json.dumps(tren_data), 
-        anggaran_status=anggaran_status, total_tren_pemasukan=total_tren_pemasukan,
-        total_tren_pengeluaran=total_tren_pengeluaran, arus_kas_bersih_tren=arus_kas_bersih_tren,
-        rekening_data=rekening_dengan_saldo,
-        utang_piutang_data=utang_piutang_summary,
-        bulan=bulan_filter,
-        tahun=tahun_filter
-    )
+    data['chart_data'] = json.dumps(data['chart_data'])
+    data['tren_data'] = json.dumps(data['tren_data'])
+    with fase('panel', metrik):
+        for nama, (_, kueri, _, _) in PANEL_DASHBOARD.items():
+            if nama in panel:
+                continue
+            panel[nama] = Markup(render_template(f'panel/{nama}.html', **data))
+            # Panel dari kueri yang gagal (atau agregat yang gagal) tidak disimpan
+            if nama in kunci and not kueri_gagal & {'agregat', 'gaji', 'tabungan', *kueri}:
+                cache_fragmen.simpan(nama, parameter_panel[nama], kunci[nama], str(panel[nama]))
+    return data, panel
+
+@app.route('/')
+def index():
+    data, panel = panel_dashboard(*parameter_dashboard(request.args))
+    with fase('render', metrik):
+        return render_template('index.html', panel=panel, **data)
+
+# --- API JSON Dashboard ---
+# Bagian ringkasan -> tabel yang memengaruhi angkanya. ETag tiap bagian hanya
+# berubah jika salah satu tabel ini ditulis (versi_data), jadi klien yang
+# polling mendapat 304 tanpa dashboard dihitung ulang.
+BAGIAN_DASHBOARD = {
+    'saldo': ('transaksi', 'rekening', 'tabungan', 'pengaturan'),
+    'bulan_ini': ('transaksi',),
+    'grafik': ('transaksi',),
+    'tren': ('transaksi',),
+    'anggaran': ('anggaran', 'transaksi'),
+    'tabungan': ('tabungan', 'pengaturan', 'transaksi'),
+    'utang_piutang': ('utang_piutang',),
+}
+
+# Hasil hitung_dashboard per (parameter, versi semua tabel); entri lama tidak
+# pernah cocok lagi setelah ada penulisan, TTL hanya membatasi memori.
+cache_dashboard = CacheTTL(ttl=float(os.getenv("CACHE_TTL", "30")), maks_entri=32)
+
+def json_dashboard(data):
+    """Bentuk JSON per bagian dari hasil hitung_dashboard()."""
+    return {
+        'saldo': {
+            'total_saldo': data['total_saldo'],
+            'dana_aman_terpenuhi': data['dana_aman_terpenuhi'],
+            'dana_aman_target': data['DANA_AMAN_TARGET'],
+            'saldo_produktif': data['saldo_produktif'],
+            'rekening': data['rekening_data'],
+        },
+        'bulan_ini': {
+            'pemasukan': data['pemasukan_bulan_ini'],
+            'pengeluaran': data['pengeluaran_bulan_ini'],
+            'transaksi_terbaru': data['transaksi'],
+        },
+        'grafik': data['chart_data'],
+        'tren': dict(data['tren_data'], total_pemasukan=data['total_tren_pemasukan'],
+                     total_pengeluaran=data['total_tren_pengeluaran'], arus_kas_bersih=data['arus_kas_bersih_tren']),
+        'anggaran': data['anggaran_status'],
+        'tabungan': {'gaji': data['gaji'], 'dana_darurat': data['dana_darurat'], 'lainnya': data['tabungan']},
+        'utang_piutang': data['utang_piutang_data'],
+    }
+
+def _ambil_json_dashboard(parameter, segar=False):
+    data = hitung_dashboard(*parameter, segar=segar)
+    if data['galat']:
+        # Dilempar agar CacheTTL tidak menyimpan hasil yang tidak lengkap
+        raise RuntimeError('; '.join(data['galat']))
+    return json_dashboard(data)
+
+@app.route('/api/dashboard')
+@app.route('/api/dashboard/<bagian>')
+def api_dashboard(bagian=None):
+    """Ringkasan dashboard sebagai JSON (semua bagian, atau satu bagian).
+
+    Parameter query sama dengan / (bulan, tahun, tren). Respons membawa ETag
+    dan Last-Modified dari versi_data; If-None-Match / If-Modified-Since yang
+    masih cocok dijawab 304 tanpa menjalankan kueri dashboard.
+    """
+    if bagian is not None and bagian not in BAGIAN_DASHBOARD:
+        return jsonify({'error': f"Bagian tidak dikenal: {bagian}", 'bagian': sorted(BAGIAN_DASHBOARD)}), 404
+    bulan_filter, tahun_filter, jumlah_bulan_tren, today = parameter_dashboard(request.args)
+    # Tren dan bulan default ikut bergeser saat bulan berganti
+    parameter_kunci = (bulan_filter, tahun_filter, jumlah_bulan_tren, today.year, today.month)
+    tabel = BAGIAN_DASHBOARD[bagian] if bagian else sorted({t for ts in BAGIAN_DASHBOARD.values() for t in ts})
+
+    try:
+        with fase('versi', metrik):
+            versi = versi_data.detail()
+    except Exception as e:
+        print(f"Error reading versi_data: {e}")
+        versi = None
+
+    etag, terakhir_diubah = None, None
+    if versi is not None:
+        versi_bagian = tuple(versi.get(t, (0, None))[0] for t in tabel)
+        etag = hashlib.sha1(repr((bagian, parameter_kunci, versi_bagian)).encode()).hexdigest()[:20]
+        waktu = [versi[t][1] for t in tabel if t in versi and versi[t][1] is not None]
+        terakhir_diubah = max(waktu) if waktu else None
+        if not is_resource_modified(request.environ, etag=etag, last_modified=terakhir_diubah):
+            respons = Response(status=304)
+            respons.set_etag(etag)
+            return respons
+
+    try:
+        with fase('dashboard', metrik):
+            if versi is None:
+                hasil = _ambil_json_dashboard((bulan_filter, tahun_filter, jumlah_bulan_tren, today))
+            else:
+                # Disimpan dengan kunci versi, jadi tabel referensi dibaca tanpa
+                # cache_referensi yang mungkin belum melihat penulisan worker lain
+                versi_semua = tuple(sorted((t, v) for t, (v, _) in versi.items()))
+                hasil = cache_dashboard.ambil('dashboard', (parameter_kunci, versi_semua),
+                                              lambda: _ambil_json_dashboard((bulan_filter, tahun_filter, jumlah_bulan_tren, today), segar=True))
+    except Exception as e:
+        print(f"Error building dashboard JSON: {e}")
+        return jsonify({'error': f"Gagal menghitung ringkasan: {e}"}), 503
+
+    respons = jsonify(hasil[bagian] if bagian else dict(hasil, periode={'bulan': bulan_filter, 'tahun': tahun_filter, 'tren': jumlah_bulan_tren}))
+    respons.headers['Cache-Control'] = 'private, no-cache'
+    if etag is not None:
+        respons.set_etag(etag)
+        if terakhir_diubah is not None:
+            respons.last_modified = terakhir_diubah
+    return respons
+
+@app.route('/api/peringatan_anggaran')
+def api_peringatan_anggaran():
+    """Log peringatan anggaran, terbaru lebih dulu.
+
+    Filter opsional ?bulan=&tahun=&kategori=; halaman berikutnya lewat
+    ?sebelum_id=<nilai 'berikutnya' dari respons sebelumnya>.
+    """
+    limit = min(max(request.args.get('limit', default=50, type=int), 1), 200)
+    try:
+        daftar = pelacak_anggaran.peringatan(bulan=request.args.get('bulan', type=int), tahun=request.args.get('tahun', type=int),
+                                            kategori=request.args.get('kategori'), sebelum_id=request.args.get('sebelum_id', type=int), limit=limit)
+    except Exception as e:
+        print(f"Error fetching peringatan_anggaran: {e}")
+        return jsonify({'error': f"Gagal mengambil peringatan anggaran: {e}"}), 503
+    for p in daftar:
+        p['pesan'] = pesan_peringatan(p)
+    return jsonify({'peringatan': daftar, 'berikutnya': daftar[-1]['id'] if len(daftar) == limit else None})
 
 # --- SEMUA FUNGSI HALAMAN LAINNYA ---
 @app.route('/atur_gaji', methods=['GET', 'POST'])
@@ -210,13 +609,15 @@ def atur_gaji():
     if request.method == 'POST':
         gaji = request.form.get('gaji', '0')
         supabase.table('pengaturan').upsert({'kunci': 'gaji', 'nilai': gaji}).execute()
+        tandai_berubah('pengaturan')
+        sinkronkan_dana_darurat()
         flash('Gaji berhasil diperbarui!', 'success')
         return redirect(url_for('index'))
     gaji_saat_ini = "0"
     try:
-        response = supabase.table('pengaturan').select('nilai').eq('kunci', 'gaji').execute()
-        if response.data:
-            gaji_saat_ini = response.data[0]['nilai']
+        nilai_gaji = ambil_gaji()
+        if nilai_gaji is not None:
+            gaji_saat_ini = nilai_gaji
     except Exception:
         pass
     return render_template('atur_gaji.html', gaji=gaji_saat_ini)
@@ -226,7 +627,7 @@ def atur_gaji():
 def tambah_transaksi():
     rekening_list = []
     try:
-        rekening_list = supabase.table('rekening').select('*').order('id').execute().data or []
+        rekening_list = ambil_rekening()
     except Exception as e:
         flash(f"Gagal mengambil daftar rekening: {e}", "error")
 
@@ -252,55 +653,45 @@ def tambah_transaksi():
                 
                 transaksi_keluar = {'deskripsi': deskripsi or "Transfer ke rekening lain", 'jumlah': jumlah, 'tipe': 'pengeluaran', 'kategori': 'Transfer', 'tanggal': tanggal_final.isoformat(), 'rekening_id': rekening_sumber_id}
                 transaksi_masuk = {'deskripsi': deskripsi or "Transfer dari rekening lain", 'jumlah': jumlah, 'tipe': 'pemasukan', 'kategori': 'Transfer', 'tanggal': tanggal_final.isoformat(), 'rekening_id': rekening_tujuan_id}
-                supabase.table('transaksi').insert([transaksi_keluar, transaksi_masuk]).execute()
+                setelah_penulisan(penulis.catat([transaksi_keluar, transaksi_masuk]))
                 flash('Transfer dana berhasil dicatat!', 'success')
 
             else: # Untuk Pemasukan & Pengeluaran
                 kategori = request.form['kategori']
                 rekening_id = int(request.form['rekening_id'])
-                
-                # Selalu catat transaksi utamanya terlebih dahulu
-                supabase.table('transaksi').insert({
+                pihak_terkait = request.form.get('pihak_terkait')
+
+                # Transaksi dan catatan utang/piutang yang dibuat/dibayarnya
+                # tersimpan bersama dalam satu RPC, atau tidak sama sekali
+                utang_baru = pelunasan = None
+                if kategori in KATEGORI_UTANG_BARU and pihak_terkait:
+                    tipe_up = KATEGORI_UTANG_BARU[kategori]
+                    desk_up = deskripsi or (f"Piutang kepada {pihak_terkait}" if tipe_up == 'Piutang' else f"Utang dari {pihak_terkait}")
+                    utang_baru = {'tipe': tipe_up, 'deskripsi': desk_up, 'pihak_terkait': pihak_terkait}
+                elif kategori in KATEGORI_PELUNASAN and pihak_terkait:
+                    # Bagi pembayaran ke catatan aktif pihak terkait, yang terlama lebih dulu
+                    pelunasan = {'tipe': KATEGORI_PELUNASAN[kategori], 'pihak_terkait': pihak_terkait}
+                hasil = penulis.catat([{
                     'deskripsi': deskripsi, 'jumlah': jumlah, 'tipe': tipe, 'kategori': kategori,
                     'tanggal': tanggal_final.isoformat(), 'rekening_id': rekening_id
-                }).execute()
-                
-                # --- LOGIKA BARU UNTUK OTOMATISASI UTANG/PIUTANG ---
-                pihak_terkait = request.form.get('pihak_terkait')
+                }], utang_baru=utang_baru, pelunasan=pelunasan)
+                setelah_penulisan(hasil)
 
-                # Logika untuk MEMBUAT UTANG/PIUTANG BARU
-                if kategori == 'Pemberian Piutang' or kategori == 'Penerimaan Utang':
+                if kategori in KATEGORI_UTANG_BARU:
                     if not pihak_terkait:
                         flash(f"Transaksi '{kategori}' berhasil dicatat, TAPI catatan utang/piutang gagal dibuat karena Nama Pihak Terkait kosong.", "error")
                     else:
-                        tipe_up = 'Piutang' if kategori == 'Pemberian Piutang' else 'Utang'
-                        desk_up = deskripsi or (f"Piutang kepada {pihak_terkait}" if tipe_up == 'Piutang' else f"Utang dari {pihak_terkait}")
-                        supabase.table('utang_piutang').insert({
-                            'tipe': tipe_up, 'deskripsi': desk_up, 'pihak_terkait': pihak_terkait,
-                            'jumlah_total': jumlah, 'jumlah_terbayar': 0.0, 'lunas': False,
-                            'tanggal_mulai': tanggal_final.isoformat()
-                        }).execute()
                         flash('Transaksi dan catatan utang/piutang baru berhasil dibuat!', 'success')
-                
-                # Logika untuk MEMBAYAR/MENGURANGI UTANG/PIUTANG YANG ADA
-                elif kategori == 'Penerimaan Piutang' or kategori == 'Pembayaran Utang':
+                elif kategori in KATEGORI_PELUNASAN:
                     if not pihak_terkait:
                         flash(f"Transaksi '{kategori}' berhasil dicatat, TAPI tidak ada catatan utang/piutang yang diperbarui karena Nama Pihak Terkait kosong.", "warning")
+                    elif hasil['alokasi']:
+                        jumlah_catatan = len(hasil['alokasi'])
+                        flash(f"Transaksi '{kategori}' berhasil dicatat dan {jumlah_catatan} catatan untuk {pihak_terkait} telah diperbarui!", "success")
+                        if hasil['sisa']:
+                            flash(f"Kelebihan pembayaran Rp {hasil['sisa']:,.2f} tidak teralokasi karena semua catatan {pihak_terkait} sudah lunas.", "warning")
                     else:
-                        tipe_up_dicari = 'Piutang' if kategori == 'Penerimaan Piutang' else 'Utang'
-                        # Cari utang/piutang yang belum lunas dengan pihak terkait
-                        item_response = supabase.table('utang_piutang').select('*').eq('tipe', tipe_up_dicari).eq('pihak_terkait', pihak_terkait).eq('lunas', False).execute()
-                        
-                        if item_response.data:
-                            item = item_response.data[0] # Ambil yang pertama ditemukan
-                            terbayar_baru = float(item['jumlah_terbayar']) + jumlah
-                            lunas_baru = terbayar_baru >= float(item['jumlah_total'])
-                            supabase.table('utang_piutang').update({
-                                'jumlah_terbayar': terbayar_baru, 'lunas': lunas_baru
-                            }).eq('id', item['id']).execute()
-                            flash(f"Transaksi '{kategori}' berhasil dicatat dan catatan untuk {pihak_terkait} telah diperbarui!", "success")
-                        else:
-                            flash(f"Transaksi '{kategori}' berhasil dicatat, TAPI tidak ditemukan catatan utang/piutang aktif untuk {pihak_terkait}.", "warning")
+                        flash(f"Transaksi '{kategori}' berhasil dicatat, TAPI tidak ditemukan catatan utang/piutang aktif untuk {pihak_terkait}.", "warning")
                 else:
                     flash('Transaksi berhasil ditambahkan!', 'success')
 
@@ -314,8 +705,15 @@ def tambah_transaksi():
 @app.route('/hapus_transaksi/<int:id>')
 def hapus_transaksi(id):
     try:
-        supabase.table('transaksi').delete().eq('id', id).execute()
-        flash('Transaksi berhasil dihapus.', 'success')
+        # Pembayaran utang/piutang dari transaksi ini ikut dibatalkan dan catatan
+        # yang dibuatnya ikut dihapus, dalam satu transaksi database
+        hasil = penulis.hapus_transaksi(id)
+        setelah_penulisan(hasil)
+        jumlah_catatan = len(hasil['utang_piutang_dihapus']) + len(hasil['utang_piutang_diperbarui'])
+        if jumlah_catatan:
+            flash(f"Transaksi berhasil dihapus dan {jumlah_catatan} catatan utang/piutang ikut disesuaikan.", 'success')
+        else:
+            flash('Transaksi berhasil dihapus.', 'success')
     except Exception as e:
         flash(f"Gagal menghapus transaksi: {e}", "error")
     
@@ -332,6 +730,7 @@ def tambah_rekening():
                 'jenis_rekening': request.form['jenis_rekening'],
                 'saldo_awal': float(request.form['saldo_awal'])
             }).execute()
+            tandai_berubah('rekening')
             flash('Rekening baru berhasil ditambahkan!', 'success')
             return redirect(url_for('index'))
         except Exception as e:
@@ -346,6 +745,7 @@ def tambah_anggaran():
                 'kategori': request.form['kategori'], 'batas': float(request.form['batas']),
                 'bulan': int(request.form['bulan']), 'tahun': int(request.form['tahun'])
             }).execute()
+            tandai_berubah('anggaran')
             flash('Anggaran berhasil ditambahkan!', 'success')
             return redirect(url_for('index'))
         except Exception as e:
@@ -363,6 +763,7 @@ def tambah_tabungan():
                 'nama': nama_tabungan, 'target': float(request.form['target']), 'terkumpul': 0.0,
                 'tenggat': datetime.strptime(request.form['tenggat'], '%Y-%m-%d').date().isoformat()
             }).execute()
+            tandai_berubah('tabungan')
             flash('Target tabungan baru berhasil dibuat!', 'success')
             return redirect(url_for('index'))
         except Exception as e:
@@ -378,6 +779,7 @@ def tambah_dana_tabungan(id):
             terkumpul_sekarang = float(response.data.get('terkumpul', 0))
             terkumpul_baru = terkumpul_sekarang + jumlah
             supabase.table('tabungan').update({'terkumpul': terkumpul_baru}).eq('id', id).execute()
+            tandai_berubah('tabungan')
             flash(f'Dana sebesar Rp {jumlah:,.2f} berhasil ditambahkan ke tabungan!', 'success')
         else:
             flash(f'Error: Target tabungan dengan ID {id} tidak ditemukan.', 'error')
@@ -385,6 +787,50 @@ def tambah_dana_tabungan(id):
         flash(f"Error saat menambah dana tabungan: {e}", "error")
     return redirect(url_for('index'))
 
+# Rute statistik membuka isi proses (latensi per tabel, cache, pool koneksi),
+# jadi mati (404) kecuali TOKEN_METRIK diatur; permintaan harus membawa
+# "Authorization: Bearer <TOKEN_METRIK>" (bearer_token di konfigurasi scrape
+# Prometheus).
+TOKEN_METRIK = os.getenv("TOKEN_METRIK", "")
+
+def hanya_internal(rute):
+    @functools.wraps(rute)
+    def pembungkus(*args, **kwargs):
+        if not TOKEN_METRIK:
+            abort(404)
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {TOKEN_METRIK}'.encode()):
+            return Response('Token tidak valid', 401, {'WWW-Authenticate': 'Bearer'})
+        return rute(*args, **kwargs)
+    return pembungkus
+
+@app.route('/statistik_cache')
+@hanya_internal
+def statistik_cache():
+    return jsonify(dict(cache_referensi.statistik(), fragmen=cache_fragmen.statistik()))
+
+def _gauge_cache():
+    return [({'cache': nama, 'statistik': k}, v)
+            for nama, cache in (('referensi', cache_referensi), ('dashboard', cache_dashboard), ('fragmen', cache_fragmen))
+            for k, v in cache.statistik().items()]
+
+metrik.gauge('cache', 'Statistik cache di memori proses (hit, miss, eviksi, entri, rasio_hit; byte untuk fragmen).', _gauge_cache)
+
+@app.route('/statistik_pool')
+@hanya_internal
+def statistik_pool_http():
+    return jsonify(statistik_pool(klien_supabase) or {})
+
+def _gauge_pool():
+    return [({'statistik': k}, v) for k, v in (statistik_pool(klien_supabase) or {}).items()]
+
+metrik.gauge('pool_http', 'Pool koneksi Supabase (dipakai, menunggu, koneksi baru/dipakai ulang, retry).', _gauge_pool)
+
+@app.route('/metrics')
+@hanya_internal
+def metrics():
+    """Metrik proses ini dalam format teks Prometheus."""
+    return Response(metrik.prometheus(), mimetype='text/plain; version=0.0.4')
+
 # --- RUTE UNTUK FITUR UTANG PIUTANG ---
 @app.route('/utang_piutang')
 def utang_piutang():
@@ -392,7 +838,7 @@ def utang_piutang():
     try:
         response = supabase.table('utang_piutang').select('*').order('lunas').order('tanggal_jatuh_tempo').execute()
         items = response.data or []
-        rekening_list = supabase.table('rekening').select('id, nama_rekening').execute().data or []
+        rekening_list = ambil_rekening()
     except Exception as e:
         flash(f"Gagal mengambil data utang/piutang: {e}", "error")
     return render_template('utang_piutang.html', items=items, rekening_list=rekening_list)
@@ -402,36 +848,16 @@ def utang_piutang():
 def bayar_cicilan():
     try:
         utang_piutang_id = int(request.form['utang_piutang_id'])
-        tipe_up = request.form['tipe_utang_piutang']
         jumlah_bayar = float(request.form['jumlah'])
         # Cukup gunakan waktu sekarang untuk pembayaran cicilan agar simpel
         tanggal_bayar = datetime.now()
         rekening_id = int(request.form['rekening_id'])
-        
-        item_response = supabase.table('utang_piutang').select('*').eq('id', utang_piutang_id).single().execute()
-        item = item_response.data
-        
-        terbayar_baru = float(item['jumlah_terbayar']) + jumlah_bayar
-        lunas_baru = terbayar_baru >= float(item['jumlah_total'])
-        
-        supabase.table('utang_piutang').update({
-            'jumlah_terbayar': terbayar_baru, 'lunas': lunas_baru
-        }).eq('id', utang_piutang_id).execute()
-
-        tipe_transaksi, kategori, desk_auto = ('', '', '')
-        if tipe_up == 'Utang':
-            tipe_transaksi, kategori = 'pengeluaran', 'Pembayaran Utang'
-            desk_auto = f"Bayar Utang: {item['deskripsi']}"
-        else:
-            tipe_transaksi, kategori = 'pemasukan', 'Penerimaan Piutang'
-            desk_auto = f"Terima Piutang: {item['deskripsi']}"
-        
-        # Gunakan tanggal_bayar dan hapus bulan/tahun
-        supabase.table('transaksi').insert({
-            'deskripsi': desk_auto, 'jumlah': jumlah_bayar, 'tipe': tipe_transaksi,
-            'kategori': kategori, 'tanggal': tanggal_bayar.isoformat(), 'rekening_id': rekening_id
-        }).execute()
-        
+
+        # Transaksi pembayaran dan jumlah_terbayar ditulis dalam satu RPC; tipe,
+        # kategori dan deskripsi transaksi mengikuti catatan utang/piutangnya
+        hasil = penulis.bayar_cicilan(utang_piutang_id, jumlah_bayar, rekening_id, tanggal_bayar.isoformat())
+        setelah_penulisan(hasil)
+
         flash(f"Pembayaran sejumlah Rp {jumlah_bayar:,.2f} berhasil dicatat!", "success")
     except Exception as e:
         flash(f"Error saat mencatat pembayaran: {e}", "error")
@@ -441,7 +867,7 @@ def bayar_cicilan():
 @app.route('/hapus_utang_piutang/<int:id>')
 def hapus_utang_piutang(id):
     try:
-        supabase.table('utang_piutang').delete().eq('id', id).execute()
+        penulis.hapus_utang_piutang(id)
         flash('Catatan utang/piutang berhasil dihapus.', 'success')
     except Exception as e:
         flash(f"Gagal menghapus catatan: {e}", "error")
@@ -451,165 +877,322 @@ def hapus_utang_piutang(id):
 def semua_transaksi():
     # Tentukan jumlah item per halaman
     PER_PAGE = 15 
-    
-    # Ambil nomor halaman dari URL, default-nya adalah halaman 1
-    page = request.args.get('page', 1, type=int)
-    
-    # Hitung offset untuk query database
-    offset = (page - 1) * PER_PAGE
-    
-    try:
-        # Ambil total jumlah transaksi untuk menghitung total halaman
-        count_response = supabase.table('transaksi').select('id', count='exact').execute()
-        total_items = count_response.count
-        
-        # Ambil data transaksi sesuai halaman saat ini
-        transaksi_response = supabase.table('transaksi').select('*').order('tanggal', desc=True).limit(PER_PAGE).offset(offset).execute()
-        transaksi_list = transaksi_response.data or []
-        
-        # Hitung total halaman
-        total_pages = (total_items + PER_PAGE - 1) // PER_PAGE
 
+    # Paginasi memakai kursor (tanggal, id), bukan OFFSET, lihat paginasi.py
+    filter_aktif = filter_dari_args(request.args)
+    sesudah = request.args.get('sesudah')
+    sebelum = request.args.get('sebelum')
+    # Total persis hanya dihitung jika diminta, lalu disimpan di cache
+    hitung = request.args.get('hitung', type=int) == 1
+
+    transaksi_list, kursor_berikutnya, kursor_sebelumnya, total_items = [], None, None, None
+    try:
+        with fase('kueri', metrik):
+            halaman = ambil_halaman(supabase, filter_aktif, sesudah=sesudah, sebelum=sebelum, per_halaman=PER_PAGE)
+        transaksi_list = halaman['data']
+        kursor_berikutnya = halaman['kursor_berikutnya']
+        kursor_sebelumnya = halaman['kursor_sebelumnya']
+        if hitung:
+            kunci_filter = '&'.join(f"{k}={v}" for k, v in sorted(filter_aktif.items()))
+            total_items = cache_referensi.ambil('transaksi', f'count?{kunci_filter}', lambda: hitung_total(supabase, filter_aktif))
     except Exception as e:
         flash(f"Gagal mengambil riwayat transaksi: {e}", "error")
-        transaksi_list = []
-        total_pages = 0
 
+    rekening_list = []
+    try:
+        rekening_list = ambil_rekening()
+    except Exception as e:
+        print(f"Error fetching rekening: {e}")
+
+    # Parameter filter yang dibawa ke link navigasi/hapus filter
+    args_filter = {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in filter_aktif.items()}
     return render_template(
         'semua_transaksi.html', 
         transaksi=transaksi_list,
-        current_page=page,
-        total_pages=total_pages
+        kursor_berikutnya=kursor_berikutnya,
+        kursor_sebelumnya=kursor_sebelumnya,
+        total_items=total_items,
+        filter=args_filter,
+        hitung=hitung,
+        rekening_list=rekening_list,
+        kategori_pemasukan=KATEGORI_PEMASUKAN,
+        kategori_pengeluaran=KATEGORI_PENGELUARAN
     )
 # ===============================================
 
-# --- Kode Ekspor (Tidak diubah) ---
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Laporan Keuangan Pribadi', 0, 1, 'C')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Halaman {self.page_no()}', 0, 0, 'C')
-
-    def chapter_title(self, title):
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, title, 0, 1, 'L')
-        self.ln(5)
-
-    def fancy_table(self, header, data):
-        self.set_fill_color(230, 230, 230)
-        self.set_text_color(0)
-        self.set_draw_color(128)
-        self.set_line_width(0.3)
-        self.set_font('', 'B')
-        col_widths = [25, 105, 30, 25, 25]
-        for i, h in enumerate(header):
-            self.cell(col_widths[i], 7, h, 1, 0, 'C', 1)
-        self.ln()
-        self.set_font('')
-        fill = False
-        for row in data:
-            self.cell(col_widths[0], 6, str(row.get('tanggal', '')), 'LR', 0, 'L', fill)
-            self.cell(col_widths[1], 6, str(row.get('deskripsi', '')), 'LR', 0, 'L', fill)
-            self.cell(col_widths[2], 6, "Rp {:,.2f}".format(float(row.get('jumlah', 0.0))), 'LR', 0, 'R', fill)
-            self.cell(col_widths[3], 6, str(row.get('tipe', '')), 'LR', 0, 'L', fill)
-            self.cell(col_widths[4], 6, str(row.get('kategori', '')), 'LR', 0, 'L', fill)
-            self.ln()
-            fill = not fill
-        self.cell(sum(col_widths), 0, '', 'T')
-
-    def summary_section(self, total_pemasukan, total_pengeluaran, sisa_uang):
-        self.add_page()
-        self.chapter_title('Ringkasan Keuangan')
-        self.set_font('Arial', '', 12)
-        self.cell(50, 10, 'Total Pemasukan:', 0, 0)
-        self.set_font('', 'B')
-        self.cell(0, 10, "Rp {:,.2f}".format(total_pemasukan), 0, 1)
-        self.set_font('')
-        self.cell(50, 10, 'Total Pengeluaran:', 0, 0)
-        self.set_font('', 'B')
-        self.cell(0, 10, "Rp {:,.2f}".format(total_pengeluaran), 0, 1)
-        self.set_font('')
-        self.line(self.get_x(), self.get_y(), self.get_x() + 100, self.get_y())
-        self.ln(5)
-        self.cell(50, 10, 'Sisa Uang:', 0, 0)
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, "Rp {:,.2f}".format(sisa_uang), 0, 1)
+# --- Pencarian teks (lihat pencarian.py) ---
+PER_HALAMAN_CARI = 20
 
+def jalankan_pencarian(args):
+    """(kueri, filter, sumber, mode, hasil) dari query string /cari dan /api/cari."""
+    kueri = args.get('q', '').strip()
+    filter_aktif = filter_dari_args(args)
+    sumber = args.get('sumber') or None
+    mode = args.get('mode') if args.get('mode') in MODE_PENCARIAN else 'otomatis'
+    halaman = max(1, args.get('halaman', default=1, type=int))
+    with fase('kueri', metrik):
+        hasil = indeks_pencarian.cari(kueri, filter_aktif, sumber=sumber, mode=mode, halaman=halaman, per_halaman=PER_HALAMAN_CARI)
+    return kueri, filter_aktif, sumber, mode, hasil
+
+@app.route('/cari')
+def cari():
+    kueri, filter_aktif, sumber, mode, hasil = '', {}, None, 'otomatis', {'data': [], 'mode': 'otomatis', 'halaman': 1, 'ada_berikutnya': False}
+    try:
+        kueri, filter_aktif, sumber, mode, hasil = jalankan_pencarian(request.args)
+    except Exception as e:
+        flash(f"Gagal mencari: {e}", "error")
+
+    rekening_list = []
+    try:
+        rekening_list = ambil_rekening()
+    except Exception as e:
+        print(f"Error fetching rekening: {e}")
+
+    args_filter = {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in filter_aktif.items()}
+    if sumber:
+        args_filter['sumber'] = sumber
+    return render_template(
+        'cari.html',
+        kueri=kueri,
+        hasil=hasil,
+        mode=mode,
+        filter=args_filter,
+        rekening_list=rekening_list,
+        kategori_pemasukan=KATEGORI_PEMASUKAN,
+        kategori_pengeluaran=KATEGORI_PENGELUARAN
+    )
+
+@app.route('/api/cari')
+def api_cari():
+    """Hasil pencarian JSON: {'data', 'mode', 'halaman', 'ada_berikutnya'}."""
+    try:
+        _, _, _, _, hasil = jalankan_pencarian(request.args)
+    except Exception as e:
+        print(f"Error searching indeks_pencarian: {e}")
+        return jsonify({'error': f"Gagal mencari: {e}"}), 503
+    return jsonify(hasil)
+
+# --- Kode Ekspor ---
 @app.route('/ekspor_excel')
 def ekspor_excel():
+    # Filter opsional sama seperti ekspor CSV
+    filter_aktif = filter_dari_args(request.args)
     try:
-        response = supabase.table('transaksi').select('*').order('tanggal', desc=True).execute()
-        transaksi = response.data or []
-        if not transaksi:
-            df_empty = pd.DataFrame()
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_empty.to_excel(writer, index=False, sheet_name='Ringkasan')
-            output.seek(0)
-            return send_file(output, download_name='laporan_keuangan_kosong.xlsx', as_attachment=True)
-        df = pd.DataFrame(transaksi)
-        df['jumlah'] = pd.to_numeric(df['jumlah'], errors='coerce').fillna(0)
-        df_pemasukan = df[df['tipe'] == 'pemasukan'].copy()
-        df_pengeluaran = df[df['tipe'] == 'pengeluaran'].copy()
-        total_pemasukan = df_pemasukan['jumlah'].sum()
-        total_pengeluaran = df_pengeluaran['jumlah'].sum()
-        sisa_uang = total_pemasukan - total_pengeluaran
-        summary_data = {'Deskripsi': ['Total Pemasukan', 'Total Pengeluaran', 'Sisa Uang'], 'Jumlah': [total_pemasukan, total_pengeluaran, sisa_uang]}
-        df_summary = pd.DataFrame(summary_data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_summary.to_excel(writer, index=False, sheet_name='Ringkasan')
-            df_pemasukan.to_excel(writer, index=False, sheet_name='Pemasukan')
-            df_pengeluaran.to_excel(writer, index=False, sheet_name='Pengeluaran')
+        # Workbook write-only ditulis ke file sementara di disk, bukan BytesIO
+        output = tempfile.TemporaryFile()
+        jumlah_baris = tulis_excel(iter_transaksi(supabase, filter_aktif), output)
         output.seek(0)
-        return send_file(output, download_name='laporan_keuangan.xlsx', as_attachment=True, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        nama_file = 'laporan_keuangan.xlsx' if jumlah_baris else 'laporan_keuangan_kosong.xlsx'
+        return send_file(output, download_name=nama_file, as_attachment=True, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     except Exception as e:
         print(f"Error exporting to Excel: {e}")
         return redirect(url_for('index'))
 
 @app.route('/ekspor_csv')
 def ekspor_csv():
+    # Filter opsional: dari, sampai, rekening_id (juga tipe & kategori)
+    filter_aktif = filter_dari_args(request.args)
     try:
-        response = supabase.table('transaksi').select('*').order('tanggal', desc=True).execute()
-        transaksi = response.data or []
-        df = pd.DataFrame(transaksi)
-        output = BytesIO()
-        output.write(df.to_csv(index=False, encoding='utf-8').encode('utf-8'))
-        output.seek(0)
-        return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=laporan_transaksi.csv"})
+        transaksi_iter = iter_transaksi(supabase, filter_aktif)
+        # Ambil baris pertama di sini supaya error koneksi masih bisa di-redirect
+        pertama = next(transaksi_iter, None)
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
         return redirect(url_for('index'))
+    semua_baris = itertools.chain([pertama], transaksi_iter) if pertama is not None else iter(())
+    return Response(stream_with_context(iter_csv(semua_baris)), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=laporan_transaksi.csv"})
 
 @app.route('/ekspor_pdf')
 def ekspor_pdf():
+    # Filter opsional sama seperti ekspor CSV; ?per_bulan=1 memisah tabel per bulan
+    filter_aktif = filter_dari_args(request.args)
     try:
-        response = supabase.table('transaksi').select('*').order('tanggal', desc=True).execute()
-        transaksi = response.data or []
-        pemasukan_data = [t for t in transaksi if t['tipe'] == 'pemasukan']
-        pengeluaran_data = [t for t in transaksi if t['tipe'] == 'pengeluaran']
-        total_pemasukan = sum(float(t.get('jumlah', 0)) for t in pemasukan_data)
-        total_pengeluaran = sum(float(t.get('jumlah', 0)) for t in pengeluaran_data)
-        sisa_uang = total_pemasukan - total_pengeluaran
-        pdf = PDF('L', 'mm', 'A4')
-        header = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori']
-        pdf.add_page()
-        pdf.chapter_title('Laporan Pemasukan')
-        pdf.fancy_table(header, pemasukan_data)
-        pdf.add_page()
-        pdf.chapter_title('Laporan Pengeluaran')
-        pdf.fancy_table(header, pengeluaran_data)
-        pdf.summary_section(total_pemasukan, total_pengeluaran, sisa_uang)
-        return Response(pdf.output(dest='S').encode('latin-1'), mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=laporan_keuangan.pdf'})
+        output = tempfile.TemporaryFile()
+        with fase('pdf', metrik):
+            tulis_pdf_transaksi(supabase, filter_aktif, output, per_bulan=request.args.get('per_bulan') == '1', maks_baris=MAKS_BARIS_PDF)
+        output.seek(0)
+        return send_file(output, download_name='laporan_keuangan.pdf', as_attachment=True, mimetype='application/pdf')
     except Exception as e:
         print(f"Error exporting to PDF: {e}")
         return redirect(url_for('index'))
 
+# --- Impor transaksi massal ---
+def kategori_per_tipe():
+    return {'pemasukan': KATEGORI_PEMASUKAN, 'pengeluaran': KATEGORI_PENGELUARAN}
+
+@app.route('/impor_transaksi', methods=['GET', 'POST'])
+def impor_transaksi():
+    laporan = None
+    if request.method == 'POST':
+        berkas = request.files.get('berkas')
+        try:
+            if not berkas or not berkas.filename:
+                raise ValueError('Pilih berkas CSV atau XLSX terlebih dahulu.')
+            baris_iter = periksa_header(baca_berkas(berkas.stream, berkas.filename))
+            rekening_ids = [r['id'] for r in ambil_rekening()]
+            hanya_validasi = request.form.get('hanya_validasi') == '1'
+            laporan = jalankan_impor(penulis, baris_iter, kategori_per_tipe(), rekening_ids, ukuran_batch=UKURAN_BATCH,
+                                     setelah_simpan=setelah_penulisan, hanya_validasi=hanya_validasi)
+            laporan['hanya_validasi'] = hanya_validasi
+            flash(f"{laporan['berhasil']} baris {'valid' if hanya_validasi else 'diimpor'}, {laporan['gagal']} baris ditolak ({laporan['durasi']:.1f} detik).", 'success' if not laporan['gagal'] else 'error')
+        except Exception as e:
+            flash(f"Gagal mengimpor transaksi: {e}", "error")
+    return render_template('impor_transaksi.html', laporan=laporan, kolom_wajib=KOLOM_WAJIB, kolom_opsional=KOLOM_OPSIONAL, maks_ditampilkan=200)
+
+# --- Ekspor di latar belakang ---
+@app.route('/ekspor/<format_>', methods=['POST'])
+def antre_ekspor(format_):
+    """Daftarkan pekerjaan ekspor (excel, csv, pdf) dan kembalikan id-nya.
+
+    Hanya POST: mendaftarkan pekerjaan memakai CPU dan disk, jadi tidak boleh
+    dipicu oleh prefetch, crawler atau tautan biasa.
+    """
+    if format_ not in MIMETYPE:
+        return jsonify({'error': f'Format ekspor tidak dikenal: {format_}'}), 404
+    filter_aktif = filter_dari_args(request.args)
+    opsi = {}
+    if format_ == 'pdf':
+        opsi = {'per_bulan': request.args.get('per_bulan') == '1', 'maks_baris': MAKS_BARIS_PDF}
+    try:
+        status = antrean_ekspor.kirim(format_, filter_aktif, opsi, versi=versi_ledger())
+    except Exception as e:
+        print(f"Error queueing export: {e}")
+        return jsonify({'error': str(e)}), 500
+    return jsonify(respons_pekerjaan(status)), 200 if status['status'] == 'selesai' else 202
+
+@app.route('/ekspor/pekerjaan/<id_>')
+def status_ekspor(id_):
+    status = antrean_ekspor.status(id_)
+    if status is None:
+        return jsonify({'error': 'Pekerjaan ekspor tidak ditemukan.'}), 404
+    return jsonify(respons_pekerjaan(status))
+
+@app.route('/ekspor/pekerjaan/<id_>/unduh')
+def unduh_ekspor(id_):
+    status = antrean_ekspor.status(id_)
+    if status is None:
+        return jsonify({'error': 'Pekerjaan ekspor tidak ditemukan.'}), 404
+    if status['status'] != 'selesai':
+        return jsonify(respons_pekerjaan(status)), 409
+    path = antrean_ekspor.path_artefak(status)
+    try:
+        # Perbarui mtime: artefak yang baru diunduh paling akhir tergusur
+        os.utime(path)
+        return send_file(path, download_name=NAMA_UNDUHAN[status['format']], as_attachment=True, mimetype=MIMETYPE[status['format']])
+    except FileNotFoundError:
+        return jsonify({'error': 'Artefak ekspor sudah dihapus, silakan ekspor ulang.'}), 410
+
+def respons_pekerjaan(status):
+    return {
+        'id': status['id'],
+        'format': status['format'],
+        'status': status['status'],
+        'pesan': status.get('pesan'),
+        'ukuran': status.get('ukuran'),
+        'url_status': url_for('status_ekspor', id_=status['id']),
+        'url_unduh': url_for('unduh_ekspor', id_=status['id']),
+    }
+
+# --- Perintah CLI (flask --app app <perintah>) ---
+@app.cli.command('rekonsiliasi-saldo')
+@click.option('--perbaiki', is_flag=True, help='Timpa saldo tercatat dengan hasil hitung ulang.')
+def rekonsiliasi_saldo(perbaiki):
+    """Hitung ulang saldo semua rekening dan laporkan selisihnya."""
+    selisih = buku_saldo.rekonsiliasi(perbaiki=perbaiki)
+    if not selisih:
+        click.echo('Semua saldo rekening sesuai.')
+        return
+    for s in selisih:
+        tercatat = 'belum tercatat' if s['tercatat'] is None else f"{s['tercatat']:,.2f}"
+        click.echo(f"Rekening {s['rekening_id']}: tercatat {tercatat}, seharusnya {s['seharusnya']:,.2f}")
+    click.echo(f"{len(selisih)} rekening berselisih" + (' (sudah diperbaiki).' if perbaiki else '. Jalankan dengan --perbaiki untuk memperbaiki.'))
+
+@app.cli.command('bangun-ulang-rekap')
+def bangun_ulang_rekap():
+    """Isi ulang tabel rekap_bulanan dari seluruh transaksi (backfill)."""
+    jumlah = rekap_bulanan.bangun_ulang()
+    click.echo(f'Rekap bulanan dibangun ulang: {jumlah} baris.')
+
+@app.cli.command('bangun-ulang-anggaran')
+def bangun_ulang_anggaran():
+    """Isi ulang tabel anggaran_terpakai dari seluruh transaksi (backfill)."""
+    jumlah = pelacak_anggaran.bangun_ulang()
+    cache_referensi.invalidasi('anggaran')
+    click.echo(f'Pemakaian anggaran dibangun ulang: {jumlah} baris.')
+
+@app.cli.command('bangun-ulang-pencarian')
+def bangun_ulang_pencarian():
+    """Bangun ulang indeks pencarian dari transaksi dan utang_piutang."""
+    jumlah = indeks_pencarian.bangun_ulang()
+    click.echo(f"Indeks pencarian dibangun ulang: {jumlah} dokumen.")
+
+@app.cli.command('sinkronkan-dana-darurat')
+def sinkronkan_dana_darurat_cli():
+    """Perbarui target dan alokasi Dana Darurat (aman dijadwalkan berkala)."""
+    if sinkronkan_dana_darurat():
+        click.echo('Dana Darurat diperbarui.')
+    else:
+        click.echo('Dana Darurat sudah sesuai (atau gagal diperbarui, lihat log).')
+
+@app.cli.command('impor-transaksi')
+@click.argument('berkas', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch', 'ukuran_batch', default=UKURAN_BATCH, show_default=True, help='Jumlah baris per RPC (satu transaksi database).')
+@click.option('--coba', is_flag=True, help='Hanya validasi, tidak ada yang disimpan.')
+@click.option('--laporan', type=click.Path(dir_okay=False, writable=True), help='Tulis galat & peringatan per baris ke CSV ini.')
+def impor_transaksi_cli(berkas, ukuran_batch, coba, laporan):
+    """Impor transaksi dari BERKAS (.csv atau .xlsx)."""
+    rekening_ids = [r['id'] for r in supabase.table('rekening').select('id').execute().data or []]
+    with open(berkas, 'rb') as f:
+        baris_iter = periksa_header(baca_berkas(f, berkas))
+        hasil = jalankan_impor(penulis, baris_iter, kategori_per_tipe(), rekening_ids, ukuran_batch=ukuran_batch,
+                               setelah_simpan=setelah_penulisan, hanya_validasi=coba)
+    if laporan:
+        with open(laporan, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['baris', 'jenis', 'pesan'])
+            for jenis in ('galat', 'peringatan'):
+                for g in hasil[jenis]:
+                    writer.writerow([g['baris'], jenis, g['pesan']])
+    for g in hasil['galat'][:20]:
+        click.echo(f"Baris {g['baris']}: {g['pesan']}")
+    if len(hasil['galat']) > 20:
+        click.echo(f"... dan {len(hasil['galat']) - 20} galat lainnya" + (f" (lihat {laporan})" if laporan else ' (gunakan --laporan)'))
+    kecepatan = (hasil['berhasil'] + hasil['gagal']) / hasil['durasi'] if hasil['durasi'] else 0
+    click.echo(f"{hasil['berhasil']} baris {'valid' if coba else 'diimpor'}, {hasil['gagal']} ditolak, "
+               f"{hasil['utang_piutang_dibuat']} utang/piutang dibuat, {hasil['utang_piutang_diperbarui']} diperbarui "
+               f"({hasil['durasi']:.1f} detik, {kecepatan:,.0f} baris/detik).")
+
+# --- Warm-up worker ---
+# Dependensi yang sengaja dimuat malas (ekspor PDF/Excel) dan template yang
+# paling sering dirender.
+MODUL_BERAT = ('ekspor_pdf', 'openpyxl')
+TEMPLATE_UTAMA = ('index.html', 'semua_transaksi.html')
+
+def hangatkan():
+    """Siapkan worker sebelum request pertama: impor modul berat, kompilasi
+    template, buat klien Supabase dan buka koneksinya.
+
+    Dipanggil oleh gunicorn.conf.py (post_worker_init) untuk worker yang hidup
+    lama. Di Vercel jangan dipanggil; di sana pemuatan malas justru yang
+    memperpendek cold start. Mengembalikan durasi dalam detik.
+    """
+    mulai = time.perf_counter()
+    for nama in MODUL_BERAT:
+        importlib.import_module(nama)
+    for nama in TEMPLATE_UTAMA:
+        app.jinja_env.get_template(nama)
+    try:
+        # Kueri kecil: membuat klien dan membuka koneksi keep-alive ke PostgREST
+        versi_data.semua()
+    except Exception as e:
+        print(f"Error warming up Supabase client: {e}")
+    return time.perf_counter() - mulai
+
+@app.cli.command('hangatkan')
+def hangatkan_cli():
+    """Ukur waktu warm-up (impor modul berat, template, koneksi Supabase)."""
+    click.echo(f'Warm-up selesai dalam {hangatkan() * 1000:.0f} ms.')
+
 # 7. Menjalankan Aplikasi
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
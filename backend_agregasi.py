@@ -0,0 +1,316 @@
+"""Sumber agregat dashboard yang bisa ditukar.
+
+Setiap backend mengembalikan dict dengan bentuk yang sama seperti
+`agregasi.agregasi_transaksi`, sehingga `index()` (dan helper anggaran/
+rekening di agregasi.py) tidak peduli dari mana angkanya berasal:
+
+  - BackendPython   : unduh semua transaksi lalu hitung di Python lewat
+                      agregasi.agregasi_transaksi (satu lintasan).
+  - BackendSupabase : baca view v_rekap_bulanan / v_saldo_rekening
+                      (sql/001_agregasi_dashboard.sql), hasilnya kecil dan
+                      ukurannya tidak ikut tumbuh bersama ledger.
+  - BackendRekap    : baca tabel rekap_bulanan yang diperbarui saat menulis
+                      (sql/005_rekap_bulanan.sql); database pun tidak perlu
+                      memindai ledger, biayanya sebanding jumlah bulan.
+  - BackendSQLite / BackendSQLiteRekap : padanan keduanya di SQLite, untuk
+                      pengujian lokal.
+
+Untuk backend SQL, 'transaksi_bulan_ini' hanya berisi transaksi terbaru
+(secukupnya untuk daftar di dashboard), bukan seluruh isi bulan.
+"""
+import sqlite3
+
+from agregasi import agregasi_transaksi, bulan_tahun
+from kueri_paralel import PelaksanaKueri
+from rekap_bulanan import daftar_periode
+
+JUMLAH_TRANSAKSI_TERBARU = 5
+
+
+def batas_bulan(bulan, tahun):
+    """Rentang [awal, akhir) sebuah bulan sebagai string tanggal ISO."""
+    awal = f"{tahun:04d}-{bulan:02d}-01"
+    akhir = f"{tahun + 1:04d}-01-01" if bulan == 12 else f"{tahun:04d}-{bulan + 1:02d}-01"
+    return awal, akhir
+
+
+def ringkasan_kosong():
+    """Dict agregat tanpa transaksi; dipakai index() jika backend gagal dibaca."""
+    return {
+        'total_pemasukan': 0.0, 'total_pengeluaran': 0.0, 'per_bulan': {}, 'per_rekening': {}, 'transaksi_bulan_ini': [],
+        'pemasukan_bulan_ini': 0.0, 'pengeluaran_bulan_ini': 0.0, 'pengeluaran_kategori': {},
+    }
+
+
+class BackendAgregasi:
+    """Antarmuka: `ringkasan(bulan, tahun, periode)` -> dict agregat."""
+
+    def ringkasan(self, bulan, tahun, periode):
+        raise NotImplementedError
+
+    def total_saldo(self):
+        """Total pemasukan - pengeluaran seluruh ledger (dasar alokasi Dana Darurat)."""
+        raise NotImplementedError
+
+
+class BackendPython(BackendAgregasi):
+    def __init__(self, client):
+        self.client = client
+
+    def ringkasan(self, bulan, tahun, periode):
+        all_transaksi = self.client.table('transaksi').select('*').order('tanggal', desc=True).execute().data or []
+        return agregasi_transaksi(all_transaksi, bulan, tahun)
+
+    def total_saldo(self):
+        rows = self.client.table('transaksi').select('tipe, jumlah').execute().data or []
+        return sum(float(r['jumlah']) if r['tipe'] == 'pemasukan' else -float(r['jumlah']) for r in rows if r['tipe'] in ('pemasukan', 'pengeluaran'))
+
+
+class _BackendSQL(BackendAgregasi):
+    """Menyusun dict agregat dari tiga hasil kueri kecil.
+
+    Ketiga kueri independen; jika diberi `pelaksana` (PelaksanaKueri) mereka
+    dijalankan bersamaan. Pelaksana ini sebaiknya terpisah dari thread pool
+    pemanggil agar tidak ada tugas yang menunggu tugas lain di pool yang sama.
+    """
+    pelaksana = PelaksanaKueri(maks_worker=1)
+
+    def _rekap(self, daftar_periode):
+        """Baris {'tahun','bulan','tipe','kategori','total'} untuk periode 'YYYY-MM' yang diminta."""
+        raise NotImplementedError
+
+    def _saldo(self):
+        """Baris {'rekening_id','pemasukan','pengeluaran'}, termasuk rekening_id NULL."""
+        raise NotImplementedError
+
+    def _terbaru(self, bulan, tahun, limit):
+        raise NotImplementedError
+
+    def total_saldo(self):
+        return sum(float(r['pemasukan'] or 0) - float(r['pengeluaran'] or 0) for r in self._saldo())
+
+    def ringkasan(self, bulan, tahun, periode):
+        diminta = daftar_periode([(tahun, bulan), *periode])
+        hasil = self.pelaksana.jalankan({
+            'rekap': lambda: self._rekap(diminta),
+            'saldo': self._saldo,
+            'terbaru': lambda: self._terbaru(bulan, tahun, JUMLAH_TRANSAKSI_TERBARU),
+        })
+
+        per_bulan = {}
+        pemasukan_bulan_ini, pengeluaran_bulan_ini = 0.0, 0.0
+        pengeluaran_kategori = {}
+        for r in hasil['rekap'].nilai():
+            kunci = (int(r['tahun']), int(r['bulan']))
+            tipe, kategori, total = r['tipe'], r['kategori'], float(r['total'] or 0)
+            ember = per_bulan.setdefault(kunci, {'pemasukan': 0.0, 'pengeluaran': 0.0})
+            ember[tipe] += total
+            if kunci == (tahun, bulan):
+                if kategori != 'Transfer':
+                    if tipe == 'pemasukan':
+                        pemasukan_bulan_ini += total
+                    else:
+                        pengeluaran_bulan_ini += total
+                if tipe == 'pengeluaran':
+                    pengeluaran_kategori[kategori] = pengeluaran_kategori.get(kategori, 0.0) + total
+
+        total_pemasukan, total_pengeluaran = 0.0, 0.0
+        per_rekening = {}
+        for r in hasil['saldo'].nilai():
+            pemasukan, pengeluaran = float(r['pemasukan'] or 0), float(r['pengeluaran'] or 0)
+            total_pemasukan += pemasukan
+            total_pengeluaran += pengeluaran
+            if r['rekening_id'] is not None:
+                per_rekening[r['rekening_id']] = {'pemasukan': pemasukan, 'pengeluaran': pengeluaran}
+
+        return {
+            'total_pemasukan': total_pemasukan,
+            'total_pengeluaran': total_pengeluaran,
+            'per_bulan': per_bulan,
+            'per_rekening': per_rekening,
+            'transaksi_bulan_ini': hasil['terbaru'].nilai(),
+            'pemasukan_bulan_ini': pemasukan_bulan_ini,
+            'pengeluaran_bulan_ini': pengeluaran_bulan_ini,
+            'pengeluaran_kategori': pengeluaran_kategori,
+        }
+
+
+class BackendSupabase(_BackendSQL):
+    def __init__(self, client, pelaksana=None):
+        self.client = client
+        if pelaksana is not None:
+            self.pelaksana = pelaksana
+
+    def _rekap(self, daftar_periode):
+        return self.client.table('v_rekap_bulanan').select('tahun, bulan, tipe, kategori, total').in_('periode', daftar_periode).execute().data or []
+
+    def _saldo(self):
+        return self.client.table('v_saldo_rekening').select('*').execute().data or []
+
+    def _terbaru(self, bulan, tahun, limit):
+        awal, akhir = batas_bulan(bulan, tahun)
+        return self.client.table('transaksi').select('*').gte('tanggal', awal).lt('tanggal', akhir).order('tanggal', desc=True).limit(limit).execute().data or []
+
+
+class BackendRekap(BackendSupabase):
+    def _rekap(self, daftar_periode):
+        return self.client.table('rekap_bulanan').select('tahun, bulan, tipe, kategori, total').in_('periode', daftar_periode).execute().data or []
+
+    def _saldo(self):
+        return self.client.table('v_saldo_rekap').select('*').execute().data or []
+
+
+# Padanan SQLite untuk sql/001_agregasi_dashboard.sql.
+SKEMA_SQLITE = """
+create table if not exists transaksi (
+    id integer primary key,
+    deskripsi text,
+    jumlah real not null,
+    tipe text not null,
+    kategori text,
+    tanggal text,
+    rekening_id integer
+);
+create index if not exists transaksi_tanggal_idx on transaksi (tanggal desc);
+create view if not exists v_rekap_bulanan as
+select
+    substr(tanggal, 1, 7)                  as periode,
+    cast(substr(tanggal, 1, 4) as integer) as tahun,
+    cast(substr(tanggal, 6, 2) as integer) as bulan,
+    tipe,
+    kategori,
+    sum(jumlah)                            as total,
+    count(*)                               as jumlah_transaksi
+from transaksi
+where tanggal is not null and tanggal != '' and tipe in ('pemasukan', 'pengeluaran')
+group by 1, 2, 3, 4, 5;
+create view if not exists v_saldo_rekening as
+select
+    rekening_id,
+    coalesce(sum(case when tipe = 'pemasukan' then jumlah end), 0)   as pemasukan,
+    coalesce(sum(case when tipe = 'pengeluaran' then jumlah end), 0) as pengeluaran
+from transaksi
+group by rekening_id;
+create table if not exists rekap_bulanan (
+    tahun integer not null,
+    bulan integer not null,
+    tipe text not null,
+    kategori text,
+    rekening_id integer,
+    total real not null default 0,
+    jumlah_transaksi integer not null default 0,
+    periode text generated always as (printf('%04d-%02d', tahun, bulan)) stored
+);
+create index if not exists rekap_bulanan_periode_idx on rekap_bulanan (periode);
+create view if not exists v_saldo_rekap as
+select
+    rekening_id,
+    coalesce(sum(case when tipe = 'pemasukan' then total end), 0)   as pemasukan,
+    coalesce(sum(case when tipe = 'pengeluaran' then total end), 0) as pengeluaran
+from rekap_bulanan
+group by rekening_id;
+"""
+
+KOLOM_TRANSAKSI = ('id', 'deskripsi', 'jumlah', 'tipe', 'kategori', 'tanggal', 'rekening_id')
+
+
+def delta_rekap(transaksi_rows, arah=1):
+    """Gabungkan transaksi menjadi baris delta rekap dengan kunci unik."""
+    delta = {}
+    for t in transaksi_rows:
+        tipe, tanggal = t.get('tipe'), t.get('tanggal')
+        if tipe not in ('pemasukan', 'pengeluaran') or not tanggal:
+            continue
+        tahun, bulan = bulan_tahun(tanggal)
+        kunci = (tahun, bulan, tipe, t.get('kategori'), t.get('rekening_id'))
+        ember = delta.setdefault(kunci, [0.0, 0])
+        ember[0] += arah * float(t.get('jumlah', 0))
+        ember[1] += arah
+    return [
+        {'tahun': tahun, 'bulan': bulan, 'tipe': tipe, 'kategori': kategori, 'rekening_id': rekening_id, 'total': total, 'jumlah_transaksi': jumlah}
+        for (tahun, bulan, tipe, kategori, rekening_id), (total, jumlah) in delta.items()
+    ]
+
+
+def tambah_rekap_sqlite(conn, transaksi_rows, arah=1):
+    """Padanan RPC tambah_rekap_bulanan, tanpa commit (ikut transaksi pemanggil)."""
+    # SQLite menganggap NULL selalu berbeda di index unik, jadi pakai update
+    # lalu insert dengan perbandingan 'is'.
+    for d in delta_rekap(transaksi_rows, arah):
+        kunci = (d['tahun'], d['bulan'], d['tipe'], d['kategori'], d['rekening_id'])
+        cur = conn.execute(
+            "update rekap_bulanan set total = total + ?, jumlah_transaksi = jumlah_transaksi + ? "
+            "where tahun = ? and bulan = ? and tipe = ? and kategori is ? and rekening_id is ?",
+            (d['total'], d['jumlah_transaksi'], *kunci),
+        )
+        if cur.rowcount == 0:
+            conn.execute(
+                "insert into rekap_bulanan (tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi) values (?, ?, ?, ?, ?, ?, ?)",
+                (*kunci, d['total'], d['jumlah_transaksi']),
+            )
+
+
+class BackendSQLite(_BackendSQL):
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SKEMA_SQLITE)
+
+    def muat_transaksi(self, rows):
+        """Masukkan daftar dict transaksi (bentuk PostgREST) ke tabel lokal."""
+        self.conn.executemany(
+            f"insert into transaksi ({', '.join(KOLOM_TRANSAKSI)}) values ({', '.join('?' * len(KOLOM_TRANSAKSI))})",
+            ([t.get(k) for k in KOLOM_TRANSAKSI] for t in rows),
+        )
+        self.conn.commit()
+
+    def _rekap(self, daftar_periode):
+        tanda = ', '.join('?' * len(daftar_periode))
+        cur = self.conn.execute(f"select tahun, bulan, tipe, kategori, total from v_rekap_bulanan where periode in ({tanda})", daftar_periode)
+        return [dict(r) for r in cur]
+
+    def _saldo(self):
+        return [dict(r) for r in self.conn.execute("select * from v_saldo_rekening")]
+
+    def _terbaru(self, bulan, tahun, limit):
+        awal, akhir = batas_bulan(bulan, tahun)
+        cur = self.conn.execute("select * from transaksi where tanggal >= ? and tanggal < ? order by tanggal desc limit ?", (awal, akhir, limit))
+        return [dict(r) for r in cur]
+
+
+class BackendSQLiteRekap(BackendSQLite):
+    """Padanan BackendRekap: rekap_bulanan diisi lewat `bangun_ulang_rekap`/`catat_rekap`."""
+
+    def bangun_ulang_rekap(self):
+        self.conn.execute("delete from rekap_bulanan")
+        self.conn.execute(
+            "insert into rekap_bulanan (tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi) "
+            "select tahun, bulan, tipe, kategori, rekening_id, sum(jumlah), count(*) from ("
+            "  select cast(substr(tanggal, 1, 4) as integer) as tahun, cast(substr(tanggal, 6, 2) as integer) as bulan, tipe, kategori, rekening_id, jumlah"
+            "  from transaksi where tanggal is not null and tanggal != '' and tipe in ('pemasukan', 'pengeluaran')"
+            ") group by 1, 2, 3, 4, 5"
+        )
+        self.conn.commit()
+
+    def catat_rekap(self, transaksi_rows, arah=1):
+        tambah_rekap_sqlite(self.conn, transaksi_rows, arah)
+        self.conn.commit()
+
+    def _rekap(self, daftar_periode):
+        tanda = ', '.join('?' * len(daftar_periode))
+        cur = self.conn.execute(f"select tahun, bulan, tipe, kategori, total from rekap_bulanan where periode in ({tanda})", daftar_periode)
+        return [dict(r) for r in cur]
+
+    def _saldo(self):
+        return [dict(r) for r in self.conn.execute("select * from v_saldo_rekap")]
+
+
+def buat_backend(nama, client, pelaksana=None):
+    """Pilih backend berdasarkan nama (env AGREGASI_BACKEND)."""
+    if nama == 'python':
+        return BackendPython(client)
+    if nama == 'supabase':
+        return BackendSupabase(client, pelaksana)
+    if nama == 'rekap':
+        return BackendRekap(client, pelaksana)
+    raise ValueError(f"AGREGASI_BACKEND tidak dikenal: {nama}")
@@ -0,0 +1,110 @@
+"""Benchmark mesin agregasi dashboard: implementasi lama vs satu lintasan.
+
+Jalankan dari root repo:
+    python benchmarks/bench_agregasi.py
+    python benchmarks/bench_agregasi.py --ukuran 10000 100000 1000000
+
+Selain mengukur waktu, skrip ini memastikan kedua implementasi menghasilkan
+keluaran yang identik untuk ledger yang sama.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregasi import agregasi_transaksi, data_tren, periode_tren, saldo_rekening  # noqa: E402
+from data_sintetis import KATEGORI_PENGELUARAN, buat_rekening, buat_transaksi  # noqa: E402
+
+
+def dashboard_lama(all_transaksi, rekening_list, bulan_filter, tahun_filter, today):
+    """Salinan logika `index()` sebelum mesin agregasi (Bagian 2 dan 6).
+
+    Bagian 3 (anggaran) tidak dibandingkan: status anggaran kini dibaca dari
+    view v_status_anggaran, bukan dari transaksi.
+    """
+    total_pemasukan_all = sum(float(t.get('jumlah', 0)) for t in all_transaksi if t.get('tipe') == 'pemasukan')
+    total_pengeluaran_all = sum(float(t.get('jumlah', 0)) for t in all_transaksi if t.get('tipe') == 'pengeluaran')
+    transaksi_bulan_ini = [
+        t for t in all_transaksi
+        if t.get('tanggal') and
+           datetime.fromisoformat(t['tanggal']).month == bulan_filter and
+           datetime.fromisoformat(t['tanggal']).year == tahun_filter
+    ]
+    pemasukan_bulan_ini = sum(float(t.get('jumlah', 0)) for t in transaksi_bulan_ini if t.get('tipe') == 'pemasukan' and t.get('kategori') != 'Transfer')
+    pengeluaran_bulan_ini = sum(float(t.get('jumlah', 0)) for t in transaksi_bulan_ini if t.get('tipe') == 'pengeluaran' and t.get('kategori') != 'Transfer')
+    pengeluaran_kategori = {k: 0.0 for k in KATEGORI_PENGELUARAN}
+    for t in transaksi_bulan_ini:
+        if t.get('tipe') == 'pengeluaran' and t.get('kategori') in pengeluaran_kategori:
+            pengeluaran_kategori[t['kategori']] += float(t.get('jumlah', 0))
+    tren_data = {'labels': [], 'pemasukan': [], 'pengeluaran': []}
+    for i in range(5, -1, -1):
+        target_date = today - timedelta(days=i*30)
+        bulan_tren, tahun_tren = target_date.month, target_date.year
+        transaksi_per_bulan = [t for t in all_transaksi if t.get('tanggal') and datetime.fromisoformat(t['tanggal']).month == bulan_tren and datetime.fromisoformat(t['tanggal']).year == tahun_tren]
+        tren_data['labels'].append(f"{bulan_tren}/{tahun_tren}")
+        tren_data['pemasukan'].append(sum(float(t.get('jumlah', 0)) for t in transaksi_per_bulan if t.get('tipe') == 'pemasukan'))
+        tren_data['pengeluaran'].append(sum(float(t.get('jumlah', 0)) for t in transaksi_per_bulan if t.get('tipe') == 'pengeluaran'))
+    rekening_dengan_saldo = []
+    for rek in rekening_list:
+        tx_for_rek = [t for t in all_transaksi if t.get('rekening_id') == rek['id']]
+        pemasukan_rek = sum(float(t['jumlah']) for t in tx_for_rek if t['tipe'] == 'pemasukan')
+        pengeluaran_rek = sum(float(t['jumlah']) for t in tx_for_rek if t['tipe'] == 'pengeluaran')
+        rek['saldo_sekarang'] = float(rek.get('saldo_awal', 0)) + pemasukan_rek - pengeluaran_rek
+        rekening_dengan_saldo.append(rek)
+    return {
+        'total_pemasukan': total_pemasukan_all, 'total_pengeluaran': total_pengeluaran_all,
+        'transaksi_bulan_ini': transaksi_bulan_ini,
+        'pemasukan_bulan_ini': pemasukan_bulan_ini, 'pengeluaran_bulan_ini': pengeluaran_bulan_ini,
+        'chart_data': pengeluaran_kategori, 'tren_data': tren_data,
+        'rekening': rekening_dengan_saldo,
+    }
+
+
+def dashboard_baru(all_transaksi, rekening_list, bulan_filter, tahun_filter, today):
+    """Logika `index()` yang sama di atas mesin agregasi satu lintasan."""
+    hasil = agregasi_transaksi(all_transaksi, bulan_filter, tahun_filter)
+    return {
+        'total_pemasukan': hasil['total_pemasukan'], 'total_pengeluaran': hasil['total_pengeluaran'],
+        'transaksi_bulan_ini': hasil['transaksi_bulan_ini'],
+        'pemasukan_bulan_ini': hasil['pemasukan_bulan_ini'], 'pengeluaran_bulan_ini': hasil['pengeluaran_bulan_ini'],
+        'chart_data': {k: hasil['pengeluaran_kategori'].get(k, 0.0) for k in KATEGORI_PENGELUARAN},
+        'tren_data': data_tren(hasil, periode_tren(today)),
+        'rekening': saldo_rekening(rekening_list, hasil),
+    }
+
+
+def ukur(fungsi, *args, ulang=3):
+    terbaik, hasil = None, None
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi(*args)
+        durasi = time.perf_counter() - mulai
+        terbaik = durasi if terbaik is None else min(terbaik, durasi)
+    return terbaik, hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--ulang', type=int, default=3)
+    args = parser.parse_args()
+
+    today = datetime(2025, 6, 15, 12, 0, 0)
+    bulan, tahun = today.month, today.year
+    print(f"{'baris':>10} {'lama (s)':>10} {'baru (s)':>10} {'speedup':>8}  identik")
+    for n in args.ukuran:
+        transaksi = buat_transaksi(n, akhir=today)
+        ulang = 1 if n >= 1_000_000 else args.ulang
+        waktu_lama, hasil_lama = ukur(dashboard_lama, transaksi, buat_rekening(), bulan, tahun, today, ulang=ulang)
+        waktu_baru, hasil_baru = ukur(dashboard_baru, transaksi, buat_rekening(), bulan, tahun, today, ulang=ulang)
+        identik = hasil_lama == hasil_baru
+        print(f"{n:>10} {waktu_lama:>10.3f} {waktu_baru:>10.3f} {waktu_lama / waktu_baru:>7.1f}x  {'ya' if identik else 'TIDAK'}")
+        if not identik:
+            sys.exit(f"Keluaran berbeda untuk {n} baris")
+
+
+if __name__ == '__main__':
+    main()
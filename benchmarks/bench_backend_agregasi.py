@@ -0,0 +1,103 @@
+"""Bandingkan agregasi di database (BackendSQLite) dengan jalur Python.
+
+Jalankan dari root repo:
+    python benchmarks/bench_backend_agregasi.py
+    python benchmarks/bench_backend_agregasi.py --ukuran 10000 100000
+
+Untuk tiap ukuran ledger skrip ini:
+  - memastikan angka dari view SQL sama dengan `agregasi_transaksi`,
+  - membandingkan ukuran payload (JSON) yang harus dikirim ke aplikasi,
+  - mengukur latensi `ringkasan()` kedua jalur.
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregasi import agregasi_transaksi, periode_tren  # noqa: E402
+from backend_agregasi import BackendSQLite  # noqa: E402
+from data_sintetis import buat_transaksi  # noqa: E402
+
+
+class BackendSQLiteTercatat(BackendSQLite):
+    """BackendSQLite yang mencatat ukuran JSON setiap hasil kueri."""
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.payload = 0
+
+    def _catat(self, rows):
+        self.payload += len(json.dumps(rows))
+        return rows
+
+    def _rekap(self, daftar_periode):
+        return self._catat(super()._rekap(daftar_periode))
+
+    def _saldo(self):
+        return self._catat(super()._saldo())
+
+    def _terbaru(self, bulan, tahun, limit):
+        return self._catat(super()._terbaru(bulan, tahun, limit))
+
+
+def sama(a, b):
+    """Bandingkan struktur agregat dengan toleransi pembulatan float."""
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    if isinstance(a, dict):
+        kunci = set(a) | set(b)
+        return all(sama(a.get(k, 0.0), b.get(k, 0.0)) for k in kunci)
+    return a == b
+
+
+def periksa(hasil_sql, hasil_py, periode):
+    for kunci in ('total_pemasukan', 'total_pengeluaran', 'pemasukan_bulan_ini', 'pengeluaran_bulan_ini', 'pengeluaran_kategori', 'per_rekening'):
+        if not sama(hasil_sql[kunci], hasil_py[kunci]):
+            return kunci
+    for p in periode:
+        if not sama(hasil_sql['per_bulan'].get(p, {}), hasil_py['per_bulan'].get(p, {})):
+            return f'per_bulan {p}'
+    terbaru_py = [t['id'] for t in hasil_py['transaksi_bulan_ini'][:len(hasil_sql['transaksi_bulan_ini'])]]
+    if [t['id'] for t in hasil_sql['transaksi_bulan_ini']] != terbaru_py:
+        return 'transaksi_bulan_ini'
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    today = datetime(2025, 6, 15, 12, 0, 0)
+    bulan, tahun = today.month, today.year
+    periode = periode_tren(today)
+    print(f"{'baris':>8} {'payload py':>12} {'payload sql':>12} {'py (ms)':>9} {'sql (ms)':>9}  sama")
+    for n in args.ukuran:
+        transaksi = buat_transaksi(n, akhir=today)
+        ledger_json = json.dumps(transaksi)
+        payload_py = len(ledger_json)
+        # Jalur Python ikut menanggung decode seluruh ledger dari JSON
+        mulai = time.perf_counter()
+        hasil_py = agregasi_transaksi(json.loads(ledger_json), bulan, tahun)
+        waktu_py = time.perf_counter() - mulai
+
+        backend = BackendSQLiteTercatat(sqlite3.connect(':memory:'))
+        backend.muat_transaksi(transaksi)
+        mulai = time.perf_counter()
+        hasil_sql = backend.ringkasan(bulan, tahun, periode)
+        waktu_sql = time.perf_counter() - mulai
+
+        beda = periksa(hasil_sql, hasil_py, periode)
+        print(f"{n:>8} {payload_py:>12,} {backend.payload:>12,} {waktu_py * 1000:>9.1f} {waktu_sql * 1000:>9.1f}  {'ya' if beda is None else 'TIDAK: ' + beda}")
+        if beda is not None:
+            sys.exit(f"Hasil berbeda untuk {n} baris pada '{beda}'")
+
+
+if __name__ == '__main__':
+    main()
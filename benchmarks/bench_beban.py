@@ -0,0 +1,198 @@
+"""Uji beban end-to-end rute utama dengan klien Supabase palsu (tanpa jaringan).
+
+Jalankan dari root repo:
+    python benchmarks/bench_beban.py
+    python benchmarks/bench_beban.py --ukuran 1000 10000 --ulang 30 --latensi 2
+    python benchmarks/bench_beban.py --simpan-baseline
+
+Setiap ukuran ledger dijalankan di proses terpisah: app diimpor dengan
+SUPABASE_URL/SUPABASE_KEY tiruan, klien aslinya diganti
+supabase_palsu.SupabasePalsu (latensi --latensi ms per kueri), data turunan
+dibangun lewat fungsi aplikasi sendiri (rekap, saldo, anggaran, Dana
+Darurat), lalu setiap rute dipanggil lewat Flask test client. Satu request
+pemanasan per rute tidak ikut dihitung.
+
+Dilaporkan p50/p95/p99 (ms), throughput (request/detik dengan --konkuren
+klien bersamaan) dan rata-rata kueri Supabase per request. Hasil
+dibandingkan dengan benchmarks/baseline_beban.json: skrip keluar dengan
+status 1 jika p50/p95 melebihi baseline lebih dari --toleransi (relatif,
+ditambah 2 ms) atau jumlah kueri per request bertambah. Angka waktu di
+baseline bergantung mesin; perbarui dengan --simpan-baseline di mesin yang
+sama dengan yang menjalankan pemeriksaan. Jumlah kueri tidak bergantung
+mesin.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_beban.json')
+SELISIH_MUTLAK_MS = 2.0
+
+
+def siapkan_app(ukuran, latensi):
+    """Impor app dengan klien palsu berisi ledger `ukuran` baris."""
+    os.environ.update(SUPABASE_URL='http://supabase-palsu.invalid', SUPABASE_KEY='palsu.palsu.palsu',
+                      DIREKTORI_EKSPOR=tempfile.mkdtemp(prefix='bench-beban-'))
+    from data_sintetis import buat_anggaran, buat_rekening, buat_transaksi
+    from supabase_palsu import SupabasePalsu
+    import app as modul_app
+
+    sekarang = datetime.now()
+    db = SupabasePalsu({
+        'pengaturan': [{'kunci': 'gaji', 'nilai': '8000000'}],
+        'rekening': buat_rekening(),
+        'anggaran': buat_anggaran(sekarang.month, sekarang.year),
+        'tabungan': [{'id': 1, 'nama': 'Liburan', 'target': 5000000.0, 'terkumpul': 1250000.0, 'tenggat': '2027-06-30'}],
+        'utang_piutang': [
+            {'id': 1, 'tipe': 'Utang', 'deskripsi': 'Cicilan motor', 'pihak_terkait': 'Dealer', 'jumlah_total': 1e12,
+             'jumlah_terbayar': 0.0, 'lunas': False, 'tanggal_mulai': '2025-01-01', 'tanggal_jatuh_tempo': '2030-01-01'},
+            {'id': 2, 'tipe': 'Piutang', 'deskripsi': 'Pinjaman teman', 'pihak_terkait': 'Budi', 'jumlah_total': 750000.0,
+             'jumlah_terbayar': 250000.0, 'lunas': False, 'tanggal_mulai': '2025-03-01', 'tanggal_jatuh_tempo': '2025-12-31'},
+        ],
+        'transaksi': buat_transaksi(ukuran, akhir=sekarang),
+    }, latensi=latensi)
+    modul_app.klien_supabase.ganti(db)
+    modul_app.rekap_bulanan.bangun_ulang()
+    modul_app.pelacak_anggaran.bangun_ulang()
+    modul_app.indeks_pencarian.bangun_ulang()
+    modul_app.buku_saldo.rekonsiliasi(perbaiki=True)
+    modul_app.sinkronkan_dana_darurat()
+    return modul_app, db
+
+
+def skenario(ulang, ulang_ekspor):
+    """(nama, metode, url, data form, jumlah ulang, status yang diharapkan)."""
+    tambah = {'tipe': 'pengeluaran', 'jumlah': '25000', 'kategori': 'Makanan', 'rekening_id': '1', 'deskripsi': 'bench'}
+    cicilan = {'utang_piutang_id': '1', 'tipe_utang_piutang': 'Utang', 'jumlah': '1000', 'rekening_id': '1'}
+    return [
+        ('GET /', 'GET', '/', None, ulang, 200),
+        ('GET /transaksi', 'GET', '/transaksi', None, ulang, 200),
+        ('GET /cari', 'GET', '/cari?q=makan', None, ulang, 200),
+        ('POST /tambah_transaksi', 'POST', '/tambah_transaksi', tambah, ulang, 302),
+        ('POST /bayar_cicilan', 'POST', '/bayar_cicilan', cicilan, ulang, 302),
+        ('GET /ekspor_csv', 'GET', '/ekspor_csv', None, ulang_ekspor, 200),
+        ('GET /ekspor_excel', 'GET', '/ekspor_excel', None, ulang_ekspor, 200),
+        ('GET /ekspor_pdf', 'GET', '/ekspor_pdf', None, ulang_ekspor, 200),
+    ]
+
+
+def jalankan_skenario(modul_app, db, metode, url, data, ulang, status_ok, konkuren):
+    latensi, galat = [], []
+    lock = threading.Lock()
+
+    def kerja():
+        klien = modul_app.app.test_client()
+        milik_sendiri = []
+        for _ in range(ulang):
+            mulai = time.perf_counter()
+            respons = klien.open(url, method=metode, data=data)
+            respons.get_data()
+            milik_sendiri.append(time.perf_counter() - mulai)
+            if respons.status_code != status_ok:
+                galat.append(respons.status_code)
+        with lock:
+            latensi.extend(milik_sendiri)
+
+    # Pemanasan (template, cache referensi, impor malas) tidak dihitung
+    modul_app.app.test_client().open(url, method=metode, data=data).get_data()
+    kueri_awal = db.jumlah_kueri
+    mulai = time.perf_counter()
+    semua = [threading.Thread(target=kerja) for _ in range(konkuren)]
+    for t in semua:
+        t.start()
+    for t in semua:
+        t.join()
+    durasi = time.perf_counter() - mulai
+    if galat:
+        raise SystemExit(f"{metode} {url}: status {sorted(set(galat))}, seharusnya {status_ok}")
+    kuantil = statistics.quantiles(latensi, n=100, method='inclusive') if len(latensi) > 1 else latensi * 99
+    return {'p50': kuantil[49] * 1000, 'p95': kuantil[94] * 1000, 'p99': kuantil[98] * 1000,
+            'rps': len(latensi) / durasi, 'kueri': (db.jumlah_kueri - kueri_awal) / len(latensi)}
+
+
+def anak(ukuran, args):
+    modul_app, db = siapkan_app(ukuran, args.latensi / 1000)
+    hasil = {nama: jalankan_skenario(modul_app, db, metode, url, data, n, status, args.konkuren)
+             for nama, metode, url, data, n, status in skenario(args.ulang, args.ulang_ekspor)}
+    print(json.dumps(hasil))
+
+
+def bandingkan(hasil, baseline, toleransi):
+    """Daftar pesan regresi terhadap baseline (kosong jika tidak ada)."""
+    regresi = []
+    for ukuran, per_rute in hasil.items():
+        for rute, h in per_rute.items():
+            b = baseline.get(ukuran, {}).get(rute)
+            if b is None:
+                continue
+            for kunci in ('p50', 'p95'):
+                if h[kunci] > b[kunci] * (1 + toleransi) + SELISIH_MUTLAK_MS:
+                    regresi.append(f"{ukuran} baris, {rute}: {kunci} {h[kunci]:.1f} ms > baseline {b[kunci]:.1f} ms")
+            if h['kueri'] > b['kueri'] + 0.05:
+                regresi.append(f"{ukuran} baris, {rute}: {h['kueri']:.2f} kueri/request > baseline {b['kueri']:.2f}")
+    return regresi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--ulang', type=int, default=20, help='request per klien untuk rute biasa')
+    parser.add_argument('--ulang-ekspor', type=int, default=3, help='request per klien untuk rute ekspor')
+    parser.add_argument('--konkuren', type=int, default=1, help='jumlah klien bersamaan')
+    parser.add_argument('--latensi', type=float, default=1.0, help='latensi klien palsu per kueri (ms)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--toleransi', type=float, default=0.5, help='kenaikan relatif p50/p95 yang masih diterima')
+    parser.add_argument('--simpan-baseline', action='store_true', help='tulis hasil ke --baseline alih-alih membandingkan')
+    parser.add_argument('--anak', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.anak is not None:
+        anak(args.anak, args)
+        return
+
+    hasil = {}
+    print(f"{'baris':>7} {'rute':<24} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'req/detik':>10} {'kueri/req':>10}")
+    for n in args.ukuran:
+        perintah = [sys.executable, __file__, '--anak', str(n), '--ulang', str(args.ulang), '--ulang-ekspor', str(args.ulang_ekspor),
+                    '--konkuren', str(args.konkuren), '--latensi', str(args.latensi)]
+        keluaran = subprocess.run(perintah, cwd=AKAR, capture_output=True, text=True)
+        if keluaran.returncode != 0:
+            sys.exit(f"Ukuran {n} gagal:\n{keluaran.stderr[-3000:]}{keluaran.stdout[-1000:]}")
+        hasil[str(n)] = json.loads(keluaran.stdout.strip().splitlines()[-1])
+        for rute, h in hasil[str(n)].items():
+            print(f"{n:>7} {rute:<24} {h['p50']:>9.1f} {h['p95']:>9.1f} {h['p99']:>9.1f} {h['rps']:>10.1f} {h['kueri']:>10.2f}")
+
+    if args.simpan_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as berkas:
+            json.dump({'latensi_ms': args.latensi, 'konkuren': args.konkuren, 'ukuran': hasil}, berkas, indent=2, sort_keys=True)
+            berkas.write('\n')
+        print(f"\nBaseline disimpan ke {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nBaseline {args.baseline} belum ada; jalankan dengan --simpan-baseline.")
+        return
+    with open(args.baseline, encoding='utf-8') as berkas:
+        baseline = json.load(berkas)
+    if (baseline.get('latensi_ms'), baseline.get('konkuren')) != (args.latensi, args.konkuren):
+        print(f"\nBaseline diukur dengan --latensi {baseline.get('latensi_ms')} --konkuren {baseline.get('konkuren')}; tidak dibandingkan.")
+        return
+    regresi = bandingkan(hasil, baseline['ukuran'], args.toleransi)
+    if regresi:
+        print("\nREGRESI terhadap baseline:")
+        for pesan in regresi:
+            print(f"  - {pesan}")
+        sys.exit(1)
+    print("\nTidak ada regresi terhadap baseline.")
+
+
+if __name__ == '__main__':
+    main()
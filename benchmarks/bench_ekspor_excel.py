@@ -0,0 +1,89 @@
+"""Peak RSS dan waktu ekspor Excel: pandas/ExcelWriter vs workbook write-only.
+
+Jalankan dari root repo:
+    python benchmarks/bench_ekspor_excel.py
+    python benchmarks/bench_ekspor_excel.py --ukuran 10000 100000
+
+Setiap kombinasi (implementasi, ukuran) dijalankan di proses terpisah supaya
+peak RSS (ru_maxrss) tidak saling memengaruhi. Jalur pandas menerima seluruh
+ledger sebagai list (seperti hasil select('*') sebelumnya), jalur write-only
+menerima generator (seperti iter_transaksi yang membaca per chunk).
+
+pandas tidak lagi ada di requirements.txt; pasang terpisah
+(`pip install pandas`) hanya untuk menjalankan perbandingan ini.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+
+def ekspor_pandas(transaksi, output):
+    """Salinan implementasi `ekspor_excel` sebelum mode write-only."""
+    import pandas as pd
+    df = pd.DataFrame(transaksi)
+    df['jumlah'] = pd.to_numeric(df['jumlah'], errors='coerce').fillna(0)
+    df_pemasukan = df[df['tipe'] == 'pemasukan'].copy()
+    df_pengeluaran = df[df['tipe'] == 'pengeluaran'].copy()
+    total_pemasukan = df_pemasukan['jumlah'].sum()
+    total_pengeluaran = df_pengeluaran['jumlah'].sum()
+    sisa_uang = total_pemasukan - total_pengeluaran
+    summary_data = {'Deskripsi': ['Total Pemasukan', 'Total Pengeluaran', 'Sisa Uang'], 'Jumlah': [total_pemasukan, total_pengeluaran, sisa_uang]}
+    df_summary = pd.DataFrame(summary_data)
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df_summary.to_excel(writer, index=False, sheet_name='Ringkasan')
+        df_pemasukan.to_excel(writer, index=False, sheet_name='Pemasukan')
+        df_pengeluaran.to_excel(writer, index=False, sheet_name='Pengeluaran')
+
+
+def rss_mb():
+    # ru_maxrss dalam KB di Linux (byte di macOS)
+    maks = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maks / (1024 * 1024) if sys.platform == 'darwin' else maks / 1024
+
+
+def anak(mode, n):
+    """Dijalankan di subprocess: ukur satu ekspor lalu cetak JSON."""
+    sys.path.insert(0, os.path.join(AKAR, 'benchmarks'))
+    from data_sintetis import iter_transaksi
+    import pandas  # noqa: F401  -- impor dimuat di kedua mode agar baseline RSS sama
+    from ekspor import tulis_excel
+
+    rss_awal = rss_mb()
+    with tempfile.TemporaryFile() as output:
+        mulai = time.perf_counter()
+        if mode == 'pandas':
+            ekspor_pandas(list(iter_transaksi(n)), output)
+        else:
+            tulis_excel(iter_transaksi(n), output)
+        waktu = time.perf_counter() - mulai
+        ukuran = output.tell()
+    print(json.dumps({'waktu': waktu, 'rss_awal': rss_awal, 'rss_puncak': rss_mb(), 'ukuran': ukuran}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[10_000, 50_000, 100_000])
+    parser.add_argument('--anak', nargs=2, metavar=('MODE', 'N'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.anak:
+        anak(args.anak[0], int(args.anak[1]))
+        return
+
+    print(f"{'baris':>8} {'mode':>10} {'waktu (s)':>10} {'Δ RSS (MB)':>11} {'puncak (MB)':>12} {'xlsx (MB)':>10}")
+    for n in args.ukuran:
+        for mode in ('pandas', 'write-only'):
+            keluaran = subprocess.run([sys.executable, __file__, '--anak', mode, str(n)], capture_output=True, text=True, check=True).stdout
+            h = json.loads(keluaran.strip().splitlines()[-1])
+            print(f"{n:>8} {mode:>10} {h['waktu']:>10.2f} {h['rss_puncak'] - h['rss_awal']:>11.1f} {h['rss_puncak']:>12.1f} {h['ukuran'] / 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
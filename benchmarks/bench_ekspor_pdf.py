@@ -0,0 +1,124 @@
+"""Waktu dan peak RSS ekspor PDF: fancy_table per-cell vs renderer tabel massal.
+
+Jalankan dari root repo:
+    python benchmarks/bench_ekspor_pdf.py
+    python benchmarks/bench_ekspor_pdf.py --ukuran 1000 10000
+
+Setiap kombinasi (implementasi, ukuran) dijalankan di proses terpisah supaya
+peak RSS (ru_maxrss) tidak saling memengaruhi. Jalur lama menerima seluruh
+ledger sebagai list dan merender lewat lima cell() per baris; jalur baru
+menerima generator dan merender per blok halaman. Mode per bulan memakai
+list yang sudah terurut per tanggal, jadi RSS-nya termasuk list tersebut.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+
+def ekspor_lama(transaksi, output):
+    """Salinan `ekspor_pdf` + `PDF.fancy_table` sebelum renderer massal.
+
+    Satu-satunya perubahan: output(dest='S').encode('latin-1') gagal di
+    fpdf2 2.7 (output() sudah mengembalikan bytearray), jadi di sini diganti
+    dengan bytes(pdf.output()) -- tetap salinan penuh dokumen di memori.
+    """
+    from ekspor_pdf import PDF
+
+    def fancy_table(self, header, data):
+        self.set_fill_color(230, 230, 230)
+        self.set_text_color(0)
+        self.set_draw_color(128)
+        self.set_line_width(0.3)
+        self.set_font('', 'B')
+        col_widths = [25, 105, 30, 25, 25]
+        for i, h in enumerate(header):
+            self.cell(col_widths[i], 7, h, 1, 0, 'C', 1)
+        self.ln()
+        self.set_font('')
+        fill = False
+        for row in data:
+            self.cell(col_widths[0], 6, str(row.get('tanggal', '')), 'LR', 0, 'L', fill)
+            self.cell(col_widths[1], 6, str(row.get('deskripsi', '')), 'LR', 0, 'L', fill)
+            self.cell(col_widths[2], 6, "Rp {:,.2f}".format(float(row.get('jumlah', 0.0))), 'LR', 0, 'R', fill)
+            self.cell(col_widths[3], 6, str(row.get('tipe', '')), 'LR', 0, 'L', fill)
+            self.cell(col_widths[4], 6, str(row.get('kategori', '')), 'LR', 0, 'L', fill)
+            self.ln()
+            fill = not fill
+        self.cell(sum(col_widths), 0, '', 'T')
+
+    pemasukan_data = [t for t in transaksi if t['tipe'] == 'pemasukan']
+    pengeluaran_data = [t for t in transaksi if t['tipe'] == 'pengeluaran']
+    total_pemasukan = sum(float(t.get('jumlah', 0)) for t in pemasukan_data)
+    total_pengeluaran = sum(float(t.get('jumlah', 0)) for t in pengeluaran_data)
+    pdf = PDF('L', 'mm', 'A4')
+    header = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori']
+    pdf.add_page()
+    pdf.chapter_title('Laporan Pemasukan')
+    fancy_table(pdf, header, pemasukan_data)
+    pdf.add_page()
+    pdf.chapter_title('Laporan Pengeluaran')
+    fancy_table(pdf, header, pengeluaran_data)
+    pdf.summary_section(total_pemasukan, total_pengeluaran, total_pemasukan - total_pengeluaran)
+    output.write(bytes(pdf.output()))
+
+
+def rss_mb():
+    # ru_maxrss dalam KB di Linux (byte di macOS)
+    maks = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maks / (1024 * 1024) if sys.platform == 'darwin' else maks / 1024
+
+
+def anak(mode, n):
+    """Dijalankan di subprocess: ukur satu ekspor lalu cetak JSON."""
+    sys.path.insert(0, os.path.join(AKAR, 'benchmarks'))
+    from data_sintetis import buat_transaksi, iter_transaksi
+    from ekspor_pdf import tulis_pdf
+
+    def per_tipe(tipe):
+        return (t for t in iter_transaksi(n) if t['tipe'] == tipe)
+
+    def per_tipe_urut(tipe):
+        # Mode per bulan butuh urutan tanggal seperti hasil iter_transaksi di app
+        return (t for t in buat_transaksi(n) if t['tipe'] == tipe)
+
+    rss_awal = rss_mb()
+    with tempfile.TemporaryFile() as output:
+        mulai = time.perf_counter()
+        if mode == 'lama':
+            ekspor_lama(list(iter_transaksi(n)), output)
+        elif mode == 'per-bulan':
+            tulis_pdf(per_tipe_urut('pemasukan'), per_tipe_urut('pengeluaran'), output, per_bulan=True)
+        else:
+            tulis_pdf(per_tipe('pemasukan'), per_tipe('pengeluaran'), output)
+        waktu = time.perf_counter() - mulai
+        ukuran = output.tell()
+    print(json.dumps({'waktu': waktu, 'rss_awal': rss_awal, 'rss_puncak': rss_mb(), 'ukuran': ukuran}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--anak', nargs=2, metavar=('MODE', 'N'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.anak:
+        anak(args.anak[0], int(args.anak[1]))
+        return
+
+    print(f"{'baris':>8} {'mode':>10} {'waktu (s)':>10} {'Δ RSS (MB)':>11} {'puncak (MB)':>12} {'pdf (MB)':>9}")
+    for n in args.ukuran:
+        for mode in ('lama', 'massal', 'per-bulan'):
+            keluaran = subprocess.run([sys.executable, __file__, '--anak', mode, str(n)], capture_output=True, text=True, check=True).stdout
+            h = json.loads(keluaran.strip().splitlines()[-1])
+            print(f"{n:>8} {mode:>10} {h['waktu']:>10.2f} {h['rss_puncak'] - h['rss_awal']:>11.1f} {h['rss_puncak']:>12.1f} {h['ukuran'] / 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
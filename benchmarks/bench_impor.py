@@ -0,0 +1,136 @@
+"""Throughput impor transaksi (baris/detik) untuk beberapa ukuran batch.
+
+Jalankan dari root repo:
+    python benchmarks/bench_impor.py
+    python benchmarks/bench_impor.py --baris 20000 --batch 1 100 1000 --jeda 0.005
+
+Berkas CSV dibuat di memori dari data sintetis, termasuk baris utang/piutang
+dan sebagian kecil baris tidak valid. Setiap batch ditulis lewat
+penulisan.PenulisSupabase.impor ke supabase_palsu.SupabasePalsu, yang
+menunda setiap execute() sebesar --jeda detik (mensimulasikan round trip
+jaringan), jadi angka bisa diukur tanpa database. Batch 1 kira-kira setara
+dengan satu form tambah_transaksi per baris.
+
+Setelah pengukuran, `uji_gagal_di_tengah_batch` memakai
+penulisan.PenulisSQLite dan menyuntikkan kegagalan di setiap pernyataan SQL
+impor secara bergantian: batch yang gagal harus ditolak tanpa bekas
+(transaksi, catatan utang/piutang, pembayaran, data turunan), batch lainnya
+tetap tersimpan, dan menghapus transaksi hasil impor harus membatalkan
+pembayarannya.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sintetis import KATEGORI_PEMASUKAN, KATEGORI_PENGELUARAN, iter_transaksi  # noqa: E402
+from impor import baca_berkas, impor_transaksi, periksa_header  # noqa: E402
+from penulisan import PenulisSQLite, PenulisSupabase  # noqa: E402
+from supabase_palsu import SupabasePalsu  # noqa: E402
+from bench_penulisan import REKENING, KoneksiGagal, periksa_konsisten  # noqa: E402
+
+KATEGORI_PER_TIPE = {'pemasukan': KATEGORI_PEMASUKAN, 'pengeluaran': KATEGORI_PENGELUARAN}
+
+
+def buat_csv(jumlah, seed=3):
+    """CSV mutasi: ~5% baris utang/piutang, ~1% baris tidak valid."""
+    rng = random.Random(seed)
+    pihak = [f'Pihak {i}' for i in range(50)]
+    berkas = io.StringIO()
+    writer = csv.writer(berkas)
+    writer.writerow(['tanggal', 'deskripsi', 'jumlah', 'tipe', 'kategori', 'rekening_id', 'pihak_terkait'])
+    for t in iter_transaksi(jumlah, seed=seed):
+        nama = ''
+        acak = rng.random()
+        if acak < 0.05:
+            t['tipe'], t['kategori'] = rng.choice([('pengeluaran', 'Pemberian Piutang'), ('pemasukan', 'Penerimaan Piutang'),
+                                                   ('pemasukan', 'Penerimaan Utang'), ('pengeluaran', 'Pembayaran Utang')])
+            nama = rng.choice(pihak)
+        elif acak < 0.06:
+            t['kategori'] = 'Tidak Ada'
+        writer.writerow([t['tanggal'][:10], t['deskripsi'], t['jumlah'], t['tipe'], t['kategori'], t['rekening_id'], nama])
+    return berkas.getvalue().encode('utf-8')
+
+
+def uji_gagal_di_tengah_batch():
+    """Impor gagal di pernyataan ke-1, ke-2, dst.; batch yang gagal harus ditolak utuh tanpa bekas."""
+    kolom = ['tanggal', 'deskripsi', 'jumlah', 'tipe', 'kategori', 'rekening_id', 'pihak_terkait']
+    baris = [
+        # batch 1: dua pembayaran ke catatan lama dan satu catatan baru
+        ['2025-02-01', 'cicil', 30, 'pengeluaran', 'Pembayaran Utang', 1, 'Budi'],
+        ['2025-02-01', 'cicil', 30, 'pengeluaran', 'Pembayaran Utang', 1, 'Siti'],
+        ['2025-02-01', 'pinjam', 50, 'pemasukan', 'Penerimaan Utang', 1, 'Andi'],
+        # batch 2
+        ['2025-03-01', 'cicil', 10, 'pengeluaran', 'Pembayaran Utang', 2, 'budi '],
+        ['2025-03-01', 'pinjam', 20, 'pemasukan', 'Penerimaan Utang', 2, 'Dewi'],
+    ]
+    berkas = io.StringIO()
+    csv.writer(berkas).writerows([kolom, *baris])
+    isi = berkas.getvalue().encode()
+
+    masalah, k = [], 1
+    while True:
+        conn = sqlite3.connect(':memory:', factory=KoneksiGagal)
+        penulis = PenulisSQLite(conn)
+        with conn:
+            conn.executemany("insert into rekening (id, nama, saldo_awal) values (?, ?, ?)", [(r['id'], r['nama'], r['saldo_awal']) for r in REKENING])
+            conn.executemany("insert into utang_piutang (id, tipe, deskripsi, pihak_terkait, jumlah_total, tanggal_mulai) "
+                             "values (?, 'Utang', ?, ?, 100, '2025-01-01')", [(1, 'Utang Budi', 'Budi'), (2, 'Utang Siti', 'Siti')])
+        conn.hitung, conn.gagal_pada = 0, k
+        laporan = impor_transaksi(penulis, periksa_header(baca_berkas(io.BytesIO(isi), 'mutasi.csv')), KATEGORI_PER_TIPE, [1, 2], ukuran_batch=3)
+        conn.gagal_pada = None
+        ditolak = [g['baris'] for g in laporan['galat']]
+        # Nomor baris 2-4 adalah batch 1, 5-6 batch 2; batch yang gagal tidak meninggalkan apa pun
+        seharusnya = {(): ({'Budi': 40, 'Siti': 30, 'Andi': 0, 'Dewi': 0}, 5),
+                      (2, 3, 4): ({'Budi': 10, 'Siti': 0, 'Dewi': 0}, 2),
+                      (5, 6): ({'Budi': 30, 'Siti': 30, 'Andi': 0}, 3)}.get(tuple(ditolak))
+        terbayar = {u['pihak_terkait']: u['jumlah_terbayar'] for u in conn.execute("select * from utang_piutang")}
+        jumlah_transaksi = conn.execute("select count(*) from transaksi").fetchone()[0]
+        if seharusnya is None:
+            masalah.append(f"gagal di pernyataan {k}: baris ditolak {ditolak}, seharusnya satu batch utuh")
+        elif (terbayar, jumlah_transaksi) != seharusnya:
+            masalah.append(f"gagal di pernyataan {k}: terbayar {terbayar} dan {jumlah_transaksi} transaksi, seharusnya {seharusnya}")
+        masalah.extend(f"gagal di pernyataan {k}: {m}" for m in periksa_konsisten(conn))
+        if not ditolak:
+            break
+        k += 1
+
+    # Menghapus transaksi pembayaran hasil impor membatalkan efeknya pada catatan
+    id_bayar = conn.execute("select id from transaksi where kategori = 'Pembayaran Utang' and rekening_id = 2").fetchone()[0]
+    penulis.hapus_transaksi(id_bayar)
+    if conn.execute("select jumlah_terbayar from utang_piutang where id = 1").fetchone()[0] != 30:
+        masalah.append('hapus transaksi impor tidak membatalkan pembayarannya')
+    print(f"\nUji gagal di tengah batch: {k - 1} kegagalan disuntikkan, {'lolos' if not masalah else 'GAGAL'}")
+    for m in masalah[:10]:
+        print(f"  {m}")
+    return not masalah
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baris', type=int, default=5_000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 100, 500, 2000])
+    parser.add_argument('--jeda', type=float, default=0.002, help='jeda per execute() (detik)')
+    args = parser.parse_args()
+
+    isi = buat_csv(args.baris)
+    print(f"{'batch':>6} {'berhasil':>9} {'gagal':>6} {'kueri':>7} {'waktu (s)':>10} {'baris/detik':>12}")
+    for ukuran_batch in args.batch:
+        db = SupabasePalsu({'rekening': [{'id': i, 'nama': f'Rekening {i}', 'saldo_awal': 0.0} for i in range(1, 6)]}, latensi=args.jeda)
+        mulai = time.perf_counter()
+        baris_iter = periksa_header(baca_berkas(io.BytesIO(isi), 'mutasi.csv'))
+        laporan = impor_transaksi(PenulisSupabase(db), baris_iter, KATEGORI_PER_TIPE, range(1, 6), ukuran_batch=ukuran_batch)
+        waktu = time.perf_counter() - mulai
+        print(f"{ukuran_batch:>6} {laporan['berhasil']:>9} {laporan['gagal']:>6} {db.jumlah_kueri:>7} {waktu:>10.2f} {args.baris / waktu:>12,.0f}")
+    if not uji_gagal_di_tengah_batch():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Biaya tambahan instrumentasi per kueri dan per request.
+
+Jalankan dari root repo:
+    python benchmarks/bench_instrumentasi.py
+    python benchmarks/bench_instrumentasi.py --ulang 200000
+
+Klien palsu di bawah tidak melakukan I/O sama sekali, jadi selisih waktu
+antara klien asli dan KlienTerinstrumentasi adalah biaya instrumentasi
+murni (pembungkus builder, histogram, penghitung). Bandingkan dengan latensi
+satu round trip ke Supabase (biasanya puluhan milidetik).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentasi import CatatanRequest, KlienTerinstrumentasi, _catatan_request, fase, metrik_bawaan  # noqa: E402
+
+
+class _Respons:
+    data = [{'id': 1}, {'id': 2}]
+
+
+class _Builder:
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def execute(self):
+        return _Respons()
+
+
+class KlienKosong:
+    def table(self, nama):
+        return _Builder()
+
+
+def ukur(fungsi, ulang):
+    mulai = time.perf_counter()
+    for _ in range(ulang):
+        fungsi()
+    return (time.perf_counter() - mulai) / ulang
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ulang', type=int, default=100_000)
+    args = parser.parse_args()
+
+    metrik = metrik_bawaan()
+    asli, terukur = KlienKosong(), KlienTerinstrumentasi(KlienKosong(), metrik)
+    kueri = lambda k: k.table('transaksi').select('*').eq('id', 1).limit(5).execute()  # noqa: E731
+
+    waktu_asli = ukur(lambda: kueri(asli), args.ulang)
+    waktu_terukur = ukur(lambda: kueri(terukur), args.ulang)
+    token = _catatan_request.set(CatatanRequest('bench'))
+    waktu_request = ukur(lambda: kueri(terukur), args.ulang)
+
+    def dengan_fase():
+        with fase('hitung', metrik):
+            pass
+    waktu_fase = ukur(dengan_fase, args.ulang)
+    _catatan_request.reset(token)
+
+    # Catatan seukuran request dashboard biasa: 7 kueri, 3 fase
+    catatan = CatatanRequest('bench')
+    for _ in range(7):
+        catatan.catat_kueri(0.01)
+    for nama in ('kueri', 'dashboard', 'render'):
+        catatan.catat_fase(nama, 0.02)
+    header = ukur(catatan.server_timing, 10_000)
+    teks = ukur(metrik.prometheus, 100)
+
+    print(f"{'pengukuran':<36} {'mikrodetik':>10}")
+    print(f"{'kueri tanpa instrumentasi':<36} {waktu_asli * 1e6:>10.2f}")
+    print(f"{'kueri terinstrumentasi':<36} {waktu_terukur * 1e6:>10.2f}")
+    print(f"{'kueri terinstrumentasi + catatan':<36} {waktu_request * 1e6:>10.2f}")
+    print(f"{'fase() kosong':<36} {waktu_fase * 1e6:>10.2f}")
+    print(f"{'header Server-Timing':<36} {header * 1e6:>10.2f}")
+    print(f"{'render /metrics':<36} {teks * 1e6:>10.2f}")
+    print(f"\nTambahan per kueri: {(waktu_request - waktu_asli) * 1e6:.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
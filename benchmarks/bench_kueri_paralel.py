@@ -0,0 +1,109 @@
+"""Waktu render dashboard: kueri berurutan vs fan-out paralel.
+
+Jalankan dari root repo:
+    python benchmarks/bench_kueri_paralel.py
+    python benchmarks/bench_kueri_paralel.py --jeda 0.05 --ulang 5
+
+Klien palsu yang menunda setiap kueri sesuai tabelnya dipasang lewat
+`app.klien_supabase.ganti(...)` (seperti bench_beban), jadi semua objek yang
+memegang `app.supabase` (backend agregasi, buku saldo, versi data, dst.)
+memakainya. Lalu `GET /` dijalankan lewat Flask test client dengan 1 worker
+(berurutan) dan dengan thread pool. Skrip gagal jika versi paralel tidak
+lebih cepat. Cache referensi dimatikan (TTL 0) dan cache panel dikosongkan
+sebelum setiap request supaya setiap request benar-benar memanggil semua
+kueri.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark.bukan.kunci')
+os.environ['AGREGASI_BACKEND'] = 'supabase'
+os.environ['CACHE_TTL'] = '0'
+
+import app as aplikasi  # noqa: E402
+from kueri_paralel import PelaksanaKueri  # noqa: E402
+
+
+class _Respons:
+    def __init__(self, data):
+        self.data = data
+        self.count = None
+
+
+class _Kueri:
+    """Builder tiruan: semua filter diabaikan, execute() menunggu lalu mengembalikan data tabel."""
+
+    def __init__(self, klien, tabel):
+        self.klien = klien
+        self.tabel = tabel
+
+    def __getattr__(self, nama):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.klien.jeda.get(self.tabel, self.klien.jeda_bawaan))
+        return _Respons(list(self.klien.data.get(self.tabel, [])))
+
+
+class KlienTertunda:
+    def __init__(self, data, jeda, jeda_bawaan):
+        self.data = data
+        self.jeda = jeda
+        self.jeda_bawaan = jeda_bawaan
+
+    def table(self, nama):
+        return _Kueri(self, nama)
+
+    def rpc(self, nama, params=None):
+        return _Kueri(self, nama)
+
+
+def ukur(klien, ulang):
+    aplikasi.klien_supabase.ganti(klien)
+    client = aplikasi.app.test_client()
+    waktu = []
+    for _ in range(ulang):
+        aplikasi.cache_fragmen.kosongkan()
+        mulai = time.perf_counter()
+        respons = client.get('/')
+        waktu.append(time.perf_counter() - mulai)
+        assert respons.status_code == 200
+    return min(waktu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jeda', type=float, default=0.05, help='jeda bawaan per kueri (detik)')
+    parser.add_argument('--ulang', type=int, default=3)
+    args = parser.parse_args()
+
+    data = {
+        'pengaturan': [{'nilai': '5000000'}],
+        'tabungan': [{'id': 1, 'nama': 'Dana Darurat', 'target': 15000000.0, 'terkumpul': 15000000.0}],
+        'rekening': [{'id': 1, 'nama_rekening': 'BCA', 'jenis_rekening': 'Bank', 'saldo_awal': 0.0}],
+        'v_saldo_rekening': [{'rekening_id': 1, 'pemasukan': 1000.0, 'pengeluaran': 500.0}],
+    }
+    # Kueri agregat dan utang piutang sengaja dibuat paling lambat
+    jeda = {'v_rekap_bulanan': args.jeda * 2, 'utang_piutang': args.jeda * 1.5}
+    klien = KlienTertunda(data, jeda, args.jeda)
+
+    aplikasi.pelaksana_kueri = PelaksanaKueri(maks_worker=1)
+    aplikasi.backend_agregasi.pelaksana = PelaksanaKueri(maks_worker=1)
+    waktu_urut = ukur(klien, args.ulang)
+    aplikasi.pelaksana_kueri = PelaksanaKueri(maks_worker=8)
+    aplikasi.backend_agregasi.pelaksana = PelaksanaKueri(maks_worker=3)
+    waktu_paralel = ukur(klien, args.ulang)
+
+    print(f"berurutan : {waktu_urut * 1000:8.1f} ms")
+    print(f"paralel   : {waktu_paralel * 1000:8.1f} ms")
+    print(f"speedup   : {waktu_urut / waktu_paralel:8.1f}x")
+    if waktu_paralel >= waktu_urut:
+        sys.exit("Fan-out paralel tidak lebih cepat dari eksekusi berurutan")
+
+
+if __name__ == '__main__':
+    main()
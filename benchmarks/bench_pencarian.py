@@ -0,0 +1,153 @@
+"""Latensi pencarian teks: indeks terbalik vs memindai ledger.
+
+Jalankan dari root repo:
+    python benchmarks/bench_pencarian.py
+    python benchmarks/bench_pencarian.py --ukuran 100000 --ulang 50
+
+Dokumen sintetis (deskripsi transaksi dan pihak utang/piutang) dimasukkan
+ke supabase_palsu.IndeksTeksPalsu, padanan tabel indeks_pencarian dan index
+GIN-nya (sql/009_pencarian.sql). Setiap kueri diukur lewat indeks dan lewat
+pemindaian semua dokumen (yang dilakukan `deskripsi ilike '%...%'` tanpa
+index), lalu hasil keduanya dibandingkan baris demi baris. Dilaporkan juga
+waktu bangun ulang dan biaya pembaruan inkremental per dokumen.
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pencarian import AMBANG_FUZZY, kata_kueri, normalisasi  # noqa: E402
+from supabase_palsu import IndeksTeksPalsu, trigram  # noqa: E402
+
+BARANG = ['kopi', 'susu', 'nasi', 'ayam', 'bakso', 'sate', 'roti', 'teh', 'gula', 'beras', 'bensin', 'parkir', 'tol', 'pulsa',
+          'listrik', 'air', 'sabun', 'buku', 'obat', 'tiket', 'sepatu', 'kaos', 'servis', 'makan', 'minum', 'jajan']
+TEMPAT = ['warung', 'indomaret', 'alfamart', 'pertamina', 'gojek', 'grab', 'tokopedia', 'shopee', 'apotek', 'kantin', 'pasar',
+          'bioskop', 'bengkel', 'laundry', 'minimarket', 'restoran', 'kafe', 'stasiun']
+NAMA = ['budi', 'siti', 'andi', 'dewi', 'rudi', 'ayu', 'joko', 'rina', 'agus', 'lestari', 'hendra', 'wulan', 'bayu', 'putri']
+
+KUERI = [
+    # (nama, kueri, mode, filter, halaman)
+    ('kata langka', 'laundry', 'awalan', {}, 1),
+    ('kata umum', 'kopi', 'awalan', {}, 1),
+    ('awalan 2 kata', 'kop war', 'awalan', {}, 1),
+    ('awalan + filter', 'nas', 'awalan', {'rekening_id': 3, 'tipe': 'pengeluaran', 'dari': '2025-01-01', 'sampai': '2025-04-01'}, 1),
+    ('halaman 10', 'sate', 'awalan', {}, 10),
+    ('nama pihak', 'hendra', 'awalan', {'sumber': 'utang_piutang'}, 1),
+    ('fuzzy (salah ketik)', 'indomart', 'fuzzy', {}, 1),
+    ('fuzzy 2 kata', 'bnsin pertamna', 'fuzzy', {}, 1),
+]
+PER_HALAMAN = 20
+
+
+def buat_dokumen(jumlah, seed=7, akhir=datetime(2025, 6, 15)):
+    """(sumber, baris p_baris) sintetis; sekitar 2% berupa utang/piutang."""
+    rng = random.Random(seed)
+    for i in range(1, jumlah + 1):
+        tanggal = (akhir - timedelta(seconds=rng.randrange(3 * 365 * 86400))).isoformat()
+        if rng.random() < 0.02:
+            tipe = rng.choice(['Utang', 'Piutang'])
+            nama = f"{rng.choice(NAMA).title()} {rng.choice(NAMA).title()}"
+            yield 'utang_piutang', {'sumber_id': i, 'deskripsi': f"{tipe} {rng.choice(BARANG)}", 'pihak_terkait': nama, 'tanggal': tanggal,
+                                    'tipe': tipe, 'kategori': None, 'rekening_id': None, 'jumlah': 500000.0}
+            continue
+        tipe = 'pemasukan' if rng.random() < 0.2 else 'pengeluaran'
+        deskripsi = f"{rng.choice(BARANG).title()} {rng.choice(BARANG)} di {rng.choice(TEMPAT).title()} #{rng.randrange(10000)}"
+        yield 'transaksi', {'sumber_id': i, 'deskripsi': deskripsi, 'pihak_terkait': None, 'tanggal': tanggal, 'tipe': tipe,
+                            'kategori': 'Makanan', 'rekening_id': rng.randint(1, 5), 'jumlah': round(rng.uniform(1000, 500000), 2)}
+
+
+def pisah_filter(filter_):
+    kolom = {k: filter_.get(k) for k in ('sumber', 'tipe', 'kategori', 'rekening_id')}
+    return kolom, filter_.get('dari'), filter_.get('sampai')
+
+
+def pindai(indeks, kata, mode, filter_, limit, offset):
+    """Kueri yang sama tanpa posting list: setiap dokumen dinormalisasi dan diperiksa."""
+    kolom, dari, sampai = pisah_filter(filter_)
+    tersimpan = {}
+
+    def skor_kata(k, kata_dok):
+        if k not in tersimpan:
+            tersimpan[k] = trigram(k)
+        terbaik = 0.0
+        for w in kata_dok:
+            tg = trigram(w)
+            bersama = len(tersimpan[k] & tg)
+            terbaik = max(terbaik, bersama / (len(tersimpan[k]) + len(tg) - bersama))
+        return terbaik
+
+    cocok = []
+    for n, d in enumerate(indeks.dokumen):
+        if d is None or not indeks._lolos(d, kolom, dari, sampai):
+            continue
+        kata_dok = normalisasi(f"{d.get('deskripsi') or ''} {d.get('pihak_terkait') or ''}").split()
+        if mode == 'awalan':
+            if all(any(w.startswith(k) for w in kata_dok) for k in kata):
+                cocok.append((1.0, *indeks._kunci_urut(d), n))
+        else:
+            skor = [skor_kata(k, kata_dok) for k in kata]
+            if all(s >= AMBANG_FUZZY for s in skor):
+                cocok.append((sum(skor) / len(kata), *indeks._kunci_urut(d), n))
+    return [k[-1] for k in heapq.nlargest(offset + limit, cocok)[offset:]]
+
+
+def lewat_indeks(indeks, kata, mode, filter_, limit, offset):
+    kolom, dari, sampai = pisah_filter(filter_)
+    if mode == 'awalan':
+        rows = indeks.cari_awalan(kata, kolom, dari, sampai, limit, offset)
+    else:
+        rows = indeks.cari_fuzzy(kata, AMBANG_FUZZY, kolom, dari, sampai, limit, offset)
+    return [indeks.nomor[(r['sumber'], r['sumber_id'])] for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--ulang', type=int, default=20, help='pengulangan kueri lewat indeks (pemindaian sekali)')
+    args = parser.parse_args()
+
+    for n in args.ukuran:
+        indeks = IndeksTeksPalsu()
+        dokumen = list(buat_dokumen(n))
+        mulai = time.perf_counter()
+        indeks.bangun(dokumen)
+        bangun = time.perf_counter() - mulai
+
+        # Pembaruan inkremental: simpan dokumen baru lalu hapus lagi
+        baru = [('transaksi', dict(b, sumber_id=n + i, tanggal=datetime(2025, 6, 16).isoformat())) for i, (_, b) in enumerate(dokumen[:1000], start=1)]
+        mulai = time.perf_counter()
+        for sumber, baris in baru:
+            indeks.simpan(sumber, baris)
+        simpan_us = (time.perf_counter() - mulai) / len(baru) * 1e6
+        mulai = time.perf_counter()
+        for sumber, baris in baru:
+            indeks.hapus(sumber, baris['sumber_id'])
+        hapus_us = (time.perf_counter() - mulai) / len(baru) * 1e6
+
+        print(f"\n{n:,} dokumen: bangun ulang {bangun:.1f} dtk, simpan {simpan_us:.0f} us/dok, hapus {hapus_us:.0f} us/dok")
+        print(f"{'kueri':<22} {'hasil':>6} {'indeks p50':>11} {'indeks p95':>11} {'pindai':>10} {'sama':>5}")
+        for nama, kueri, mode, filter_, halaman in KUERI:
+            kata = kata_kueri(kueri)
+            offset = (halaman - 1) * PER_HALAMAN
+            waktu = []
+            for _ in range(args.ulang):
+                mulai = time.perf_counter()
+                hasil = lewat_indeks(indeks, kata, mode, filter_, PER_HALAMAN, offset)
+                waktu.append(time.perf_counter() - mulai)
+            mulai = time.perf_counter()
+            acuan = pindai(indeks, kata, mode, filter_, PER_HALAMAN, offset)
+            durasi_pindai = time.perf_counter() - mulai
+            kuantil = statistics.quantiles(waktu, n=20, method='inclusive') if len(waktu) > 1 else waktu * 19
+            print(f"{nama:<22} {len(hasil):>6} {statistics.median(waktu) * 1000:>9.2f}ms {kuantil[18] * 1000:>9.2f}ms "
+                  f"{durasi_pindai * 1000:>8.0f}ms {'ya' if hasil == acuan else 'TIDAK':>5}")
+        del indeks, dokumen
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Penulisan atomik: round trip per operasi dan uji semua-atau-tidak-sama-sekali.
+
+Jalankan dari root repo:
+    python benchmarks/bench_penulisan.py
+    python benchmarks/bench_penulisan.py --latensi-ms 5 --ulang 200
+
+Bagian 1 membandingkan urutan lama (insert transaksi, baca/ubah
+utang_piutang, lalu RPC data turunan satu per satu) dengan satu RPC
+penulisan.PenulisSupabase, keduanya terhadap supabase_palsu.SupabasePalsu
+dengan latensi per round trip.
+
+Bagian 2 memakai penulisan.PenulisSQLite. Setiap operasi diulang dengan
+kegagalan yang disuntikkan di pernyataan SQL ke-1, ke-2, dst. (meniru worker
+yang mati di tengah jalan); isi database harus persis sama dengan sebelum
+operasi. Setelah serangkaian operasi acak, saldo, rekap, pemakaian anggaran
+dan jumlah_terbayar dibandingkan dengan hasil hitung ulang dari transaksi.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_agregasi import delta_rekap  # noqa: E402
+from pelacak_anggaran import AMBANG_BAWAAN  # noqa: E402
+from pelunasan import TOLERANSI, alokasi_fifo, normalisasi_nama, terapkan_lokal  # noqa: E402
+from pencarian import baris_indeks  # noqa: E402
+from penulisan import PenulisSQLite, PenulisSupabase, delta_terpakai, mutasi_per_rekening, transaksi_cicilan  # noqa: E402
+from supabase_palsu import SupabasePalsu  # noqa: E402
+
+REKENING = [{'id': i, 'nama': f'Rekening {i}', 'saldo_awal': 1_000_000.0} for i in range(1, 4)]
+PIHAK = ['Budi', 'Siti', 'Andi']
+
+
+class UrutanLama:
+    """Langkah-langkah rute sebelum penulisan atomik, masing-masing satu round trip."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _rpc(self, nama, params):
+        self.db.rpc(nama, params).execute()
+
+    def _mutasi(self, rows):
+        for rekening_id, delta in mutasi_per_rekening(rows).items():
+            if delta:
+                self._rpc('tambah_saldo_rekening', {'p_rekening_id': rekening_id, 'p_delta': delta})
+        self._rpc('tambah_rekap_bulanan', {'p_baris': delta_rekap(rows)})
+        terpakai = delta_terpakai(rows)
+        if terpakai:
+            self._rpc('catat_anggaran_terpakai', {'p_baris': terpakai, 'p_ambang': list(AMBANG_BAWAAN)})
+        self._rpc('catat_indeks_pencarian', {'p_sumber': 'transaksi', 'p_baris': baris_indeks('transaksi', rows)})
+        self._rpc('naikkan_versi', {'p_tabel': ['transaksi']})
+
+    def catat(self, transaksi, utang_baru=None, pelunasan=None):
+        rows = self.db.table('transaksi').insert(transaksi).execute().data
+        self._mutasi(rows)
+        if utang_baru is not None:
+            baru = self.db.table('utang_piutang').insert({**utang_baru, 'jumlah_total': rows[0]['jumlah'], 'jumlah_terbayar': 0.0,
+                                                          'lunas': False, 'tanggal_mulai': rows[0]['tanggal']}).execute().data
+            self._rpc('catat_indeks_pencarian', {'p_sumber': 'utang_piutang', 'p_baris': baris_indeks('utang_piutang', baru)})
+            self._rpc('naikkan_versi', {'p_tabel': ['utang_piutang']})
+        if pelunasan is not None:
+            # Baca catatan aktif, lalu ubah jumlah_terbayar satu per satu
+            aktif = [i for i in self.db.table('utang_piutang').select('*').eq('lunas', False).eq('tipe', pelunasan['tipe'])
+                     .order('tanggal_mulai').order('id').execute().data
+                     if normalisasi_nama(i['pihak_terkait']) == normalisasi_nama(pelunasan['pihak_terkait'])]
+            bagian, _ = alokasi_fifo(aktif, float(rows[0]['jumlah']))
+            for item, porsi in bagian:
+                self._ubah_terbayar(item, porsi)
+            if bagian:
+                self._rpc('naikkan_versi', {'p_tabel': ['utang_piutang']})
+
+    def _ubah_terbayar(self, item, porsi):
+        terapkan_lokal(item, porsi)
+        self.db.table('utang_piutang').update({'jumlah_terbayar': item['jumlah_terbayar'], 'lunas': item['lunas']}).eq('id', item['id']).execute()
+
+    def bayar_cicilan(self, utang_piutang_id, jumlah, rekening_id, tanggal):
+        item = self.db.table('utang_piutang').select('*').eq('id', utang_piutang_id).single().execute().data
+        self._ubah_terbayar(item, jumlah)
+        self._rpc('naikkan_versi', {'p_tabel': ['utang_piutang']})
+        self._mutasi(self.db.table('transaksi').insert(transaksi_cicilan(item, jumlah, rekening_id, tanggal)).execute().data)
+
+
+def transaksi_acak(rng, kategori='Makanan', tipe='pengeluaran'):
+    return {'deskripsi': f'{kategori} #{rng.randrange(1000)}', 'jumlah': float(rng.randrange(1, 200) * 1000), 'tipe': tipe,
+            'kategori': kategori, 'tanggal': f'2025-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}T10:00:00',
+            'rekening_id': rng.randint(1, len(REKENING))}
+
+
+def operasi_acak(rng, penulis, id_transaksi, id_utang):
+    """Satu (nama, fungsi tanpa argumen) acak untuk `penulis`."""
+    pilihan = rng.random()
+    if pilihan < 0.25:
+        t = transaksi_acak(rng)
+        return 'biasa', lambda: penulis.catat([t])
+    if pilihan < 0.4:
+        keluar = transaksi_acak(rng, 'Transfer')
+        masuk = dict(keluar, tipe='pemasukan', rekening_id=keluar['rekening_id'] % len(REKENING) + 1)
+        return 'transfer', lambda: penulis.catat([keluar, masuk])
+    if pilihan < 0.55:
+        t = transaksi_acak(rng, 'Penerimaan Utang', 'pemasukan')
+        pihak = rng.choice(PIHAK)
+        return 'utang baru', lambda: penulis.catat([t], utang_baru={'tipe': 'Utang', 'deskripsi': f'Utang dari {pihak}', 'pihak_terkait': pihak})
+    if pilihan < 0.7:
+        t = transaksi_acak(rng, 'Pembayaran Utang')
+        pihak = rng.choice(PIHAK)
+        return 'pelunasan', lambda: penulis.catat([t], pelunasan={'tipe': 'Utang', 'pihak_terkait': f' {pihak.lower()} '})
+    if pilihan < 0.8 and id_utang:
+        t = transaksi_acak(rng)
+        id_ = rng.choice(id_utang)
+        return 'cicilan', lambda: penulis.bayar_cicilan(id_, t['jumlah'] / 4, t['rekening_id'], t['tanggal'])
+    if pilihan < 0.95 and id_transaksi:
+        id_ = rng.choice(id_transaksi)
+        return 'hapus transaksi', lambda: penulis.hapus_transaksi(id_)
+    if id_utang:
+        id_ = rng.choice(id_utang)
+        return 'hapus utang', lambda: penulis.hapus_utang_piutang(id_)
+    t = transaksi_acak(rng)
+    return 'biasa', lambda: penulis.catat([t])
+
+
+class KoneksiGagal(sqlite3.Connection):
+    """Koneksi yang melempar GagalDisuntik pada pernyataan ke-`gagal_pada` (hitungan dari 1)."""
+
+    gagal_pada = None
+    hitung = 0
+
+    def execute(self, *args, **kwargs):
+        self.hitung += 1
+        if self.gagal_pada is not None and self.hitung == self.gagal_pada:
+            raise GagalDisuntik(self.hitung)
+        return super().execute(*args, **kwargs)
+
+
+class GagalDisuntik(Exception):
+    pass
+
+
+def periksa_konsisten(conn):
+    """Daftar pelanggaran invarian antara transaksi dan data turunannya."""
+    transaksi = [dict(r) for r in conn.execute("select * from transaksi")]
+    masalah = []
+    saldo = {r['rekening_id']: r['saldo'] for r in conn.execute("select * from saldo_rekening")}
+    for rek in REKENING:
+        seharusnya = rek['saldo_awal'] + mutasi_per_rekening(transaksi).get(rek['id'], 0.0)
+        if rek['id'] in saldo and abs(saldo[rek['id']] - seharusnya) > TOLERANSI:
+            masalah.append(f"saldo rekening {rek['id']}: {saldo[rek['id']]} != {seharusnya}")
+    rekap = {(r['tahun'], r['bulan'], r['tipe'], r['kategori'], r['rekening_id']): r['total']
+             for r in conn.execute("select * from rekap_bulanan") if abs(r['total']) > TOLERANSI}
+    acuan = {(d['tahun'], d['bulan'], d['tipe'], d['kategori'], d['rekening_id']): d['total'] for d in delta_rekap(transaksi)}
+    if rekap.keys() != acuan.keys() or any(abs(rekap[k] - acuan[k]) > TOLERANSI for k in acuan):
+        masalah.append('rekap_bulanan tidak sama dengan hitung ulang')
+    terpakai = {(r['tahun'], r['bulan'], r['kategori']): r['terpakai']
+                for r in conn.execute("select * from anggaran_terpakai") if abs(r['terpakai']) > TOLERANSI}
+    acuan = {(d['tahun'], d['bulan'], d['kategori']): d['total'] for d in delta_terpakai(transaksi)}
+    if terpakai.keys() != acuan.keys() or any(abs(terpakai[k] - acuan[k]) > TOLERANSI for k in acuan):
+        masalah.append('anggaran_terpakai tidak sama dengan hitung ulang')
+    for u in conn.execute("select u.id, u.jumlah_terbayar, coalesce(sum(t.jumlah) filter (where t.jenis = 'bayar'), 0) as dibayar "
+                          "from utang_piutang u left join transaksi_utang_piutang t on t.utang_piutang_id = u.id group by u.id"):
+        if abs(u['jumlah_terbayar'] - u['dibayar']) > TOLERANSI:
+            masalah.append(f"utang_piutang {u['id']}: terbayar {u['jumlah_terbayar']} != tautan {u['dibayar']}")
+    yatim = conn.execute("select count(*) from transaksi_utang_piutang where transaksi_id not in (select id from transaksi) "
+                         "or utang_piutang_id not in (select id from utang_piutang)").fetchone()[0]
+    if yatim:
+        masalah.append(f"{yatim} tautan transaksi_utang_piutang yatim")
+    return masalah
+
+
+def bagian_round_trip(args):
+    print(f"Round trip per operasi (latensi {args.latensi_ms} ms per panggilan, {args.ulang} kali):")
+    print(f"{'operasi':<14} {'jalur':<8} {'kueri':>6} {'p50':>9} {'p95':>9}")
+    for nama_jalur, buat in (('lama', UrutanLama), ('atomik', PenulisSupabase)):
+        db = SupabasePalsu({'rekening': REKENING, 'utang_piutang': [
+            {'id': 1, 'tipe': 'Utang', 'deskripsi': 'Cicilan motor', 'pihak_terkait': 'Dealer', 'jumlah_total': 1e12,
+             'jumlah_terbayar': 0.0, 'lunas': False, 'tanggal_mulai': '2025-01-01'}]}, latensi=args.latensi_ms / 1000)
+        penulis = buat(db)
+        rng = random.Random(1)
+        kasus = {
+            'transfer': lambda: penulis.catat([transaksi_acak(rng, 'Transfer'), dict(transaksi_acak(rng, 'Transfer'), tipe='pemasukan')]),
+            'utang baru': lambda: penulis.catat([transaksi_acak(rng, 'Penerimaan Utang', 'pemasukan')],
+                                                utang_baru={'tipe': 'Utang', 'deskripsi': 'Utang', 'pihak_terkait': 'Budi'}),
+            'pelunasan': lambda: penulis.catat([transaksi_acak(rng, 'Pembayaran Utang')], pelunasan={'tipe': 'Utang', 'pihak_terkait': 'Dealer'}),
+            'cicilan': lambda: penulis.bayar_cicilan(1, 1000.0, 1, '2025-06-01T10:00:00'),
+        }
+        for nama, fungsi in kasus.items():
+            waktu = []
+            sebelum = db.jumlah_kueri
+            for _ in range(args.ulang):
+                mulai = time.perf_counter()
+                fungsi()
+                waktu.append(time.perf_counter() - mulai)
+            kuantil = statistics.quantiles(waktu, n=20, method='inclusive')
+            print(f"{nama:<14} {nama_jalur:<8} {(db.jumlah_kueri - sebelum) / args.ulang:>6.1f} "
+                  f"{statistics.median(waktu) * 1000:>7.2f}ms {kuantil[18] * 1000:>7.2f}ms")
+
+
+def bagian_atomik(args):
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(':memory:', factory=KoneksiGagal)
+    penulis = PenulisSQLite(conn)
+    with conn:
+        conn.executemany("insert into rekening (id, nama, saldo_awal) values (?, ?, ?)", [(r['id'], r['nama'], r['saldo_awal']) for r in REKENING])
+        conn.executemany("insert into anggaran (tahun, bulan, kategori, batas) values (?, ?, 'Makanan', 500000)", [(2025, b) for b in range(1, 7)])
+
+    percobaan, gagal_bocor, per_operasi = 0, [], {}
+    for _ in range(args.operasi):
+        id_transaksi = [r[0] for r in conn.execute("select id from transaksi")]
+        id_utang = [r[0] for r in conn.execute("select id from utang_piutang")]
+        nama, fungsi = operasi_acak(rng, penulis, id_transaksi, id_utang)
+        sebelum = list(conn.iterdump())
+        # Gagal di setiap pernyataan secara bergantian sampai operasi lolos
+        k = 1
+        while True:
+            conn.hitung, conn.gagal_pada = 0, k
+            try:
+                fungsi()
+            except GagalDisuntik:
+                percobaan += 1
+                if list(conn.iterdump()) != sebelum:
+                    gagal_bocor.append((nama, k))
+                k += 1
+                continue
+            except (LookupError, ValueError):
+                # Ditolak oleh aturan bisnis (mis. catatan yang sudah dibayar); juga harus tanpa bekas
+                if list(conn.iterdump()) != sebelum:
+                    gagal_bocor.append((nama, 'ditolak'))
+            finally:
+                conn.gagal_pada = None
+            break
+        per_operasi[nama] = per_operasi.get(nama, 0) + 1
+
+    print(f"\nUji atomik PenulisSQLite: {args.operasi} operasi acak ({', '.join(f'{n} {j}' for n, j in sorted(per_operasi.items()))}),")
+    print(f"{percobaan} kegagalan disuntikkan di tengah operasi, {len(gagal_bocor)} meninggalkan tulisan sebagian.")
+    for nama, k in gagal_bocor[:10]:
+        print(f"  BOCOR: {nama} gagal di pernyataan {k}")
+    masalah = periksa_konsisten(conn)
+    print(f"Invarian setelah semua operasi: {'konsisten' if not masalah else 'TIDAK konsisten'}")
+    for m in masalah[:10]:
+        print(f"  {m}")
+    return not gagal_bocor and not masalah
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latensi-ms', type=float, default=2.0)
+    parser.add_argument('--ulang', type=int, default=100)
+    parser.add_argument('--operasi', type=int, default=300, help='jumlah operasi acak pada uji atomik')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    bagian_round_trip(args)
+    if not bagian_atomik(args):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
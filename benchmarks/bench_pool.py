@@ -0,0 +1,102 @@
+"""Klien Supabase bawaan vs pool terbatas (klien.KonfigurasiPool) di bawah beban thread.
+
+Jalankan dari root repo:
+    python benchmarks/bench_pool.py
+    python benchmarks/bench_pool.py --thread 16 --request 200 --latensi 5 --putus 2
+
+Kedua klien menembak postgrest_lokal.PostgRESTLokal (latensi server
+--latensi ms). Untuk setiap klien dilaporkan throughput, persentil latensi,
+koneksi TCP yang diterima server dan kueri yang gagal. Dengan --putus P,
+P% request baca diputus server tanpa respons (seperti koneksi keep-alive yang
+ditutup di tengah jalan): klien bawaan langsung gagal, klien ber-pool
+mengulangnya. Skenario terakhir memastikan insert yang diputus TIDAK diulang.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from klien import KonfigurasiPool, buat_klien_supabase  # noqa: E402
+from postgrest_lokal import PostgRESTLokal  # noqa: E402
+
+
+def persentil(data, p):
+    data = sorted(data)
+    return data[min(len(data) - 1, int(len(data) * p / 100))] if data else 0.0
+
+
+def beban(klien, jumlah_thread, jumlah_request):
+    latensi, gagal = [], []
+    lock = threading.Lock()
+
+    def kerja():
+        milik_sendiri, galat = [], 0
+        for i in range(jumlah_request):
+            mulai = time.perf_counter()
+            try:
+                klien.table('transaksi').select('id, jumlah').eq('tipe', 'pengeluaran').order('id', desc=True).limit(20).execute()
+            except Exception:
+                galat += 1
+            milik_sendiri.append(time.perf_counter() - mulai)
+        with lock:
+            latensi.extend(milik_sendiri)
+            gagal.append(galat)
+
+    mulai = time.perf_counter()
+    semua = [threading.Thread(target=kerja) for _ in range(jumlah_thread)]
+    for t in semua:
+        t.start()
+    for t in semua:
+        t.join()
+    return time.perf_counter() - mulai, latensi, sum(gagal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thread', type=int, default=16)
+    parser.add_argument('--request', type=int, default=100, help='request per thread')
+    parser.add_argument('--latensi', type=float, default=5.0, help='latensi server (ms)')
+    parser.add_argument('--maks-koneksi', type=int, default=8)
+    parser.add_argument('--putus', type=float, default=2.0, help='persen request yang diputus server')
+    args = parser.parse_args()
+
+    baris = [{'id': i, 'jumlah': i * 1000, 'tipe': 'pengeluaran' if i % 3 else 'pemasukan'} for i in range(1, 501)]
+    total = args.thread * args.request
+    konfigurasi = KonfigurasiPool(maks_koneksi=args.maks_koneksi, maks_idle=args.maks_koneksi, jeda_awal=0.01)
+    print(f"{args.thread} thread x {args.request} request, latensi server {args.latensi:.0f} ms, {args.putus:g}% diputus\n")
+    print(f"{'klien':>8} {'req/detik':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'koneksi TCP':>12} {'gagal':>6}")
+    for nama, konf in (('bawaan', None), ('pool', konfigurasi)):
+        with PostgRESTLokal({'transaksi': baris}, latensi=args.latensi / 1000) as server:
+            klien = buat_klien_supabase(server.url, 'header.payload.tanda', konf)
+            klien.table('transaksi').select('id').limit(1).execute()
+            if args.putus:
+                setiap = max(1, round(100 / args.putus))
+                server.ganggu(*([None] * (setiap - 1) + ['putus']) * (total // setiap))
+            koneksi_awal = server.statistik['koneksi']
+            durasi, latensi, gagal = beban(klien, args.thread, args.request)
+            print(f"{nama:>8} {total / durasi:>10.0f} {persentil(latensi, 50) * 1000:>9.1f} {persentil(latensi, 95) * 1000:>9.1f} "
+                  f"{persentil(latensi, 99) * 1000:>9.1f} {server.statistik['koneksi'] - koneksi_awal:>12} {gagal:>6}")
+            if konf is not None:
+                stat = klien.pool_http.statistik()
+                print(f"\nStatistik pool: puncak dipakai {stat['dipakai_puncak']}/{stat['maks_koneksi']}, menunggu {stat['menunggu']} kali "
+                      f"({stat['detik_menunggu']:.2f} detik total), pakai ulang {stat['rasio_pakai_ulang']:.1%}, retry {stat['retry']}")
+
+                # Tulis tidak boleh diulang: insert yang koneksinya diputus harus gagal sekali
+                sebelum = server.statistik['request']
+                server.ganggu('putus')
+                try:
+                    klien.table('transaksi').insert({'jumlah': 1, 'tipe': 'pemasukan'}).execute()
+                    sys.exit("Insert yang diputus seharusnya gagal")
+                except Exception:
+                    pass
+                dikirim = server.statistik['request'] - sebelum
+                print(f"Insert yang diputus dikirim {dikirim} kali ({'benar, tidak diulang' if dikirim == 1 else 'SALAH'})")
+                if dikirim != 1:
+                    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
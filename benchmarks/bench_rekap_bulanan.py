@@ -0,0 +1,73 @@
+"""Latensi ringkasan dashboard: view v_rekap_bulanan vs tabel rekap_bulanan.
+
+Jalankan dari root repo:
+    python benchmarks/bench_rekap_bulanan.py
+    python benchmarks/bench_rekap_bulanan.py --ukuran 10000 100000 --tren 6 24
+
+Keduanya memakai SQLite lokal. View mengagregasi ulang seluruh ledger di
+setiap kueri, sedangkan tabel rekap hanya membaca baris bulan yang diminta.
+Skrip juga memeriksa bahwa pembaruan inkremental (catat_rekap untuk insert
+dan hapus) menghasilkan angka yang sama dengan view.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregasi import periode_tren  # noqa: E402
+from backend_agregasi import BackendSQLite, BackendSQLiteRekap  # noqa: E402
+from bench_backend_agregasi import periksa  # noqa: E402
+from data_sintetis import buat_transaksi  # noqa: E402
+
+
+def ukur(fungsi, ulang=5):
+    terbaik, hasil = None, None
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi = time.perf_counter() - mulai
+        terbaik = durasi if terbaik is None else min(terbaik, durasi)
+    return terbaik, hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+    parser.add_argument('--tren', type=int, nargs='+', default=[6, 12, 24])
+    args = parser.parse_args()
+
+    today = datetime(2025, 6, 15, 12, 0, 0)
+    bulan, tahun = today.month, today.year
+    print(f"{'baris':>8} {'tren':>5} {'view (ms)':>10} {'rekap (ms)':>11} {'speedup':>8}  sama")
+    for n in args.ukuran:
+        transaksi = buat_transaksi(n, akhir=today)
+        # Sebagian kecil ledger dicatat belakangan lewat jalur inkremental
+        awal, susulan = transaksi[n // 100:], transaksi[:n // 100]
+        conn = sqlite3.connect(':memory:')
+        view, rekap = BackendSQLite(conn), BackendSQLiteRekap(conn)
+        view.muat_transaksi(awal)
+        rekap.bangun_ulang_rekap()
+        view.muat_transaksi(susulan)
+        rekap.catat_rekap(susulan)
+        # ... lalu sebagian dihapus lagi
+        terhapus = random.Random(7).sample(transaksi, n // 200)
+        conn.executemany("delete from transaksi where id = ?", [(t['id'],) for t in terhapus])
+        rekap.catat_rekap(terhapus, arah=-1)
+
+        for jumlah_bulan in args.tren:
+            periode = periode_tren(today, jumlah_bulan)
+            waktu_view, hasil_view = ukur(lambda: view.ringkasan(bulan, tahun, periode))
+            waktu_rekap, hasil_rekap = ukur(lambda: rekap.ringkasan(bulan, tahun, periode))
+            beda = periksa(hasil_rekap, hasil_view, periode)
+            print(f"{n:>8} {jumlah_bulan:>5} {waktu_view * 1000:>10.1f} {waktu_rekap * 1000:>11.2f} {waktu_view / waktu_rekap:>7.0f}x  {'ya' if beda is None else 'TIDAK: ' + beda}")
+            if beda is not None:
+                sys.exit(f"Hasil berbeda untuk {n} baris pada '{beda}'")
+
+
+if __name__ == '__main__':
+    main()
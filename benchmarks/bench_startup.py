@@ -0,0 +1,102 @@
+"""Cold start: waktu impor app, RSS, dan latensi request pertama.
+
+Jalankan dari root repo:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --ulang 5 --catat benchmarks/startup.jsonl
+
+Setiap pengukuran dijalankan di proses baru (seperti instance serverless
+yang baru dinyalakan) dengan SUPABASE_URL diarahkan ke server lokal
+(postgrest_lokal.py, tabel kosong), sehingga angka di bawah tidak termasuk
+latensi jaringan ke Supabase. Dua mode:
+
+  - malas  : seperti Vercel, request pertama membayar impor dan koneksi;
+  - hangat : seperti worker gunicorn, app.hangatkan() dipanggil dulu.
+
+Dengan --catat setiap hasil ditambahkan sebagai satu baris JSON (beserta
+commit git) supaya regresi waktu startup bisa dilacak dari waktu ke waktu.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AKAR)
+
+from postgrest_lokal import PostgRESTLokal  # noqa: E402
+
+MODUL_DIPANTAU = ('supabase', 'httpx', 'pandas', 'numpy', 'openpyxl', 'fpdf')
+MODE = ('malas', 'hangat')
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def anak(mode):
+    mulai = time.perf_counter()
+    import app as modul_app
+    hasil = {'impor': time.perf_counter() - mulai, 'rss_impor': rss_mb(),
+             'modul_saat_impor': sorted(m for m in MODUL_DIPANTAU if m in sys.modules)}
+    if mode == 'hangat':
+        hasil['hangatkan'] = modul_app.hangatkan()
+    klien = modul_app.app.test_client()
+    for kunci, url in (('get_pertama', '/'), ('get_kedua', '/'), ('pdf_pertama', '/ekspor_pdf')):
+        mulai = time.perf_counter()
+        status = klien.get(url).status_code
+        hasil[kunci] = time.perf_counter() - mulai
+        if status != 200:
+            raise SystemExit(f"{url} mengembalikan status {status}")
+    hasil['rss_akhir'] = rss_mb()
+    print(json.dumps(hasil))
+
+
+def commit_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=AKAR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ulang', type=int, default=3, help='jumlah proses per mode (median dilaporkan)')
+    parser.add_argument('--catat', metavar='FILE', help='tambahkan hasil sebagai baris JSON ke FILE')
+    parser.add_argument('--anak', choices=MODE, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.anak:
+        anak(args.anak)
+        return
+
+    server = PostgRESTLokal().mulai()
+    env = dict(os.environ, SUPABASE_URL=server.url, SUPABASE_KEY='header.payload.tanda')
+
+    ringkasan = {}
+    for mode in MODE:
+        hasil = [json.loads(subprocess.run([sys.executable, __file__, '--anak', mode], cwd=AKAR, env=env,
+                                           capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1])
+                 for _ in range(args.ulang)]
+        ringkasan[mode] = {k: statistics.median(h[k] for h in hasil) for k, v in hasil[0].items() if isinstance(v, (int, float))}
+        ringkasan[mode]['modul_saat_impor'] = hasil[0]['modul_saat_impor']
+    server.berhenti()
+
+    print(f"{'mode':>7} {'impor (ms)':>11} {'hangatkan (ms)':>15} {'GET / #1 (ms)':>14} {'GET / #2 (ms)':>14} "
+          f"{'PDF #1 (ms)':>12} {'RSS impor (MB)':>15} {'RSS akhir (MB)':>15}")
+    for mode, h in ringkasan.items():
+        print(f"{mode:>7} {h['impor'] * 1000:>11.0f} {h.get('hangatkan', 0) * 1000:>15.0f} {h['get_pertama'] * 1000:>14.0f} "
+              f"{h['get_kedua'] * 1000:>14.0f} {h['pdf_pertama'] * 1000:>12.0f} {h['rss_impor']:>15.1f} {h['rss_akhir']:>15.1f}")
+    print(f"\nModul berat yang sudah dimuat setelah `import app`: {', '.join(ringkasan['malas']['modul_saat_impor']) or '-'}")
+
+    if args.catat:
+        with open(args.catat, 'a', encoding='utf-8') as berkas:
+            berkas.write(json.dumps({'waktu': datetime.now().isoformat(timespec='seconds'), 'commit': commit_git(),
+                                     'python': sys.version.split()[0], 'hasil': ringkasan}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Pembuat ledger sintetis untuk benchmark (deterministik lewat seed)."""
+import random
+from datetime import datetime, timedelta
+
+KATEGORI_PENGELUARAN = ['Makanan', 'Transportasi', 'Hiburan', 'Belanja', 'Orang Tua', 'Alokasi Dana', 'Pembayaran Utang', 'Pemberian Piutang', 'Transfer', 'Lainnya']
+KATEGORI_PEMASUKAN = ['Gaji', 'Hadiah', 'Freelance', 'Investasi', 'Penerimaan Piutang', 'Penerimaan Utang', 'Transfer', 'Lainnya']
+
+
+def buat_rekening(jumlah=5):
+    return [{'id': i, 'nama_rekening': f'Rekening {i}', 'jenis_rekening': 'Bank', 'saldo_awal': float(i * 100000)} for i in range(1, jumlah + 1)]
+
+
+def buat_anggaran(bulan, tahun):
+    return [{'id': i, 'kategori': k, 'batas': 1500000.0, 'bulan': bulan, 'tahun': tahun} for i, k in enumerate(KATEGORI_PENGELUARAN[:6], start=1)]
+
+
+def iter_transaksi(jumlah, jumlah_rekening=5, hari=3 * 365, seed=42, akhir=None):
+    """Generator transaksi dict seperti hasil PostgREST (belum terurut)."""
+    rng = random.Random(seed)
+    akhir = akhir or datetime(2025, 6, 15, 12, 0, 0)
+    for i in range(1, jumlah + 1):
+        tipe = 'pemasukan' if rng.random() < 0.3 else 'pengeluaran'
+        kategori = rng.choice(KATEGORI_PEMASUKAN if tipe == 'pemasukan' else KATEGORI_PENGELUARAN)
+        tanggal = akhir - timedelta(seconds=rng.randrange(hari * 86400))
+        yield {
+            'id': i,
+            'deskripsi': f'{kategori} #{i}',
+            'jumlah': round(rng.uniform(1000, 2000000), 2),
+            'tipe': tipe,
+            'kategori': kategori,
+            'tanggal': tanggal.isoformat(),
+            'rekening_id': rng.randint(1, jumlah_rekening),
+        }
+
+
+def buat_transaksi(jumlah, jumlah_rekening=5, hari=3 * 365, seed=42, akhir=None):
+    """Daftar transaksi dict seperti hasil PostgREST, terurut tanggal menurun."""
+    rows = list(iter_transaksi(jumlah, jumlah_rekening, hari, seed, akhir))
+    rows.sort(key=lambda t: t['tanggal'], reverse=True)
+    return rows
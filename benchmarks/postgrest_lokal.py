@@ -0,0 +1,209 @@
+"""Server HTTP lokal yang meniru PostgREST secukupnya untuk benchmark.
+
+    with PostgRESTLokal({'transaksi': baris}, latensi=0.005) as server:
+        klien = create_client(server.url, 'header.payload.tanda')
+
+Yang didukung (di bawah /rest/v1/):
+  - GET/HEAD <tabel>?select=a,b&kolom=op.nilai&order=kolom.desc&limit=&offset=
+    dengan operator eq, neq, gt, gte, lt, lte, is, in, like, ilike;
+    `Prefer: count=exact` mengisi header Content-Range;
+  - POST <tabel> (insert dict atau list, id diisi otomatis), PATCH (update)
+    dan DELETE dengan filter yang sama; ketiganya mengembalikan barisnya;
+  - POST rpc/<nama>: memanggil `rpc[nama](params)` atau mengembalikan [].
+
+Server memakai HTTP/1.1 keep-alive dan menghitung koneksi TCP yang diterima
+(`koneksi`) serta request (`request`), sehingga pemakaian ulang koneksi
+bisa diperiksa dari sisi server. `ganggu(*aksi)` mengantrekan gangguan
+untuk request berikutnya: kode status (mis. 503) atau 'putus' (koneksi
+ditutup tanpa respons).
+"""
+import fnmatch
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+AWALAN = '/rest/v1/'
+OPERATOR = {
+    'eq': lambda a, b: a is not None and str(a) == b,
+    'neq': lambda a, b: a is not None and str(a) != b,
+    'gt': lambda a, b: a is not None and _angka(a) > _angka(b),
+    'gte': lambda a, b: a is not None and _angka(a) >= _angka(b),
+    'lt': lambda a, b: a is not None and _angka(a) < _angka(b),
+    'lte': lambda a, b: a is not None and _angka(a) <= _angka(b),
+    'is': lambda a, b: (a is None) if b == 'null' else (a is (b == 'true')),
+    'in': lambda a, b: a is not None and str(a) in [v.strip('"') for v in b.strip('()').split(',')],
+    'like': lambda a, b: a is not None and fnmatch.fnmatchcase(str(a), b.replace('%', '*')),
+    'ilike': lambda a, b: a is not None and fnmatch.fnmatchcase(str(a).lower(), b.replace('%', '*').lower()),
+}
+
+
+def _angka(nilai):
+    try:
+        return float(nilai)
+    except (TypeError, ValueError):
+        return str(nilai)
+
+
+def _cocok(baris, filter_):
+    for kolom, op, nilai, negasi in filter_:
+        if OPERATOR[op](baris.get(kolom), nilai) == negasi:
+            return False
+    return True
+
+
+def _parse_kueri(query):
+    filter_, opsi = [], {}
+    for kunci, nilai in parse_qsl(query, keep_blank_values=True):
+        if kunci in ('select', 'order', 'limit', 'offset', 'columns', 'on_conflict'):
+            opsi[kunci] = nilai
+            continue
+        negasi = nilai.startswith('not.')
+        op, _, isi = nilai[4:].partition('.') if negasi else nilai.partition('.')
+        if op in OPERATOR:
+            filter_.append((kunci, op, isi, negasi))
+    return filter_, opsi
+
+
+def _urutkan(baris, order):
+    for bagian in reversed(order.split(',')):
+        kolom, *arah = bagian.split('.')
+        # seperti PostgreSQL: null di akhir untuk asc, di awal untuk desc
+        baris.sort(key=lambda b: (b.get(kolom) is None, _angka(b.get(kolom))), reverse='desc' in arah)
+    return baris
+
+
+def _pilih_kolom(baris, select):
+    kolom = [k.strip() for k in (select or '*').split(',') if k.strip() and '(' not in k]
+    if not kolom or '*' in kolom:
+        return [dict(b) for b in baris]
+    return [{k: b.get(k) for k in kolom} for b in baris]
+
+
+class _Penangan(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'postgrest-lokal'
+    # header dan body ditulis terpisah; tanpa ini setiap respons keep-alive
+    # tertahan ~40 ms oleh Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.lokal._catat('koneksi')
+
+    def log_message(self, *args):
+        pass
+
+    def _kirim(self, status, isi=None, header=None):
+        data = b'' if isi is None else json.dumps(isi).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        for kunci, nilai in (header or {}).items():
+            self.send_header(kunci, nilai)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def _tangani(self):
+        lokal = self.server.lokal
+        panjang = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(panjang)) if panjang else None
+        lokal._catat('request')
+        if lokal.latensi:
+            time.sleep(lokal.latensi)
+        gangguan = lokal._gangguan_berikutnya()
+        if gangguan == 'putus':
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if gangguan is not None:
+            return self._kirim(gangguan, {'message': 'gangguan buatan', 'code': str(gangguan)})
+
+        url = urlsplit(self.path)
+        if not url.path.startswith(AWALAN):
+            return self._kirim(404, {'message': 'bukan jalur PostgREST'})
+        sumber = url.path[len(AWALAN):]
+        filter_, opsi = _parse_kueri(url.query)
+        if sumber.startswith('rpc/'):
+            fungsi = lokal.rpc.get(sumber[4:])
+            return self._kirim(200, fungsi(body or {}) if fungsi else [])
+        status, hasil, header = lokal.jalankan(self.command, sumber, filter_, opsi, body, self.headers.get('Prefer') or '')
+        self._kirim(status, hasil, header)
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _tangani
+
+
+class PostgRESTLokal:
+    def __init__(self, tabel=None, latensi=0.0, rpc=None):
+        self.tabel = {nama: [dict(b) for b in baris] for nama, baris in (tabel or {}).items()}
+        self.latensi = latensi
+        self.rpc = dict(rpc or {})
+        self.statistik = {'koneksi': 0, 'request': 0}
+        self._gangguan = deque()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _catat(self, kunci):
+        with self._lock:
+            self.statistik[kunci] += 1
+
+    def ganggu(self, *aksi):
+        with self._lock:
+            self._gangguan.extend(aksi)
+
+    def _gangguan_berikutnya(self):
+        with self._lock:
+            return self._gangguan.popleft() if self._gangguan else None
+
+    def jalankan(self, metode, nama, filter_, opsi, body, prefer):
+        with self._lock:
+            baris = self.tabel.setdefault(nama, [])
+            if metode == 'POST':
+                baru = body if isinstance(body, list) else [body]
+                id_berikut = max((b.get('id') or 0 for b in baris), default=0) + 1
+                for i, b in enumerate(baru):
+                    baris.append({'id': id_berikut + i, **b})
+                return 201, _pilih_kolom(baris[-len(baru):], opsi.get('select')), {}
+            cocok = [b for b in baris if _cocok(b, filter_)]
+            if metode == 'PATCH':
+                for b in cocok:
+                    b.update(body or {})
+                return 200, _pilih_kolom(cocok, opsi.get('select')), {}
+            if metode == 'DELETE':
+                dihapus = {id(b) for b in cocok}
+                self.tabel[nama] = [b for b in baris if id(b) not in dihapus]
+                return 200, _pilih_kolom(cocok, opsi.get('select')), {}
+            if 'order' in opsi:
+                cocok = _urutkan(list(cocok), opsi['order'])
+            awal = int(opsi.get('offset') or 0)
+            akhir = awal + int(opsi['limit']) if opsi.get('limit') else None
+            hasil = _pilih_kolom(cocok[awal:akhir], opsi.get('select'))
+        header = {}
+        if 'count=exact' in prefer:
+            rentang = f"{awal}-{awal + len(hasil) - 1}" if hasil else '*'
+            header['Content-Range'] = f"{rentang}/{len(cocok)}"
+        return 200, hasil, header
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def mulai(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Penangan)
+        self._server.daemon_threads = True
+        self._server.lokal = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def berhenti(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.mulai()
+
+    def __exit__(self, *exc):
+        self.berhenti()
@@ -0,0 +1,834 @@
+"""Klien Supabase palsu di dalam proses untuk benchmark dan uji beban.
+
+    db = SupabasePalsu({'rekening': [...], 'transaksi': [...]}, latensi=0.002)
+    app.klien_supabase.ganti(db)
+
+Meniru rantai builder supabase-py yang dipakai aplikasi:
+table(nama).select(kolom, count='exact', head=True), eq/neq/gt/gte/lt/lte/
+in_/ilike, or_ (hanya bentuk kursor paginasi.py), order, limit, offset,
+range, single/maybe_single, insert/upsert/update/delete, lalu execute().
+Tabel disimpan di memori sebagai list of dict. RPC dan view dari folder
+sql/ ditiru dengan Python (`_rpc_<nama>`, `_view_<nama>`) supaya data
+turunan (saldo, rekap, versi, pemakaian anggaran) tetap konsisten. Setiap
+RPC berjalan di bawah satu lock, jadi RPC penulisan atomik
+(sql/010_penulisan_atomik.sql) juga tidak terlihat setengah jadi oleh thread
+lain.
+
+Setiap execute() menunggu `latensi` detik (+ `latensi_per_baris` per baris
+hasil) di luar lock, meniru round trip ke database. `statistik` mencatat
+jumlah kueri per (tabel, operasi).
+
+Urutan (tanggal, id) di-cache per versi tabel dan kondisi kursor dicari
+dengan bisect, sehingga paginasi keyset pada ledger besar tidak didominasi
+biaya klien palsu ini sendiri. Untuk alasan yang sama tabel
+indeks_pencarian (sql/009_pencarian.sql) ditiru oleh `IndeksTeksPalsu`,
+indeks terbalik dengan posting list per kata dan trigram per kata, bukan
+list of dict yang dipindai.
+"""
+import bisect
+import copy
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from backend_agregasi import delta_rekap
+from dana_darurat import sisa_setelah_dana_aman, target_dana_darurat
+from pelunasan import TOLERANSI, alokasi_fifo, normalisasi_nama, terapkan_lokal
+from pencarian import baris_indeks, normalisasi
+from penulisan import delta_terpakai, mutasi_per_rekening, transaksi_cicilan, utang_dari_transaksi
+
+KUNCI_UNIK = {
+    'pengaturan': ('kunci',),
+    'saldo_rekening': ('rekening_id',),
+    'versi_data': ('tabel',),
+    'rekap_bulanan': ('tahun', 'bulan', 'tipe', 'kategori', 'rekening_id'),
+    'anggaran_terpakai': ('tahun', 'bulan', 'kategori'),
+    'transaksi_utang_piutang': ('transaksi_id', 'utang_piutang_id'),
+}
+POLA_KURSOR = re.compile(r'tanggal\.(lt|gt)\."(.+)",and\(tanggal\.eq\."(.+)",id\.(lt|gt)\.(-?\d+)\)')
+
+
+class GalatPalsu(Exception):
+    """Pengganti postgrest.exceptions.APIError."""
+
+
+class Respons:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _kunci_urut(nilai):
+    # Seperti PostgreSQL: null di akhir urutan naik
+    return (nilai is None, nilai if nilai is not None else 0)
+
+
+def _bulan_tahun(tanggal):
+    return int(tanggal[:4]), int(tanggal[5:7])
+
+
+class Kueri:
+    def __init__(self, db, tabel):
+        self.db = db
+        self.tabel = tabel
+        self.kolom = '*'
+        self.filter = []
+        self.kursor = None
+        self.urutan = []
+        self.batas = None
+        self.lompat = 0
+        self.hitung = False
+        self.kepala = False
+        self.tunggal = None
+        self.operasi = 'select'
+        self.muatan = None
+        self.konflik = None
+
+    def select(self, kolom='*', count=None, head=None):
+        self.kolom, self.hitung, self.kepala = kolom, count == 'exact', bool(head)
+        return self
+
+    def _saring(self, kolom, uji):
+        self.filter.append((kolom, uji))
+        return self
+
+    def eq(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v == nilai)
+
+    def neq(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v is not None and v != nilai)
+
+    def gt(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v is not None and v > nilai)
+
+    def gte(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v is not None and v >= nilai)
+
+    def lt(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v is not None and v < nilai)
+
+    def lte(self, kolom, nilai):
+        return self._saring(kolom, lambda v: v is not None and v <= nilai)
+
+    def in_(self, kolom, nilai):
+        pilihan = set(nilai)
+        return self._saring(kolom, lambda v: v in pilihan)
+
+    def ilike(self, kolom, pola):
+        pola = re.compile('^' + re.escape(pola).replace('%', '.*').replace('_', '.') + '$', re.IGNORECASE | re.DOTALL)
+        return self._saring(kolom, lambda v: v is not None and pola.match(str(v)) is not None)
+
+    def or_(self, ekspresi):
+        cocok = POLA_KURSOR.fullmatch(ekspresi)
+        if cocok is None:
+            raise NotImplementedError(f"or_ hanya mendukung kondisi kursor paginasi: {ekspresi}")
+        self.kursor = (cocok.group(1), cocok.group(2), int(cocok.group(5)))
+        return self
+
+    def order(self, kolom, desc=False):
+        self.urutan.append((kolom, desc))
+        return self
+
+    def limit(self, jumlah):
+        self.batas = jumlah
+        return self
+
+    def offset(self, jumlah):
+        self.lompat = jumlah
+        return self
+
+    def range(self, awal, akhir):
+        self.lompat, self.batas = awal, akhir - awal + 1
+        return self
+
+    def single(self):
+        self.tunggal = 'single'
+        return self
+
+    def maybe_single(self):
+        self.tunggal = 'maybe'
+        return self
+
+    def insert(self, muatan, **kwargs):
+        self.operasi, self.muatan = 'insert', muatan
+        return self
+
+    def upsert(self, muatan, on_conflict=None, **kwargs):
+        self.operasi, self.muatan = 'upsert', muatan
+        self.konflik = tuple(k.strip() for k in on_conflict.split(',')) if on_conflict else None
+        return self
+
+    def update(self, muatan):
+        self.operasi, self.muatan = 'update', muatan
+        return self
+
+    def delete(self):
+        self.operasi = 'delete'
+        return self
+
+    def _cocok(self, baris):
+        return all(uji(baris.get(kolom)) for kolom, uji in self.filter)
+
+    def _proyeksi(self, baris, kolom):
+        if kolom is None:
+            return dict(baris)
+        return {k: baris.get(k) for k in kolom}
+
+    def execute(self):
+        with self.db._lock:
+            self.db.statistik[(self.tabel, self.operasi)] += 1
+            if self.operasi == 'select':
+                hasil = self.db._pilih(self)
+            else:
+                hasil = self.db._tulis(self)
+        self.db._tunggu(len(hasil.data) if hasil is not None and isinstance(hasil.data, list) else 1)
+        return hasil
+
+
+class _RPC:
+    def __init__(self, db, nama, params):
+        self.db, self.nama, self.params = db, nama, params
+
+    def execute(self):
+        fungsi = getattr(self.db, f'_rpc_{self.nama}', None)
+        if fungsi is None:
+            raise GalatPalsu(f"RPC tidak dikenal: {self.nama}")
+        with self.db._lock:
+            self.db.statistik[(self.nama, 'rpc')] += 1
+            data = fungsi(**self.params)
+        self.db._tunggu(len(data) if isinstance(data, list) else 1)
+        return Respons(data)
+
+
+class SupabasePalsu:
+    def __init__(self, tabel=None, latensi=0.0, latensi_per_baris=0.0):
+        self.tabel = {nama: [dict(b) for b in baris] for nama, baris in (tabel or {}).items()}
+        self.latensi = latensi
+        self.latensi_per_baris = latensi_per_baris
+        self.statistik = Counter()
+        self._lock = threading.RLock()
+        self._versi = Counter()
+        self._cache_urut = {}
+        self._id_berikut = {nama: max((b.get('id') or 0 for b in baris), default=0) + 1 for nama, baris in self.tabel.items()}
+        self.indeks_teks = IndeksTeksPalsu()
+
+    # --- antarmuka supabase-py ---
+    def table(self, nama):
+        return Kueri(self, nama)
+
+    from_ = table
+
+    def rpc(self, nama, params=None):
+        return _RPC(self, nama, params or {})
+
+    # --- bantuan untuk benchmark ---
+    @property
+    def jumlah_kueri(self):
+        return sum(self.statistik.values())
+
+    def salin(self, nama):
+        with self._lock:
+            return copy.deepcopy(self.tabel.get(nama, []))
+
+    def _tunggu(self, jumlah_baris):
+        jeda = self.latensi + self.latensi_per_baris * jumlah_baris
+        if jeda > 0:
+            time.sleep(jeda)
+
+    # --- select ---
+    def _sumber(self, nama):
+        view = getattr(self, f'_view_{nama}', None)
+        if view is not None:
+            return view()
+        return self.tabel.setdefault(nama, [])
+
+    def _terurut(self, nama, urutan):
+        """Baris tabel terurut (di-cache sampai tabel ditulis) + kunci (tanggal, id) naik."""
+        kunci_cache = (nama, tuple(urutan))
+        tersimpan = self._cache_urut.get(kunci_cache)
+        if tersimpan is not None and tersimpan[0] == self._versi[nama]:
+            return tersimpan[1], tersimpan[2]
+        baris = list(self.tabel.setdefault(nama, []))
+        for kolom, turun in reversed(urutan):
+            baris.sort(key=lambda b: _kunci_urut(b.get(kolom)), reverse=turun)
+        kunci = None
+        if [k for k, _ in urutan] == ['tanggal', 'id'] and urutan[0][1] == urutan[1][1]:
+            kunci = [(b.get('tanggal') or '', b.get('id') or 0) for b in baris]
+            if urutan[0][1]:
+                kunci.reverse()
+        self._cache_urut[kunci_cache] = (self._versi[nama], baris, kunci)
+        return baris, kunci
+
+    def _pilih(self, q):
+        if hasattr(self, f'_view_{q.tabel}') or not q.urutan:
+            baris = [b for b in self._sumber(q.tabel)]
+            for kolom, turun in reversed(q.urutan):
+                baris.sort(key=lambda b: _kunci_urut(b.get(kolom)), reverse=turun)
+            kunci = None
+        else:
+            baris, kunci = self._terurut(q.tabel, q.urutan)
+
+        awal = 0
+        if q.kursor is not None:
+            operator, tanggal, id_ = q.kursor
+            if kunci is None:
+                if operator == 'lt':
+                    baris = [b for b in baris if (b.get('tanggal') or '', b.get('id')) < (tanggal, id_)]
+                else:
+                    baris = [b for b in baris if (b.get('tanggal') or '', b.get('id')) > (tanggal, id_)]
+            elif q.urutan[0][1]:
+                # urutan menurun: baris < kursor adalah ekor daftar
+                awal = len(baris) - bisect.bisect_left(kunci, (tanggal, id_))
+            else:
+                awal = bisect.bisect_right(kunci, (tanggal, id_))
+
+        kolom = [k.strip() for k in q.kolom.split(',')]
+        kolom = None if '*' in kolom else kolom
+        hasil, total = [], 0
+        butuh = None if q.batas is None else q.lompat + q.batas
+        for i in range(awal, len(baris)):
+            b = baris[i]
+            if not q._cocok(b):
+                continue
+            total += 1
+            if total <= q.lompat or (butuh is not None and total > butuh):
+                continue
+            if not q.kepala:
+                hasil.append(q._proyeksi(b, kolom))
+            if butuh is not None and total == butuh and not q.hitung:
+                break
+
+        if q.tunggal is not None:
+            if len(hasil) != 1:
+                if q.tunggal == 'maybe' and not hasil:
+                    return None
+                raise GalatPalsu(f"JSON object requested, multiple (or no) rows returned ({len(hasil)} baris di {q.tabel})")
+            return Respons(hasil[0])
+        return Respons(hasil, total if q.hitung else None)
+
+    # --- tulis ---
+    def _baris_baru(self, nama, baris):
+        baris = dict(baris)
+        if 'id' not in baris and nama not in KUNCI_UNIK:
+            baris['id'] = self._id_berikut.get(nama, 1)
+            self._id_berikut[nama] = baris['id'] + 1
+        elif isinstance(baris.get('id'), int):
+            self._id_berikut[nama] = max(self._id_berikut.get(nama, 1), baris['id'] + 1)
+        return baris
+
+    def _tulis(self, q):
+        nama = q.tabel
+        tabel = self.tabel.setdefault(nama, [])
+        self._versi[nama] += 1
+        if q.operasi in ('insert', 'upsert'):
+            daftar = q.muatan if isinstance(q.muatan, list) else [q.muatan]
+            kunci = q.konflik or KUNCI_UNIK.get(nama, ('id',))
+            hasil = []
+            for muatan in daftar:
+                lama = None
+                if q.operasi == 'upsert':
+                    lama = next((b for b in tabel if all(b.get(k) == muatan.get(k) for k in kunci)), None)
+                if lama is not None:
+                    lama.update(muatan)
+                    hasil.append(dict(lama))
+                    continue
+                baru = self._baris_baru(nama, muatan)
+                tabel.append(baru)
+                hasil.append(dict(baru))
+            return Respons(hasil)
+        cocok = [b for b in tabel if q._cocok(b)]
+        if q.operasi == 'update':
+            for b in cocok:
+                b.update(q.muatan)
+            return Respons([dict(b) for b in cocok])
+        dihapus = {id(b) for b in cocok}
+        self.tabel[nama] = [b for b in tabel if id(b) not in dihapus]
+        return Respons([dict(b) for b in cocok])
+
+    def _ubah(self, nama):
+        self._versi[nama] += 1
+        return self.tabel.setdefault(nama, [])
+
+    # --- RPC (lihat folder sql/) ---
+    def _rpc_tambah_saldo_rekening(self, p_rekening_id, p_delta):
+        saldo = self._ubah('saldo_rekening')
+        baris = next((s for s in saldo if s['rekening_id'] == p_rekening_id), None)
+        if baris is None:
+            awal = next((float(r.get('saldo_awal') or 0) for r in self.tabel.get('rekening', []) if r['id'] == p_rekening_id), 0.0)
+            baris = {'rekening_id': p_rekening_id, 'saldo': awal}
+            saldo.append(baris)
+        baris['saldo'] += p_delta
+        return baris['saldo']
+
+    def _rpc_bangun_ulang_saldo_rekening(self):
+        mutasi = mutasi_per_rekening(self.tabel.get('transaksi', []))
+        self._ubah('saldo_rekening')
+        self.tabel['saldo_rekening'] = [
+            {'rekening_id': r['id'], 'saldo': float(r.get('saldo_awal') or 0) + mutasi.get(r['id'], 0.0)} for r in self.tabel.get('rekening', [])
+        ]
+        return len(self.tabel['saldo_rekening'])
+
+    def _rpc_naikkan_versi(self, p_tabel):
+        versi = self._ubah('versi_data')
+        sekarang = datetime.now(timezone.utc).isoformat()
+        hasil = []
+        for nama in p_tabel:
+            baris = next((v for v in versi if v['tabel'] == nama), None)
+            if baris is None:
+                baris = {'tabel': nama, 'versi': 0}
+                versi.append(baris)
+            baris['versi'] += 1
+            baris['diperbarui'] = sekarang
+            hasil.append(dict(baris))
+        return hasil
+
+    def _tambah_terkunci(self, nama, kolom_kunci, baris, kolom_nilai):
+        tabel = self._ubah(nama)
+        indeks = {tuple(b[k] for k in kolom_kunci): b for b in tabel}
+        hasil = []
+        for delta in baris:
+            kunci = tuple(delta[k] for k in kolom_kunci)
+            lama = indeks.get(kunci)
+            if lama is None:
+                lama = {k: delta[k] for k in kolom_kunci}
+                lama.update({k: 0 for k in kolom_nilai})
+                tabel.append(lama)
+                indeks[kunci] = lama
+            sebelum = lama[kolom_nilai[0]]
+            for k in kolom_nilai:
+                lama[k] += delta[k]
+            hasil.append((lama, sebelum))
+        return hasil
+
+    def _rpc_tambah_rekap_bulanan(self, p_baris):
+        for baris, _ in self._tambah_terkunci('rekap_bulanan', KUNCI_UNIK['rekap_bulanan'], p_baris, ('total', 'jumlah_transaksi')):
+            baris['periode'] = f"{baris['tahun']:04d}-{baris['bulan']:02d}"
+        return None
+
+    def _rpc_bangun_ulang_rekap_bulanan(self):
+        delta = {}
+        for t in self.tabel.get('transaksi', []):
+            if not t.get('tanggal') or t.get('tipe') not in ('pemasukan', 'pengeluaran'):
+                continue
+            kunci = (*_bulan_tahun(t['tanggal']), t['tipe'], t.get('kategori'), t.get('rekening_id'))
+            ember = delta.setdefault(kunci, {'total': 0.0, 'jumlah_transaksi': 0})
+            ember['total'] += float(t['jumlah'])
+            ember['jumlah_transaksi'] += 1
+        self._ubah('rekap_bulanan')
+        self.tabel['rekap_bulanan'] = [
+            {'tahun': th, 'bulan': bl, 'tipe': tp, 'kategori': kt, 'rekening_id': rk, 'periode': f"{th:04d}-{bl:02d}", **e}
+            for (th, bl, tp, kt, rk), e in delta.items()
+        ]
+        return len(delta)
+
+    def _rpc_catat_anggaran_terpakai(self, p_baris, p_ambang):
+        anggaran = self.tabel.get('anggaran', [])
+        peringatan = self._ubah('peringatan_anggaran')
+        hasil = []
+        for (baris, sebelum), delta in zip(self._tambah_terkunci('anggaran_terpakai', KUNCI_UNIK['anggaran_terpakai'], [
+                {'tahun': d['tahun'], 'bulan': d['bulan'], 'kategori': d['kategori'], 'terpakai': d['total'], 'jumlah_transaksi': d['jumlah_transaksi']}
+                for d in p_baris], ('terpakai', 'jumlah_transaksi')), p_baris):
+            sesudah = baris['terpakai']
+            for a in anggaran:
+                if (a['tahun'], a['bulan'], a['kategori']) != (delta['tahun'], delta['bulan'], delta['kategori']) or not a['batas'] > 0:
+                    continue
+                for ambang in sorted(p_ambang):
+                    batas = ambang * a['batas']
+                    if sebelum < batas <= sesudah or sesudah < batas <= sebelum:
+                        p = self._baris_baru('peringatan_anggaran', {
+                            'anggaran_id': a['id'], 'tahun': delta['tahun'], 'bulan': delta['bulan'], 'kategori': delta['kategori'],
+                            'ambang': ambang, 'arah': 'naik' if sesudah > sebelum else 'turun', 'batas': a['batas'],
+                            'terpakai_sebelum': sebelum, 'terpakai': sesudah, 'dibuat': datetime.now(timezone.utc).isoformat()})
+                        peringatan.append(p)
+                        hasil.append(dict(p))
+        return hasil
+
+    def _rpc_bangun_ulang_anggaran_terpakai(self):
+        terpakai = {}
+        for t in self.tabel.get('transaksi', []):
+            if t.get('tipe') != 'pengeluaran' or not t.get('tanggal') or not t.get('kategori'):
+                continue
+            ember = terpakai.setdefault((*_bulan_tahun(t['tanggal']), t['kategori']), {'terpakai': 0.0, 'jumlah_transaksi': 0})
+            ember['terpakai'] += float(t['jumlah'])
+            ember['jumlah_transaksi'] += 1
+        self._ubah('anggaran_terpakai')
+        self.tabel['anggaran_terpakai'] = [{'tahun': th, 'bulan': bl, 'kategori': kt, **e} for (th, bl, kt), e in terpakai.items()]
+        return len(terpakai)
+
+    def _rpc_sinkronkan_dana_darurat(self, p_target, p_alokasi):
+        tabungan = self._ubah('tabungan')
+        baris = next((t for t in tabungan if t.get('nama') == 'Dana Darurat'), None)
+        dibuat = baris is None
+        if dibuat:
+            baris = self._baris_baru('tabungan', {'nama': 'Dana Darurat', 'target': p_target or 0.0, 'terkumpul': 0.0, 'tenggat': None})
+            tabungan.append(baris)
+        target = p_target if p_target is not None else baris['target']
+        terkumpul = max(baris['terkumpul'], min(target, max(p_alokasi, 0.0)))
+        berubah = dibuat or target != baris['target'] or terkumpul != baris['terkumpul']
+        baris.update(target=target, terkumpul=terkumpul)
+        return [{'id': baris['id'], 'target': target, 'terkumpul': terkumpul, 'berubah': berubah}]
+
+    def _rpc_catat_indeks_pencarian(self, p_sumber, p_baris):
+        for b in p_baris:
+            self.indeks_teks.simpan(p_sumber, b)
+        return None
+
+    def _rpc_hapus_indeks_pencarian(self, p_sumber, p_id):
+        for id_ in p_id:
+            self.indeks_teks.hapus(p_sumber, id_)
+        return None
+
+    def _rpc_cari_indeks_pencarian(self, p_tsquery, p_kueri, p_fuzzy, p_ambang, p_sumber, p_tipe, p_kategori, p_rekening_id,
+                                   p_dari, p_sampai, p_limit, p_offset):
+        filter_ = {'sumber': p_sumber, 'tipe': p_tipe, 'kategori': p_kategori, 'rekening_id': p_rekening_id}
+        if p_fuzzy:
+            return self.indeks_teks.cari_fuzzy(p_kueri.split(), p_ambang, filter_, p_dari, p_sampai, p_limit, p_offset)
+        kata = [k[:-2] for k in p_tsquery.split(' & ')]
+        return self.indeks_teks.cari_awalan(kata, filter_, p_dari, p_sampai, p_limit, p_offset)
+
+    def _rpc_bangun_ulang_indeks_pencarian(self):
+        self.indeks_teks = IndeksTeksPalsu()
+        self.indeks_teks.bangun((sumber, b) for sumber in ('transaksi', 'utang_piutang') for b in baris_indeks(sumber, self.tabel.get(sumber, [])))
+        return len(self.indeks_teks)
+
+    # --- penulisan atomik (sql/010_penulisan_atomik.sql); satu RPC berjalan di bawah lock ---
+    def _sisipkan(self, nama, baris):
+        baru = self._baris_baru(nama, baris)
+        self._ubah(nama).append(baru)
+        return baru
+
+    def _terapkan_mutasi_transaksi(self, baris, arah, ambang):
+        for rekening_id, delta in sorted(mutasi_per_rekening(baris).items()):
+            if delta:
+                self._rpc_tambah_saldo_rekening(rekening_id, arah * delta)
+        rekap = delta_rekap(baris, arah)
+        if rekap:
+            self._rpc_tambah_rekap_bulanan(rekap)
+        terpakai = delta_terpakai(baris, arah)
+        peringatan = self._rpc_catat_anggaran_terpakai(terpakai, ambang) if terpakai else []
+        if arah > 0:
+            self._rpc_catat_indeks_pencarian('transaksi', baris_indeks('transaksi', baris))
+        else:
+            self._rpc_hapus_indeks_pencarian('transaksi', [b['id'] for b in baris])
+        self._rpc_naikkan_versi(['transaksi'])
+        return peringatan
+
+    def _sinkronkan_dana_darurat_dari_saldo(self):
+        nilai = next((p['nilai'] for p in self.tabel.get('pengaturan', []) if p.get('kunci') == 'gaji'), None)
+        try:
+            gaji = float(nilai) if nilai is not None else 0.0
+        except ValueError:
+            gaji = 0.0
+        total = sum(float(r['total']) if r['tipe'] == 'pemasukan' else -float(r['total'])
+                    for r in self.tabel.get('rekap_bulanan', []) if r.get('tipe') in ('pemasukan', 'pengeluaran'))
+        berubah = self._rpc_sinkronkan_dana_darurat(target_dana_darurat(gaji), sisa_setelah_dana_aman(total))[0]['berubah']
+        if berubah:
+            self._rpc_naikkan_versi(['tabungan'])
+        return berubah
+
+    def _buat_utang_dari_transaksi(self, utama, utang_baru):
+        item = self._sisipkan('utang_piutang', utang_dari_transaksi(utang_baru, utama))
+        self._sisipkan('transaksi_utang_piutang', {'transaksi_id': utama['id'], 'utang_piutang_id': item['id'], 'jenis': 'buat', 'jumlah': utama['jumlah']})
+        self._rpc_catat_indeks_pencarian('utang_piutang', baris_indeks('utang_piutang', [item]))
+        return dict(item)
+
+    def _lunasi_dari_transaksi(self, utama, pelunasan):
+        nama = normalisasi_nama(pelunasan.get('pihak_terkait'))
+        aktif = sorted((u for u in self._ubah('utang_piutang')
+                        if not u.get('lunas') and u['tipe'] == pelunasan['tipe'] and normalisasi_nama(u.get('pihak_terkait')) == nama),
+                       key=lambda u: (str(u.get('tanggal_mulai') or ''), u['id']))
+        bagian, sisa = alokasi_fifo(aktif, float(utama['jumlah']))
+        alokasi = []
+        for item, porsi in bagian:
+            terapkan_lokal(item, porsi)
+            self._sisipkan('transaksi_utang_piutang', {'transaksi_id': utama['id'], 'utang_piutang_id': item['id'], 'jenis': 'bayar', 'jumlah': porsi})
+            alokasi.append({'id': item['id'], 'dialokasikan': porsi, 'lunas': item['lunas']})
+        return {'alokasi': alokasi, 'sisa': sisa if sisa > TOLERANSI else 0.0}
+
+    def _rpc_catat_transaksi_atomik(self, p_transaksi, p_ambang, p_utang_baru=None, p_pelunasan=None):
+        rows = [self._sisipkan('transaksi', t) for t in p_transaksi]
+        utang = [self._buat_utang_dari_transaksi(rows[0], p_utang_baru)] if p_utang_baru is not None else []
+        lunas = self._lunasi_dari_transaksi(rows[0], p_pelunasan) if p_pelunasan is not None else {'alokasi': [], 'sisa': 0.0}
+        peringatan = self._terapkan_mutasi_transaksi(rows, 1, p_ambang)
+        if utang or lunas['alokasi']:
+            self._rpc_naikkan_versi(['utang_piutang'])
+        return {'transaksi': [dict(t) for t in rows], 'utang_piutang': utang, **lunas, 'peringatan': peringatan,
+                'dana_darurat_berubah': self._sinkronkan_dana_darurat_dari_saldo()}
+
+    def _rpc_impor_transaksi_atomik(self, p_baris, p_ambang):
+        rows, utang, hasil = [], [], []
+        for elemen in p_baris:
+            utama = self._sisipkan('transaksi', elemen['transaksi'])
+            rows.append(utama)
+            if elemen.get('utang_baru') is not None:
+                utang.append(self._buat_utang_dari_transaksi(utama, elemen['utang_baru']))
+            hasil.append(self._lunasi_dari_transaksi(utama, elemen['pelunasan']) if elemen.get('pelunasan') is not None
+                         else {'alokasi': [], 'sisa': 0.0})
+        peringatan = self._terapkan_mutasi_transaksi(rows, 1, p_ambang)
+        if utang or any(h['alokasi'] for h in hasil):
+            self._rpc_naikkan_versi(['utang_piutang'])
+        return {'transaksi': [dict(t) for t in rows], 'utang_piutang': utang, 'hasil': hasil, 'peringatan': peringatan,
+                'dana_darurat_berubah': self._sinkronkan_dana_darurat_dari_saldo()}
+
+    def _rpc_bayar_cicilan_atomik(self, p_utang_piutang_id, p_transaksi, p_ambang):
+        item = next((u for u in self._ubah('utang_piutang') if u['id'] == p_utang_piutang_id), None)
+        if item is None:
+            raise GalatPalsu(f"Catatan utang/piutang {p_utang_piutang_id} tidak ditemukan")
+        utama = self._sisipkan('transaksi', transaksi_cicilan(item, p_transaksi['jumlah'], p_transaksi['rekening_id'], p_transaksi['tanggal']))
+        terbayar = float(item.get('jumlah_terbayar') or 0) + float(utama['jumlah'])
+        item.update(jumlah_terbayar=terbayar, lunas=terbayar >= float(item['jumlah_total']))
+        self._sisipkan('transaksi_utang_piutang', {'transaksi_id': utama['id'], 'utang_piutang_id': item['id'], 'jenis': 'bayar', 'jumlah': utama['jumlah']})
+        peringatan = self._terapkan_mutasi_transaksi([utama], 1, p_ambang)
+        self._rpc_naikkan_versi(['utang_piutang'])
+        return {'transaksi': [dict(utama)], 'utang_piutang': [dict(item)], 'peringatan': peringatan,
+                'dana_darurat_berubah': self._sinkronkan_dana_darurat_dari_saldo()}
+
+    def _rpc_hapus_transaksi_atomik(self, p_id, p_ambang):
+        hasil = {'transaksi': [], 'utang_piutang_dihapus': [], 'utang_piutang_diperbarui': [], 'peringatan': [],
+                 'dana_darurat_berubah': False}
+        utama = next((t for t in self.tabel.get('transaksi', []) if t['id'] == p_id), None)
+        if utama is None:
+            return hasil
+        utang = {u['id']: u for u in self._ubah('utang_piutang')}
+        tautan = [(t, utang[t['utang_piutang_id']]) for t in self._ubah('transaksi_utang_piutang')
+                  if t['transaksi_id'] == p_id and t['utang_piutang_id'] in utang]
+        # Periksa dulu sebelum mengubah apa pun: di database error membatalkan seluruh transaksi
+        for t, item in tautan:
+            if t['jenis'] == 'buat' and float(item.get('jumlah_terbayar') or 0) > TOLERANSI:
+                raise GalatPalsu(f"Catatan {item['tipe']} dengan {item['pihak_terkait']} sudah dibayar Rp {item['jumlah_terbayar']}; "
+                                 "hapus transaksi pembayarannya dulu.")
+        dihapus = set()
+        for t, item in tautan:
+            if t['jenis'] == 'bayar':
+                terbayar = max(float(item.get('jumlah_terbayar') or 0) - t['jumlah'], 0.0)
+                item.update(jumlah_terbayar=terbayar, lunas=terbayar >= float(item['jumlah_total']))
+                hasil['utang_piutang_diperbarui'].append(dict(item))
+            else:
+                dihapus.add(item['id'])
+                self._rpc_hapus_indeks_pencarian('utang_piutang', [item['id']])
+                hasil['utang_piutang_dihapus'].append(dict(item))
+        self.tabel['utang_piutang'] = [u for u in self.tabel['utang_piutang'] if u['id'] not in dihapus]
+        self.tabel['transaksi_utang_piutang'] = [t for t in self.tabel['transaksi_utang_piutang']
+                                                 if t['transaksi_id'] != p_id and t['utang_piutang_id'] not in dihapus]
+        self.tabel['transaksi'] = [t for t in self._ubah('transaksi') if t['id'] != p_id]
+        hasil['transaksi'] = [dict(utama)]
+        hasil['peringatan'] = self._terapkan_mutasi_transaksi([utama], -1, p_ambang)
+        if tautan:
+            self._rpc_naikkan_versi(['utang_piutang'])
+        hasil['dana_darurat_berubah'] = self._sinkronkan_dana_darurat_dari_saldo()
+        return hasil
+
+    def _rpc_hapus_utang_piutang_atomik(self, p_id):
+        dihapus = [dict(u) for u in self._ubah('utang_piutang') if u['id'] == p_id]
+        if dihapus:
+            self.tabel['utang_piutang'] = [u for u in self.tabel['utang_piutang'] if u['id'] != p_id]
+            self.tabel['transaksi_utang_piutang'] = [t for t in self._ubah('transaksi_utang_piutang') if t['utang_piutang_id'] != p_id]
+            self._rpc_hapus_indeks_pencarian('utang_piutang', [p_id])
+            self._rpc_naikkan_versi(['utang_piutang'])
+        return dihapus
+
+    # --- view (lihat folder sql/) ---
+    def _per_rekening(self, baris, kolom_jumlah):
+        hasil = {}
+        for b in baris:
+            if b.get('tipe') in ('pemasukan', 'pengeluaran'):
+                ember = hasil.setdefault(b.get('rekening_id'), {'rekening_id': b.get('rekening_id'), 'pemasukan': 0.0, 'pengeluaran': 0.0})
+                ember[b['tipe']] += float(b[kolom_jumlah])
+        return list(hasil.values())
+
+    def _view_v_saldo_rekening(self):
+        return self._per_rekening(self.tabel.get('transaksi', []), 'jumlah')
+
+    def _view_v_saldo_rekap(self):
+        return self._per_rekening(self.tabel.get('rekap_bulanan', []), 'total')
+
+    def _view_v_rekap_bulanan(self):
+        rekap = {}
+        for t in self.tabel.get('transaksi', []):
+            if not t.get('tanggal') or t.get('tipe') not in ('pemasukan', 'pengeluaran'):
+                continue
+            tahun, bulan = _bulan_tahun(t['tanggal'])
+            ember = rekap.setdefault((tahun, bulan, t['tipe'], t.get('kategori')), {
+                'periode': f"{tahun:04d}-{bulan:02d}", 'tahun': tahun, 'bulan': bulan, 'tipe': t['tipe'], 'kategori': t.get('kategori'),
+                'total': 0.0, 'jumlah_transaksi': 0})
+            ember['total'] += float(t['jumlah'])
+            ember['jumlah_transaksi'] += 1
+        return list(rekap.values())
+
+    def _view_v_status_anggaran(self):
+        terpakai = {(t['tahun'], t['bulan'], t['kategori']): t['terpakai'] for t in self.tabel.get('anggaran_terpakai', [])}
+        return [{'id': a['id'], 'tahun': a['tahun'], 'bulan': a['bulan'], 'kategori': a['kategori'], 'batas': float(a['batas']),
+                 'terpakai': float(terpakai.get((a['tahun'], a['bulan'], a['kategori']), 0.0))} for a in self.tabel.get('anggaran', [])]
+
+
+def trigram(kata):
+    """Trigram satu kata seperti pg_trgm: diawali dua spasi dan diakhiri satu spasi."""
+    kata = f'  {kata} '
+    return {kata[i:i + 3] for i in range(len(kata) - 2)}
+
+
+class IndeksTeksPalsu:
+    """Padanan tabel indeks_pencarian beserta index GIN-nya.
+
+    Setiap dokumen diberi nomor internal. `posting` memetakan kata ke nomor
+    dokumen (padanan GIN tsvector), `kosakata` adalah daftar kata terurut
+    untuk rentang awalan, dan `trigram_kata` memetakan trigram ke kata
+    (padanan GIN pg_trgm). `urutan` menyimpan (tanggal, sumber, id) terurut
+    untuk jalur planner "telusuri index tanggal lalu saring" ketika kandidat
+    terlalu banyak untuk diurutkan.
+
+    Skor fuzzy meniru word_similarity per kata: rata-rata kemiripan trigram
+    terbaik setiap kata kueri, dan setiap kata harus mencapai ambang.
+    """
+
+    PERINGKAT_SUMBER = {'transaksi': 0, 'utang_piutang': 1}
+    AMBANG_TELUSURI = 20_000
+
+    def __init__(self):
+        self.dokumen = []
+        self.nomor = {}
+        self.posting = {}
+        self.kosakata = []
+        self.trigram_kata = {}
+        self.urutan = []
+
+    def __len__(self):
+        return len(self.nomor)
+
+    def _kunci_urut(self, d):
+        return (d['tanggal'] or '', -self.PERINGKAT_SUMBER[d['sumber']], d['sumber_id'])
+
+    def simpan(self, sumber, baris):
+        self.hapus(sumber, baris['sumber_id'])
+        bisect.insort(self.urutan, self._tambah(sumber, baris))
+
+    def bangun(self, dokumen):
+        """Isi dari iterable (sumber, baris) sekaligus; urutan diurutkan sekali di akhir."""
+        for sumber, baris in dokumen:
+            self.hapus(sumber, baris['sumber_id'])
+            self.urutan.append(self._tambah(sumber, baris))
+        self.urutan.sort()
+
+    def _tambah(self, sumber, baris):
+        d = dict(baris, sumber=sumber)
+        d['kata'] = frozenset(normalisasi(f"{d.get('deskripsi') or ''} {d.get('pihak_terkait') or ''}").split())
+        n = len(self.dokumen)
+        self.dokumen.append(d)
+        self.nomor[(sumber, d['sumber_id'])] = n
+        for k in d['kata']:
+            daftar = self.posting.get(k)
+            if daftar is None:
+                daftar = self.posting[k] = set()
+                bisect.insort(self.kosakata, k)
+                for t in trigram(k):
+                    self.trigram_kata.setdefault(t, set()).add(k)
+            daftar.add(n)
+        return (*self._kunci_urut(d), n)
+
+    def hapus(self, sumber, sumber_id):
+        n = self.nomor.pop((sumber, sumber_id), None)
+        if n is None:
+            return
+        d = self.dokumen[n]
+        self.dokumen[n] = None
+        for k in d['kata']:
+            self.posting[k].discard(n)
+        kunci = (*self._kunci_urut(d), n)
+        i = bisect.bisect_left(self.urutan, kunci)
+        if i < len(self.urutan) and self.urutan[i] == kunci:
+            del self.urutan[i]
+
+    def _awalan(self, awalan):
+        i = bisect.bisect_left(self.kosakata, awalan)
+        hasil = set()
+        while i < len(self.kosakata) and self.kosakata[i].startswith(awalan):
+            hasil |= self.posting[self.kosakata[i]]
+            i += 1
+        return hasil
+
+    def _mirip(self, kata, ambang):
+        """{kata kosakata: kemiripan} untuk kata dengan kemiripan trigram >= ambang."""
+        tg = trigram(kata)
+        bersama = {}
+        for t in tg:
+            for k in self.trigram_kata.get(t, ()):
+                bersama[k] = bersama.get(k, 0) + 1
+        hasil = {}
+        for k, jumlah in bersama.items():
+            skor = jumlah / (len(tg) + len(trigram(k)) - jumlah)
+            if skor >= ambang and self.posting[k]:
+                hasil[k] = skor
+        return hasil
+
+    def _lolos(self, d, filter_, dari, sampai):
+        for kolom, nilai in filter_.items():
+            if nilai is not None and d.get(kolom) != nilai:
+                return False
+        if dari is not None and not (d['tanggal'] and d['tanggal'] >= dari):
+            return False
+        if sampai is not None and not (d['tanggal'] and d['tanggal'] < sampai):
+            return False
+        return True
+
+    def _hasil(self, d, skor):
+        return {k: d.get(k) for k in ('sumber', 'sumber_id', 'deskripsi', 'pihak_terkait', 'tanggal', 'tipe', 'kategori', 'rekening_id', 'jumlah')} | {'skor': skor}
+
+    def _pilih(self, kandidat, filter_, dari, sampai, perlu):
+        """`perlu` kunci urutan pertama (terbaru dulu) dari nomor dokumen `kandidat` yang lolos filter."""
+        if len(kandidat) <= self.AMBANG_TELUSURI:
+            return heapq.nlargest(perlu, ((*self._kunci_urut(self.dokumen[n]), n) for n in kandidat
+                                          if self._lolos(self.dokumen[n], filter_, dari, sampai)))
+        # Telusuri urutan tanggal mulai dari batas `sampai`, berhenti di `dari`
+        cocok = []
+        akhir = bisect.bisect_left(self.urutan, (sampai,)) if sampai is not None else len(self.urutan)
+        for i in range(akhir - 1, -1, -1):
+            kunci = self.urutan[i]
+            if dari is not None and kunci[0] < dari:
+                break
+            if kunci[-1] in kandidat and self._lolos(self.dokumen[kunci[-1]], filter_, dari, sampai):
+                cocok.append(kunci)
+                if len(cocok) >= perlu:
+                    break
+        return cocok
+
+    def cari_awalan(self, kata, filter_, dari, sampai, limit, offset):
+        kandidat = None
+        for himpunan in sorted((self._awalan(k) for k in kata), key=len):
+            kandidat = himpunan if kandidat is None else kandidat & himpunan
+            if not kandidat:
+                return []
+        cocok = self._pilih(kandidat, filter_, dari, sampai, offset + limit)
+        return [self._hasil(self.dokumen[k[-1]], 1.0) for k in cocok[offset:]]
+
+    def cari_fuzzy(self, kata, ambang, filter_, dari, sampai, limit, offset):
+        # Per kata kueri: {kemiripan: dokumen yang kata terbaiknya semirip itu}
+        tingkat_per_kata = []
+        for k in kata:
+            tingkat, sudah = {}, set()
+            for mirip, skor in sorted(self._mirip(k, ambang).items(), key=lambda x: -x[1]):
+                baru = self.posting[mirip] - sudah
+                if baru:
+                    tingkat.setdefault(skor, set()).update(baru)
+                    sudah |= baru
+            if not tingkat:
+                return []
+            tingkat_per_kata.append(sorted(tingkat.items(), reverse=True))
+        # Gabungkan tingkat antar kata; skor dokumen = rata-rata kemiripan
+        gabungan = [(0.0, None)]
+        for tingkat in tingkat_per_kata:
+            gabungan = [(total + skor, docs if kandidat is None else kandidat & docs)
+                        for total, kandidat in gabungan for skor, docs in tingkat]
+            gabungan = [(total, docs) for total, docs in gabungan if docs]
+        per_skor = {}
+        for total, docs in gabungan:
+            per_skor.setdefault(total / len(kata), set()).update(docs)
+        perlu, hasil = offset + limit, []
+        for skor in sorted(per_skor, reverse=True):
+            for kunci in self._pilih(per_skor[skor], filter_, dari, sampai, perlu - len(hasil)):
+                hasil.append((skor, kunci))
+            if len(hasil) >= perlu:
+                break
+        return [self._hasil(self.dokumen[k[-1]], skor) for skor, k in hasil[offset:]]
@@ -0,0 +1,58 @@
+"""Buku saldo: saldo berjalan per rekening yang diperbarui saat menulis.
+
+Alih-alih menghitung `saldo_awal + pemasukan - pengeluaran` dari seluruh
+transaksi setiap kali dashboard dibuka, saldo disimpan di tabel
+`saldo_rekening` (sql/002_saldo_rekening.sql). Saldo ditambah/dikurangi di
+dalam RPC penulisan atomik (penulisan.PenulisSupabase) setiap kali transaksi
+dicatat atau dihapus; modul ini membaca dan memeriksanya.
+
+`rekonsiliasi()` menghitung ulang saldo dari awal (lewat view
+v_saldo_rekening) dan melaporkan selisihnya. Perbaikannya (`perbaiki=True`,
+atau `bangun_ulang()`) dijalankan oleh RPC `bangun_ulang_saldo_rekening`,
+yang menghitung ulang di database sambil mengunci saldo_rekening, sehingga
+penulisan yang bersamaan tidak tertimpa nilai yang sudah basi.
+"""
+
+
+class BukuSaldo:
+    def __init__(self, client):
+        self.client = client
+
+    def semua(self):
+        """{rekening_id: saldo} untuk semua rekening yang sudah punya catatan."""
+        rows = self.client.table('saldo_rekening').select('rekening_id, saldo').execute().data or []
+        return {r['rekening_id']: float(r['saldo']) for r in rows}
+
+    def hitung_ulang(self):
+        """Saldo seharusnya per rekening, dihitung dari seluruh transaksi."""
+        rekening_list = self.client.table('rekening').select('id, saldo_awal').execute().data or []
+        mutasi = {r['rekening_id']: r for r in self.client.table('v_saldo_rekening').select('*').execute().data or []}
+        saldo = {}
+        for rek in rekening_list:
+            m = mutasi.get(rek['id'], {})
+            saldo[rek['id']] = float(rek.get('saldo_awal') or 0) + float(m.get('pemasukan') or 0) - float(m.get('pengeluaran') or 0)
+        return saldo
+
+    def rekonsiliasi(self, perbaiki=False, toleransi=0.005):
+        """Bandingkan saldo tercatat dengan hitung ulang.
+
+        Mengembalikan daftar selisih {'rekening_id', 'tercatat', 'seharusnya',
+        'selisih'}; 'tercatat' bernilai None jika rekening belum punya catatan.
+        Dengan `perbaiki=True` semua saldo dihitung ulang lewat bangun_ulang().
+        """
+        tercatat = self.semua()
+        selisih = []
+        for rekening_id, seharusnya in sorted(self.hitung_ulang().items()):
+            nilai = tercatat.get(rekening_id)
+            if nilai is None or abs(nilai - seharusnya) > toleransi:
+                selisih.append({
+                    'rekening_id': rekening_id, 'tercatat': nilai, 'seharusnya': seharusnya,
+                    'selisih': None if nilai is None else nilai - seharusnya,
+                })
+        if perbaiki and selisih:
+            self.bangun_ulang()
+        return selisih
+
+    def bangun_ulang(self):
+        """Hitung ulang saldo semua rekening di database; mengembalikan jumlah rekening."""
+        return self.client.rpc('bangun_ulang_saldo_rekening').execute().data
@@ -0,0 +1,166 @@
+"""Cache baca-lewat (read-through) untuk tabel referensi.
+
+Tabel seperti `pengaturan`, `rekening`, `anggaran` dan `tabungan` hanya berubah
+saat ada form yang dikirim, jadi hasil kuerinya disimpan di memori proses
+dengan kunci (tabel, kueri). Entri kedaluwarsa setelah TTL dan yang paling
+lama tidak dipakai dibuang saat jumlah entri melebihi batas (LRU).
+
+Rute yang menulis wajib memanggil `invalidasi(tabel)`. Setiap invalidasi
+menaikkan generasi tabelnya; hasil kueri yang sedang berjalan saat itu tidak
+disimpan, karena bisa jadi dibaca sebelum penulisan. Karena cache ini per
+proses, worker gunicorn lain baru melihat perubahan setelah TTL habis; hasil
+yang disimpan dengan kunci versi (CacheFragmen, cache dashboard) harus
+dibaca dengan `segar=True`.
+
+`CacheFragmen` menyimpan potongan HTML yang sudah dirender (panel
+dashboard). Kuncinya memuat versi tabel sumber (versi.py), jadi tidak perlu
+TTL maupun invalidasi: setelah ada penulisan, kunci baru tidak cocok dengan
+entri lama. Batasnya berupa anggaran memori dalam byte, dengan LRU.
+"""
+import copy
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+class CacheTTL:
+    def __init__(self, ttl=30.0, maks_entri=128, waktu=time.monotonic):
+        self.ttl = ttl
+        self.maks_entri = maks_entri
+        self._waktu = waktu
+        self._data = OrderedDict()
+        self._generasi = Counter()    # tabel -> jumlah invalidasi
+        self._generasi_semua = 0      # jumlah kosongkan()
+        self._lock = threading.Lock()
+        self.hit = 0
+        self.miss = 0
+        self.eviksi = 0
+
+    def _generasi_tabel(self, tabel):
+        return self._generasi_semua, self._generasi[tabel]
+
+    def ambil(self, tabel, kueri, pemuat, segar=False):
+        """Kembalikan hasil dari cache, atau panggil `pemuat()` lalu simpan hasilnya.
+
+        Dengan `segar=True` entri yang ada diabaikan: `pemuat()` selalu
+        dipanggil dan hasilnya menggantikan entri lama. Jika tabelnya
+        diinvalidasi selama `pemuat()` berjalan, hasilnya tetap dikembalikan
+        tetapi tidak disimpan. Yang dikembalikan selalu salinan, sehingga
+        pemanggil bebas mengubahnya.
+        """
+        kunci = (tabel, kueri)
+        sekarang = self._waktu()
+        with self._lock:
+            entri = self._data.get(kunci)
+            if entri is not None and entri[0] > sekarang and not segar:
+                self._data.move_to_end(kunci)
+                self.hit += 1
+                return copy.deepcopy(entri[1])
+            self.miss += 1
+            generasi = self._generasi_tabel(tabel)
+
+        # Kueri dijalankan di luar lock supaya request lain tidak ikut menunggu
+        data = pemuat()
+        with self._lock:
+            if self._generasi_tabel(tabel) != generasi:
+                return copy.deepcopy(data)
+            self._data[kunci] = (self._waktu() + self.ttl, data)
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.maks_entri:
+                self._data.popitem(last=False)
+                self.eviksi += 1
+        return copy.deepcopy(data)
+
+    def invalidasi(self, *tabel):
+        """Buang semua entri milik tabel yang disebut."""
+        with self._lock:
+            self._generasi.update(tabel)
+            for kunci in [k for k in self._data if k[0] in tabel]:
+                del self._data[kunci]
+
+    def kosongkan(self):
+        with self._lock:
+            self._generasi_semua += 1
+            self._data.clear()
+
+    def statistik(self):
+        with self._lock:
+            total = self.hit + self.miss
+            return {
+                'hit': self.hit,
+                'miss': self.miss,
+                'eviksi': self.eviksi,
+                'entri': len(self._data),
+                'rasio_hit': (self.hit / total) if total else 0.0,
+            }
+
+
+class CacheFragmen:
+    def __init__(self, maks_byte=8 * 1024 * 1024):
+        self.maks_byte = maks_byte
+        self._data = OrderedDict()   # (nama, parameter, versi) -> (html, ukuran)
+        self._terbaru = {}           # (nama, parameter) -> versi entri yang tersimpan
+        self._byte = 0
+        self._lock = threading.Lock()
+        self.hit = 0
+        self.miss = 0
+        self.eviksi = 0
+
+    def ambil(self, nama, parameter, versi):
+        """HTML tersimpan untuk fragmen ini pada versi tersebut, atau None."""
+        with self._lock:
+            entri = self._data.get((nama, parameter, versi))
+            if entri is None:
+                self.miss += 1
+                return None
+            self._data.move_to_end((nama, parameter, versi))
+            self.hit += 1
+            return entri[0]
+
+    def versi_tersimpan(self, nama, parameter):
+        """Versi entri fragmen ini yang sedang disimpan, atau None (tidak dihitung sebagai hit/miss)."""
+        with self._lock:
+            return self._terbaru.get((nama, parameter))
+
+    def simpan(self, nama, parameter, versi, html):
+        ukuran = sys.getsizeof(html)
+        if ukuran > self.maks_byte:
+            return
+        with self._lock:
+            # Versi hanya naik, jadi entri versi lama fragmen yang sama tidak akan dipakai lagi
+            lama = self._terbaru.get((nama, parameter))
+            if lama is not None:
+                self._buang((nama, parameter, lama))
+            self._data[(nama, parameter, versi)] = (html, ukuran)
+            self._terbaru[(nama, parameter)] = versi
+            self._byte += ukuran
+            while self._byte > self.maks_byte:
+                kunci = next(iter(self._data))
+                self._buang(kunci)
+                self._terbaru.pop(kunci[:2], None)
+                self.eviksi += 1
+
+    def _buang(self, kunci):
+        entri = self._data.pop(kunci, None)
+        if entri is not None:
+            self._byte -= entri[1]
+
+    def kosongkan(self):
+        with self._lock:
+            self._data.clear()
+            self._terbaru.clear()
+            self._byte = 0
+
+    def statistik(self):
+        with self._lock:
+            total = self.hit + self.miss
+            return {
+                'hit': self.hit,
+                'miss': self.miss,
+                'eviksi': self.eviksi,
+                'entri': len(self._data),
+                'byte': self._byte,
+                'maks_byte': self.maks_byte,
+                'rasio_hit': (self.hit / total) if total else 0.0,
+            }
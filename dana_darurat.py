@@ -0,0 +1,67 @@
+"""Dana Darurat dan pembagian (waterfall) total saldo.
+
+Total saldo dibagi berurutan:
+  1. Dana aman sampai DANA_AMAN_TARGET.
+  2. Dana Darurat dengan target KELIPATAN_GAJI x gaji; sisa setelah dana aman
+     dialokasikan ke sini sampai target tercapai. Alokasi otomatis tidak
+     pernah mengurangi nilai terkumpul, jadi setoran manual tetap dihitung.
+  3. Sisanya saldo produktif.
+
+`waterfall()` murni: hasilnya hanya bergantung pada gaji, total saldo dan
+baris Dana Darurat, bukan pada berapa kali dashboard dibuka. Tabel tabungan
+hanya ditulis lewat RPC idempoten sinkronkan_dana_darurat
+(sql/007_dana_darurat.sql): oleh `DanaDarurat.sinkronkan()` saat gaji berubah
+dan lewat `flask sinkronkan-dana-darurat`, dan di dalam RPC penulisan atomik
+(sql/010_penulisan_atomik.sql) saat transaksi berubah.
+"""
+NAMA = 'Dana Darurat'
+DANA_AMAN_TARGET = 10000000.0
+KELIPATAN_GAJI = 3
+
+
+def target_dana_darurat(gaji):
+    """Target dari gaji, atau None (target lama dipertahankan) jika gaji belum diatur."""
+    return gaji * KELIPATAN_GAJI if gaji > 0 else None
+
+
+def sisa_setelah_dana_aman(total_saldo, dana_aman_target=DANA_AMAN_TARGET):
+    return total_saldo - min(total_saldo, dana_aman_target)
+
+
+def waterfall(total_saldo, dana_darurat=None, gaji=0.0, dana_aman_target=DANA_AMAN_TARGET):
+    """Bagi total saldo ke dana aman, Dana Darurat dan saldo produktif.
+
+    `dana_darurat` adalah baris tabungan Dana Darurat (atau None). Mengembalikan
+    {'dana_aman_terpenuhi', 'saldo_produktif', 'dana_darurat'}; yang terakhir
+    salinan baris dengan target, terkumpul dan terpenuhi yang sudah
+    memperhitungkan gaji dan alokasi otomatis saat ini.
+    """
+    dana_aman_terpenuhi = min(total_saldo, dana_aman_target)
+    sisa = total_saldo - dana_aman_terpenuhi
+    if dana_darurat is None:
+        return {'dana_aman_terpenuhi': dana_aman_terpenuhi, 'saldo_produktif': sisa, 'dana_darurat': None}
+
+    target = target_dana_darurat(gaji)
+    if target is None:
+        target = float(dana_darurat.get('target') or 0)
+    terkumpul = max(float(dana_darurat.get('terkumpul') or 0), min(target, sisa))
+    return {
+        'dana_aman_terpenuhi': dana_aman_terpenuhi,
+        'saldo_produktif': sisa - min(sisa, terkumpul),
+        'dana_darurat': dict(dana_darurat, target=target, terkumpul=terkumpul, terpenuhi=target > 0 and terkumpul >= target),
+    }
+
+
+class DanaDarurat:
+    def __init__(self, client):
+        self.client = client
+
+    def sinkronkan(self, gaji, total_saldo):
+        """Buat/perbarui baris Dana Darurat sesuai gaji dan total saldo.
+
+        Mengembalikan True jika ada yang ditulis; memanggil ulang dengan nilai
+        yang sama tidak menulis apa pun.
+        """
+        params = {'p_target': target_dana_darurat(gaji), 'p_alokasi': sisa_setelah_dana_aman(total_saldo)}
+        rows = self.client.rpc('sinkronkan_dana_darurat', params).execute().data or []
+        return bool(rows and rows[0]['berubah'])
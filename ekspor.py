@@ -0,0 +1,181 @@
+"""Ekspor laporan transaksi tanpa memuat seluruh ledger ke memori.
+
+Transaksi dibaca per potongan (chunk) memakai kursor keyset dari
+paginasi.py, lalu langsung diubah menjadi keluaran. Pemakaian memori tetap
+konstan berapa pun ukuran ledger-nya.
+
+openpyxl dan fpdf (ekspor_pdf.py) baru diimpor saat ekspor dijalankan,
+supaya tidak memperlambat start aplikasi.
+"""
+import csv
+import io
+from datetime import timedelta
+
+from paginasi import ambil_halaman, hitung_total
+
+UKURAN_CHUNK = 1000
+
+NAMA_BULAN = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli', 'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+
+def iter_transaksi(client, filter_=None, ukuran_chunk=UKURAN_CHUNK):
+    """Generator semua transaksi (tanggal DESC, id DESC), dibaca per chunk."""
+    sesudah = None
+    while True:
+        halaman = ambil_halaman(client, filter_, sesudah=sesudah, per_halaman=ukuran_chunk)
+        yield from halaman['data']
+        sesudah = halaman['kursor_berikutnya']
+        if not sesudah:
+            return
+
+
+def iter_csv(transaksi_iter, baris_per_flush=500):
+    """Ubah iterator dict transaksi menjadi potongan teks CSV.
+
+    Header diambil dari kolom baris pertama (sama seperti DataFrame.to_csv
+    sebelumnya). Teks dikirim setiap `baris_per_flush` baris.
+    """
+    buffer = io.StringIO()
+    writer = None
+    jumlah = 0
+    for baris in transaksi_iter:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(baris.keys()), extrasaction='ignore', lineterminator='\n')
+            writer.writeheader()
+        writer.writerow(baris)
+        jumlah += 1
+        if jumlah % baris_per_flush == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def tulis_csv(transaksi_iter, output):
+    """Tulis CSV ke file biner `output` (UTF-8), potongan demi potongan."""
+    for potongan in iter_csv(transaksi_iter):
+        output.write(potongan.encode('utf-8'))
+
+
+def _angka(nilai):
+    try:
+        return float(nilai)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def tulis_excel(transaksi_iter, output):
+    """Tulis laporan Excel (Ringkasan/Pemasukan/Pengeluaran) dengan workbook write-only.
+
+    Baris langsung ditulis ke worksheet streaming openpyxl tanpa membangun
+    DataFrame, dan total ringkasan dihitung sambil baris lewat. Sheet
+    Ringkasan dibuat pertama (urutan tab tetap) tetapi isinya ditulis paling
+    akhir. Mengembalikan jumlah transaksi yang ditulis; jika nol, workbook
+    hanya berisi sheet Ringkasan kosong.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws_ringkasan = wb.create_sheet('Ringkasan')
+    ws_tipe, total, kolom, jumlah_baris = {}, {'pemasukan': 0.0, 'pengeluaran': 0.0}, None, 0
+    for t in transaksi_iter:
+        if kolom is None:
+            kolom = list(t.keys())
+            ws_tipe = {'pemasukan': wb.create_sheet('Pemasukan'), 'pengeluaran': wb.create_sheet('Pengeluaran')}
+            for ws in ws_tipe.values():
+                ws.append(kolom)
+        jumlah_baris += 1
+        tipe = t.get('tipe')
+        if tipe not in ws_tipe:
+            continue
+        jumlah = _angka(t.get('jumlah'))
+        total[tipe] += jumlah
+        ws_tipe[tipe].append([jumlah if k == 'jumlah' else t.get(k) for k in kolom])
+
+    if jumlah_baris:
+        ws_ringkasan.append(['Deskripsi', 'Jumlah'])
+        ws_ringkasan.append(['Total Pemasukan', total['pemasukan']])
+        ws_ringkasan.append(['Total Pengeluaran', total['pengeluaran']])
+        ws_ringkasan.append(['Sisa Uang', total['pemasukan'] - total['pengeluaran']])
+    wb.save(output)
+    return jumlah_baris
+
+
+def _awal_bulan_berikutnya(tanggal):
+    return (tanggal.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def total_ringkasan(client, filter_):
+    """(total_pemasukan, total_pengeluaran) untuk `filter_` tanpa membaca setiap transaksi.
+
+    Bulan yang tercakup penuh oleh `dari`/`sampai` dijumlahkan dari tabel
+    rekap_bulanan; hanya hari-hari di bulan tepi yang terpotong yang dibaca
+    dari tabel transaksi. Dijumlahkan dalam sen supaya tidak ada selisih float.
+    """
+    filter_ = filter_ or {}
+    dari, sampai = filter_.get('dari'), filter_.get('sampai')
+    # Rentang bulan penuh [awal, akhir): None berarti tanpa batas di sisi itu
+    awal = dari if dari is None or dari.day == 1 else _awal_bulan_berikutnya(dari)
+    akhir = None if sampai is None else (sampai + timedelta(days=1))
+    if akhir is not None and akhir.day != 1:
+        akhir = akhir.replace(day=1)
+
+    sen = {'pemasukan': 0, 'pengeluaran': 0}
+    if awal is not None and akhir is not None and awal >= akhir:
+        tepi = [(dari, sampai)]
+    else:
+        tepi = []
+        if dari is not None and dari != awal:
+            tepi.append((dari, awal - timedelta(days=1)))
+        if sampai is not None and akhir != sampai + timedelta(days=1):
+            tepi.append((akhir, sampai))
+        query = client.table('rekap_bulanan').select('tipe, total')
+        for kolom in ('kategori', 'rekening_id'):
+            if kolom in filter_:
+                query = query.eq(kolom, filter_[kolom])
+        if awal is not None:
+            query = query.gte('periode', f'{awal:%Y-%m}')
+        if akhir is not None:
+            query = query.lt('periode', f'{akhir:%Y-%m}')
+        query = query.order('periode').order('tipe').order('kategori').order('rekening_id')
+        mulai = 0
+        while True:
+            baris = query.range(mulai, mulai + UKURAN_CHUNK - 1).execute().data or []
+            for r in baris:
+                if r.get('tipe') in sen:
+                    sen[r['tipe']] += round(_angka(r.get('total')) * 100)
+            if len(baris) < UKURAN_CHUNK:
+                break
+            mulai += UKURAN_CHUNK
+    for dari_tepi, sampai_tepi in tepi:
+        for t in iter_transaksi(client, {**filter_, 'dari': dari_tepi, 'sampai': sampai_tepi}):
+            if t.get('tipe') in sen:
+                sen[t['tipe']] += round(_angka(t.get('jumlah')) * 100)
+    return sen['pemasukan'] / 100, sen['pengeluaran'] / 100
+
+
+def tulis_pdf_transaksi(client, filter_, output, per_bulan=False, maks_baris=None):
+    """Laporan PDF untuk semua transaksi yang cocok dengan `filter_`.
+
+    Pemasukan dan pengeluaran dibaca sebagai dua aliran terpisah (filter tipe
+    diabaikan). Jika `maks_baris` diisi dan jumlah transaksi melebihinya,
+    hanya halaman ringkasan yang ditulis, dengan total dari total_ringkasan.
+    """
+    from ekspor_pdf import tulis_pdf
+
+    filter_ = {k: v for k, v in (filter_ or {}).items() if k != 'tipe'}
+    total, catatan = None, None
+    if maks_baris is not None:
+        jumlah = hitung_total(client, filter_)
+        if jumlah > maks_baris:
+            total = total_ringkasan(client, filter_)
+            catatan = f'Laporan berisi {jumlah:,} transaksi, melebihi batas {maks_baris:,} baris. Hanya ringkasan yang disertakan; gunakan ekspor CSV atau Excel untuk rincian.'
+    tulis_pdf(
+        iter_transaksi(client, {**filter_, 'tipe': 'pemasukan'}),
+        iter_transaksi(client, {**filter_, 'tipe': 'pengeluaran'}),
+        output,
+        per_bulan=per_bulan,
+        total=total,
+        catatan=catatan,
+    )
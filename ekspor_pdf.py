@@ -0,0 +1,241 @@
+"""Laporan PDF transaksi (fpdf2).
+
+Dipisah dari ekspor.py supaya fpdf hanya diimpor saat laporan PDF benar-benar
+dibuat; modul ini dimuat oleh ekspor.tulis_pdf_transaksi.
+
+tabel_massal menulis operator PDF langsung lewat atribut internal fpdf2
+(_out, current_font, page_break_trigger), karena itu fpdf2 dipin persis di
+requirements.txt.
+"""
+import itertools
+
+from fpdf import FPDF
+from fpdf.util import escape_parens
+
+from ekspor import NAMA_BULAN, _angka
+
+
+class PDF(FPDF):
+    HEADER_TABEL = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori']
+    LEBAR_KOLOM = (25, 105, 30, 25, 25)
+    RATA_KANAN = (False, False, True, False, False)
+    TINGGI_BARIS = 6
+    UKURAN_FONT_TABEL = 9
+
+    def header(self):
+        self.set_font('helvetica', 'B', 12)
+        self.cell(0, 10, 'Laporan Keuangan Pribadi', 0, 1, 'C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('helvetica', 'I', 8)
+        self.cell(0, 10, f'Halaman {self.page_no()}', 0, 0, 'C')
+
+    def chapter_title(self, title):
+        self.set_font('helvetica', 'B', 14)
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(5)
+
+    def section_title(self, title):
+        self.set_font('helvetica', 'B', 11)
+        self.cell(0, 8, title, 0, 1, 'L')
+
+    def _metrik_tabel(self):
+        """Lebar karakter font tabel (satuan halaman), dihitung sekali per dokumen."""
+        if getattr(self, '_metrik', None) is None:
+            self.set_font('helvetica', '', self.UKURAN_FONT_TABEL)
+            skala = self.UKURAN_FONT_TABEL * 0.001 / self.k
+            lebar_karakter = {c: w * skala for c, w in self.current_font.cw.items()}
+            self._metrik = {
+                'font': self.current_font.i,
+                'lebar_karakter': lebar_karakter,
+                'lebar_maks': max(lebar_karakter.values()),
+                'ruang_kolom': [w - 2 * self.c_margin for w in self.LEBAR_KOLOM],
+            }
+        return self._metrik
+
+    def _lebar_teks(self, teks):
+        lebar_karakter = self._metrik['lebar_karakter']
+        return sum(lebar_karakter[c] for c in teks)
+
+    def _potong(self, teks, ruang):
+        """Potong teks agar muat di kolom (cek cepat dulu dengan lebar karakter maksimum)."""
+        if len(teks) * self._metrik['lebar_maks'] <= ruang or self._lebar_teks(teks) <= ruang:
+            return teks
+        ruang -= self._lebar_teks('...')
+        lebar_karakter, total = self._metrik['lebar_karakter'], 0.0
+        for i, c in enumerate(teks):
+            total += lebar_karakter[c]
+            if total > ruang:
+                return teks[:i] + '...'
+        return teks
+
+    def _format_batch(self, batch):
+        """Ubah satu batch baris transaksi menjadi tuple teks siap cetak + total jumlah."""
+        ruang = self._metrik['ruang_kolom']
+        hasil, total = [], 0.0
+        for row in batch:
+            jumlah = _angka(row.get('jumlah', 0.0))
+            total += jumlah
+            kolom = (
+                str(row.get('tanggal', '') or '')[:10],
+                str(row.get('deskripsi', '') or ''),
+                "Rp {:,.2f}".format(jumlah),
+                str(row.get('tipe', '') or ''),
+                str(row.get('kategori', '') or ''),
+            )
+            # Font inti PDF hanya mendukung latin-1
+            kolom = [k.encode('latin-1', 'replace').decode('latin-1') for k in kolom]
+            hasil.append([self._potong(k, ruang[i]) for i, k in enumerate(kolom)])
+        return hasil, total
+
+    def _header_tabel(self):
+        self.set_fill_color(230, 230, 230)
+        self.set_text_color(0)
+        self.set_draw_color(128)
+        self.set_line_width(0.3)
+        self.set_font('helvetica', 'B', self.UKURAN_FONT_TABEL)
+        for i, h in enumerate(self.HEADER_TABEL):
+            self.cell(self.LEBAR_KOLOM[i], 7, h, 1, 0, 'C', 1)
+        self.ln()
+
+    def _kapasitas(self):
+        return int((self.page_break_trigger - self.y) // self.TINGGI_BARIS)
+
+    def _gambar_blok(self, rows, isi_awal):
+        """Gambar sekumpulan baris di halaman saat ini dengan operator PDF mentah.
+
+        Satu blok q...Q per halaman: semua latar belang, lalu semua teks dalam
+        satu BT...ET, lalu garis kolom vertikal sekali untuk seluruh blok.
+        """
+        k, h_hal, tinggi = self.k, self.h, self.TINGGI_BARIS
+        m = self._metrik
+        x0, y0 = self.l_margin, self.y
+        lebar_total = sum(self.LEBAR_KOLOM)
+        batas_kolom = list(itertools.accumulate(self.LEBAR_KOLOM, initial=x0))
+        # Posisi baseline teks relatif terhadap atas baris (sama seperti cell())
+        turun = 0.5 * tinggi + 0.3 * self.UKURAN_FONT_TABEL / k
+
+        ops = ['q', f'{0.3 * k:.2f} w 0.502 G 0.902 g']
+        isi = isi_awal
+        for n in range(len(rows)):
+            if isi:
+                y = y0 + n * tinggi
+                ops.append(f'{x0 * k:.2f} {(h_hal - y) * k:.2f} {lebar_total * k:.2f} {-tinggi * k:.2f} re f')
+            isi = not isi
+        ops.append(f'0 g BT /F{m["font"]} {self.UKURAN_FONT_TABEL:.2f} Tf')
+        for n, kolom in enumerate(rows):
+            y_teks = (h_hal - (y0 + n * tinggi) - turun) * k
+            for i, teks in enumerate(kolom):
+                if not teks:
+                    continue
+                if self.RATA_KANAN[i]:
+                    x = batas_kolom[i + 1] - self.c_margin - self._lebar_teks(teks)
+                else:
+                    x = batas_kolom[i] + self.c_margin
+                ops.append(f'1 0 0 1 {x * k:.2f} {y_teks:.2f} Tm ({escape_parens(teks)}) Tj')
+        ops.append('ET')
+        y_atas, y_bawah = (h_hal - y0) * k, (h_hal - y0 - len(rows) * tinggi) * k
+        for x in batas_kolom:
+            ops.append(f'{x * k:.2f} {y_atas:.2f} m {x * k:.2f} {y_bawah:.2f} l S')
+        ops.append(f'{x0 * k:.2f} {y_bawah:.2f} m {(x0 + lebar_total) * k:.2f} {y_bawah:.2f} l S')
+        ops.append('Q')
+        self._out('\n'.join(ops))
+        self.set_y(y0 + len(rows) * tinggi)
+        return isi
+
+    def tabel_massal(self, baris_iter, ukuran_batch=500):
+        """Render tabel transaksi besar dengan cepat; mengembalikan (jumlah_baris, total).
+
+        Baris diformat per batch, metrik font dihitung sekali, dan halaman
+        dipecah secara eksplisit (header tabel diulang di setiap halaman).
+        """
+        self._metrik_tabel()
+        if self._kapasitas() < 3:
+            self.add_page()
+        self._header_tabel()
+        jumlah_baris, total, isi = 0, 0.0, False
+        baris_iter = iter(baris_iter)
+        while True:
+            batch = list(itertools.islice(baris_iter, ukuran_batch))
+            if not batch:
+                break
+            rows, subtotal = self._format_batch(batch)
+            jumlah_baris += len(rows)
+            total += subtotal
+            while rows:
+                kapasitas = self._kapasitas()
+                if kapasitas < 1:
+                    self.add_page()
+                    self._header_tabel()
+                    kapasitas = self._kapasitas()
+                isi = self._gambar_blok(rows[:kapasitas], isi)
+                rows = rows[kapasitas:]
+        self.ln(2)
+        return jumlah_baris, total
+
+    def tabel_per_bulan(self, baris_iter, ukuran_batch=500):
+        """Seperti tabel_massal, tetapi dipisah per bulan dengan subtotal masing-masing."""
+        jumlah_baris, total = 0, 0.0
+        for periode, baris_bulan in itertools.groupby(baris_iter, key=lambda t: str(t.get('tanggal') or '')[:7]):
+            if self._kapasitas() < 5:
+                self.add_page()
+            try:
+                judul = f"{NAMA_BULAN[int(periode[5:7]) - 1]} {periode[:4]}"
+            except (ValueError, IndexError):
+                judul = periode or 'Tanpa tanggal'
+            self.section_title(judul)
+            n, subtotal = self.tabel_massal(baris_bulan, ukuran_batch)
+            jumlah_baris += n
+            total += subtotal
+            self.set_font('helvetica', 'B', self.UKURAN_FONT_TABEL)
+            self.cell(sum(self.LEBAR_KOLOM[:2]), 6, f'Subtotal {judul} ({n} transaksi)', 0, 0, 'R')
+            self.cell(self.LEBAR_KOLOM[2], 6, "Rp {:,.2f}".format(subtotal), 0, 1, 'R')
+            self.ln(3)
+        return jumlah_baris, total
+
+    def summary_section(self, total_pemasukan, total_pengeluaran, sisa_uang, catatan=None):
+        self.add_page()
+        self.chapter_title('Ringkasan Keuangan')
+        if catatan:
+            self.set_font('helvetica', 'I', 10)
+            self.multi_cell(0, 6, catatan)
+            self.ln(3)
+        self.set_font('helvetica', '', 12)
+        self.cell(50, 10, 'Total Pemasukan:', 0, 0)
+        self.set_font('', 'B')
+        self.cell(0, 10, "Rp {:,.2f}".format(total_pemasukan), 0, 1)
+        self.set_font('')
+        self.cell(50, 10, 'Total Pengeluaran:', 0, 0)
+        self.set_font('', 'B')
+        self.cell(0, 10, "Rp {:,.2f}".format(total_pengeluaran), 0, 1)
+        self.set_font('')
+        self.line(self.get_x(), self.get_y(), self.get_x() + 100, self.get_y())
+        self.ln(5)
+        self.cell(50, 10, 'Sisa Uang:', 0, 0)
+        self.set_font('helvetica', 'B', 14)
+        self.cell(0, 10, "Rp {:,.2f}".format(sisa_uang), 0, 1)
+
+
+def tulis_pdf(iter_pemasukan, iter_pengeluaran, output, per_bulan=False, total=None, catatan=None):
+    """Tulis laporan PDF (Pemasukan, Pengeluaran, Ringkasan) ke file `output`.
+
+    Jika `total` berisi (total_pemasukan, total_pengeluaran) yang sudah
+    dihitung, hanya halaman ringkasan yang ditulis dan kedua iterator tidak
+    dibaca; dipakai saat jumlah transaksi melewati batas ukuran laporan.
+    """
+    pdf = PDF('L', 'mm', 'A4')
+    if total is not None:
+        total_pemasukan, total_pengeluaran = total
+    else:
+        render = pdf.tabel_per_bulan if per_bulan else pdf.tabel_massal
+        pdf.add_page()
+        pdf.chapter_title('Laporan Pemasukan')
+        _, total_pemasukan = render(iter_pemasukan)
+        pdf.add_page()
+        pdf.chapter_title('Laporan Pengeluaran')
+        _, total_pengeluaran = render(iter_pengeluaran)
+    pdf.summary_section(total_pemasukan, total_pengeluaran, total_pemasukan - total_pengeluaran, catatan)
+    # Tulis langsung ke file agar dokumen tidak disalin lagi ke string/bytes baru
+    pdf.output(output)
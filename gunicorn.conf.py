@@ -0,0 +1,9 @@
+# Dibaca otomatis oleh `gunicorn app:app` dari direktori kerja.
+# Opsi lain (workers, bind, timeout) tetap diatur lewat argumen/env seperti biasa.
+
+
+def post_worker_init(worker):
+    # Worker gunicorn hidup lama: bayar impor modul berat dan koneksi Supabase
+    # sekarang, bukan di request pertama pengguna (lihat app.hangatkan).
+    from app import hangatkan
+    worker.log.info("Worker %s siap dalam %.0f ms", worker.pid, hangatkan() * 1000)
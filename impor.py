@@ -0,0 +1,213 @@
+"""Impor transaksi massal dari CSV/XLSX (mis. mutasi rekening bank).
+
+Berkas dibaca baris demi baris (csv.DictReader / openpyxl read-only), setiap
+baris divalidasi terhadap daftar kategori dan id rekening yang ada, lalu
+disimpan per batch lewat penulisan.PenulisSupabase.impor: satu RPC per
+batch, dan setiap batch adalah satu transaksi database. Transaksi, catatan
+utang/piutang yang dibuat atau dibayar (beserta tautan
+transaksi_utang_piutang, sehingga hapus transaksi membatalkan efeknya) dan
+data turunan tersimpan bersama, atau batch itu ditolak seluruhnya.
+
+Hasilnya berupa laporan dengan satu entri galat per baris yang ditolak.
+"""
+import csv
+import io
+import itertools
+import math
+import time
+from datetime import datetime
+
+from pelunasan import TOLERANSI
+
+KOLOM_WAJIB = ('tanggal', 'jumlah', 'tipe', 'kategori', 'rekening_id')
+KOLOM_OPSIONAL = ('deskripsi', 'pihak_terkait')
+UKURAN_BATCH = 500
+
+# Kategori yang membuat catatan utang/piutang baru, dan yang melunasinya
+KATEGORI_UTANG_BARU = {'Pemberian Piutang': 'Piutang', 'Penerimaan Utang': 'Utang'}
+KATEGORI_PELUNASAN = {'Penerimaan Piutang': 'Piutang', 'Pembayaran Utang': 'Utang'}
+
+
+def _nama_kolom(nilai):
+    return str(nilai or '').strip().lower().replace(' ', '_')
+
+
+def baca_csv(berkas_teks):
+    """Iterator (nomor_baris, dict) dari file teks CSV; nomor baris header = 1."""
+    reader = csv.reader(berkas_teks)
+    header = [_nama_kolom(h) for h in next(reader, [])]
+    for nomor, nilai in enumerate(reader, start=2):
+        if any(v.strip() for v in nilai):
+            yield nomor, dict(zip(header, nilai))
+
+
+def baca_xlsx(berkas_biner):
+    """Iterator (nomor_baris, dict) dari sheet pertama sebuah workbook."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(berkas_biner, read_only=True, data_only=True)
+    try:
+        baris = wb.worksheets[0].iter_rows(values_only=True)
+        header = [_nama_kolom(h) for h in next(baris, ())]
+        for nomor, nilai in enumerate(baris, start=2):
+            if any(v not in (None, '') for v in nilai):
+                yield nomor, dict(zip(header, nilai))
+    finally:
+        wb.close()
+
+
+def baca_berkas(berkas, nama_file):
+    """Pilih pembaca berdasarkan ekstensi; `berkas` adalah file biner."""
+    nama = (nama_file or '').lower()
+    if nama.endswith('.xlsx'):
+        return baca_xlsx(berkas)
+    if nama.endswith('.csv'):
+        return baca_csv(io.TextIOWrapper(berkas, encoding='utf-8-sig', newline=''))
+    raise ValueError('Format berkas harus .csv atau .xlsx')
+
+
+def periksa_header(baris_iter):
+    """Pastikan kolom wajib ada sebelum impor dimulai (menghabiskan satu baris lalu mengembalikannya)."""
+    pertama = next(baris_iter, None)
+    if pertama is None:
+        return iter(())
+    kurang = [k for k in KOLOM_WAJIB if k not in pertama[1]]
+    if kurang:
+        raise ValueError(f"Kolom wajib tidak ada: {', '.join(kurang)}")
+    return itertools.chain([pertama], baris_iter)
+
+
+def _teks(nilai):
+    return '' if nilai is None else str(nilai).strip()
+
+
+def validasi_baris(baris, kategori_per_tipe, rekening_ids):
+    """Ubah satu baris mentah menjadi (transaksi, pihak_terkait).
+
+    Melempar ValueError berisi pesan untuk laporan jika baris tidak valid.
+    """
+    tipe = _teks(baris.get('tipe')).lower()
+    if tipe not in kategori_per_tipe:
+        raise ValueError(f"tipe '{_teks(baris.get('tipe'))}' harus salah satu dari {', '.join(kategori_per_tipe)}")
+    kategori = _teks(baris.get('kategori'))
+    if kategori not in kategori_per_tipe[tipe]:
+        raise ValueError(f"kategori '{kategori}' tidak dikenal untuk {tipe}")
+
+    jumlah = baris.get('jumlah')
+    try:
+        jumlah = float(jumlah if isinstance(jumlah, (int, float)) else _teks(jumlah).replace(' ', ''))
+    except ValueError:
+        raise ValueError(f"jumlah '{_teks(baris.get('jumlah'))}' bukan angka") from None
+    if not math.isfinite(jumlah):
+        raise ValueError(f"jumlah '{_teks(baris.get('jumlah'))}' bukan angka")
+    if not jumlah > 0:
+        raise ValueError('jumlah harus lebih dari 0')
+
+    try:
+        rekening_id = int(baris.get('rekening_id'))
+    except (TypeError, ValueError):
+        raise ValueError(f"rekening_id '{_teks(baris.get('rekening_id'))}' bukan angka") from None
+    if rekening_id not in rekening_ids:
+        raise ValueError(f'rekening_id {rekening_id} tidak ditemukan')
+
+    tanggal = baris.get('tanggal')
+    if not isinstance(tanggal, datetime):
+        try:
+            tanggal = datetime.fromisoformat(_teks(tanggal))
+        except ValueError:
+            raise ValueError(f"tanggal '{_teks(baris.get('tanggal'))}' harus berformat YYYY-MM-DD") from None
+
+    transaksi = {
+        'deskripsi': _teks(baris.get('deskripsi')), 'jumlah': jumlah, 'tipe': tipe, 'kategori': kategori,
+        'tanggal': tanggal.isoformat(), 'rekening_id': rekening_id,
+    }
+    return transaksi, _teks(baris.get('pihak_terkait'))
+
+
+def elemen_impor(transaksi, pihak_terkait):
+    """Elemen untuk PenulisSupabase.impor; mengembalikan (elemen, peringatan atau None).
+
+    Kategori 'Pemberian Piutang' / 'Penerimaan Utang' membuat catatan baru;
+    'Penerimaan Piutang' / 'Pembayaran Utang' dialokasikan FIFO ke catatan
+    aktif pihak yang sama, termasuk catatan yang dibuat baris sebelumnya.
+    """
+    elemen = {'transaksi': transaksi}
+    kategori = transaksi['kategori']
+    if kategori in KATEGORI_UTANG_BARU:
+        if not pihak_terkait:
+            return elemen, 'catatan utang/piutang tidak dibuat karena pihak_terkait kosong'
+        tipe_up = KATEGORI_UTANG_BARU[kategori]
+        elemen['utang_baru'] = {
+            'tipe': tipe_up, 'pihak_terkait': pihak_terkait,
+            'deskripsi': transaksi['deskripsi'] or (f"Piutang kepada {pihak_terkait}" if tipe_up == 'Piutang' else f"Utang dari {pihak_terkait}"),
+        }
+    elif kategori in KATEGORI_PELUNASAN:
+        if not pihak_terkait:
+            return elemen, 'tidak ada utang/piutang yang diperbarui karena pihak_terkait kosong'
+        elemen['pelunasan'] = {'tipe': KATEGORI_PELUNASAN[kategori], 'pihak_terkait': pihak_terkait}
+    return elemen, None
+
+
+def impor_transaksi(penulis, baris_iter, kategori_per_tipe, rekening_ids, ukuran_batch=UKURAN_BATCH, setelah_simpan=None, hanya_validasi=False):
+    """Validasi dan simpan transaksi dari iterator (nomor_baris, dict).
+
+    `penulis` adalah penulisan.PenulisSupabase (atau PenulisSQLite).
+    `setelah_simpan(hasil)` dipanggil dengan hasil setiap batch yang
+    tersimpan (untuk cache proses dan peringatan anggaran). Dengan
+    `hanya_validasi=True` tidak ada yang ditulis. Mengembalikan laporan
+    {'berhasil', 'gagal', 'peringatan', 'galat', 'utang_piutang_dibuat',
+    'utang_piutang_diperbarui', 'durasi'}.
+    """
+    mulai = time.perf_counter()
+    rekening_ids = set(rekening_ids)
+    laporan = {'berhasil': 0, 'gagal': 0, 'peringatan': [], 'galat': [], 'utang_piutang_dibuat': 0, 'utang_piutang_diperbarui': 0}
+
+    baris_iter = iter(baris_iter)
+    while True:
+        batch, peringatan, dibaca = [], [], 0
+        for nomor, baris in itertools.islice(baris_iter, ukuran_batch):
+            dibaca += 1
+            try:
+                transaksi, pihak = validasi_baris(baris, kategori_per_tipe, rekening_ids)
+            except ValueError as e:
+                laporan['galat'].append({'baris': nomor, 'pesan': str(e)})
+                laporan['gagal'] += 1
+                continue
+            elemen, pesan = elemen_impor(transaksi, pihak)
+            if pesan:
+                peringatan.append({'baris': nomor, 'pesan': pesan})
+            batch.append((nomor, elemen))
+        if not dibaca:
+            break
+        if not batch:
+            continue
+
+        if hanya_validasi:
+            laporan['berhasil'] += len(batch)
+            laporan['peringatan'].extend(peringatan)
+            continue
+        try:
+            hasil = penulis.impor([elemen for _, elemen in batch])
+        except Exception as e:
+            # Satu transaksi database per batch: tidak ada baris batch ini yang tersimpan
+            for nomor, _ in batch:
+                laporan['galat'].append({'baris': nomor, 'pesan': f'gagal disimpan: {e}'})
+            laporan['gagal'] += len(batch)
+            continue
+        laporan['berhasil'] += len(batch)
+        laporan['utang_piutang_dibuat'] += len(hasil['utang_piutang'])
+        laporan['utang_piutang_diperbarui'] += len({a['id'] for h in hasil['hasil'] for a in h['alokasi']})
+        for (nomor, elemen), h in zip(batch, hasil['hasil']):
+            if 'pelunasan' not in elemen:
+                continue
+            pihak = elemen['pelunasan']['pihak_terkait']
+            if not h['alokasi']:
+                peringatan.append({'baris': nomor, 'pesan': f'tidak ditemukan utang/piutang aktif untuk {pihak}'})
+            elif h['sisa'] > TOLERANSI:
+                peringatan.append({'baris': nomor, 'pesan': f"kelebihan pembayaran Rp {h['sisa']:,.2f} untuk {pihak} tidak teralokasi"})
+        laporan['peringatan'].extend(sorted(peringatan, key=lambda p: p['baris']))
+        if setelah_simpan is not None:
+            setelah_simpan(hasil)
+
+    laporan['durasi'] = time.perf_counter() - mulai
+    return laporan
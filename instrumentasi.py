@@ -0,0 +1,380 @@
+"""Instrumentasi ringan: waktu kueri Supabase, fase rute, dan profiler sampling.
+
+  - Metrik            : penghitung dan histogram di memori proses, ditampilkan
+                        dalam format teks Prometheus (rute /metrics).
+  - KlienTerinstrumentasi : pembungkus klien Supabase; setiap execute() dicatat
+                        per (tabel, operasi): latensi, jumlah baris, byte
+                        diterima/dikirim, dan galat.
+  - fase(nama)        : timer fase di dalam handler rute (kueri, hitung,
+                        render, ...).
+  - pasang_flask()    : mencatat durasi setiap request dan menambahkan header
+                        Server-Timing (db, fase, total).
+  - ProfilerSampling  : opsional; mengambil sampel stack thread request setiap
+                        beberapa milidetik dan menulisnya dalam format
+                        "folded" (bisa dibuka dengan speedscope/flamegraph.pl).
+
+Catatan per request disimpan di contextvar. Kueri yang dijalankan lewat
+kueri_paralel.PelaksanaKueri ikut tercatat karena pelaksana menyalin context
+ke thread pool-nya.
+
+Biayanya beberapa mikrodetik per kueri (satu lock dan beberapa penjumlahan),
+jadi aman dibiarkan aktif di produksi. Profiler hanya berjalan untuk
+sebagian request sesuai `rasio`, default 0 (mati).
+"""
+import bisect
+import contextlib
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+BATAS_HISTOGRAM = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPERASI_KUERI = frozenset({'select', 'insert', 'update', 'upsert', 'delete'})
+
+_catatan_request = contextvars.ContextVar('catatan_request', default=None)
+_byte_kueri = contextvars.ContextVar('byte_kueri', default=None)
+
+
+def _label(label):
+    if not label:
+        return ''
+    isi = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in label)
+    return '{' + isi + '}'
+
+
+def _angka(nilai):
+    return repr(float(nilai)) if nilai != int(nilai) else str(int(nilai))
+
+
+class Metrik:
+    """Registri metrik sederhana yang thread-safe (penghitung, histogram, gauge)."""
+
+    def __init__(self, awalan='nadifah', batas=BATAS_HISTOGRAM):
+        self.awalan = awalan
+        self.batas = tuple(batas)
+        self._lock = threading.Lock()
+        self._jenis = {}       # nama -> (tipe, keterangan)
+        self._penghitung = {}  # (nama, label) -> nilai
+        self._histogram = {}   # (nama, label) -> [jumlah per ember..., +Inf, total, banyak]
+        self._gauge = []       # (nama, keterangan, fungsi -> [(dict label, nilai)])
+
+    def daftar(self, nama, tipe, keterangan):
+        self._jenis[nama] = (tipe, keterangan)
+
+    def tambah(self, nama, nilai=1, **label):
+        kunci = (nama, tuple(sorted(label.items())))
+        with self._lock:
+            self._penghitung[kunci] = self._penghitung.get(kunci, 0) + nilai
+
+    def amati(self, nama, nilai, **label):
+        kunci = (nama, tuple(sorted(label.items())))
+        indeks = bisect.bisect_left(self.batas, nilai)
+        with self._lock:
+            ember = self._histogram.get(kunci)
+            if ember is None:
+                ember = self._histogram[kunci] = [0] * (len(self.batas) + 1) + [0.0, 0]
+            ember[indeks] += 1
+            ember[-2] += nilai
+            ember[-1] += 1
+
+    def gauge(self, nama, keterangan, fungsi):
+        """Gauge yang nilainya dibaca saat /metrics diminta; `fungsi()` -> [(dict label, nilai)]."""
+        self._gauge.append((nama, keterangan, fungsi))
+
+    def kosongkan(self):
+        with self._lock:
+            self._penghitung.clear()
+            self._histogram.clear()
+
+    def prometheus(self):
+        """Semua metrik dalam format teks eksposisi Prometheus 0.0.4."""
+        with self._lock:
+            penghitung = dict(self._penghitung)
+            histogram = {k: list(v) for k, v in self._histogram.items()}
+
+        baris = []
+        per_nama = {}
+        for (nama, label), nilai in penghitung.items():
+            per_nama.setdefault(nama, []).append((label, nilai))
+        for (nama, label), ember in histogram.items():
+            per_nama.setdefault(nama, []).append((label, ember))
+
+        for nama in sorted(per_nama):
+            tipe, keterangan = self._jenis.get(nama, ('untyped', ''))
+            penuh = f'{self.awalan}_{nama}'
+            baris.append(f'# HELP {penuh} {keterangan}')
+            baris.append(f'# TYPE {penuh} {tipe}')
+            for label, nilai in sorted(per_nama[nama]):
+                if tipe != 'histogram':
+                    baris.append(f'{penuh}{_label(label)} {_angka(nilai)}')
+                    continue
+                kumulatif = 0
+                for batas, jumlah in zip(self.batas + ('+Inf',), nilai[:-2]):
+                    kumulatif += jumlah
+                    le = batas if batas == '+Inf' else _angka(batas)
+                    baris.append(f'{penuh}_bucket{_label(label + (("le", le),))} {kumulatif}')
+                baris.append(f'{penuh}_sum{_label(label)} {_angka(nilai[-2])}')
+                baris.append(f'{penuh}_count{_label(label)} {nilai[-1]}')
+
+        for nama, keterangan, fungsi in self._gauge:
+            penuh = f'{self.awalan}_{nama}'
+            try:
+                nilai_gauge = fungsi()
+            except Exception as e:
+                print(f"Error reading gauge {nama}: {e}")
+                continue
+            baris.append(f'# HELP {penuh} {keterangan}')
+            baris.append(f'# TYPE {penuh} gauge')
+            for label, nilai in nilai_gauge:
+                baris.append(f'{penuh}{_label(tuple(sorted(label.items())))} {_angka(nilai)}')
+        return '\n'.join(baris) + '\n'
+
+
+def metrik_bawaan():
+    """Metrik dengan nama dan keterangan yang dipakai modul ini."""
+    metrik = Metrik()
+    metrik.daftar('kueri_detik', 'histogram', 'Latensi execute() Supabase per tabel dan operasi.')
+    metrik.daftar('kueri_baris_total', 'counter', 'Jumlah baris yang dikembalikan kueri Supabase.')
+    metrik.daftar('kueri_byte_diterima_total', 'counter', 'Byte respons dari Supabase.')
+    metrik.daftar('kueri_byte_dikirim_total', 'counter', 'Byte body request ke Supabase.')
+    metrik.daftar('kueri_galat_total', 'counter', 'Kueri Supabase yang melempar exception.')
+    metrik.daftar('request_detik', 'histogram', 'Durasi request per endpoint, metode dan status.')
+    metrik.daftar('fase_detik', 'histogram', 'Durasi fase di dalam handler rute.')
+    metrik.daftar('profil_total', 'counter', 'Request yang diprofil oleh profiler sampling.')
+    return metrik
+
+
+class CatatanRequest:
+    """Waktu yang terkumpul selama satu request (bisa diisi dari beberapa thread)."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.mulai = time.perf_counter()
+        self.fase = []
+        self.db_detik = 0.0
+        self.db_kueri = 0
+        self.profil = None
+        self._lock = threading.Lock()
+
+    def catat_kueri(self, durasi):
+        with self._lock:
+            self.db_detik += durasi
+            self.db_kueri += 1
+
+    def catat_fase(self, nama, durasi):
+        with self._lock:
+            self.fase.append((nama, durasi))
+
+    def server_timing(self):
+        """Nilai header Server-Timing; 'db' adalah jumlah waktu kueri (bisa melebihi total jika paralel)."""
+        total = time.perf_counter() - self.mulai
+        with self._lock:
+            bagian = [f'db;dur={self.db_detik * 1000:.1f};desc="{self.db_kueri} kueri"']
+            bagian += [f'{nama};dur={durasi * 1000:.1f}' for nama, durasi in self.fase]
+        if self.profil:
+            bagian.append(f'profil;desc="{os.path.basename(self.profil)}"')
+        bagian.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(bagian)
+
+
+def catatan_aktif():
+    return _catatan_request.get()
+
+
+@contextlib.contextmanager
+def fase(nama, metrik=None):
+    """Ukur satu fase handler; tercatat di Server-Timing dan histogram fase_detik."""
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        durasi = time.perf_counter() - mulai
+        catatan = _catatan_request.get()
+        if catatan is not None:
+            catatan.catat_fase(nama, durasi)
+            if metrik is not None:
+                metrik.amati('fase_detik', durasi, endpoint=catatan.endpoint, fase=nama)
+
+
+def _hitung_byte(response):
+    """Event hook httpx: tambahkan ukuran request/respons ke kueri yang sedang berjalan."""
+    wadah = _byte_kueri.get()
+    if wadah is None:
+        return
+    # Body tetap dibaca oleh postgrest; membacanya di sini tidak menambah I/O
+    response.read()
+    wadah[0] += len(response.content)
+    try:
+        wadah[1] += len(response.request.content)
+    except Exception:
+        pass
+
+
+class _KueriTerukur:
+    """Pembungkus builder postgrest; execute() diukur, metode lain diteruskan."""
+    __slots__ = ('_builder', '_tabel', '_operasi', '_metrik')
+
+    def __init__(self, builder, tabel, operasi, metrik):
+        self._builder = builder
+        self._tabel = tabel
+        self._operasi = operasi
+        self._metrik = metrik
+
+    def __getattr__(self, nama):
+        atribut = getattr(self._builder, nama)
+        if not callable(atribut):
+            # mis. properti `.not_` yang mengembalikan builder
+            return _KueriTerukur(atribut, self._tabel, self._operasi, self._metrik) if hasattr(atribut, 'execute') else atribut
+        operasi = nama if nama in OPERASI_KUERI else self._operasi
+
+        def panggil(*args, **kwargs):
+            hasil = atribut(*args, **kwargs)
+            return _KueriTerukur(hasil, self._tabel, operasi, self._metrik) if hasattr(hasil, 'execute') else hasil
+        return panggil
+
+    def execute(self):
+        label = {'tabel': self._tabel, 'operasi': self._operasi}
+        wadah = [0, 0]
+        token = _byte_kueri.set(wadah)
+        mulai = time.perf_counter()
+        try:
+            response = self._builder.execute()
+        except Exception:
+            self._metrik.tambah('kueri_galat_total', **label)
+            raise
+        finally:
+            durasi = time.perf_counter() - mulai
+            _byte_kueri.reset(token)
+            self._metrik.amati('kueri_detik', durasi, **label)
+            if wadah[0]:
+                self._metrik.tambah('kueri_byte_diterima_total', wadah[0], **label)
+            if wadah[1]:
+                self._metrik.tambah('kueri_byte_dikirim_total', wadah[1], **label)
+            catatan = _catatan_request.get()
+            if catatan is not None:
+                catatan.catat_kueri(durasi)
+        data = getattr(response, 'data', None)
+        self._metrik.tambah('kueri_baris_total', len(data) if isinstance(data, list) else int(data is not None), **label)
+        return response
+
+
+class KlienTerinstrumentasi:
+    """Klien Supabase yang mencatat setiap kueri `table()` dan `rpc()` ke `metrik`.
+
+    Atribut lain (auth, storage, ...) diteruskan apa adanya ke klien asli.
+    """
+
+    def __init__(self, client, metrik):
+        self.client = client
+        self.metrik = metrik
+        self._session_terpasang = None
+
+    def _pasang_hook(self):
+        # Klien postgrest dibuat ulang oleh supabase saat token berganti, jadi dicek setiap kali
+        session = getattr(getattr(self.client, 'postgrest', None), 'session', None)
+        if session is None or session is self._session_terpasang:
+            return
+        hook = session.event_hooks
+        if _hitung_byte not in hook['response']:
+            hook['response'] = [*hook['response'], _hitung_byte]
+            session.event_hooks = hook
+        self._session_terpasang = session
+
+    def table(self, nama):
+        self._pasang_hook()
+        return _KueriTerukur(self.client.table(nama), nama, 'select', self.metrik)
+
+    def rpc(self, nama, params=None, *args, **kwargs):
+        self._pasang_hook()
+        return _KueriTerukur(self.client.rpc(nama, params if params is not None else {}, *args, **kwargs), nama, 'rpc', self.metrik)
+
+    def __getattr__(self, nama):
+        return getattr(self.client, nama)
+
+
+class ProfilerSampling:
+    """Ambil sampel stack satu thread setiap `interval` detik sampai dihentikan."""
+
+    def __init__(self, interval=0.005, kedalaman=64):
+        self.interval = interval
+        self.kedalaman = kedalaman
+        self.sampel = Counter()
+        self._berhenti = threading.Event()
+        self._thread = None
+
+    def mulai(self, thread_id=None):
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._thread = threading.Thread(target=self._loop, args=(target,), name='profiler-sampling', daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self, target):
+        while not self._berhenti.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break
+            tumpukan = []
+            while frame is not None and len(tumpukan) < self.kedalaman:
+                kode = frame.f_code
+                tumpukan.append(f"{os.path.basename(kode.co_filename)}:{kode.co_name}")
+                frame = frame.f_back
+            self.sampel[';'.join(reversed(tumpukan))] += 1
+
+    def berhenti(self):
+        self._berhenti.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.sampel
+
+    def tulis(self, path):
+        """Tulis sampel dalam format folded: 'a;b;c jumlah' per baris."""
+        with open(path, 'w') as f:
+            for tumpukan, jumlah in self.sampel.most_common():
+                f.write(f'{tumpukan} {jumlah}\n')
+
+
+def pasang_flask(app, metrik, rasio_profil=0.0, interval_profil=0.005, direktori_profil=None):
+    """Catat durasi setiap request, tambahkan Server-Timing, dan jalankan profiler untuk sebagian request."""
+    from flask import g, request
+
+    if rasio_profil > 0 and direktori_profil:
+        os.makedirs(direktori_profil, exist_ok=True)
+
+    @app.before_request
+    def _mulai_catatan():
+        catatan = CatatanRequest(request.endpoint or 'tidak_dikenal')
+        g._token_catatan = _catatan_request.set(catatan)
+        if rasio_profil > 0 and direktori_profil and random.random() < rasio_profil:
+            g._profiler = ProfilerSampling(interval_profil).mulai()
+
+    @app.after_request
+    def _selesai_catatan(response):
+        catatan = _catatan_request.get()
+        if catatan is None:
+            return response
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.berhenti()
+            path = os.path.join(direktori_profil, f"{time.strftime('%Y%m%d-%H%M%S')}-{catatan.endpoint}-{os.getpid()}.folded")
+            try:
+                profiler.tulis(path)
+                catatan.profil = path
+                metrik.tambah('profil_total', endpoint=catatan.endpoint)
+            except OSError as e:
+                print(f"Error writing profile: {e}")
+        response.headers['Server-Timing'] = catatan.server_timing()
+        metrik.amati('request_detik', time.perf_counter() - catatan.mulai,
+                     endpoint=catatan.endpoint, metode=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _lepas_catatan(exc):
+        token = g.pop('_token_catatan', None)
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.berhenti()
+        if token is not None:
+            _catatan_request.reset(token)
@@ -0,0 +1,90 @@
+"""Klien Supabase yang dibuat saat pertama kali dipakai.
+
+Mengimpor paket `supabase` (gotrue, postgrest, storage, realtime, httpx)
+memakan ratusan milidetik. Dengan `KlienMalas` biaya itu tidak dibayar saat
+modul app diimpor, melainkan pada kueri pertama; untuk worker yang hidup
+lama, app.hangatkan() memicunya sebelum request pertama datang.
+
+Dengan `KonfigurasiPool` kueri PostgREST klien tersebut berjalan lewat pool
+koneksi terbatas dengan keep-alive, timeout dan retry baca (pool_http.py).
+"""
+import os
+import threading
+from collections import namedtuple
+
+_KOLOM_POOL = {
+    # nama: (variabel lingkungan, tipe, bawaan)
+    'maks_koneksi': ('SUPABASE_POOL_MAKS', int, 20),
+    'maks_idle': ('SUPABASE_POOL_IDLE', int, 10),
+    'keepalive': ('SUPABASE_KEEPALIVE_DETIK', float, 20.0),
+    'timeout_koneksi': ('SUPABASE_TIMEOUT_KONEKSI', float, 5.0),
+    'timeout_baca': ('SUPABASE_TIMEOUT_BACA', float, 30.0),
+    'timeout_pool': ('SUPABASE_TIMEOUT_POOL', float, 10.0),
+    'retry': ('SUPABASE_RETRY', int, 2),
+    'jeda_awal': ('SUPABASE_RETRY_JEDA', float, 0.1),
+    'jeda_maks': ('SUPABASE_RETRY_JEDA_MAKS', float, 2.0),
+    'http2': ('SUPABASE_HTTP2', lambda v: v.lower() in ('1', 'true', 'ya'), False),
+}
+
+
+class KonfigurasiPool(namedtuple('KonfigurasiPool', list(_KOLOM_POOL), defaults=[b for _, _, b in _KOLOM_POOL.values()])):
+    """Batas pool, keep-alive (detik), timeout (detik) dan retry klien PostgREST.
+
+    `maks_koneksi` sebaiknya >= jumlah kueri serentak satu worker (thread
+    gunicorn x KUERI_PARALEL_WORKER); di atas itu request menunggu slot.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def dari_env(cls, environ=os.environ):
+        return cls(**{nama: ubah(environ[env]) for nama, (env, ubah, _) in _KOLOM_POOL.items() if environ.get(env)})
+
+
+def buat_klien_supabase(url, key, konfigurasi=None):
+    """create_client dengan impor paket supabase yang ditunda.
+
+    Fungsi tingkat modul sehingga functools.partial(buat_klien_supabase, url,
+    key, konfigurasi) bisa di-pickle untuk proses pool antrean_ekspor.
+    """
+    from supabase import create_client
+    klien = create_client(url, key)
+    if konfigurasi is not None:
+        from pool_http import pasang_pool
+        pasang_pool(klien, konfigurasi)
+    return klien
+
+
+def statistik_pool(klien_malas):
+    """Statistik pool HTTP, atau None jika klien belum dibuat / tanpa pool."""
+    if not klien_malas.sudah_dibuat:
+        return None
+    pool = getattr(klien_malas.klien(), 'pool_http', None)
+    return pool.statistik() if pool is not None else None
+
+
+class KlienMalas:
+    """Proxy yang membuat klien lewat `pembuat()` pada akses atribut pertama."""
+
+    def __init__(self, pembuat):
+        self._pembuat = pembuat
+        self._klien = None
+        self._lock = threading.Lock()
+
+    def klien(self):
+        if self._klien is None:
+            with self._lock:
+                if self._klien is None:
+                    self._klien = self._pembuat()
+        return self._klien
+
+    def ganti(self, klien):
+        """Pakai `klien` yang sudah jadi (mis. benchmarks/supabase_palsu.py)."""
+        with self._lock:
+            self._klien = klien
+
+    @property
+    def sudah_dibuat(self):
+        return self._klien is not None
+
+    def __getattr__(self, nama):
+        return getattr(self.klien(), nama)
@@ -0,0 +1,48 @@
+"""Menjalankan kueri baca yang saling independen secara bersamaan.
+
+Panggilan Supabase bersifat I/O-bound, jadi thread pool sudah cukup: waktu
+total mendekati kueri paling lambat, bukan jumlah semua kueri. Error tiap
+kueri diisolasi dan dikembalikan bersama hasilnya, sehingga pemanggil bisa
+menanganinya satu per satu seperti blok try/except biasa.
+
+Setiap kueri berjalan di salinan contextvars pemanggil, sehingga catatan
+per request (instrumentasi.py) tetap terisi dari thread pool.
+"""
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HasilKueri(namedtuple('HasilKueri', ['data', 'error'])):
+    __slots__ = ()
+
+    def nilai(self):
+        """Kembalikan data, atau lempar ulang error kueri ini."""
+        if self.error is not None:
+            raise self.error
+        return self.data
+
+
+class PelaksanaKueri:
+    def __init__(self, maks_worker=8):
+        self.maks_worker = maks_worker
+        self._executor = ThreadPoolExecutor(max_workers=maks_worker, thread_name_prefix='kueri') if maks_worker > 1 else None
+
+    @staticmethod
+    def _jalankan_satu(fungsi):
+        try:
+            return HasilKueri(fungsi(), None)
+        except Exception as e:
+            return HasilKueri(None, e)
+
+    def jalankan(self, kueri):
+        """Jalankan dict {nama: fungsi_tanpa_argumen}, kembalikan {nama: HasilKueri}.
+
+        Fungsi dijalankan di thread lain, jadi jangan memanggil `flash()` atau
+        objek `request` Flask di dalamnya.
+        """
+        if self._executor is None or len(kueri) <= 1:
+            return {nama: self._jalankan_satu(fungsi) for nama, fungsi in kueri.items()}
+        # Satu salinan context per tugas: sebuah Context tidak bisa dimasuki dua thread sekaligus
+        futures = {nama: self._executor.submit(contextvars.copy_context().run, self._jalankan_satu, fungsi) for nama, fungsi in kueri.items()}
+        return {nama: future.result() for nama, future in futures.items()}
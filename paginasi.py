@@ -0,0 +1,108 @@
+"""Paginasi keyset (kursor) untuk tabel transaksi.
+
+Urutan selalu (tanggal DESC, id DESC). Kursor menyimpan (tanggal, id) baris
+terakhir/pertama sebuah halaman, dan halaman berikutnya diambil dengan
+kondisi "lebih kecil dari kursor" alih-alih OFFSET. Biayanya sama untuk
+halaman pertama maupun riwayat yang sangat lama, dan urutannya tetap stabil
+walaupun ada transaksi baru yang masuk di antara dua permintaan.
+"""
+import base64
+from datetime import date, timedelta
+
+TIPE_VALID = ('pemasukan', 'pengeluaran')
+
+
+def encode_kursor(baris):
+    mentah = f"{baris['tanggal']}|{baris['id']}".encode('utf-8')
+    return base64.urlsafe_b64encode(mentah).decode('ascii').rstrip('=')
+
+
+def decode_kursor(kursor):
+    """(tanggal, id) dari string kursor, atau None jika tidak valid."""
+    if not kursor:
+        return None
+    try:
+        mentah = base64.urlsafe_b64decode(kursor + '=' * (-len(kursor) % 4)).decode('utf-8')
+        tanggal, id_ = mentah.rsplit('|', 1)
+        return tanggal, int(id_)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def filter_dari_args(args):
+    """Ambil filter yang valid dari query string (request.args)."""
+    filter_ = {}
+    tipe = args.get('tipe')
+    if tipe in TIPE_VALID:
+        filter_['tipe'] = tipe
+    if args.get('kategori'):
+        filter_['kategori'] = args['kategori']
+    rekening_id = args.get('rekening_id', type=int)
+    if rekening_id is not None:
+        filter_['rekening_id'] = rekening_id
+    for kunci in ('dari', 'sampai'):
+        try:
+            filter_[kunci] = date.fromisoformat(args.get(kunci, ''))
+        except ValueError:
+            pass
+    return filter_
+
+
+def terapkan_filter(query, filter_):
+    for kolom in ('tipe', 'kategori', 'rekening_id'):
+        if kolom in filter_:
+            query = query.eq(kolom, filter_[kolom])
+    if 'dari' in filter_:
+        query = query.gte('tanggal', filter_['dari'].isoformat())
+    if 'sampai' in filter_:
+        # 'sampai' inklusif: ambil semua transaksi sebelum hari berikutnya
+        query = query.lt('tanggal', (filter_['sampai'] + timedelta(days=1)).isoformat())
+    return query
+
+
+def _kondisi_kursor(operator, tanggal, id_):
+    # Nilai tanggal diberi tanda kutip karena mengandung ':' dan '+'
+    return f'tanggal.{operator}."{tanggal}",and(tanggal.eq."{tanggal}",id.{operator}.{id_})'
+
+
+def ambil_halaman(client, filter_=None, sesudah=None, sebelum=None, per_halaman=15):
+    """Ambil satu halaman transaksi.
+
+    `sesudah`: kursor baris terakhir halaman sebelumnya (navigasi maju).
+    `sebelum`: kursor baris pertama halaman berikutnya (navigasi mundur).
+    Mengembalikan dict {'data', 'kursor_berikutnya', 'kursor_sebelumnya'};
+    kursor bernilai None jika tidak ada halaman ke arah itu.
+    """
+    filter_ = filter_ or {}
+    posisi_sesudah, posisi_sebelum = decode_kursor(sesudah), decode_kursor(sebelum)
+    mundur = posisi_sebelum is not None and posisi_sesudah is None
+
+    query = terapkan_filter(client.table('transaksi').select('*'), filter_)
+    if mundur:
+        query = query.or_(_kondisi_kursor('gt', *posisi_sebelum))
+        query = query.order('tanggal').order('id')
+    else:
+        if posisi_sesudah is not None:
+            query = query.or_(_kondisi_kursor('lt', *posisi_sesudah))
+        query = query.order('tanggal', desc=True).order('id', desc=True)
+    rows = query.limit(per_halaman + 1).execute().data or []
+
+    masih_ada = len(rows) > per_halaman
+    rows = rows[:per_halaman]
+    if mundur:
+        rows.reverse()
+        ada_berikutnya, ada_sebelumnya = True, masih_ada
+    else:
+        ada_berikutnya, ada_sebelumnya = masih_ada, posisi_sesudah is not None
+
+    return {
+        'data': rows,
+        'kursor_berikutnya': encode_kursor(rows[-1]) if rows and ada_berikutnya else None,
+        'kursor_sebelumnya': encode_kursor(rows[0]) if rows and ada_sebelumnya else None,
+    }
+
+
+def hitung_total(client, filter_=None):
+    """Jumlah persis transaksi yang cocok dengan filter (kueri count terpisah)."""
+    query = terapkan_filter(client.table('transaksi').select('id', count='exact', head=True), filter_ or {})
+    return query.execute().count or 0
@@ -0,0 +1,59 @@
+"""Pelacak anggaran: pemakaian per (tahun, bulan, kategori) dan peringatan ambang.
+
+Tabel `anggaran_terpakai` (sql/008_anggaran_terpakai.sql) diperbarui lewat
+RPC `catat_anggaran_terpakai` di dalam penulisan atomik setiap kali
+transaksi pengeluaran dicatat atau dihapus, seperti rekap_bulanan. RPC yang
+sama membandingkan pemakaian sebelum dan sesudah penulisan dengan setiap
+ambang (AMBANG_BAWAAN: 80% dan 100% dari batas) dan menulis peringatan ke
+`peringatan_anggaran`.
+Status anggaran dibaca dari view `v_status_anggaran`, satu baris per
+anggaran, tanpa memindai transaksi.
+
+`bangun_ulang()` mengisi ulang pemakaian dari transaksi (backfill), dipakai
+lewat `flask bangun-ulang-anggaran`.
+"""
+
+AMBANG_BAWAAN = (0.8, 1.0)
+
+
+def pesan_peringatan(p):
+    """Teks singkat untuk flash/log dari satu baris peringatan_anggaran."""
+    persen = p['ambang'] * 100
+    if p['arah'] == 'turun':
+        return f"Pemakaian anggaran {p['kategori']} kembali di bawah {persen:.0f}% (Rp {p['terpakai']:,.2f} / {p['batas']:,.2f})."
+    if p['ambang'] >= 1:
+        return f"Anggaran {p['kategori']} {p['bulan']:02d}/{p['tahun']} sudah habis: Rp {p['terpakai']:,.2f} dari batas Rp {p['batas']:,.2f}."
+    return f"Anggaran {p['kategori']} {p['bulan']:02d}/{p['tahun']} sudah terpakai {persen:.0f}%: Rp {p['terpakai']:,.2f} dari Rp {p['batas']:,.2f}."
+
+
+class PelacakAnggaran:
+    def __init__(self, client, ambang=AMBANG_BAWAAN):
+        self.client = client
+        self.ambang = sorted(ambang)
+
+    def status(self, bulan, tahun):
+        """Status tiap anggaran bulan tersebut (bentuk agregasi.status_anggaran + 'persen')."""
+        rows = self.client.table('v_status_anggaran').select('id, kategori, batas, terpakai').eq('bulan', bulan).eq('tahun', tahun).order('id').execute().data or []
+        hasil = []
+        for a in rows:
+            batas, terpakai = float(a.get('batas') or 0), float(a.get('terpakai') or 0)
+            hasil.append({'kategori': a.get('kategori'), 'batas': batas, 'terpakai': terpakai, 'sisa': batas - terpakai,
+                          'melebihi': terpakai > batas, 'persen': terpakai / batas * 100 if batas > 0 else 0.0})
+        return hasil
+
+    def peringatan(self, bulan=None, tahun=None, kategori=None, sebelum_id=None, limit=50):
+        """Log peringatan terbaru lebih dulu; `sebelum_id` untuk halaman berikutnya."""
+        kueri = self.client.table('peringatan_anggaran').select('*')
+        if tahun is not None:
+            kueri = kueri.eq('tahun', tahun)
+        if bulan is not None:
+            kueri = kueri.eq('bulan', bulan)
+        if kategori:
+            kueri = kueri.eq('kategori', kategori)
+        if sebelum_id is not None:
+            kueri = kueri.lt('id', sebelum_id)
+        return kueri.order('id', desc=True).limit(limit).execute().data or []
+
+    def bangun_ulang(self):
+        """Isi ulang seluruh pemakaian dari tabel transaksi; mengembalikan jumlah baris."""
+        return self.client.rpc('bangun_ulang_anggaran_terpakai').execute().data
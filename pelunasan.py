@@ -0,0 +1,48 @@
+"""Aturan pelunasan utang/piutang yang dipakai bersama.
+
+Pelunasan di produksi berjalan di database: `lunasi_dari_transaksi`
+(sql/010_penulisan_atomik.sql) mengunci catatan aktif pihak yang sama lewat
+index utang_piutang_pihak_aktif_idx (tipe, normalisasi_nama(pihak_terkait),
+tanggal_mulai, id) dan membagi pembayaran secara FIFO. Modul ini berisi
+padanan Python aturan yang sama untuk penulisan.PenulisSQLite dan
+benchmarks/supabase_palsu.py:
+
+  - normalisasi_nama : nama pihak untuk pencocokan (padanan fungsi SQL
+                       normalisasi_nama).
+  - alokasi_fifo     : bagi satu pembayaran ke beberapa catatan, yang terlama
+                       lebih dulu; sisanya pindah ke catatan berikutnya.
+"""
+
+TOLERANSI = 0.005
+
+
+def normalisasi_nama(nama):
+    """Nama pihak untuk pencocokan: tanpa beda huruf besar/kecil dan spasi berlebih."""
+    return ' '.join(str(nama or '').split()).casefold()
+
+
+def sisa_tagihan(item):
+    return max(float(item.get('jumlah_total') or 0) - float(item.get('jumlah_terbayar') or 0), 0.0)
+
+
+def alokasi_fifo(items, jumlah):
+    """Bagi `jumlah` ke `items` (sudah urut FIFO) sampai sisa tagihan masing-masing habis.
+
+    Mengembalikan ([(item, porsi)], sisa) dengan `sisa` bagian pembayaran yang
+    melebihi total tagihan semua catatan.
+    """
+    alokasi = []
+    for item in items:
+        if jumlah <= TOLERANSI:
+            break
+        porsi = min(sisa_tagihan(item), jumlah)
+        if porsi > 0:
+            alokasi.append((item, porsi))
+            jumlah -= porsi
+    return alokasi, max(jumlah, 0.0)
+
+
+def terapkan_lokal(item, porsi):
+    """Perbarui salinan item di memori setelah menerima `porsi` pembayaran."""
+    item['jumlah_terbayar'] = float(item.get('jumlah_terbayar') or 0) + porsi
+    item['lunas'] = item['jumlah_terbayar'] >= float(item.get('jumlah_total') or 0) - TOLERANSI
@@ -0,0 +1,95 @@
+"""Pencarian teks atas deskripsi transaksi dan pihak/deskripsi utang-piutang.
+
+Tabel `indeks_pencarian` (sql/009_pencarian.sql) menyimpan satu dokumen per
+baris transaksi/utang_piutang beserta kolom filternya, dengan index GIN
+tsvector (awalan kata) dan GIN pg_trgm (fuzzy). Indeks diperbarui di dalam
+penulisan atomik (RPC `catat_indeks_pencarian`/`hapus_indeks_pencarian`),
+seperti rekap_bulanan, dan bisa dibangun ulang dari nol lewat
+`flask bangun-ulang-pencarian`.
+
+Mode pencarian:
+  - 'awalan'   : setiap kata kueri harus menjadi awalan salah satu kata
+                 dokumen ('kop sus' cocok dengan 'Kopi susu'), terbaru dulu
+  - 'fuzzy'    : kemiripan trigram kata (tahan salah ketik), paling mirip dulu
+  - 'otomatis' : awalan; jika halaman pertama kosong, ulangi secara fuzzy
+"""
+import re
+from datetime import timedelta
+
+MODE = ('otomatis', 'awalan', 'fuzzy')
+SUMBER = ('transaksi', 'utang_piutang')
+AMBANG_FUZZY = 0.4
+MAKS_KATA = 8
+
+_BUKAN_ALNUM = re.compile(r'[\W_]+')
+
+
+def normalisasi(teks):
+    """Huruf kecil, selain huruf/angka menjadi satu spasi (sama dengan normalisasi_teks di SQL)."""
+    return _BUKAN_ALNUM.sub(' ', (teks or '').lower()).strip()
+
+
+def kata_kueri(kueri):
+    """Kata unik dari kueri (urutan dipertahankan), paling banyak MAKS_KATA."""
+    return list(dict.fromkeys(normalisasi(kueri).split()))[:MAKS_KATA]
+
+
+def tsquery_awalan(kata):
+    """'kop:* & sus:*' untuk to_tsquery('simple', ...). Kata sudah alfanumerik, jadi aman."""
+    return ' & '.join(f'{k}:*' for k in kata)
+
+
+def baris_indeks(sumber, rows):
+    """Baris p_baris untuk RPC catat_indeks_pencarian dari baris tabel sumber."""
+    if sumber == 'transaksi':
+        return [{'sumber_id': r['id'], 'deskripsi': r.get('deskripsi'), 'pihak_terkait': None, 'tanggal': r.get('tanggal'),
+                 'tipe': r.get('tipe'), 'kategori': r.get('kategori'), 'rekening_id': r.get('rekening_id'), 'jumlah': r.get('jumlah')}
+                for r in rows if r.get('id') is not None]
+    return [{'sumber_id': r['id'], 'deskripsi': r.get('deskripsi'), 'pihak_terkait': r.get('pihak_terkait'), 'tanggal': r.get('tanggal_mulai'),
+             'tipe': r.get('tipe'), 'kategori': None, 'rekening_id': None, 'jumlah': r.get('jumlah_total')}
+            for r in rows if r.get('id') is not None]
+
+
+class IndeksPencarian:
+    def __init__(self, client, ambang_fuzzy=AMBANG_FUZZY):
+        self.client = client
+        self.ambang_fuzzy = ambang_fuzzy
+
+    def _cari(self, kata, fuzzy, filter_, sumber, limit, offset):
+        sampai = filter_.get('sampai')
+        params = {
+            'p_tsquery': tsquery_awalan(kata), 'p_kueri': ' '.join(kata), 'p_fuzzy': fuzzy, 'p_ambang': self.ambang_fuzzy,
+            'p_sumber': sumber, 'p_tipe': filter_.get('tipe'), 'p_kategori': filter_.get('kategori'),
+            'p_rekening_id': filter_.get('rekening_id'),
+            'p_dari': filter_['dari'].isoformat() if filter_.get('dari') else None,
+            # 'sampai' inklusif, sama seperti paginasi.terapkan_filter
+            'p_sampai': (sampai + timedelta(days=1)).isoformat() if sampai else None,
+            'p_limit': limit, 'p_offset': offset,
+        }
+        return self.client.rpc('cari_indeks_pencarian', params).execute().data or []
+
+    def cari(self, kueri, filter_=None, sumber=None, mode='otomatis', halaman=1, per_halaman=20):
+        """Satu halaman hasil pencarian.
+
+        `filter_` berbentuk paginasi.filter_dari_args (tipe, kategori,
+        rekening_id, dari, sampai); filter kategori/rekening otomatis hanya
+        mengenai transaksi. Mengembalikan dict {'data', 'mode', 'halaman',
+        'ada_berikutnya'}; 'mode' adalah mode yang benar-benar dipakai.
+        """
+        filter_ = filter_ or {}
+        kata = kata_kueri(kueri)
+        halaman = max(1, halaman)
+        if not kata:
+            return {'data': [], 'mode': mode, 'halaman': halaman, 'ada_berikutnya': False}
+        sumber = sumber if sumber in SUMBER else None
+        offset = (halaman - 1) * per_halaman
+        dipakai = 'fuzzy' if mode == 'fuzzy' else 'awalan'
+        rows = self._cari(kata, dipakai == 'fuzzy', filter_, sumber, per_halaman + 1, offset)
+        if not rows and mode == 'otomatis' and halaman == 1:
+            dipakai = 'fuzzy'
+            rows = self._cari(kata, True, filter_, sumber, per_halaman + 1, offset)
+        return {'data': rows[:per_halaman], 'mode': dipakai, 'halaman': halaman, 'ada_berikutnya': len(rows) > per_halaman}
+
+    def bangun_ulang(self):
+        """Isi ulang seluruh indeks dari transaksi dan utang_piutang; mengembalikan jumlah dokumen."""
+        return self.client.rpc('bangun_ulang_indeks_pencarian').execute().data
@@ -0,0 +1,424 @@
+"""Penulisan atomik: satu operasi bisnis = satu panggilan = satu transaksi database.
+
+Sebelumnya rute yang menulis menjalankan beberapa round trip terpisah
+(insert transaksi, baca lalu ubah utang_piutang, kemudian RPC data turunan
+satu per satu). Jika worker mati di tengah jalan (mis. timeout gunicorn),
+sebagian langkah sudah tersimpan dan sisanya tidak. Fungsi di
+sql/010_penulisan_atomik.sql menjalankan semua langkah satu operasi,
+termasuk saldo_rekening, rekap_bulanan, anggaran_terpakai, indeks_pencarian,
+Dana Darurat dan versi_data, di dalam satu transaksi: tersimpan semua atau tidak sama
+sekali, dengan satu round trip.
+
+Setiap transaksi yang membuat atau membayar utang/piutang dicatat di tabel
+`transaksi_utang_piutang`, sehingga menghapus transaksinya ikut membatalkan
+efeknya pada catatan utang/piutang.
+
+  - PenulisSupabase : memanggil RPC di atas lewat klien Supabase.
+  - PenulisSQLite   : padanannya di sqlite3 (satu `begin immediate` per
+                      operasi) untuk pengujian lokal, dengan skema yang sama
+                      dengan backend_agregasi.BackendSQLiteRekap sehingga
+                      keduanya bisa berbagi koneksi. Indeks pencarian
+                      (tsvector/pg_trgm) tidak ditiru.
+
+Semua operasi mengembalikan dict dengan bentuk yang sama untuk kedua kelas.
+"""
+import sqlite3
+from contextlib import contextmanager
+
+from agregasi import bulan_tahun
+from backend_agregasi import SKEMA_SQLITE, tambah_rekap_sqlite
+from dana_darurat import NAMA as NAMA_DANA_DARURAT, sisa_setelah_dana_aman, target_dana_darurat
+from pelacak_anggaran import AMBANG_BAWAAN
+from pelunasan import TOLERANSI, alokasi_fifo, normalisasi_nama, terapkan_lokal
+
+
+def utang_dari_transaksi(utang_baru, transaksi):
+    """Baris utang_piutang baru sebesar `transaksi` (padanan catat_transaksi_atomik)."""
+    return {
+        'tipe': utang_baru['tipe'], 'deskripsi': utang_baru.get('deskripsi'), 'pihak_terkait': utang_baru.get('pihak_terkait'),
+        'jumlah_total': float(transaksi['jumlah']), 'jumlah_terbayar': 0.0, 'lunas': False, 'tanggal_mulai': transaksi.get('tanggal'),
+    }
+
+
+def transaksi_cicilan(item, jumlah, rekening_id, tanggal):
+    """Baris transaksi pembayaran cicilan; tipe, kategori dan deskripsi mengikuti catatannya."""
+    if item['tipe'] == 'Utang':
+        tipe, kategori, deskripsi = 'pengeluaran', 'Pembayaran Utang', f"Bayar Utang: {item.get('deskripsi') or ''}"
+    else:
+        tipe, kategori, deskripsi = 'pemasukan', 'Penerimaan Piutang', f"Terima Piutang: {item.get('deskripsi') or ''}"
+    return {'deskripsi': deskripsi, 'jumlah': jumlah, 'tipe': tipe, 'kategori': kategori, 'tanggal': tanggal, 'rekening_id': rekening_id}
+
+
+class PenulisSupabase:
+    def __init__(self, client, ambang=AMBANG_BAWAAN):
+        self.client = client
+        self.ambang = sorted(ambang)
+
+    def catat(self, transaksi, utang_baru=None, pelunasan=None):
+        """Simpan transaksi (satu baris, atau dua untuk transfer) beserta efeknya.
+
+        `utang_baru` {'tipe', 'deskripsi', 'pihak_terkait'}: buat catatan
+        utang/piutang sebesar transaksi pertama. `pelunasan` {'tipe',
+        'pihak_terkait'}: alokasikan jumlah transaksi pertama ke catatan aktif
+        pihak itu secara FIFO. Mengembalikan {'transaksi', 'utang_piutang',
+        'alokasi', 'sisa', 'peringatan', 'dana_darurat_berubah'}.
+        """
+        params = {'p_transaksi': list(transaksi), 'p_ambang': self.ambang, 'p_utang_baru': utang_baru, 'p_pelunasan': pelunasan}
+        return self.client.rpc('catat_transaksi_atomik', params).execute().data
+
+    def impor(self, baris):
+        """Simpan satu batch impor dalam satu transaksi database.
+
+        `baris` adalah list {'transaksi', 'utang_baru'?, 'pelunasan'?} dengan
+        arti yang sama seperti argumen catat (satu transaksi per elemen);
+        pelunasan boleh mengenai catatan yang dibuat elemen sebelumnya.
+        Mengembalikan {'transaksi', 'utang_piutang', 'hasil', 'peringatan',
+        'dana_darurat_berubah'}; 'hasil' sejajar dengan `baris`, masing-masing
+        {'alokasi', 'sisa'}.
+        """
+        return self.client.rpc('impor_transaksi_atomik', {'p_baris': list(baris), 'p_ambang': self.ambang}).execute().data
+
+    def bayar_cicilan(self, utang_piutang_id, jumlah, rekening_id, tanggal):
+        """Transaksi pembayaran + jumlah_terbayar; mengembalikan {'transaksi', 'utang_piutang', 'peringatan', 'dana_darurat_berubah'}."""
+        params = {'p_utang_piutang_id': utang_piutang_id, 'p_ambang': self.ambang,
+                  'p_transaksi': {'jumlah': jumlah, 'tanggal': tanggal, 'rekening_id': rekening_id}}
+        return self.client.rpc('bayar_cicilan_atomik', params).execute().data
+
+    def hapus_transaksi(self, id_):
+        """Hapus transaksi dan batalkan efeknya.
+
+        Mengembalikan {'transaksi', 'utang_piutang_dihapus',
+        'utang_piutang_diperbarui', 'peringatan', 'dana_darurat_berubah'};
+        'transaksi' kosong jika id tidak ada.
+        """
+        return self.client.rpc('hapus_transaksi_atomik', {'p_id': id_, 'p_ambang': self.ambang}).execute().data
+
+    def hapus_utang_piutang(self, id_):
+        """Hapus satu catatan utang/piutang; mengembalikan baris yang dihapus."""
+        return self.client.rpc('hapus_utang_piutang_atomik', {'p_id': id_}).execute().data or []
+
+
+# Padanan Python untuk delta data turunan yang dihitung di dalam
+# terapkan_mutasi_transaksi (sql/010_penulisan_atomik.sql); dipakai
+# PenulisSQLite dan benchmarks/supabase_palsu.py.
+def mutasi_per_rekening(transaksi_rows):
+    """{rekening_id: pemasukan - pengeluaran} dari daftar transaksi."""
+    mutasi = {}
+    for t in transaksi_rows:
+        rekening_id = t.get('rekening_id')
+        if rekening_id is None:
+            continue
+        if t.get('tipe') == 'pemasukan':
+            delta = float(t.get('jumlah', 0))
+        elif t.get('tipe') == 'pengeluaran':
+            delta = -float(t.get('jumlah', 0))
+        else:
+            continue
+        mutasi[rekening_id] = mutasi.get(rekening_id, 0.0) + delta
+    return mutasi
+
+
+def delta_terpakai(transaksi_rows, arah=1):
+    """Gabungkan transaksi pengeluaran menjadi baris delta dengan kunci unik."""
+    delta = {}
+    for t in transaksi_rows:
+        if t.get('tipe') != 'pengeluaran' or not t.get('tanggal') or not t.get('kategori'):
+            continue
+        tahun, bulan = bulan_tahun(t['tanggal'])
+        ember = delta.setdefault((tahun, bulan, t['kategori']), [0.0, 0])
+        ember[0] += arah * float(t.get('jumlah', 0))
+        ember[1] += arah
+    return [
+        {'tahun': tahun, 'bulan': bulan, 'kategori': kategori, 'total': total, 'jumlah_transaksi': jumlah}
+        for (tahun, bulan, kategori), (total, jumlah) in delta.items()
+    ]
+
+
+# Padanan SQLite untuk tabel yang ditulis sql/010_penulisan_atomik.sql;
+# transaksi dan rekap_bulanan berasal dari backend_agregasi.SKEMA_SQLITE.
+SKEMA_SQLITE_PENULISAN = """
+create table if not exists rekening (
+    id integer primary key,
+    nama text,
+    saldo_awal real not null default 0
+);
+create table if not exists saldo_rekening (
+    rekening_id integer primary key,
+    saldo real not null default 0
+);
+create table if not exists utang_piutang (
+    id integer primary key,
+    tipe text not null,
+    deskripsi text,
+    pihak_terkait text,
+    jumlah_total real not null,
+    jumlah_terbayar real not null default 0,
+    lunas integer not null default 0,
+    tanggal_mulai text,
+    tanggal_jatuh_tempo text
+);
+create table if not exists transaksi_utang_piutang (
+    transaksi_id integer not null,
+    utang_piutang_id integer not null,
+    jenis text not null check (jenis in ('buat', 'bayar')),
+    jumlah real not null,
+    primary key (transaksi_id, utang_piutang_id)
+);
+create index if not exists transaksi_utang_piutang_utang_idx on transaksi_utang_piutang (utang_piutang_id);
+create table if not exists anggaran (
+    id integer primary key,
+    tahun integer not null,
+    bulan integer not null,
+    kategori text not null,
+    batas real not null
+);
+create table if not exists anggaran_terpakai (
+    tahun integer not null,
+    bulan integer not null,
+    kategori text not null,
+    terpakai real not null default 0,
+    jumlah_transaksi integer not null default 0,
+    primary key (tahun, bulan, kategori)
+);
+create table if not exists peringatan_anggaran (
+    id integer primary key,
+    anggaran_id integer,
+    tahun integer not null,
+    bulan integer not null,
+    kategori text not null,
+    ambang real not null,
+    arah text not null,
+    batas real not null,
+    terpakai_sebelum real not null,
+    terpakai real not null
+);
+create table if not exists versi_data (
+    tabel text primary key,
+    versi integer not null default 0
+);
+create table if not exists pengaturan (
+    kunci text primary key,
+    nilai text
+);
+create table if not exists tabungan (
+    id integer primary key,
+    nama text not null,
+    target real not null default 0,
+    terkumpul real not null default 0,
+    tenggat text
+);
+create unique index if not exists tabungan_dana_darurat_unik on tabungan (nama) where nama = 'Dana Darurat';
+"""
+
+KOLOM_TRANSAKSI = ('deskripsi', 'jumlah', 'tipe', 'kategori', 'tanggal', 'rekening_id')
+KOLOM_UTANG = ('tipe', 'deskripsi', 'pihak_terkait', 'jumlah_total', 'jumlah_terbayar', 'lunas', 'tanggal_mulai')
+
+
+class PenulisSQLite:
+    """Padanan PenulisSupabase di sqlite3; setiap operasi commit atau rollback seluruhnya."""
+
+    def __init__(self, conn, ambang=AMBANG_BAWAAN):
+        self.conn = conn
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SKEMA_SQLITE + SKEMA_SQLITE_PENULISAN)
+        self.ambang = sorted(ambang)
+
+    @contextmanager
+    def _transaksi(self):
+        # 'begin immediate' mengambil kunci tulis di awal, padanan 'for update'
+        # di fungsi SQL: pembacaan utang_piutang di dalam operasi tidak bisa
+        # didahului penulis lain.
+        with self.conn:
+            self.conn.execute('begin immediate')
+            yield
+
+    def _satu(self, sql, params=()):
+        baris = self.conn.execute(sql, params).fetchone()
+        return _dict(baris) if baris is not None else None
+
+    def _semua(self, sql, params=()):
+        return [_dict(b) for b in self.conn.execute(sql, params).fetchall()]
+
+    def _sisipkan(self, tabel, kolom, baris):
+        # Dibaca ulang alih-alih 'returning *': nilai dari returning belum
+        # melewati afinitas kolom (jumlah 85.0 kembali sebagai 85)
+        cur = self.conn.execute(f"insert into {tabel} ({', '.join(kolom)}) values ({', '.join('?' * len(kolom))})", [baris.get(k) for k in kolom])
+        return self._satu(f"select * from {tabel} where rowid = ?", (cur.lastrowid,))
+
+    def _tautkan(self, transaksi_id, utang_piutang_id, jenis, jumlah):
+        self.conn.execute("insert into transaksi_utang_piutang (transaksi_id, utang_piutang_id, jenis, jumlah) values (?, ?, ?, ?)",
+                          (transaksi_id, utang_piutang_id, jenis, jumlah))
+
+    def _naikkan_versi(self, tabel):
+        self.conn.execute("insert into versi_data (tabel, versi) values (?, 1) on conflict (tabel) do update set versi = versi + 1", (tabel,))
+
+    def _ubah_terbayar(self, item):
+        self.conn.execute("update utang_piutang set jumlah_terbayar = ?, lunas = ? where id = ?",
+                          (item['jumlah_terbayar'], item['lunas'], item['id']))
+
+    def _terapkan_mutasi(self, transaksi_rows, arah):
+        """Padanan terapkan_mutasi_transaksi; mengembalikan peringatan anggaran."""
+        for rekening_id, delta in sorted(mutasi_per_rekening(transaksi_rows).items()):
+            if not delta:
+                continue
+            # Padanan tambah_saldo_rekening: baris baru dimulai dari saldo_awal rekening
+            cur = self.conn.execute("update saldo_rekening set saldo = saldo + ? where rekening_id = ?", (arah * delta, rekening_id))
+            if cur.rowcount == 0:
+                self.conn.execute("insert into saldo_rekening (rekening_id, saldo) "
+                                  "values (?, coalesce((select saldo_awal from rekening where id = ?), 0) + ?)",
+                                  (rekening_id, rekening_id, arah * delta))
+        tambah_rekap_sqlite(self.conn, transaksi_rows, arah)
+        peringatan = []
+        for d in delta_terpakai(transaksi_rows, arah):
+            sesudah = self._satu(
+                "insert into anggaran_terpakai (tahun, bulan, kategori, terpakai, jumlah_transaksi) values (?, ?, ?, ?, ?) "
+                "on conflict (tahun, bulan, kategori) do update set terpakai = terpakai + excluded.terpakai, "
+                "jumlah_transaksi = jumlah_transaksi + excluded.jumlah_transaksi returning terpakai",
+                (d['tahun'], d['bulan'], d['kategori'], d['total'], d['jumlah_transaksi']),
+            )['terpakai']
+            sesudah = float(sesudah)
+            sebelum = sesudah - d['total']
+            for a in self._semua("select * from anggaran where tahun = ? and bulan = ? and kategori = ? and batas > 0",
+                                 (d['tahun'], d['bulan'], d['kategori'])):
+                for ambang in self.ambang:
+                    batas = ambang * a['batas']
+                    if sebelum < batas <= sesudah or sesudah < batas <= sebelum:
+                        peringatan.append(self._sisipkan('peringatan_anggaran', (
+                            'anggaran_id', 'tahun', 'bulan', 'kategori', 'ambang', 'arah', 'batas', 'terpakai_sebelum', 'terpakai'), {
+                            'anggaran_id': a['id'], 'tahun': d['tahun'], 'bulan': d['bulan'], 'kategori': d['kategori'], 'ambang': ambang,
+                            'arah': 'naik' if sesudah > sebelum else 'turun', 'batas': a['batas'], 'terpakai_sebelum': sebelum, 'terpakai': sesudah}))
+        self._naikkan_versi('transaksi')
+        return peringatan
+
+    def _sinkronkan_dana_darurat(self):
+        """Padanan sinkronkan_dana_darurat_dari_saldo; True jika baris Dana Darurat berubah."""
+        baris = self._satu("select nilai from pengaturan where kunci = 'gaji'")
+        try:
+            gaji = float(baris['nilai']) if baris is not None else 0.0
+        except (TypeError, ValueError):
+            gaji = 0.0
+        total = float(self.conn.execute("select coalesce(sum(case when tipe = 'pemasukan' then total else -total end), 0) "
+                                        "from rekap_bulanan where tipe in ('pemasukan', 'pengeluaran')").fetchone()[0])
+        target, alokasi = target_dana_darurat(gaji), sisa_setelah_dana_aman(total)
+        item = self._satu("select * from tabungan where nama = ?", (NAMA_DANA_DARURAT,))
+        dibuat = item is None
+        if dibuat:
+            item = self._sisipkan('tabungan', ('nama', 'target', 'terkumpul', 'tenggat'),
+                                  {'nama': NAMA_DANA_DARURAT, 'target': target or 0.0, 'terkumpul': 0.0})
+        target_baru = target if target is not None else item['target']
+        terkumpul_baru = max(item['terkumpul'], min(target_baru, max(alokasi, 0.0)))
+        if not dibuat and target_baru == item['target'] and terkumpul_baru == item['terkumpul']:
+            return False
+        self.conn.execute("update tabungan set target = ?, terkumpul = ? where id = ?", (target_baru, terkumpul_baru, item['id']))
+        self._naikkan_versi('tabungan')
+        return True
+
+    def _buat_utang(self, utama, utang_baru):
+        """Padanan buat_utang_dari_transaksi."""
+        item = self._sisipkan('utang_piutang', KOLOM_UTANG, utang_dari_transaksi(utang_baru, utama))
+        self._tautkan(utama['id'], item['id'], 'buat', utama['jumlah'])
+        return item
+
+    def _lunasi(self, utama, pelunasan):
+        """Padanan lunasi_dari_transaksi; mengembalikan {'alokasi', 'sisa'}."""
+        aktif = [i for i in self._semua("select * from utang_piutang where not lunas and tipe = ? order by tanggal_mulai, id",
+                                        (pelunasan['tipe'],))
+                 if normalisasi_nama(i['pihak_terkait']) == normalisasi_nama(pelunasan.get('pihak_terkait'))]
+        bagian, sisa = alokasi_fifo(aktif, float(utama['jumlah']))
+        alokasi = []
+        for item, porsi in bagian:
+            terapkan_lokal(item, porsi)
+            self._ubah_terbayar(item)
+            self._tautkan(utama['id'], item['id'], 'bayar', porsi)
+            alokasi.append({'id': item['id'], 'dialokasikan': porsi, 'lunas': item['lunas']})
+        return {'alokasi': alokasi, 'sisa': sisa if sisa > TOLERANSI else 0.0}
+
+    def catat(self, transaksi, utang_baru=None, pelunasan=None):
+        with self._transaksi():
+            rows = [self._sisipkan('transaksi', KOLOM_TRANSAKSI, t) for t in transaksi]
+            utang = [self._buat_utang(rows[0], utang_baru)] if utang_baru is not None else []
+            lunas = self._lunasi(rows[0], pelunasan) if pelunasan is not None else {'alokasi': [], 'sisa': 0.0}
+            peringatan = self._terapkan_mutasi(rows, 1)
+            if utang or lunas['alokasi']:
+                self._naikkan_versi('utang_piutang')
+            berubah = self._sinkronkan_dana_darurat()
+        return {'transaksi': rows, 'utang_piutang': utang, **lunas, 'peringatan': peringatan, 'dana_darurat_berubah': berubah}
+
+    def impor(self, baris):
+        with self._transaksi():
+            rows, utang, hasil = [], [], []
+            for elemen in baris:
+                utama = self._sisipkan('transaksi', KOLOM_TRANSAKSI, elemen['transaksi'])
+                rows.append(utama)
+                if elemen.get('utang_baru') is not None:
+                    utang.append(self._buat_utang(utama, elemen['utang_baru']))
+                hasil.append(self._lunasi(utama, elemen['pelunasan']) if elemen.get('pelunasan') is not None else {'alokasi': [], 'sisa': 0.0})
+            peringatan = self._terapkan_mutasi(rows, 1)
+            if utang or any(h['alokasi'] for h in hasil):
+                self._naikkan_versi('utang_piutang')
+            berubah = self._sinkronkan_dana_darurat()
+        return {'transaksi': rows, 'utang_piutang': utang, 'hasil': hasil, 'peringatan': peringatan, 'dana_darurat_berubah': berubah}
+
+    def bayar_cicilan(self, utang_piutang_id, jumlah, rekening_id, tanggal):
+        with self._transaksi():
+            item = self._satu("select * from utang_piutang where id = ?", (utang_piutang_id,))
+            if item is None:
+                raise LookupError(f"Catatan utang/piutang {utang_piutang_id} tidak ditemukan")
+            utama = self._sisipkan('transaksi', KOLOM_TRANSAKSI, transaksi_cicilan(item, jumlah, rekening_id, tanggal))
+            item['jumlah_terbayar'] += float(utama['jumlah'])
+            item['lunas'] = item['jumlah_terbayar'] >= item['jumlah_total']
+            self._ubah_terbayar(item)
+            self._tautkan(utama['id'], item['id'], 'bayar', utama['jumlah'])
+            peringatan = self._terapkan_mutasi([utama], 1)
+            self._naikkan_versi('utang_piutang')
+            berubah = self._sinkronkan_dana_darurat()
+        return {'transaksi': [utama], 'utang_piutang': [item], 'peringatan': peringatan, 'dana_darurat_berubah': berubah}
+
+    def hapus_transaksi(self, id_):
+        with self._transaksi():
+            utama = self._satu("select * from transaksi where id = ?", (id_,))
+            if utama is None:
+                return {'transaksi': [], 'utang_piutang_dihapus': [], 'utang_piutang_diperbarui': [], 'peringatan': [],
+                        'dana_darurat_berubah': False}
+            dihapus, diperbarui = [], []
+            for tautan in self._semua("select * from transaksi_utang_piutang where transaksi_id = ? order by utang_piutang_id", (id_,)):
+                item = self._satu("select * from utang_piutang where id = ?", (tautan['utang_piutang_id'],))
+                if item is None:
+                    continue
+                if tautan['jenis'] == 'bayar':
+                    item['jumlah_terbayar'] = max(item['jumlah_terbayar'] - tautan['jumlah'], 0.0)
+                    item['lunas'] = item['jumlah_terbayar'] >= item['jumlah_total']
+                    self._ubah_terbayar(item)
+                    diperbarui.append(item)
+                else:
+                    if item['jumlah_terbayar'] > TOLERANSI:
+                        raise ValueError(f"Catatan {item['tipe']} dengan {item['pihak_terkait']} sudah dibayar Rp {item['jumlah_terbayar']}; "
+                                         "hapus transaksi pembayarannya dulu.")
+                    self.conn.execute("delete from transaksi_utang_piutang where utang_piutang_id = ?", (item['id'],))
+                    self.conn.execute("delete from utang_piutang where id = ?", (item['id'],))
+                    dihapus.append(item)
+            self.conn.execute("delete from transaksi_utang_piutang where transaksi_id = ?", (id_,))
+            self.conn.execute("delete from transaksi where id = ?", (id_,))
+            peringatan = self._terapkan_mutasi([utama], -1)
+            if dihapus or diperbarui:
+                self._naikkan_versi('utang_piutang')
+            berubah = self._sinkronkan_dana_darurat()
+        return {'transaksi': [utama], 'utang_piutang_dihapus': dihapus, 'utang_piutang_diperbarui': diperbarui,
+                'peringatan': peringatan, 'dana_darurat_berubah': berubah}
+
+    def hapus_utang_piutang(self, id_):
+        with self._transaksi():
+            item = self._satu("select * from utang_piutang where id = ?", (id_,))
+            if item is None:
+                return []
+            self.conn.execute("delete from transaksi_utang_piutang where utang_piutang_id = ?", (id_,))
+            self.conn.execute("delete from utang_piutang where id = ?", (id_,))
+            self._naikkan_versi('utang_piutang')
+        return [item]
+
+
+def _dict(baris):
+    hasil = dict(baris)
+    if 'lunas' in hasil:
+        hasil['lunas'] = bool(hasil['lunas'])
+    return hasil
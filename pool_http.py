@@ -0,0 +1,227 @@
+"""Pool koneksi HTTP terbatas untuk klien PostgREST (dipakai klien.py).
+
+Session bawaan postgrest-py adalah httpx.Client dengan timeout 120 detik,
+tanpa batas koneksi yang jelas dan tanpa retry. `TransportPool` membungkus
+httpx.HTTPTransport dengan:
+
+  - batas koneksi serentak (`maks_koneksi`): request yang tidak kebagian slot
+    menunggu paling lama `timeout_pool` detik lalu gagal dengan
+    httpx.PoolTimeout, bukan membuka koneksi baru tanpa batas;
+  - keep-alive: paling banyak `maks_idle` koneksi idle disimpan selama
+    `keepalive` detik untuk dipakai ulang;
+  - retry dengan backoff eksponensial (+ jitter) hanya untuk metode
+    idempoten (GET/HEAD). Insert, update, delete dan rpc (POST) tidak pernah
+    diulang karena bisa saja sudah dijalankan server;
+  - statistik: slot dipakai, request yang menunggu, koneksi baru vs dipakai
+    ulang, jumlah retry.
+
+Modul ini mengimpor httpx, jadi hanya dimuat saat klien dibuat.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+METODE_IDEMPOTEN = frozenset({'GET', 'HEAD'})
+STATUS_ULANG = frozenset({502, 503, 504})
+# Kegagalan sebelum server sempat memproses request. RemoteProtocolError yang
+# paling sering: koneksi keep-alive sudah ditutup server tepat saat dipakai.
+# ReadTimeout sengaja tidak diulang supaya kueri lambat tidak dikirim dua kali.
+GALAT_ULANG = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class _AliranBerslot(httpx.SyncByteStream):
+    """Body respons yang mengembalikan slot pool saat ditutup."""
+
+    def __init__(self, aliran, lepas):
+        self._aliran = aliran
+        self._lepas = lepas
+
+    def __iter__(self):
+        yield from self._aliran
+
+    def close(self):
+        try:
+            self._aliran.close()
+        finally:
+            self._lepas()
+
+
+class _SlotAdil:
+    """Semaphore FIFO: slot yang dilepas langsung diberikan ke penunggu terlama.
+
+    threading.Semaphore tidak adil; thread yang baru melepas slot bisa langsung
+    mengambilnya lagi sehingga penunggu lain tertahan hingga detik-an.
+    """
+
+    def __init__(self, jumlah):
+        self._bebas = jumlah
+        self._antrean = deque()
+        self._lock = threading.Lock()
+
+    def ambil_segera(self):
+        with self._lock:
+            if self._bebas and not self._antrean:
+                self._bebas -= 1
+                return True
+            return False
+
+    def tunggu(self, timeout):
+        with self._lock:
+            if self._bebas and not self._antrean:
+                self._bebas -= 1
+                return True
+            giliran = threading.Event()
+            self._antrean.append(giliran)
+        if giliran.wait(timeout):
+            return True
+        with self._lock:
+            if giliran.is_set():
+                return True
+            self._antrean.remove(giliran)
+            return False
+
+    def lepas(self):
+        with self._lock:
+            if self._antrean:
+                self._antrean.popleft().set()
+            else:
+                self._bebas += 1
+
+
+class TransportPool(httpx.BaseTransport):
+    def __init__(self, konfigurasi, transport=None):
+        self.konfigurasi = konfigurasi
+        self._transport = transport or httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=konfigurasi.maks_koneksi,
+                                max_keepalive_connections=konfigurasi.maks_idle,
+                                keepalive_expiry=konfigurasi.keepalive),
+            http2=konfigurasi.http2,
+        )
+        self._slot = _SlotAdil(konfigurasi.maks_koneksi)
+        self._lock = threading.Lock()
+        self._dipakai = 0
+        self._stat = dict.fromkeys(('request', 'dipakai_puncak', 'menunggu', 'timeout_pool', 'koneksi_baru',
+                                    'koneksi_dipakai_ulang', 'retry', 'gagal'), 0)
+        self._stat['detik_menunggu'] = 0.0
+
+    def _tambah(self, kunci, nilai=1):
+        with self._lock:
+            self._stat[kunci] += nilai
+
+    def _ambil_slot(self, request):
+        if not self._slot.ambil_segera():
+            self._tambah('menunggu')
+            batas = (request.extensions.get('timeout') or {}).get('pool') or self.konfigurasi.timeout_pool
+            mulai = time.perf_counter()
+            berhasil = self._slot.tunggu(batas)
+            self._tambah('detik_menunggu', time.perf_counter() - mulai)
+            if not berhasil:
+                self._tambah('timeout_pool')
+                raise httpx.PoolTimeout(f"Tidak ada koneksi Supabase yang bebas dalam {batas} detik", request=request)
+        with self._lock:
+            self._dipakai += 1
+            self._stat['dipakai_puncak'] = max(self._stat['dipakai_puncak'], self._dipakai)
+
+        dilepas = []
+
+        def lepas():
+            if not dilepas:
+                dilepas.append(True)
+                with self._lock:
+                    self._dipakai -= 1
+                self._slot.lepas()
+        return lepas
+
+    def _kirim(self, request):
+        lepas = self._ambil_slot(request)
+        koneksi_baru = []
+        trace_asal = request.extensions.get('trace')
+
+        def trace(nama, info):
+            if nama.startswith('connection.connect_') and nama.endswith('.started'):
+                koneksi_baru.append(nama)
+            if trace_asal is not None:
+                trace_asal(nama, info)
+        request.extensions = {**request.extensions, 'trace': trace}
+        try:
+            respons = self._transport.handle_request(request)
+        except BaseException:
+            lepas()
+            raise
+        self._tambah('koneksi_baru' if koneksi_baru else 'koneksi_dipakai_ulang')
+        return httpx.Response(respons.status_code, headers=respons.headers, stream=_AliranBerslot(respons.stream, lepas),
+                              extensions=respons.extensions)
+
+    def _jeda(self, ke):
+        k = self.konfigurasi
+        return min(k.jeda_maks, k.jeda_awal * 2 ** ke) * random.uniform(0.5, 1.0)
+
+    def handle_request(self, request):
+        self._tambah('request')
+        percobaan = 1 + (self.konfigurasi.retry if request.method in METODE_IDEMPOTEN else 0)
+        for ke in range(percobaan):
+            terakhir = ke + 1 == percobaan
+            try:
+                respons = self._kirim(request)
+            except GALAT_ULANG:
+                if terakhir:
+                    self._tambah('gagal')
+                    raise
+            else:
+                if terakhir or respons.status_code not in STATUS_ULANG:
+                    return respons
+                respons.close()
+            self._tambah('retry')
+            time.sleep(self._jeda(ke))
+
+    def statistik(self):
+        with self._lock:
+            hasil = dict(self._stat, dipakai=self._dipakai, maks_koneksi=self.konfigurasi.maks_koneksi)
+        total = hasil['koneksi_baru'] + hasil['koneksi_dipakai_ulang']
+        hasil['rasio_pakai_ulang'] = hasil['koneksi_dipakai_ulang'] / total if total else 0.0
+        return hasil
+
+    def close(self):
+        self._transport.close()
+
+
+def timeout_http(konfigurasi):
+    return httpx.Timeout(konfigurasi.timeout_baca, connect=konfigurasi.timeout_koneksi,
+                         write=konfigurasi.timeout_baca, pool=konfigurasi.timeout_pool)
+
+
+class PostgRESTBerpool(SyncPostgrestClient):
+    """SyncPostgrestClient yang session-nya memakai `transport` bersama."""
+
+    def __init__(self, *args, transport, **kwargs):
+        self._transport_pool = transport
+        super().__init__(*args, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout, transport=self._transport_pool,
+                          follow_redirects=True)
+
+
+def pasang_pool(klien, konfigurasi):
+    """Arahkan semua kueri PostgREST klien supabase lewat satu TransportPool.
+
+    supabase membuat ulang klien postgrest saat token auth berganti; karena
+    pembuatnya diganti di sini, klien baru tetap memakai pool yang sama.
+    Pool tersedia sebagai `klien.pool_http`.
+    """
+    transport = TransportPool(konfigurasi)
+    batas_waktu = timeout_http(konfigurasi)
+
+    def buat_postgrest(rest_url, headers, schema, timeout=None, verify=True):
+        # `timeout` bawaan supabase (120 detik) diganti timeout dari konfigurasi
+        return PostgRESTBerpool(rest_url, headers=headers, schema=schema, timeout=batas_waktu, verify=verify, transport=transport)
+
+    klien._init_postgrest_client = buat_postgrest
+    klien._postgrest = None
+    klien.pool_http = transport
+    return klien
@@ -0,0 +1,25 @@
+"""Rekap bulanan: total per (tahun, bulan, tipe, kategori, rekening_id).
+
+Tabel `rekap_bulanan` (sql/005_rekap_bulanan.sql) diperbarui lewat RPC
+`tambah_rekap_bulanan` di dalam penulisan atomik (penulisan.PenulisSupabase)
+setiap kali transaksi dicatat atau dihapus, seperti saldo_rekening.
+Dashboard membaca tren dan total bulan langsung dari tabel ini, jadi biayanya
+sebanding dengan jumlah bulan yang ditampilkan, bukan dengan ukuran ledger.
+
+`bangun_ulang()` mengisi ulang seluruh tabel dari transaksi (backfill),
+dipakai lewat `flask bangun-ulang-rekap`.
+"""
+
+
+def daftar_periode(periode):
+    """['YYYY-MM', ...] dari daftar (tahun, bulan), tanpa duplikat dan terurut."""
+    return sorted({f"{tahun:04d}-{bulan:02d}" for tahun, bulan in periode})
+
+
+class RekapBulanan:
+    def __init__(self, client):
+        self.client = client
+
+    def bangun_ulang(self):
+        """Isi ulang seluruh rekap dari tabel transaksi; mengembalikan jumlah baris rekap."""
+        return self.client.rpc('bangun_ulang_rekap_bulanan').execute().data
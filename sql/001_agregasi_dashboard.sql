@@ -0,0 +1,30 @@
+-- Agregasi dashboard di sisi database (dipakai oleh backend_agregasi.BackendSupabase).
+-- Jalankan sekali di SQL Editor Supabase. Aman dijalankan ulang.
+
+-- Total per bulan, tipe dan kategori. Dipakai untuk ringkasan bulan,
+-- grafik per kategori, status anggaran dan tren 6 bulan.
+create or replace view v_rekap_bulanan as
+select
+    to_char(tanggal, 'YYYY-MM')          as periode,
+    extract(year from tanggal)::int      as tahun,
+    extract(month from tanggal)::int     as bulan,
+    tipe,
+    kategori,
+    sum(jumlah)::float8                  as total,
+    count(*)                             as jumlah_transaksi
+from transaksi
+where tanggal is not null and tipe in ('pemasukan', 'pengeluaran')
+group by 1, 2, 3, 4, 5;
+
+-- Mutasi per rekening sepanjang waktu. Baris dengan rekening_id NULL ikut
+-- dihitung supaya total keseluruhan bisa diturunkan dari view ini.
+create or replace view v_saldo_rekening as
+select
+    rekening_id,
+    coalesce(sum(jumlah) filter (where tipe = 'pemasukan'), 0)::float8   as pemasukan,
+    coalesce(sum(jumlah) filter (where tipe = 'pengeluaran'), 0)::float8 as pengeluaran
+from transaksi
+group by rekening_id;
+
+-- Index pendukung filter rentang tanggal (transaksi terbaru per bulan).
+create index if not exists transaksi_tanggal_idx on transaksi (tanggal desc);
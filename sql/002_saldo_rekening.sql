@@ -0,0 +1,48 @@
+-- Saldo berjalan per rekening yang diperbarui setiap kali ada transaksi
+-- (dipakai oleh buku_saldo.BukuSaldo). Jalankan setelah 001_agregasi_dashboard.sql.
+
+create table if not exists saldo_rekening (
+    rekening_id bigint primary key references rekening (id) on delete cascade,
+    saldo       float8 not null default 0,
+    diperbarui  timestamptz not null default now()
+);
+
+-- Tambah/kurangi saldo secara atomik. Baris yang belum ada dibuat dari
+-- saldo_awal rekening, sehingga dua worker yang mencatat bersamaan tidak
+-- saling menimpa.
+create or replace function tambah_saldo_rekening(p_rekening_id bigint, p_delta float8)
+returns float8
+language sql
+as $$
+    insert into saldo_rekening as s (rekening_id, saldo)
+    values (p_rekening_id, coalesce((select saldo_awal from rekening where id = p_rekening_id), 0) + p_delta)
+    on conflict (rekening_id) do update
+        set saldo = s.saldo + p_delta, diperbarui = now()
+    returning saldo;
+$$;
+
+-- Hitung ulang saldo semua rekening dari saldo_awal + transaksi (backfill /
+-- perbaikan; padanan `flask rekonsiliasi-saldo --perbaiki`). Tabel dikunci
+-- supaya tambah_saldo_rekening dari penulisan yang bersamaan menunggu.
+create or replace function bangun_ulang_saldo_rekening()
+returns bigint
+language plpgsql
+as $$
+declare
+    jumlah bigint;
+begin
+    lock table saldo_rekening in exclusive mode;
+    insert into saldo_rekening as s (rekening_id, saldo)
+    select r.id, coalesce(r.saldo_awal, 0) + coalesce(sum(case when t.tipe = 'pemasukan' then t.jumlah else -t.jumlah end), 0)::float8
+    from rekening r
+    left join transaksi t on t.rekening_id = r.id and t.tipe in ('pemasukan', 'pengeluaran')
+    group by r.id, r.saldo_awal
+    on conflict (rekening_id) do update
+        set saldo = excluded.saldo, diperbarui = now();
+    get diagnostics jumlah = row_count;
+    return jumlah;
+end;
+$$;
+
+-- Isi awal dari transaksi yang sudah ada.
+select bangun_ulang_saldo_rekening();
@@ -0,0 +1,7 @@
+-- Index untuk paginasi keyset /transaksi (urutan tanggal DESC, id DESC)
+-- dan filter tipe/kategori/rekening yang dikombinasikan dengan kursor.
+
+create index if not exists transaksi_tanggal_id_idx on transaksi (tanggal desc, id desc);
+create index if not exists transaksi_tipe_tanggal_idx on transaksi (tipe, tanggal desc, id desc);
+create index if not exists transaksi_kategori_tanggal_idx on transaksi (kategori, tanggal desc, id desc);
+create index if not exists transaksi_rekening_tanggal_idx on transaksi (rekening_id, tanggal desc, id desc);
@@ -0,0 +1,21 @@
+-- Penghitung versi per tabel (dipakai oleh versi.VersiData). Setiap rute yang
+-- menulis menaikkan versi tabel yang diubahnya, sehingga cache di semua
+-- worker (artefak ekspor, dsb.) tahu kapan datanya sudah basi.
+
+create table if not exists versi_data (
+    tabel       text primary key,
+    versi       bigint not null default 0,
+    diperbarui  timestamptz not null default now()
+);
+
+-- Naikkan versi beberapa tabel sekaligus dalam satu panggilan.
+create or replace function naikkan_versi(p_tabel text[])
+returns setof versi_data
+language sql
+as $$
+    insert into versi_data as v (tabel, versi)
+    select t, 1 from unnest(p_tabel) as t
+    on conflict (tabel) do update
+        set versi = v.versi + 1, diperbarui = now()
+    returning *;
+$$;
@@ -0,0 +1,70 @@
+-- Rekap bulanan yang disimpan (dipakai oleh rekap_bulanan.RekapBulanan dan
+-- backend_agregasi.BackendRekap). Diperbarui secara inkremental setiap kali
+-- transaksi dicatat atau dihapus, sehingga dashboard cukup membaca beberapa
+-- baris per bulan alih-alih mengagregasi seluruh ledger.
+-- Jalankan setelah 001_agregasi_dashboard.sql. Aman dijalankan ulang.
+
+create table if not exists rekap_bulanan (
+    id                bigint generated always as identity primary key,
+    tahun             int not null,
+    bulan             int not null,
+    tipe              text not null,
+    kategori          text,
+    rekening_id       bigint,
+    total             float8 not null default 0,
+    jumlah_transaksi  bigint not null default 0,
+    periode           text generated always as (lpad(tahun::text, 4, '0') || '-' || lpad(bulan::text, 2, '0')) stored,
+    constraint rekap_bulanan_kunci unique nulls not distinct (tahun, bulan, tipe, kategori, rekening_id)
+);
+
+create index if not exists rekap_bulanan_periode_idx on rekap_bulanan (periode);
+
+-- Tambahkan delta rekap dari satu penulisan. p_baris adalah array JSON
+-- [{tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi}]
+-- dengan kunci yang sudah unik (digabung di sisi aplikasi).
+create or replace function tambah_rekap_bulanan(p_baris jsonb)
+returns void
+language sql
+as $$
+    insert into rekap_bulanan as r (tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi)
+    select tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi
+    from jsonb_to_recordset(p_baris) as x(tahun int, bulan int, tipe text, kategori text, rekening_id bigint, total float8, jumlah_transaksi bigint)
+    on conflict on constraint rekap_bulanan_kunci do update
+        set total = r.total + excluded.total,
+            jumlah_transaksi = r.jumlah_transaksi + excluded.jumlah_transaksi;
+$$;
+
+-- Bangun ulang seluruh rekap dari tabel transaksi (backfill / perbaikan).
+-- Tabel dikunci supaya tambah_rekap_bulanan dari penulisan yang bersamaan
+-- menunggu sampai pembangunan ulang selesai.
+create or replace function bangun_ulang_rekap_bulanan()
+returns bigint
+language plpgsql
+as $$
+declare
+    jumlah bigint;
+begin
+    lock table rekap_bulanan in exclusive mode;
+    delete from rekap_bulanan;
+    insert into rekap_bulanan (tahun, bulan, tipe, kategori, rekening_id, total, jumlah_transaksi)
+    select extract(year from tanggal)::int, extract(month from tanggal)::int, tipe, kategori, rekening_id, sum(jumlah)::float8, count(*)
+    from transaksi
+    where tanggal is not null and tipe in ('pemasukan', 'pengeluaran')
+    group by 1, 2, 3, 4, 5;
+    get diagnostics jumlah = row_count;
+    return jumlah;
+end;
+$$;
+
+-- Total sepanjang waktu per rekening dari rekap (pengganti v_saldo_rekening
+-- yang tidak perlu memindai seluruh transaksi).
+create or replace view v_saldo_rekap as
+select
+    rekening_id,
+    coalesce(sum(total) filter (where tipe = 'pemasukan'), 0)::float8   as pemasukan,
+    coalesce(sum(total) filter (where tipe = 'pengeluaran'), 0)::float8 as pengeluaran
+from rekap_bulanan
+group by rekening_id;
+
+-- Isi awal dari transaksi yang sudah ada.
+select bangun_ulang_rekap_bulanan();
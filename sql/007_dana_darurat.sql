@@ -0,0 +1,51 @@
+-- Target dan alokasi otomatis Dana Darurat (dipakai oleh dana_darurat.DanaDarurat).
+-- Menggantikan penulisan yang dulu dilakukan setiap kali dashboard dibuka.
+-- Aman dijalankan ulang.
+
+-- Paling banyak satu baris 'Dana Darurat', sehingga dua worker yang
+-- membuatnya bersamaan tidak menghasilkan duplikat. Jika index ini gagal
+-- dibuat, hapus dulu baris Dana Darurat ganda yang sudah ada.
+create unique index if not exists tabungan_dana_darurat_unik on tabungan (nama) where nama = 'Dana Darurat';
+
+-- Samakan baris Dana Darurat dengan gaji dan saldo saat ini:
+--   - baris dibuat jika belum ada (tenggat 10 tahun);
+--   - target diganti p_target (null = target lama dipertahankan);
+--   - terkumpul = greatest(terkumpul, least(target, p_alokasi)), jadi alokasi
+--     otomatis tidak pernah mengurangi dana yang sudah terkumpul.
+-- Idempoten: memanggil ulang dengan argumen yang sama tidak menulis apa pun
+-- dan 'berubah' bernilai false.
+create or replace function sinkronkan_dana_darurat(p_target float8, p_alokasi float8)
+returns table (id bigint, target float8, terkumpul float8, berubah boolean)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    v_dibuat         boolean;
+    v_id             bigint;
+    v_target         float8;
+    v_terkumpul      float8;
+    v_target_baru    float8;
+    v_terkumpul_baru float8;
+begin
+    insert into tabungan (nama, target, terkumpul, tenggat)
+    values ('Dana Darurat', coalesce(p_target, 0), 0, current_date + 3650)
+    on conflict (nama) where nama = 'Dana Darurat' do nothing;
+    v_dibuat := found;
+
+    select t.id, t.target, t.terkumpul into v_id, v_target, v_terkumpul
+    from tabungan t where t.nama = 'Dana Darurat'
+    for update;
+
+    v_target_baru := coalesce(p_target, v_target);
+    v_terkumpul_baru := greatest(v_terkumpul, least(v_target_baru, greatest(p_alokasi, 0)));
+    if v_target_baru is not distinct from v_target and v_terkumpul_baru is not distinct from v_terkumpul then
+        return query select v_id, v_target, v_terkumpul, v_dibuat;
+        return;
+    end if;
+
+    update tabungan t
+        set target = v_target_baru, terkumpul = v_terkumpul_baru
+        where t.id = v_id;
+    return query select v_id, v_target_baru, v_terkumpul_baru, true;
+end;
+$$;
@@ -0,0 +1,101 @@
+-- Pemakaian anggaran inkremental dan log peringatan (dipakai oleh
+-- pelacak_anggaran.PelacakAnggaran). Pengeluaran per (tahun, bulan, kategori)
+-- diperbarui setiap kali transaksi dicatat atau dihapus; ambang anggaran
+-- (mis. 80% dan 100%) dievaluasi pada penulisan yang sama, sehingga status
+-- anggaran cukup membaca satu baris per anggaran.
+-- Aman dijalankan ulang.
+
+create table if not exists anggaran_terpakai (
+    tahun             int not null,
+    bulan             int not null,
+    kategori          text not null,
+    terpakai          float8 not null default 0,
+    jumlah_transaksi  bigint not null default 0,
+    primary key (tahun, bulan, kategori)
+);
+
+-- Satu baris per ambang yang dilewati. arah 'naik': pemakaian mencapai
+-- ambang; 'turun': kembali di bawah ambang (mis. transaksi dihapus), sehingga
+-- ambang yang sama bisa memicu peringatan lagi.
+create table if not exists peringatan_anggaran (
+    id                bigint generated always as identity primary key,
+    anggaran_id       bigint references anggaran (id) on delete cascade,
+    tahun             int not null,
+    bulan             int not null,
+    kategori          text not null,
+    ambang            float8 not null,
+    arah              text not null check (arah in ('naik', 'turun')),
+    batas             float8 not null,
+    terpakai_sebelum  float8 not null,
+    terpakai          float8 not null,
+    dibuat            timestamptz not null default now()
+);
+
+create index if not exists peringatan_anggaran_periode_idx on peringatan_anggaran (tahun, bulan, id desc);
+
+-- Tambahkan delta pengeluaran dari satu penulisan dan kembalikan peringatan
+-- yang timbul. p_baris adalah array JSON [{tahun, bulan, kategori, total,
+-- jumlah_transaksi}] dengan kunci unik; p_ambang adalah rasio terhadap batas
+-- (mis. '{0.8,1.0}'). Upsert mengunci baris pemakaian, jadi nilai sebelum
+-- (terpakai baru - delta) tetap benar untuk penulisan yang bersamaan.
+create or replace function catat_anggaran_terpakai(p_baris jsonb, p_ambang float8[])
+returns setof peringatan_anggaran
+language sql
+as $$
+    with delta as (
+        select tahun, bulan, kategori, total, jumlah_transaksi
+        from jsonb_to_recordset(p_baris) as x(tahun int, bulan int, kategori text, total float8, jumlah_transaksi bigint)
+    ), baru as (
+        insert into anggaran_terpakai as t (tahun, bulan, kategori, terpakai, jumlah_transaksi)
+        select tahun, bulan, kategori, total, jumlah_transaksi from delta
+        on conflict (tahun, bulan, kategori) do update
+            set terpakai = t.terpakai + excluded.terpakai,
+                jumlah_transaksi = t.jumlah_transaksi + excluded.jumlah_transaksi
+        returning t.tahun, t.bulan, t.kategori, t.terpakai
+    ), perubahan as (
+        select b.tahun, b.bulan, b.kategori, b.terpakai - d.total as sebelum, b.terpakai as sesudah
+        from baru b join delta d using (tahun, bulan, kategori)
+    )
+    insert into peringatan_anggaran (anggaran_id, tahun, bulan, kategori, ambang, arah, batas, terpakai_sebelum, terpakai)
+    select a.id, p.tahun, p.bulan, p.kategori, x.ambang,
+           case when p.sesudah > p.sebelum then 'naik' else 'turun' end,
+           a.batas, p.sebelum, p.sesudah
+    from perubahan p
+    join anggaran a on a.tahun = p.tahun and a.bulan = p.bulan and a.kategori = p.kategori
+    cross join unnest(p_ambang) as x(ambang)
+    where a.batas > 0
+      and ((p.sebelum < x.ambang * a.batas and p.sesudah >= x.ambang * a.batas)
+        or (p.sesudah < x.ambang * a.batas and p.sebelum >= x.ambang * a.batas))
+    order by p.tahun, p.bulan, p.kategori, x.ambang
+    returning *;
+$$;
+
+-- Status anggaran: batas dan pemakaian, satu baris per anggaran.
+create or replace view v_status_anggaran as
+select a.id, a.tahun, a.bulan, a.kategori, a.batas::float8 as batas, coalesce(t.terpakai, 0)::float8 as terpakai
+from anggaran a
+left join anggaran_terpakai t on t.tahun = a.tahun and t.bulan = a.bulan and t.kategori = a.kategori;
+
+-- Bangun ulang pemakaian dari tabel transaksi (backfill / perbaikan). Tidak
+-- menulis peringatan untuk data lama.
+create or replace function bangun_ulang_anggaran_terpakai()
+returns bigint
+language plpgsql
+as $$
+declare
+    jumlah bigint;
+begin
+    lock table anggaran_terpakai in exclusive mode;
+    delete from anggaran_terpakai;
+    insert into anggaran_terpakai (tahun, bulan, kategori, terpakai, jumlah_transaksi)
+    select extract(year from tanggal)::int, extract(month from tanggal)::int, kategori, sum(jumlah)::float8, count(*)
+    from transaksi
+    where tanggal is not null and tipe = 'pengeluaran' and kategori is not null
+    group by 1, 2, 3;
+    get diagnostics jumlah = row_count;
+    return jumlah;
+end;
+$$;
+
+-- Isi awal dari transaksi yang sudah ada.
+select bangun_ulang_anggaran_terpakai();
@@ -0,0 +1,137 @@
+-- Indeks pencarian teks untuk transaksi.deskripsi dan
+-- utang_piutang.pihak_terkait/deskripsi (dipakai oleh pencarian.IndeksPencarian).
+-- Satu baris per dokumen sumber, diperbarui oleh rute yang menulis transaksi
+-- atau utang/piutang. Dua index GIN melayani dua mode pencarian:
+--   - dokumen (tsvector 'simple'): pencocokan awalan per kata ('kop' -> 'kopi')
+--   - teks (pg_trgm): pencocokan fuzzy untuk salah ketik ('kpoi' -> 'kopi')
+-- Filter (sumber, tipe, kategori, rekening, tanggal) ikut disimpan di baris
+-- indeks, jadi pencarian tidak perlu menyentuh tabel transaksi sama sekali.
+-- Aman dijalankan ulang.
+
+create extension if not exists pg_trgm;
+
+-- Huruf kecil, selain huruf/angka menjadi satu spasi. Padanan
+-- pencarian.normalisasi di sisi aplikasi.
+create or replace function normalisasi_teks(p_teks text)
+returns text
+language sql
+immutable parallel safe
+as $$
+    select btrim(regexp_replace(lower(coalesce(p_teks, '')), '[^[:alnum:]]+', ' ', 'g'));
+$$;
+
+create table if not exists indeks_pencarian (
+    sumber         text not null check (sumber in ('transaksi', 'utang_piutang')),
+    sumber_id      bigint not null,
+    deskripsi      text,
+    pihak_terkait  text,
+    tanggal        timestamptz,
+    tipe           text,
+    kategori       text,
+    rekening_id    bigint,
+    jumlah         float8,
+    teks           text generated always as (normalisasi_teks(coalesce(deskripsi, '') || ' ' || coalesce(pihak_terkait, ''))) stored,
+    dokumen        tsvector generated always as (to_tsvector('simple', normalisasi_teks(coalesce(deskripsi, '') || ' ' || coalesce(pihak_terkait, '')))) stored,
+    primary key (sumber, sumber_id)
+);
+
+create index if not exists indeks_pencarian_dokumen_idx on indeks_pencarian using gin (dokumen);
+create index if not exists indeks_pencarian_trgm_idx on indeks_pencarian using gin (teks gin_trgm_ops);
+-- Untuk kata yang sangat umum planner bisa berjalan di urutan tanggal dan
+-- berhenti setelah satu halaman, alih-alih mengurutkan semua yang cocok.
+create index if not exists indeks_pencarian_tanggal_idx on indeks_pencarian (tanggal desc, sumber, sumber_id desc);
+
+-- Simpan/perbarui dokumen dari satu penulisan. p_baris adalah array JSON
+-- [{sumber_id, deskripsi, pihak_terkait, tanggal, tipe, kategori,
+-- rekening_id, jumlah}].
+create or replace function catat_indeks_pencarian(p_sumber text, p_baris jsonb)
+returns void
+language sql
+as $$
+    insert into indeks_pencarian as i (sumber, sumber_id, deskripsi, pihak_terkait, tanggal, tipe, kategori, rekening_id, jumlah)
+    select p_sumber, sumber_id, deskripsi, pihak_terkait, tanggal, tipe, kategori, rekening_id, jumlah
+    from jsonb_to_recordset(p_baris) as x(sumber_id bigint, deskripsi text, pihak_terkait text, tanggal timestamptz,
+                                          tipe text, kategori text, rekening_id bigint, jumlah float8)
+    on conflict (sumber, sumber_id) do update
+        set deskripsi = excluded.deskripsi, pihak_terkait = excluded.pihak_terkait, tanggal = excluded.tanggal,
+            tipe = excluded.tipe, kategori = excluded.kategori, rekening_id = excluded.rekening_id, jumlah = excluded.jumlah;
+$$;
+
+create or replace function hapus_indeks_pencarian(p_sumber text, p_id bigint[])
+returns void
+language sql
+as $$
+    delete from indeks_pencarian where sumber = p_sumber and sumber_id = any(p_id);
+$$;
+
+-- Cari dokumen. p_tsquery (awalan, mis. 'kop:* & sus:*') dipakai jika
+-- p_fuzzy false; selain itu p_kueri dicocokkan dengan word_similarity pg_trgm
+-- (operator <%, memakai index trigram) dengan ambang p_ambang. Filter bernilai
+-- null diabaikan; p_sampai eksklusif. Hasil awalan diurutkan dari yang
+-- terbaru, hasil fuzzy dari yang paling mirip.
+create or replace function cari_indeks_pencarian(
+    p_tsquery text, p_kueri text, p_fuzzy boolean, p_ambang float8,
+    p_sumber text, p_tipe text, p_kategori text, p_rekening_id bigint,
+    p_dari timestamptz, p_sampai timestamptz, p_limit int, p_offset int
+)
+returns table (sumber text, sumber_id bigint, deskripsi text, pihak_terkait text, tanggal timestamptz,
+               tipe text, kategori text, rekening_id bigint, jumlah float8, skor float8)
+language plpgsql
+stable
+as $$
+begin
+    if p_fuzzy then
+        perform set_config('pg_trgm.word_similarity_threshold', p_ambang::text, true);
+        return query
+        select i.sumber, i.sumber_id, i.deskripsi, i.pihak_terkait, i.tanggal, i.tipe, i.kategori, i.rekening_id, i.jumlah,
+               word_similarity(p_kueri, i.teks)::float8
+        from indeks_pencarian i
+        where p_kueri <% i.teks
+          and (p_sumber is null or i.sumber = p_sumber)
+          and (p_tipe is null or i.tipe = p_tipe)
+          and (p_kategori is null or i.kategori = p_kategori)
+          and (p_rekening_id is null or i.rekening_id = p_rekening_id)
+          and (p_dari is null or i.tanggal >= p_dari)
+          and (p_sampai is null or i.tanggal < p_sampai)
+        order by 10 desc, i.tanggal desc nulls last, i.sumber, i.sumber_id desc
+        limit p_limit offset p_offset;
+    else
+        return query
+        select i.sumber, i.sumber_id, i.deskripsi, i.pihak_terkait, i.tanggal, i.tipe, i.kategori, i.rekening_id, i.jumlah,
+               1::float8
+        from indeks_pencarian i
+        where i.dokumen @@ to_tsquery('simple', p_tsquery)
+          and (p_sumber is null or i.sumber = p_sumber)
+          and (p_tipe is null or i.tipe = p_tipe)
+          and (p_kategori is null or i.kategori = p_kategori)
+          and (p_rekening_id is null or i.rekening_id = p_rekening_id)
+          and (p_dari is null or i.tanggal >= p_dari)
+          and (p_sampai is null or i.tanggal < p_sampai)
+        order by i.tanggal desc nulls last, i.sumber, i.sumber_id desc
+        limit p_limit offset p_offset;
+    end if;
+end;
+$$;
+
+-- Bangun ulang seluruh indeks dari transaksi dan utang_piutang (backfill /
+-- perbaikan). Tabel dikunci supaya penulisan yang bersamaan menunggu.
+create or replace function bangun_ulang_indeks_pencarian()
+returns bigint
+language plpgsql
+as $$
+declare
+    jumlah bigint;
+begin
+    lock table indeks_pencarian in exclusive mode;
+    delete from indeks_pencarian;
+    insert into indeks_pencarian (sumber, sumber_id, deskripsi, pihak_terkait, tanggal, tipe, kategori, rekening_id, jumlah)
+    select 'transaksi', id, deskripsi, null, tanggal, tipe, kategori, rekening_id, jumlah from transaksi
+    union all
+    select 'utang_piutang', id, deskripsi, pihak_terkait, tanggal_mulai, tipe, null, null, jumlah_total from utang_piutang;
+    get diagnostics jumlah = row_count;
+    return jumlah;
+end;
+$$;
+
+-- Isi awal dari data yang sudah ada.
+select bangun_ulang_indeks_pencarian();
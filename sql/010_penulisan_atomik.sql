@@ -0,0 +1,429 @@
+-- Penulisan atomik (dipakai oleh penulisan.PenulisSupabase). Setiap operasi
+-- bisnis (transaksi biasa/transfer, transaksi yang membuat atau membayar
+-- utang/piutang, bayar cicilan, hapus transaksi, hapus utang/piutang, satu
+-- batch impor) adalah satu fungsi, jadi satu panggilan RPC = satu transaksi
+-- database: semua langkahnya tersimpan, termasuk saldo_rekening,
+-- rekap_bulanan, anggaran_terpakai, indeks_pencarian, Dana Darurat dan
+-- versi_data, atau tidak sama sekali.
+-- Jalankan setelah 009_pencarian.sql. Aman dijalankan ulang.
+
+-- Transaksi mana yang membuat ('buat') atau membayar ('bayar') catatan
+-- utang/piutang mana, dan berapa. Dipakai hapus_transaksi_atomik untuk
+-- membatalkan efek transaksi pada utang/piutang. Transaksi dari sebelum file
+-- ini dijalankan tidak punya tautan, jadi menghapusnya tidak mengubah
+-- catatan utang/piutang (sama seperti sebelumnya).
+create table if not exists transaksi_utang_piutang (
+    transaksi_id      bigint not null references transaksi (id) on delete cascade,
+    utang_piutang_id  bigint not null references utang_piutang (id) on delete cascade,
+    jenis             text not null check (jenis in ('buat', 'bayar')),
+    jumlah            float8 not null,
+    primary key (transaksi_id, utang_piutang_id)
+);
+
+create index if not exists transaksi_utang_piutang_utang_idx on transaksi_utang_piutang (utang_piutang_id);
+
+-- Nama pihak untuk pencocokan. Padanan pelunasan.normalisasi_nama.
+create or replace function normalisasi_nama(p_nama text)
+returns text
+language sql
+immutable parallel safe
+as $$
+    select lower(regexp_replace(btrim(coalesce(p_nama, '')), '\s+', ' ', 'g'));
+$$;
+
+-- Catatan aktif per (tipe, pihak), urut FIFO: lunasi_dari_transaksi hanya
+-- membaca dan mengunci catatan pihak yang dibayar, bukan semua catatan aktif.
+create index if not exists utang_piutang_pihak_aktif_idx
+    on utang_piutang (tipe, normalisasi_nama(pihak_terkait), tanggal_mulai, id) where not lunas;
+
+-- Bersihkan sisa sql/006_pelunasan_utang.sql (sudah dihapus): pembayaran per
+-- catatan dari klien tidak dipakai lagi sejak pelunasan berjalan di
+-- lunasi_dari_transaksi, dan index di atas menggantikan index lamanya.
+drop function if exists bayar_utang_piutang(bigint, float8, boolean);
+drop index if exists utang_piutang_aktif_idx;
+
+-- Terapkan transaksi yang baru disimpan (p_arah 1) atau dihapus (p_arah -1)
+-- ke seluruh data turunan, di dalam transaksi pemanggil. Padanan
+-- penulisan.PenulisSQLite._terapkan_mutasi. p_baris adalah array JSON baris transaksi
+-- lengkap (dengan id); mengembalikan peringatan anggaran yang timbul.
+create or replace function terapkan_mutasi_transaksi(p_baris jsonb, p_arah int, p_ambang float8[])
+returns setof peringatan_anggaran
+language plpgsql
+as $$
+declare
+    r record;
+begin
+    -- Urut rekening_id supaya dua penulisan bersamaan mengunci baris saldo
+    -- dalam urutan yang sama
+    for r in
+        select x.rekening_id, sum(case when x.tipe = 'pemasukan' then x.jumlah else -x.jumlah end)::float8 as delta
+        from jsonb_populate_recordset(null::transaksi, p_baris) x
+        where x.rekening_id is not null and x.tipe in ('pemasukan', 'pengeluaran')
+        group by x.rekening_id
+        order by x.rekening_id
+    loop
+        if r.delta <> 0 then
+            perform tambah_saldo_rekening(r.rekening_id, p_arah * r.delta);
+        end if;
+    end loop;
+
+    perform tambah_rekap_bulanan(coalesce(jsonb_agg(to_jsonb(d)), '[]'))
+    from (
+        select extract(year from x.tanggal)::int as tahun, extract(month from x.tanggal)::int as bulan, x.tipe, x.kategori, x.rekening_id,
+               (p_arah * sum(x.jumlah))::float8 as total, p_arah * count(*) as jumlah_transaksi
+        from jsonb_populate_recordset(null::transaksi, p_baris) x
+        where x.tanggal is not null and x.tipe in ('pemasukan', 'pengeluaran')
+        group by 1, 2, 3, 4, 5
+    ) d;
+
+    return query
+    select * from catat_anggaran_terpakai((
+        select coalesce(jsonb_agg(to_jsonb(d)), '[]')
+        from (
+            select extract(year from x.tanggal)::int as tahun, extract(month from x.tanggal)::int as bulan, x.kategori,
+                   (p_arah * sum(x.jumlah))::float8 as total, p_arah * count(*) as jumlah_transaksi
+            from jsonb_populate_recordset(null::transaksi, p_baris) x
+            where x.tanggal is not null and x.tipe = 'pengeluaran' and x.kategori is not null
+            group by 1, 2, 3
+        ) d
+    ), p_ambang);
+
+    if p_arah > 0 then
+        perform catat_indeks_pencarian('transaksi', coalesce(jsonb_agg(jsonb_build_object(
+            'sumber_id', x.id, 'deskripsi', x.deskripsi, 'pihak_terkait', null, 'tanggal', x.tanggal, 'tipe', x.tipe,
+            'kategori', x.kategori, 'rekening_id', x.rekening_id, 'jumlah', x.jumlah)), '[]'))
+        from jsonb_populate_recordset(null::transaksi, p_baris) x;
+    else
+        perform hapus_indeks_pencarian('transaksi', array(select x.id from jsonb_populate_recordset(null::transaksi, p_baris) x));
+    end if;
+
+    perform naikkan_versi(array['transaksi']);
+end;
+$$;
+
+-- Samakan Dana Darurat dengan gaji dan total saldo setelah transaksi berubah,
+-- di dalam transaksi pemanggil, lewat sinkronkan_dana_darurat
+-- (007_dana_darurat.sql). Padanan app.sinkronkan_dana_darurat dengan backend
+-- 'rekap': 10000000 dan 3 adalah dana_darurat.DANA_AMAN_TARGET dan
+-- KELIPATAN_GAJI. Mengembalikan true jika baris Dana Darurat berubah.
+create or replace function sinkronkan_dana_darurat_dari_saldo()
+returns boolean
+language plpgsql
+as $$
+declare
+    v_gaji     float8;
+    v_total    float8;
+    v_berubah  boolean;
+begin
+    -- Kunci baris Dana Darurat sebelum membaca total: penulis lain yang
+    -- menunggu di sini membaca total setelah penulis pertama commit, jadi
+    -- sinkronisasi terakhir selalu memakai total terbaru
+    perform 1 from tabungan where nama = 'Dana Darurat' for update;
+
+    -- Nilai gaji yang bukan angka dianggap belum diatur, bukan error yang
+    -- membatalkan penulisan transaksi
+    select case when nilai ~ '^\s*[0-9]+(\.[0-9]*)?\s*$' then nilai::float8 else 0 end into v_gaji
+    from pengaturan where kunci = 'gaji';
+    select coalesce(sum(case when tipe = 'pemasukan' then total else -total end), 0)::float8 into v_total
+    from rekap_bulanan where tipe in ('pemasukan', 'pengeluaran');
+
+    select s.berubah into v_berubah
+    from sinkronkan_dana_darurat(case when v_gaji > 0 then v_gaji * 3 end, v_total - least(v_total, 10000000)) s;
+    if v_berubah then
+        perform naikkan_versi(array['tabungan']);
+    end if;
+    return coalesce(v_berubah, false);
+end;
+$$;
+
+-- Buat catatan utang/piutang sebesar p_transaksi (yang sudah disimpan) dan
+-- tautkan keduanya. p_utang_baru {tipe, deskripsi, pihak_terkait}.
+create or replace function buat_utang_dari_transaksi(p_transaksi transaksi, p_utang_baru jsonb)
+returns utang_piutang
+language plpgsql
+as $$
+declare
+    v_up utang_piutang;
+begin
+    insert into utang_piutang (tipe, deskripsi, pihak_terkait, jumlah_total, jumlah_terbayar, lunas, tanggal_mulai)
+    values (p_utang_baru ->> 'tipe', p_utang_baru ->> 'deskripsi', p_utang_baru ->> 'pihak_terkait',
+            p_transaksi.jumlah, 0, false, p_transaksi.tanggal)
+    returning * into v_up;
+    insert into transaksi_utang_piutang (transaksi_id, utang_piutang_id, jenis, jumlah)
+    values (p_transaksi.id, v_up.id, 'buat', p_transaksi.jumlah);
+    perform catat_indeks_pencarian('utang_piutang', jsonb_build_array(jsonb_build_object(
+        'sumber_id', v_up.id, 'deskripsi', v_up.deskripsi, 'pihak_terkait', v_up.pihak_terkait, 'tanggal', v_up.tanggal_mulai,
+        'tipe', v_up.tipe, 'kategori', null, 'rekening_id', null, 'jumlah', v_up.jumlah_total)));
+    return v_up;
+end;
+$$;
+
+-- Alokasikan jumlah p_transaksi (yang sudah disimpan) ke catatan aktif
+-- p_pelunasan {tipe, pihak_terkait}, yang terlama lebih dulu (padanan
+-- pelunasan.alokasi_fifo); catatannya dikunci sehingga dua
+-- pembayaran bersamaan tidak mengalokasikan sisa yang sama. Mengembalikan
+-- {alokasi: [{id, dialokasikan, lunas}], sisa}.
+create or replace function lunasi_dari_transaksi(p_transaksi transaksi, p_pelunasan jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_alokasi  jsonb := '[]';
+    v_sisa     float8 := p_transaksi.jumlah;
+    v_baru     float8;
+    u          record;
+begin
+    for u in
+        select * from utang_piutang
+        where not lunas and tipe = p_pelunasan ->> 'tipe'
+          and normalisasi_nama(pihak_terkait) = normalisasi_nama(p_pelunasan ->> 'pihak_terkait')
+        order by tanggal_mulai, id
+        for update
+    loop
+        exit when v_sisa <= 0.005;
+        v_baru := greatest(u.jumlah_terbayar, least(u.jumlah_total, u.jumlah_terbayar + v_sisa));
+        continue when v_baru <= u.jumlah_terbayar;
+        update utang_piutang set jumlah_terbayar = v_baru, lunas = v_baru >= u.jumlah_total where id = u.id;
+        insert into transaksi_utang_piutang (transaksi_id, utang_piutang_id, jenis, jumlah)
+        values (p_transaksi.id, u.id, 'bayar', v_baru - u.jumlah_terbayar);
+        v_alokasi := v_alokasi || jsonb_build_object('id', u.id, 'dialokasikan', v_baru - u.jumlah_terbayar, 'lunas', v_baru >= u.jumlah_total);
+        v_sisa := v_sisa - (v_baru - u.jumlah_terbayar);
+    end loop;
+    if v_sisa <= 0.005 then
+        v_sisa := 0;
+    end if;
+    return jsonb_build_object('alokasi', v_alokasi, 'sisa', v_sisa);
+end;
+$$;
+
+-- Catat transaksi (satu baris, atau dua untuk transfer) beserta efeknya.
+-- p_utang_baru: buat catatan utang/piutang sebesar transaksi pertama
+-- (buat_utang_dari_transaksi). p_pelunasan: alokasikan jumlah transaksi
+-- pertama ke catatan aktif pihak tersebut (lunasi_dari_transaksi). Dana
+-- Darurat ikut disinkronkan (sinkronkan_dana_darurat_dari_saldo).
+-- Mengembalikan {transaksi, utang_piutang, alokasi, sisa, peringatan,
+-- dana_darurat_berubah}.
+create or replace function catat_transaksi_atomik(
+    p_transaksi jsonb, p_ambang float8[], p_utang_baru jsonb default null, p_pelunasan jsonb default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_transaksi   jsonb;
+    v_utama       transaksi;
+    v_utang       jsonb := '[]';
+    v_lunas       jsonb := jsonb_build_object('alokasi', '[]'::jsonb, 'sisa', 0);
+    v_peringatan  jsonb;
+begin
+    with baru as (
+        insert into transaksi (deskripsi, jumlah, tipe, kategori, tanggal, rekening_id)
+        select x.deskripsi, x.jumlah, x.tipe, x.kategori, x.tanggal, x.rekening_id
+        from jsonb_populate_recordset(null::transaksi, p_transaksi) x
+        returning *
+    )
+    select coalesce(jsonb_agg(to_jsonb(baru) order by baru.id), '[]') into v_transaksi from baru;
+    v_utama := jsonb_populate_record(null::transaksi, v_transaksi -> 0);
+
+    if p_utang_baru is not null then
+        v_utang := jsonb_build_array(to_jsonb(buat_utang_dari_transaksi(v_utama, p_utang_baru)));
+    end if;
+    if p_pelunasan is not null then
+        v_lunas := lunasi_dari_transaksi(v_utama, p_pelunasan);
+    end if;
+
+    select coalesce(jsonb_agg(to_jsonb(p) order by p.id), '[]') into v_peringatan
+    from terapkan_mutasi_transaksi(v_transaksi, 1, p_ambang) p;
+    if p_utang_baru is not null or jsonb_array_length(v_lunas -> 'alokasi') > 0 then
+        perform naikkan_versi(array['utang_piutang']);
+    end if;
+
+    return jsonb_build_object('transaksi', v_transaksi, 'utang_piutang', v_utang, 'alokasi', v_lunas -> 'alokasi',
+                              'sisa', v_lunas -> 'sisa', 'peringatan', v_peringatan,
+                              'dana_darurat_berubah', sinkronkan_dana_darurat_dari_saldo());
+end;
+$$;
+
+-- Impor massal: satu batch baris dalam satu transaksi database. p_baris
+-- adalah array {transaksi, utang_baru?, pelunasan?} dengan arti yang sama
+-- seperti catat_transaksi_atomik; baris diproses berurutan, jadi pelunasan
+-- boleh mengenai catatan yang dibuat baris sebelumnya di batch yang sama.
+-- Data turunan dan Dana Darurat diperbarui sekali untuk seluruh batch.
+-- Mengembalikan {transaksi, utang_piutang, hasil, peringatan,
+-- dana_darurat_berubah}; hasil sejajar dengan p_baris, masing-masing
+-- {alokasi, sisa}.
+create or replace function impor_transaksi_atomik(p_baris jsonb, p_ambang float8[])
+returns jsonb
+language plpgsql
+as $$
+declare
+    e             jsonb;
+    v_baris       transaksi;
+    v_transaksi   jsonb := '[]';
+    v_utang       jsonb := '[]';
+    v_hasil       jsonb := '[]';
+    v_lunas       jsonb;
+    v_ubah_utang  boolean := false;
+    v_peringatan  jsonb;
+begin
+    for e in select x.elemen from jsonb_array_elements(p_baris) with ordinality as x(elemen, urutan) order by x.urutan loop
+        insert into transaksi (deskripsi, jumlah, tipe, kategori, tanggal, rekening_id)
+        select x.deskripsi, x.jumlah, x.tipe, x.kategori, x.tanggal, x.rekening_id
+        from jsonb_populate_record(null::transaksi, e -> 'transaksi') x
+        returning * into v_baris;
+        v_transaksi := v_transaksi || jsonb_build_array(to_jsonb(v_baris));
+
+        v_lunas := jsonb_build_object('alokasi', '[]'::jsonb, 'sisa', 0);
+        if jsonb_typeof(e -> 'utang_baru') = 'object' then
+            v_utang := v_utang || jsonb_build_array(to_jsonb(buat_utang_dari_transaksi(v_baris, e -> 'utang_baru')));
+            v_ubah_utang := true;
+        end if;
+        if jsonb_typeof(e -> 'pelunasan') = 'object' then
+            v_lunas := lunasi_dari_transaksi(v_baris, e -> 'pelunasan');
+            v_ubah_utang := v_ubah_utang or jsonb_array_length(v_lunas -> 'alokasi') > 0;
+        end if;
+        v_hasil := v_hasil || jsonb_build_array(v_lunas);
+    end loop;
+
+    select coalesce(jsonb_agg(to_jsonb(p) order by p.id), '[]') into v_peringatan
+    from terapkan_mutasi_transaksi(v_transaksi, 1, p_ambang) p;
+    if v_ubah_utang then
+        perform naikkan_versi(array['utang_piutang']);
+    end if;
+
+    return jsonb_build_object('transaksi', v_transaksi, 'utang_piutang', v_utang, 'hasil', v_hasil, 'peringatan', v_peringatan,
+                              'dana_darurat_berubah', sinkronkan_dana_darurat_dari_saldo());
+end;
+$$;
+
+-- Bayar cicilan satu catatan utang/piutang: transaksi pembayaran (tipe,
+-- kategori dan deskripsi mengikuti catatannya) dan jumlah_terbayar ditulis
+-- bersama. p_transaksi {jumlah, tanggal, rekening_id}. Berbeda dengan
+-- lunasi_dari_transaksi, jumlah_terbayar boleh melewati jumlah_total.
+-- Mengembalikan {transaksi, utang_piutang, peringatan, dana_darurat_berubah}.
+create or replace function bayar_cicilan_atomik(p_utang_piutang_id bigint, p_transaksi jsonb, p_ambang float8[])
+returns jsonb
+language plpgsql
+as $$
+declare
+    u             utang_piutang;
+    v_utama       transaksi;
+    v_transaksi   jsonb;
+    v_baru        float8;
+    v_peringatan  jsonb;
+begin
+    select * into u from utang_piutang where id = p_utang_piutang_id for update;
+    if not found then
+        raise exception 'Catatan utang/piutang % tidak ditemukan', p_utang_piutang_id using errcode = 'no_data_found';
+    end if;
+
+    insert into transaksi (deskripsi, jumlah, tipe, kategori, tanggal, rekening_id)
+    select case when u.tipe = 'Utang' then 'Bayar Utang: ' else 'Terima Piutang: ' end || coalesce(u.deskripsi, ''),
+           x.jumlah,
+           case when u.tipe = 'Utang' then 'pengeluaran' else 'pemasukan' end,
+           case when u.tipe = 'Utang' then 'Pembayaran Utang' else 'Penerimaan Piutang' end,
+           x.tanggal, x.rekening_id
+    from jsonb_populate_record(null::transaksi, p_transaksi) x
+    returning * into v_utama;
+    v_transaksi := jsonb_build_array(to_jsonb(v_utama));
+
+    v_baru := u.jumlah_terbayar + v_utama.jumlah;
+    update utang_piutang set jumlah_terbayar = v_baru, lunas = v_baru >= u.jumlah_total where id = u.id
+    returning * into u;
+    insert into transaksi_utang_piutang (transaksi_id, utang_piutang_id, jenis, jumlah)
+    values (v_utama.id, u.id, 'bayar', v_utama.jumlah);
+
+    select coalesce(jsonb_agg(to_jsonb(p) order by p.id), '[]') into v_peringatan
+    from terapkan_mutasi_transaksi(v_transaksi, 1, p_ambang) p;
+    perform naikkan_versi(array['utang_piutang']);
+
+    return jsonb_build_object('transaksi', v_transaksi, 'utang_piutang', jsonb_build_array(to_jsonb(u)), 'peringatan', v_peringatan,
+                              'dana_darurat_berubah', sinkronkan_dana_darurat_dari_saldo());
+end;
+$$;
+
+-- Hapus satu transaksi dan batalkan efeknya: pembayaran dikurangkan lagi
+-- dari jumlah_terbayar, catatan yang dibuat transaksi ini ikut dihapus.
+-- Catatan yang sudah menerima pembayaran tidak dihapus diam-diam; seluruh
+-- penghapusan dibatalkan dengan error supaya pembayarannya dihapus dulu.
+-- Dana Darurat ikut disinkronkan. Mengembalikan {transaksi,
+-- utang_piutang_dihapus, utang_piutang_diperbarui, peringatan,
+-- dana_darurat_berubah}; 'transaksi' kosong jika id tidak ada.
+create or replace function hapus_transaksi_atomik(p_id bigint, p_ambang float8[])
+returns jsonb
+language plpgsql
+as $$
+declare
+    l             record;
+    u             utang_piutang;
+    v_transaksi   jsonb;
+    v_dihapus     jsonb := '[]';
+    v_diperbarui  jsonb := '[]';
+    v_peringatan  jsonb := '[]';
+begin
+    -- Penghapusan bersamaan atas id yang sama menunggu di sini, jadi efeknya
+    -- hanya dibatalkan sekali
+    perform 1 from transaksi where id = p_id for update;
+    if not found then
+        return jsonb_build_object('transaksi', '[]'::jsonb, 'utang_piutang_dihapus', v_dihapus,
+                                  'utang_piutang_diperbarui', v_diperbarui, 'peringatan', v_peringatan,
+                                  'dana_darurat_berubah', false);
+    end if;
+
+    for l in select * from transaksi_utang_piutang where transaksi_id = p_id order by utang_piutang_id loop
+        if l.jenis = 'bayar' then
+            update utang_piutang
+                set jumlah_terbayar = greatest(jumlah_terbayar - l.jumlah, 0),
+                    lunas = greatest(jumlah_terbayar - l.jumlah, 0) >= jumlah_total
+                where id = l.utang_piutang_id
+                returning * into u;
+            if found then
+                v_diperbarui := v_diperbarui || to_jsonb(u);
+            end if;
+        else
+            select * into u from utang_piutang where id = l.utang_piutang_id for update;
+            if found then
+                if u.jumlah_terbayar > 0.005 then
+                    raise exception 'Catatan % dengan % sudah dibayar Rp %; hapus transaksi pembayarannya dulu.',
+                        u.tipe, u.pihak_terkait, u.jumlah_terbayar using errcode = 'restrict_violation';
+                end if;
+                delete from utang_piutang where id = u.id;
+                perform hapus_indeks_pencarian('utang_piutang', array[u.id]);
+                v_dihapus := v_dihapus || to_jsonb(u);
+            end if;
+        end if;
+    end loop;
+
+    with hapus as (delete from transaksi where id = p_id returning *)
+    select coalesce(jsonb_agg(to_jsonb(hapus)), '[]') into v_transaksi from hapus;
+    select coalesce(jsonb_agg(to_jsonb(p) order by p.id), '[]') into v_peringatan
+    from terapkan_mutasi_transaksi(v_transaksi, -1, p_ambang) p;
+    if jsonb_array_length(v_dihapus) + jsonb_array_length(v_diperbarui) > 0 then
+        perform naikkan_versi(array['utang_piutang']);
+    end if;
+
+    return jsonb_build_object('transaksi', v_transaksi, 'utang_piutang_dihapus', v_dihapus,
+                              'utang_piutang_diperbarui', v_diperbarui, 'peringatan', v_peringatan,
+                              'dana_darurat_berubah', sinkronkan_dana_darurat_dari_saldo());
+end;
+$$;
+
+-- Hapus satu catatan utang/piutang beserta dokumennya di indeks pencarian.
+-- Transaksi yang terkait tetap ada (tautannya ikut terhapus). Mengembalikan
+-- array JSON baris yang dihapus (kosong jika id tidak ada).
+create or replace function hapus_utang_piutang_atomik(p_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_utang jsonb;
+begin
+    with hapus as (delete from utang_piutang where id = p_id returning *)
+    select coalesce(jsonb_agg(to_jsonb(hapus)), '[]') into v_utang from hapus;
+    if jsonb_array_length(v_utang) > 0 then
+        perform hapus_indeks_pencarian('utang_piutang', array[p_id]);
+        perform naikkan_versi(array['utang_piutang']);
+    end if;
+    return v_utang;
+end;
+$$;
@@ -0,0 +1,32 @@
+"""Penghitung versi data per tabel.
+
+Rute yang menulis menaikkan versi tabel yang diubahnya (tabel versi_data,
+lihat sql/004_versi_data.sql). Karena disimpan di database, versinya sama
+untuk semua proses worker, sehingga bisa dipakai sebagai bagian kunci cache:
+hasil yang dibuat pada versi lama otomatis tidak dipakai lagi.
+"""
+from datetime import datetime
+
+
+class VersiData:
+    def __init__(self, client):
+        self.client = client
+
+    def naikkan(self, *tabel):
+        """Naikkan versi tabel-tabel yang baru ditulis (satu panggilan RPC)."""
+        if tabel:
+            self.client.rpc('naikkan_versi', {'p_tabel': list(tabel)}).execute()
+
+    def semua(self):
+        """{tabel: versi}; tabel yang belum pernah ditulis tidak ada di dict (versi 0)."""
+        rows = self.client.table('versi_data').select('tabel, versi').execute().data or []
+        return {r['tabel']: int(r['versi']) for r in rows}
+
+    def ambil(self, tabel):
+        rows = self.client.table('versi_data').select('versi').eq('tabel', tabel).execute().data or []
+        return int(rows[0]['versi']) if rows else 0
+
+    def detail(self):
+        """{tabel: (versi, diperbarui)}; `diperbarui` berupa datetime aware (UTC dari database)."""
+        rows = self.client.table('versi_data').select('tabel, versi, diperbarui').execute().data or []
+        return {r['tabel']: (int(r['versi']), datetime.fromisoformat(r['diperbarui']) if r.get('diperbarui') else None) for r in rows}